@@ -0,0 +1,313 @@
+"""
+しきい値アラームのルールエンジン（取込み時に評価）
+設備 × データ項目ごとのルール（AlarmRule）を設備単位の評価器にコンパイルし、
+受信したサンプルをリクエスト処理スレッドの外（専用ワーカースレッド）で評価します。
+
+ルールの条件（condition）:
+    gt / ge / lt / le     値としきい値の比較（例: temperature > 80）
+    rate_gt / rate_lt     直前のサンプルからの変化率（/秒）としきい値の比較
+    duration_seconds      条件がこの秒数以上続いたら発報（0で即時）
+    hysteresis            発報中は しきい値 ∓ hysteresis まで戻るまで解除しない
+
+- 評価は1サンプルあたり「その設備の設定済みデータ項目 × ルール数」の定数時間
+  （設備の評価器は辞書で引き、ルールは項目ごとにまとめて保持）
+- 継続時間はサンプルの時刻で判定（サンプルが届かない間は発報・解除されない）
+- 時刻が前後・重複したサンプル（再送分など）は評価しない
+- 発報・解除は AlarmEvent（発報時刻〜解除時刻の区間）に保存し、Socket.IO で配信
+  （monitoring / equipment_<id> ルームに alarm_raised / alarm_cleared）
+- 評価器は設備ごとに遅延ロードし、発報中の状態は未解除の AlarmEvent から復元
+- キューが満杯の場合はサンプルを破棄（取込みを止めない）し、メトリクスに計上
+"""
+
+import logging
+import operator
+import queue
+import threading
+
+from sqlalchemy import select, update
+
+from backend.db import db
+from backend.db.models import AlarmEvent, AlarmRule
+from backend.db.workloads import WORKLOAD_INGEST, workload
+from backend.metrics import emit_to_room, registry
+from backend.timestamps import utc_seconds
+
+logger = logging.getLogger(__name__)
+
+ALARM_CONDITIONS = ("gt", "ge", "lt", "le", "rate_gt", "rate_lt")
+ALARM_SEVERITIES = ("info", "warning", "critical")
+
+# 条件 → (比較演算子, 上向きの条件か, 変化率で判定するか)
+_CONDITION_OPS = {
+    "gt": (operator.gt, True, False),
+    "ge": (operator.ge, True, False),
+    "lt": (operator.lt, False, False),
+    "le": (operator.le, False, False),
+    "rate_gt": (operator.gt, True, True),
+    "rate_lt": (operator.lt, False, True),
+}
+
+ALARM_SAMPLES = registry.counter(
+    "plc_alarm_samples_total", "Samples submitted to the alarm engine by result", ("result",))
+ALARM_TRANSITIONS = registry.counter(
+    "plc_alarm_transitions_total", "Alarm transitions by event", ("event",))
+ALARM_QUEUE_DEPTH = registry.gauge(
+    "plc_alarm_queue_depth", "Ingest submissions waiting for alarm evaluation")
+
+# 評価待ちキューの上限（サンプル単位ではなく submit 単位）
+ALARM_QUEUE_MAX = 10000
+# ワーカーが1回にまとめて処理する submit 数
+ALARM_BATCH_SIZE = 500
+
+
+class CompiledRule:
+    """1ルールの評価状態"""
+
+    __slots__ = ("rule_id", "name", "metric", "condition", "threshold", "duration", "hysteresis",
+                 "severity", "compare", "upward", "uses_rate", "active", "pending_since")
+
+    def __init__(self, rule_id, metric, condition, threshold, duration=0.0, hysteresis=0.0,
+                 severity="warning", name="", active=False):
+        self.rule_id = rule_id
+        self.name = name
+        self.metric = metric
+        self.condition = condition
+        self.threshold = float(threshold)
+        self.duration = max(0.0, float(duration or 0.0))
+        self.hysteresis = max(0.0, float(hysteresis or 0.0))
+        self.severity = severity
+        self.compare, self.upward, self.uses_rate = _CONDITION_OPS[condition]
+        self.active = active
+        self.pending_since = None
+
+    def holds(self, x):
+        """条件を満たしているか（発報中はヒステリシス分だけ解除を遅らせる）"""
+        threshold = self.threshold
+        if self.active and self.hysteresis:
+            threshold = threshold - self.hysteresis if self.upward else threshold + self.hysteresis
+        return self.compare(x, threshold)
+
+
+class EquipmentEvaluator:
+    """1設備のルール群（データ項目ごとにまとめたもの）と直前値"""
+
+    __slots__ = ("rules_by_metric", "last")
+
+    def __init__(self, rules):
+        self.rules_by_metric = {}
+        for rule in rules:
+            self.rules_by_metric.setdefault(rule.metric, []).append(rule)
+        self.last = {}
+
+    def evaluate(self, t, data):
+        """1サンプルを評価し、[(event, rule, value), ...]（event は raised / cleared）を返す"""
+        transitions = []
+        for metric, rules in self.rules_by_metric.items():
+            v = data.get(metric)
+            if not isinstance(v, (int, float)) or isinstance(v, bool):
+                continue
+            previous = self.last.get(metric)
+            if previous is not None and t <= previous[0]:
+                continue
+            rate = (v - previous[1]) / (t - previous[0]) if previous is not None else None
+            self.last[metric] = (t, v)
+            for rule in rules:
+                x = rate if rule.uses_rate else v
+                if x is None:
+                    continue
+                if rule.holds(x):
+                    if rule.active:
+                        continue
+                    if rule.pending_since is None:
+                        rule.pending_since = t
+                    if t - rule.pending_since >= rule.duration:
+                        rule.active = True
+                        rule.pending_since = None
+                        transitions.append(("raised", rule, x))
+                else:
+                    rule.pending_since = None
+                    if rule.active:
+                        rule.active = False
+                        transitions.append(("cleared", rule, x))
+        return transitions
+
+
+def load_alarm_rules(equipment_pk):
+    """設備の有効なルールをコンパイル（未解除の AlarmEvent があるルールは発報中として復元）"""
+    rows = db.session.execute(
+        select(
+            AlarmRule.id, AlarmRule.metric, AlarmRule.condition, AlarmRule.threshold,
+            AlarmRule.duration_seconds, AlarmRule.hysteresis, AlarmRule.severity, AlarmRule.name,
+        ).where(AlarmRule.equipment_id == equipment_pk, AlarmRule.enabled.is_(True))
+    ).all()
+    if not rows:
+        return []
+    active = set(db.session.execute(
+        select(AlarmEvent.rule_id).where(
+            AlarmEvent.equipment_id == equipment_pk, AlarmEvent.cleared_at.is_(None)
+        )
+    ).scalars())
+    return [
+        CompiledRule(rule_id, metric, condition, threshold, duration, hysteresis, severity, name,
+                     active=rule_id in active)
+        for rule_id, metric, condition, threshold, duration, hysteresis, severity, name in rows
+        if condition in _CONDITION_OPS
+    ]
+
+
+def persist_alarm_events(events):
+    """発報は AlarmEvent を追加、解除は未解除の AlarmEvent に解除時刻を記録"""
+    for event in events:
+        if event["event"] == "raised":
+            db.session.add(AlarmEvent(
+                rule_id=event["rule_id"], equipment_id=event["equipment_pk"], severity=event["severity"],
+                raised_at=event["timestamp"], raised_value=event["value"],
+            ))
+        else:
+            db.session.execute(
+                update(AlarmEvent)
+                .where(AlarmEvent.rule_id == event["rule_id"], AlarmEvent.cleared_at.is_(None))
+                .values(cleared_at=event["timestamp"], cleared_value=event["value"])
+            )
+    db.session.commit()
+
+
+class AlarmEngine:
+    """取込みサンプルを受け取り、専用スレッドでルールを評価する"""
+
+    def __init__(self, rule_loader=load_alarm_rules, max_queue=ALARM_QUEUE_MAX, batch_size=ALARM_BATCH_SIZE):
+        self.rule_loader = rule_loader      # rule_loader(equipment_pk) -> [CompiledRule]
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._evaluators = {}               # ワーカースレッドのみが触る
+        self._thread = None
+        self._app = None
+        self._socketio = None
+        self.dropped = 0
+
+    def start(self, app=None, socketio=None):
+        """ワーカースレッドを開始（app があれば発報・解除をDBに保存し、socketio があれば配信）"""
+        self._app = app
+        self._socketio = socketio
+        ALARM_QUEUE_DEPTH.set_function(self.queue_depth)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="alarm-engine", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, equipment_pk, equipment_id, samples):
+        """[(timestamp, data), ...]（時刻順）を評価待ちに追加（キューが満杯なら破棄して False）"""
+        try:
+            self._queue.put_nowait((equipment_pk, equipment_id, samples))
+        except queue.Full:
+            self.dropped += len(samples)
+            ALARM_SAMPLES.labels("dropped").inc(len(samples))
+            return False
+        return True
+
+    def invalidate(self, equipment_pk):
+        """ルールの変更時に評価器を作り直す（キュー経由でワーカーに依頼）"""
+        try:
+            self._queue.put_nowait((equipment_pk, None, None))
+        except queue.Full:
+            # 満杯時は待ってでも届ける（取りこぼすと古いルールで評価し続けるため）
+            self._queue.put((equipment_pk, None, None))
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """キューに積まれた分の評価・保存が終わるまで待つ"""
+        self._queue.join()
+
+    def evaluator(self, equipment_pk):
+        evaluator = self._evaluators.get(equipment_pk)
+        if evaluator is None:
+            evaluator = self._evaluators[equipment_pk] = EquipmentEvaluator(self.rule_loader(equipment_pk))
+        return evaluator
+
+    def process(self, items):
+        """[(equipment_pk, equipment_id, samples), ...] を評価し、発報・解除イベントを返す"""
+        events = []
+        evaluated = 0
+        for equipment_pk, equipment_id, samples in items:
+            if samples is None:
+                self._evaluators.pop(equipment_pk, None)
+                continue
+            evaluator = self.evaluator(equipment_pk)
+            if not evaluator.rules_by_metric:
+                continue
+            for timestamp, data in samples:
+                for event, rule, value in evaluator.evaluate(utc_seconds(timestamp), data):
+                    events.append({
+                        "event": event,
+                        "rule_id": rule.rule_id,
+                        "name": rule.name,
+                        "equipment_pk": equipment_pk,
+                        "equipment_id": equipment_id,
+                        "metric": rule.metric,
+                        "condition": rule.condition,
+                        "threshold": rule.threshold,
+                        "severity": rule.severity,
+                        "value": value,
+                        "timestamp": timestamp,
+                    })
+            evaluated += len(samples)
+        ALARM_SAMPLES.labels("evaluated").inc(evaluated)
+        for event in events:
+            ALARM_TRANSITIONS.labels(event["event"]).inc()
+        return events
+
+    def _next_batch(self):
+        items = [self._queue.get()]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._next_batch()
+            try:
+                self._handle(items)
+            except Exception as e:
+                logger.exception("❌ アラーム評価エラー: %s", e)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _handle(self, items):
+        if self._app is None:
+            self.process(items)
+            return
+        with self._app.app_context(), workload(WORKLOAD_INGEST):
+            try:
+                events = self.process(items)
+                if events:
+                    persist_alarm_events(events)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+        self._broadcast(events)
+
+    def _broadcast(self, events):
+        if not self._socketio:
+            return
+        for event in events:
+            payload = {key: value for key, value in event.items() if key not in ("event", "equipment_pk")}
+            name = f"alarm_{event['event']}"
+            try:
+                emit_to_room(self._socketio, name, payload, "monitoring")
+                emit_to_room(self._socketio, name, payload, f"equipment_{event['equipment_id']}")
+            except Exception as e:
+                logger.warning("⚠️ アラーム配信エラー (処理継続): %s", e)
+            logger.info("🚨 アラーム%s: 設備ID=%s, ルール=%s, 値=%s",
+                        "発報" if event["event"] == "raised" else "解除",
+                        event["equipment_id"], event["name"] or event["rule_id"], event["value"])
+
+
+alarm_engine = AlarmEngine()
@@ -0,0 +1,267 @@
+"""
+逐次型の異常検知（設備 × データ項目ごとの EWMA 平均・分散と zスコア）
+取込み時にサンプルごとに基準値（指数加重移動平均・分散）を更新し、
+基準からのずれを zスコアとして返します。logs の夜間一括走査は不要です。
+
+- スコアは更新前の基準値で計算（今回の値が自分自身の基準に混ざらない）
+- 最初の ANOMALY_WARMUP 件は累積平均で基準を作り、スコアは返さない
+- 外れ値で基準が引きずられないよう、更新時は平均 ± ANOMALY_CLIP σ に丸める
+- 時刻が前後・重複したサンプル（再送分など）は更新しない
+- 状態はプロセス内メモリに保持し、ANOMALY_CHECKPOINT_SECONDS ごとに
+  anomaly_checkpoints へ保存（再起動後は設備の最初のサンプルで読み込み）
+- 1分ごとのスコア集計（最大・平均 |z|、異常件数、基準の平均・標準偏差）を
+  anomaly_scores に保存（基準の平均の推移でドリフトを確認できます）
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from backend.db import db
+from backend.db.models import AnomalyCheckpoint, AnomalyScore, DataTypes
+from backend.db.upsert import upsert_rows
+from backend.db.workloads import WORKLOAD_INGEST, workload
+from backend.metrics import registry
+from backend.timestamps import naive_utc, utc_seconds
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_METRICS = (DataTypes.CURRENT, DataTypes.TEMPERATURE, DataTypes.PRESSURE, DataTypes.CYCLE_TIME)
+# 平滑化係数（小さいほどゆっくり追従。0.01 で半減期 約69サンプル）
+ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.01"))
+# |z| がこの値以上を異常とみなす
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4"))
+ANOMALY_WARMUP = 30
+ANOMALY_CLIP = 6.0
+ANOMALY_CHECKPOINT_SECONDS = int(os.getenv("ANOMALY_CHECKPOINT_SECONDS", "60"))
+
+ANOMALY_SAMPLES = registry.counter(
+    "plc_anomaly_samples_total", "Metric values scored by the anomaly detector by result", ("result",))
+
+
+def _minute(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class MetricBaseline:
+    """1データ項目の基準値（EWMA 平均・分散）と当該1分間のスコア集計"""
+
+    __slots__ = ("count", "mean", "var", "last_timestamp", "last_t", "minute", "samples", "anomalies",
+                 "score_sum", "score_max")
+
+    def __init__(self, count=0, mean=0.0, var=0.0, last_timestamp=None):
+        self.count = count
+        self.mean = mean
+        self.var = var
+        self.last_timestamp = last_timestamp
+        self.last_t = utc_seconds(last_timestamp) if last_timestamp is not None else None
+        self.minute = None
+        self.samples = 0
+        self.anomalies = 0
+        self.score_sum = 0.0
+        self.score_max = 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var) if self.var > 0 else 0.0
+
+    def score(self, x):
+        """zスコア（基準の準備中は None）"""
+        if self.count < ANOMALY_WARMUP or self.var <= 0:
+            return None
+        return (x - self.mean) / math.sqrt(self.var)
+
+    def update(self, x, alpha):
+        if self.count == 0:
+            self.mean = x
+            self.var = 0.0
+        else:
+            if self.count >= ANOMALY_WARMUP and self.var > 0:
+                std = math.sqrt(self.var)
+                x = min(max(x, self.mean - ANOMALY_CLIP * std), self.mean + ANOMALY_CLIP * std)
+            # 準備中は累積平均（1/n）、以降は一定の alpha で追従
+            a = max(alpha, 1.0 / (self.count + 1))
+            diff = x - self.mean
+            increment = a * diff
+            self.mean += increment
+            self.var = (1 - a) * (self.var + diff * increment)
+        self.count += 1
+
+    def accumulate(self, minute, z):
+        """1分ごとのスコア集計に加算（分が変わったら完了した集計を返す）"""
+        finished = None
+        if self.minute is not None and minute != self.minute:
+            finished = self.rollup()
+            self.samples = self.anomalies = 0
+            self.score_sum = self.score_max = 0.0
+        self.minute = minute
+        self.samples += 1
+        if z is not None:
+            magnitude = abs(z)
+            self.score_sum += magnitude
+            self.score_max = max(self.score_max, magnitude)
+            if magnitude >= ANOMALY_Z_THRESHOLD:
+                self.anomalies += 1
+        return finished
+
+    def rollup(self):
+        return {
+            "minute": self.minute,
+            "samples": self.samples,
+            "anomalies": self.anomalies,
+            "score_max": round(self.score_max, 4),
+            "score_avg": round(self.score_sum / self.samples, 4) if self.samples else 0.0,
+            "baseline_mean": self.mean,
+            "baseline_std": self.std,
+        }
+
+
+class EquipmentAnomalyState:
+    """1設備の基準値（データ項目ごと）"""
+
+    def __init__(self, baselines=None, alpha=ANOMALY_ALPHA):
+        self.alpha = alpha
+        self.baselines = baselines or {}
+        self.finished = []      # 保存待ちの完了した1分集計 [(metric, rollup)]
+        self.dirty = set()      # 前回のチェックポイント以降に更新したデータ項目
+        self.lock = threading.Lock()
+
+    def offer(self, timestamp, data):
+        """1サンプルの zスコア {metric: z}（準備中の項目は None）を返し、基準値を更新"""
+        timestamp = naive_utc(timestamp)
+        t = utc_seconds(timestamp)
+        minute = _minute(timestamp)
+        scores = {}
+        for metric in ANOMALY_METRICS:
+            x = data.get(metric)
+            if not isinstance(x, (int, float)) or isinstance(x, bool):
+                continue
+            baseline = self.baselines.get(metric)
+            if baseline is None:
+                baseline = self.baselines[metric] = MetricBaseline()
+            if baseline.last_t is not None and t <= baseline.last_t:
+                ANOMALY_SAMPLES.labels("out_of_order").inc()
+                continue
+            z = baseline.score(x)
+            baseline.update(x, self.alpha)
+            baseline.last_timestamp = timestamp
+            baseline.last_t = t
+            finished = baseline.accumulate(minute, z)
+            if finished:
+                self.finished.append((metric, finished))
+            self.dirty.add(metric)
+            scores[metric] = None if z is None else round(z, 3)
+            ANOMALY_SAMPLES.labels("warmup" if z is None else "scored").inc()
+        return scores
+
+
+def load_anomaly_checkpoint(equipment_pk):
+    """保存済みの基準値 {metric: MetricBaseline}"""
+    rows = db.session.execute(
+        select(AnomalyCheckpoint.metric, AnomalyCheckpoint.count, AnomalyCheckpoint.mean,
+               AnomalyCheckpoint.variance, AnomalyCheckpoint.last_timestamp)
+        .where(AnomalyCheckpoint.equipment_id == equipment_pk)
+    ).all()
+    return {
+        metric: MetricBaseline(count or 0, mean or 0.0, variance or 0.0, last_timestamp)
+        for metric, count, mean, variance, last_timestamp in rows
+    }
+
+
+class AnomalyRegistry:
+    """設備ごとの異常検知状態（チェックポイントから遅延ロード）"""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, equipment_pk):
+        state = self._states.get(equipment_pk)
+        if state is None:
+            baselines = load_anomaly_checkpoint(equipment_pk)
+            with self._lock:
+                state = self._states.setdefault(equipment_pk, EquipmentAnomalyState(baselines))
+        return state
+
+    def score(self, equipment_pk, samples):
+        """[(timestamp, data), ...]（時刻順）で基準値を更新し、最後のサンプルの zスコアを返す"""
+        state = self.get(equipment_pk)
+        scores = {}
+        with state.lock:
+            for timestamp, data in samples:
+                scores = state.offer(timestamp, data)
+        return scores
+
+    def checkpoint(self):
+        """更新のあった基準値と1分集計（集計中の分を含む）を保存し、保存件数を返す"""
+        checkpoints = []
+        rollups = {}
+        taken = {}
+        now = datetime.utcnow()
+        for equipment_pk, state in list(self._states.items()):
+            with state.lock:
+                finished, state.finished = state.finished, []
+                dirty, state.dirty = state.dirty, set()
+                taken[state] = (finished, dirty)
+                for metric, rollup in finished:
+                    rollups[(equipment_pk, metric, rollup["minute"])] = rollup
+                for metric in dirty:
+                    baseline = state.baselines[metric]
+                    checkpoints.append({
+                        "equipment_id": equipment_pk, "metric": metric, "count": baseline.count,
+                        "mean": baseline.mean, "variance": baseline.var,
+                        "last_timestamp": baseline.last_timestamp, "updated_at": now,
+                    })
+                    rollup = baseline.rollup()
+                    rollups[(equipment_pk, metric, rollup["minute"])] = rollup
+        score_rows = [dict(rollup, equipment_id=equipment_pk, metric=metric)
+                      for (equipment_pk, metric, _), rollup in rollups.items()]
+        try:
+            upsert_rows(AnomalyCheckpoint, checkpoints, ["equipment_id", "metric"])
+            upsert_rows(AnomalyScore, score_rows, ["equipment_id", "metric", "minute"])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # 次回に保存し直す
+            for state, (finished, dirty) in taken.items():
+                with state.lock:
+                    state.finished[:0] = finished
+                    state.dirty |= dirty
+            raise
+        return len(checkpoints), len(score_rows)
+
+    def start(self, app, interval=ANOMALY_CHECKPOINT_SECONDS):
+        """定期チェックポイントのスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context(), workload(WORKLOAD_INGEST):
+                        try:
+                            saved, scores = self.checkpoint()
+                            if saved:
+                                logger.debug("💾 異常検知チェックポイント: 基準値 %s件, 1分集計 %s件", saved, scores)
+                        finally:
+                            db.session.remove()
+                except Exception as e:
+                    logger.exception("❌ 異常検知チェックポイントエラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="anomaly-checkpoint", daemon=True)
+        self._thread.start()
+        return self
+
+    def invalidate(self, equipment_pk):
+        with self._lock:
+            self._states.pop(equipment_pk, None)
+
+
+anomaly_registry = AnomalyRegistry()
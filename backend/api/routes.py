@@ -1,12 +1,45 @@
 from flask import request, jsonify, current_app
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from sqlalchemy import or_, text, func
+from sqlalchemy import case, delete, func, inspect, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from backend.db import db
-from backend.db.models import Equipment, PLCDataConfig, Log, DailyLogSummary, MonthlyLogSummary
-from datetime import datetime, timedelta
+from backend.db.models import (
+    AlarmEvent, AlarmRule, AnomalyScore, DataTypes, Equipment, ErrorEvent, PLCDataConfig, PLCDataTypes, Log, SampleStats, SpoolCheckpoint, TagValue, DailyLogSummary, MonthlyLogSummary
+)
+from backend.db.query_stats import track_queries
+from backend.db.routing import read_replica, replica_router
+from backend.db.workloads import WORKLOAD_BATCH, WORKLOAD_INGEST, use_workload, workload_engines
+from backend.db.upsert import upsert_statement
+from backend.db.readers import (
+    ANOMALY_SCORE_COLUMNS, BULK_HISTORY_METRICS, DAILY_SUMMARY_COLUMNS, LAYOUTS, LOG_HISTORY_COLUMNS, SHIFT_SUMMARY_COLUMNS,
+    TAG_SERIES_FIELDS, configured_tags,
+    fetch_anomaly_scores, fetch_bucketed_history, fetch_daily_summaries, fetch_latest_log,
+    fetch_log_history,
+    fetch_production_hourly, fetch_shift_summaries, fetch_summary_history, fetch_tag_series,
+    find_equipment_pk, production_totals, shape_rows,
+)
+from backend.compression import COMPRESSION_MODES, compression_registry
+from backend.alarm_engine import ALARM_CONDITIONS, ALARM_SEVERITIES, alarm_engine
+from backend.anomaly import ANOMALY_METRICS, ANOMALY_Z_THRESHOLD, anomaly_registry
+from backend.error_events import error_event_registry, reliability
+from backend.fleet import fleet_state
+from backend.production import oee, production_counter_type, production_registry
+from backend.shifts import create_shift_summaries, shift_calendar, shift_summary_scheduler
+from backend.sample_stats import SKETCH_METRICS, sample_stats_registry
+from backend.summaries import SUMMARY_METHOD, range_sketches, write_daily_summary, write_monthly_summary
+from backend.metrics import INGEST_BATCH_ROWS, INGEST_ROWS_WRITTEN, emit_to_room, timed_job
+from backend.logging_config import SAMPLE_LOGGER_NAME
+from backend.timestamps import naive_utc
+from datetime import date, datetime, timedelta
+import logging
+import math
 import threading
 import time
 
+logger = logging.getLogger(__name__)
+# 取込み1件ごとのログ（LOG_SAMPLE_EVERY 件に1件だけ出力）
+sample_logger = logging.getLogger(SAMPLE_LOGGER_NAME)
+
 # データ保存期間設定
 DATA_RETENTION_CONFIG = {
     'raw_data_days': 90,        # 詳細データ保持期間（日）
@@ -14,11 +47,45 @@ DATA_RETENTION_CONFIG = {
     'cleanup_interval_hours': 24  # クリーンアップ実行間隔（時間）
 }
 
+# 期間指定（period）→ 時間数
+PERIOD_HOURS = {'1h': 1, '6h': 6, '24h': 24, '7d': 24 * 7, '30d': 24 * 30}
+
+# 一括保存APIで1リクエストに受け付ける最大件数
+LOG_BATCH_MAX_SAMPLES = 5000
+
+# 複数設備の履歴APIで1リクエストに指定できる設備数と、1設備あたりの点数の上限
+BULK_HISTORY_MAX_EQUIPMENTS = 500
+BULK_HISTORY_MAX_POINTS = 5000
+
+# エッジ端末向けの Socket.IO 名前空間（設定変更の通知）
+EDGE_NAMESPACE = '/edge'
+# エッジ端末が読む設備設定の項目（変更時に config_version を上げて通知）
+EDGE_EQUIPMENT_FIELDS = ('equipment_id', 'manufacturer', 'series', 'plc_ip', 'port', 'modbus_port', 'interval')
+
+def delete_in_batches(model, timestamp_column, cutoff_date, batch_size=1000):
+    """timestamp_column が cutoff_date より古い行を batch_size 件ずつ削除し、削除件数を返す"""
+    total_deleted = 0
+    while True:
+        old_ids = db.session.execute(
+            select(model.id).where(timestamp_column < cutoff_date).limit(batch_size)
+        ).scalars().all()
+        if not old_ids:
+            break
+        db.session.execute(delete(model).where(model.id.in_(old_ids)))
+        db.session.commit()
+        total_deleted += len(old_ids)
+        # CPU負荷軽減のため少し待機
+        time.sleep(0.1)
+    return total_deleted
+
+@timed_job("cleanup_old_logs")
+@track_queries("cleanup_old_logs")
+@use_workload(WORKLOAD_BATCH)
 def cleanup_old_logs():
     """古いログデータのクリーンアップ"""
     try:
         with current_app.app_context():
-            print(f"🧹 クリーンアップ開始: {DATA_RETENTION_CONFIG['raw_data_days']}日以上古いデータを削除")
+            logger.info("🧹 クリーンアップ開始: %s日以上古いデータを削除", DATA_RETENTION_CONFIG['raw_data_days'])
             
             # 90日以上古い詳細データを削除
             cutoff_date = datetime.utcnow() - timedelta(days=DATA_RETENTION_CONFIG['raw_data_days'])
@@ -27,181 +94,348 @@ def cleanup_old_logs():
             old_logs_count = Log.query.filter(Log.timestamp < cutoff_date).count()
             
             if old_logs_count > 0:
-                print(f"📊 削除対象: {old_logs_count}件のログ")
-                
-                # バッチ削除（大量データ対応）
-                batch_size = 1000
-                total_deleted = 0
+                logger.info("📊 削除対象: %s件のログ", old_logs_count)
                 
-                while True:
-                    # 1000件ずつ削除
-                    old_logs = Log.query.filter(Log.timestamp < cutoff_date).limit(batch_size)
-                    logs_to_delete = old_logs.all()
-                    
-                    if not logs_to_delete:
-                        break
-                    
-                    for log in logs_to_delete:
-                        db.session.delete(log)
-                    
-                    db.session.commit()
-                    total_deleted += len(logs_to_delete)
-                    print(f"📝 削除進行中: {total_deleted}/{old_logs_count}件")
-                    
-                    # CPU負荷軽減のため少し待機
-                    time.sleep(0.1)
+                # バッチ削除（大量データ対応、1000件ずつ DELETE 1回）
+                total_deleted = delete_in_batches(Log, Log.timestamp, cutoff_date)
                 
-                print(f"✅ クリーンアップ完了: {total_deleted}件のログを削除しました")
+                logger.info("✅ クリーンアップ完了: %s件のログを削除しました", total_deleted)
             else:
-                print("ℹ️ 削除対象のログはありません")
+                logger.info("ℹ️ 削除対象のログはありません")
+            
+            # 汎用タグ値・異常スコアの1分集計も同じ保持期間で削除
+            tag_values_deleted = delete_in_batches(TagValue, TagValue.timestamp, cutoff_date)
+            if tag_values_deleted:
+                logger.info("✅ クリーンアップ完了: %s件のタグ値を削除しました", tag_values_deleted)
+            anomaly_scores_deleted = delete_in_batches(AnomalyScore, AnomalyScore.minute, cutoff_date)
+            if anomaly_scores_deleted:
+                logger.info("✅ クリーンアップ完了: %s件の異常スコア集計を削除しました", anomaly_scores_deleted)
+            sample_stats_deleted = delete_in_batches(SampleStats, SampleStats.bucket, cutoff_date)
+            if sample_stats_deleted:
+                logger.info("✅ クリーンアップ完了: %s件の受信サンプル15分集計を削除しました", sample_stats_deleted)
                 
     except Exception as e:
-        print(f"❌ クリーンアップエラー: {e}")
+        logger.exception("❌ クリーンアップエラー: %s", e)
         db.session.rollback()
 
+@timed_job("create_daily_summary")
+@track_queries("create_daily_summary")
+@use_workload(WORKLOAD_BATCH)
 def create_daily_summary(target_date):
     """指定日の日次集計を作成"""
     try:
         with current_app.app_context():
-            print(f"📊 日次集計作成開始: {target_date}")
+            logger.info("📊 日次集計作成開始: %s", target_date)
             
-            # 各設備の日次集計を作成
-            equipments = Equipment.query.all()
-            created_count = 0
-            
-            for equipment in equipments:
-                # 指定日のログデータを取得
-                start_date = datetime.combine(target_date, datetime.min.time())
-                end_date = start_date + timedelta(days=1)
-                
-                daily_logs = Log.query.filter(
-                    Log.equipment_id == equipment.id,
-                    Log.timestamp >= start_date,
-                    Log.timestamp < end_date
-                ).all()
-                
-                if not daily_logs:
-                    continue
-                
-                # 集計計算
-                current_values = [log.current for log in daily_logs if log.current is not None]
-                temp_values = [log.temperature for log in daily_logs if log.temperature is not None]
-                pressure_values = [log.pressure for log in daily_logs if log.pressure is not None]
-                cycle_values = [log.cycle_time for log in daily_logs if log.cycle_time is not None]
-                
-                # 最新の生産数量（累積値）
-                production_total = max([log.production_count for log in daily_logs if log.production_count is not None], default=0)
-                
-                # エラー件数
-                error_count = len([log for log in daily_logs if log.error_code and log.error_code > 0])
-                
-                # 既存の日次集計を削除
-                existing = DailyLogSummary.query.filter_by(
-                    equipment_id=equipment.id,
-                    date=target_date
-                ).first()
-                if existing:
-                    db.session.delete(existing)
-                
-                # 新しい日次集計を作成
-                daily_summary = DailyLogSummary(
-                    equipment_id=equipment.id,
-                    date=target_date,
-                    production_count_total=production_total,
-                    current_avg=sum(current_values) / len(current_values) if current_values else None,
-                    current_max=max(current_values) if current_values else None,
-                    current_min=min(current_values) if current_values else None,
-                    temperature_avg=sum(temp_values) / len(temp_values) if temp_values else None,
-                    temperature_max=max(temp_values) if temp_values else None,
-                    temperature_min=min(temp_values) if temp_values else None,
-                    pressure_avg=sum(pressure_values) / len(pressure_values) if pressure_values else None,
-                    pressure_max=max(pressure_values) if pressure_values else None,
-                    pressure_min=min(pressure_values) if pressure_values else None,
-                    cycle_time_avg=sum(cycle_values) / len(cycle_values) if cycle_values else None,
-                    error_count=error_count,
-                    data_count=len(daily_logs)
-                )
-                
-                db.session.add(daily_summary)
-                created_count += 1
-            
-            db.session.commit()
-            print(f"✅ {target_date}の日次集計を作成しました: {created_count}設備")
+            # 指定日のログを設備ごとにDB側で集計し、分位点スケッチを付けて作り直す
+            created = write_daily_summary(target_date)
+            logger.info("✅ %sの日次集計を作成しました: %s設備", target_date, created)
             
     except Exception as e:
-        print(f"❌ 日次集計作成エラー: {e}")
+        logger.exception("❌ 日次集計作成エラー: %s", e)
         db.session.rollback()
 
+@track_queries("create_monthly_summary")
+@use_workload(WORKLOAD_BATCH)
 def create_monthly_summary(year, month):
     """指定月の月次集計を作成"""
     try:
         with current_app.app_context():
-            print(f"📊 月次集計作成開始: {year}年{month}月")
+            logger.info("📊 月次集計作成開始: %s年%s月", year, month)
             
-            equipments = Equipment.query.all()
-            created_count = 0
-            
-            for equipment in equipments:
-                # 指定月の日次集計を取得
-                from calendar import monthrange
-                start_date = datetime(year, month, 1).date()
-                end_date = datetime(year, month, monthrange(year, month)[1]).date()
-                
-                daily_summaries = db.session.query(DailyLogSummary)\
-                    .filter_by(equipment_id=equipment.id)\
-                    .filter(text("date >= :start_date"))\
-                    .filter(text("date <= :end_date"))\
-                    .params(start_date=start_date, end_date=end_date)\
-                    .all()
-                
-                if not daily_summaries:
-                    continue
-                
-                # 月次集計の計算
-                production_total = max([ds.production_count_total for ds in daily_summaries if ds.production_count_total], default=0)
-                current_avgs = [ds.current_avg for ds in daily_summaries if ds.current_avg is not None]
-                temp_avgs = [ds.temperature_avg for ds in daily_summaries if ds.temperature_avg is not None]
-                pressure_avgs = [ds.pressure_avg for ds in daily_summaries if ds.pressure_avg is not None]
-                cycle_avgs = [ds.cycle_time_avg for ds in daily_summaries if ds.cycle_time_avg is not None]
-                error_total = sum([ds.error_count for ds in daily_summaries if ds.error_count])
-                
-                # 既存の月次集計を削除
-                existing = MonthlyLogSummary.query.filter_by(
-                    equipment_id=equipment.id,
-                    year=year,
-                    month=month
-                ).first()
-                if existing:
-                    db.session.delete(existing)
-                
-                # 新しい月次集計を作成
-                monthly_summary = MonthlyLogSummary(
-                    equipment_id=equipment.id,
-                    year=year,
-                    month=month,
-                    production_count_total=production_total,
-                    current_avg=sum(current_avgs) / len(current_avgs) if current_avgs else None,
-                    current_max=max([ds.current_max for ds in daily_summaries if ds.current_max is not None], default=None),
-                    current_min=min([ds.current_min for ds in daily_summaries if ds.current_min is not None], default=None),
-                    temperature_avg=sum(temp_avgs) / len(temp_avgs) if temp_avgs else None,
-                    temperature_max=max([ds.temperature_max for ds in daily_summaries if ds.temperature_max is not None], default=None),
-                    temperature_min=min([ds.temperature_min for ds in daily_summaries if ds.temperature_min is not None], default=None),
-                    pressure_avg=sum(pressure_avgs) / len(pressure_avgs) if pressure_avgs else None,
-                    cycle_time_avg=sum(cycle_avgs) / len(cycle_avgs) if cycle_avgs else None,
-                    error_count_total=error_total,
-                    operational_days=len(daily_summaries)
-                )
-                
-                db.session.add(monthly_summary)
-                created_count += 1
-            
-            db.session.commit()
-            print(f"✅ {year}年{month}月の月次集計を作成しました: {created_count}設備")
+            # 指定月の日次集計を設備ごとに重み付き集計し、スケッチを結合して作り直す
+            created = write_monthly_summary(year, month)
+            logger.info("✅ %s年%s月の月次集計を作成しました: %s設備", year, month, created)
             
     except Exception as e:
-        print(f"❌ 月次集計作成エラー: {e}")
+        logger.exception("❌ 月次集計作成エラー: %s", e)
         db.session.rollback()
 
+def parse_log_timestamp(value):
+    """受信データのタイムスタンプを UTC（タイムゾーンなし）の datetime に変換（未指定時は現在時刻）"""
+    if isinstance(value, str):
+        return parse_utc_datetime(value)
+    if value is None:
+        return datetime.utcnow()
+    return naive_utc(value)
+
+def parse_utc_datetime(value):
+    """ISO 8601 の日時を UTC（タイムゾーンなし）の datetime に変換"""
+    return naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+def find_equipment_by_identity(*identifiers):
+    """(列, 値) を優先順に並べた条件で設備を1クエリで検索（値が空の条件は無視）"""
+    conditions = [column == value for column, value in identifiers if value]
+    if not conditions:
+        return None
+    priority = case(*[(condition, rank) for rank, condition in enumerate(conditions)], else_=len(conditions))
+    return Equipment.query.filter(or_(*conditions)).order_by(priority).first()
+
+def register_equipment(values):
+    """設備の登録・更新（cpu_serial_number > mac_address > equipment_id の優先順で既存設備を検索）"""
+    equipment = find_equipment_by_identity(
+        (Equipment.cpu_serial_number, values["cpu_serial_number"]),
+        (Equipment.mac_address, values["mac_address"]),
+        (Equipment.equipment_id, values["equipment_id"]),
+    )
+    if equipment:
+        # 既存設備の更新
+        for column, value in values.items():
+            setattr(equipment, column, value)
+        return
+
+    # 新規作成（同じ設備IDの同時登録は INSERT ... ON CONFLICT で更新にする）
+    stmt = upsert_statement(Equipment, values, ["equipment_id"])
+    if stmt is not None:
+        db.session.execute(stmt)
+    else:
+        db.session.add(Equipment(**values))
+
+# PLCデータ設定の項目と未指定時の値
+PLC_CONFIG_DEFAULTS = {
+    "enabled": False,
+    "address": "",
+    "scale_factor": 1,
+    "plc_data_type": "word",
+    "compression_mode": "none",
+    "compression_tolerance": 0.0,
+    "compression_max_interval": 0,
+}
+
+def validate_plc_config(config_data):
+    """PLCデータ設定の1項目を検証してエラーを返し、圧縮設定の数値は数値型に変換（問題なければ None）"""
+    if not isinstance(config_data, dict):
+        return "Each configuration must be an object"
+    if not config_data.get("data_type") or not isinstance(config_data["data_type"], str):
+        return "data_type is required"
+    if config_data.get("plc_data_type") is not None and config_data["plc_data_type"] not in PLCDataTypes.get_all():
+        return f"Invalid plc_data_type (expected one of {', '.join(PLCDataTypes.get_all())})"
+    if config_data.get("compression_mode", "none") not in COMPRESSION_MODES:
+        return f"Invalid compression_mode (expected one of {', '.join(COMPRESSION_MODES)})"
+    for field in ("compression_tolerance", "compression_max_interval"):
+        if config_data.get(field) is None:
+            continue
+        try:
+            value = float(config_data[field])
+        except (TypeError, ValueError):
+            return f"{field} must be a number"
+        if not math.isfinite(value):
+            return f"{field} must be a number"
+        if value < 0:
+            return f"{field} must not be negative"
+        if field == "compression_max_interval":
+            if not value.is_integer():
+                return f"{field} must be a whole number of seconds"
+            value = int(value)
+        config_data[field] = value
+    # スウィングドアは保留中のサンプルがあるため、保存間隔の上限を必須にする
+    if config_data.get("compression_mode") == "swinging_door" and not config_data.get("compression_max_interval"):
+        return "compression_max_interval must be positive for swinging_door"
+    return None
+
+def apply_plc_config_diff(equipment_pk, configs):
+    """PLCデータ設定を差分で保存（追加・更新・削除をそれぞれ1回の executemany で実行）
+
+    戻り値: (追加件数, 更新件数, 削除件数)
+    """
+    fields = list(PLC_CONFIG_DEFAULTS)
+    existing = {
+        row.data_type: row
+        for row in db.session.execute(
+            select(PLCDataConfig.id, PLCDataConfig.data_type, *[getattr(PLCDataConfig, f) for f in fields])
+            .where(PLCDataConfig.equipment_id == equipment_pk)
+        )
+    }
+
+    inserts, updates = [], []
+    for config_data in configs:
+        values = {
+            field: default if config_data.get(field) is None else config_data[field]
+            for field, default in PLC_CONFIG_DEFAULTS.items()
+        }
+        current = existing.pop(config_data["data_type"], None)
+        if current is None:
+            inserts.append({"equipment_id": equipment_pk, "data_type": config_data["data_type"], **values})
+        elif any(getattr(current, field) != value for field, value in values.items()):
+            updates.append({"id": current.id, **values})
+
+    # 送られてこなかった項目は削除
+    deleted_ids = [row.id for row in existing.values()]
+    if deleted_ids:
+        db.session.execute(delete(PLCDataConfig).where(PLCDataConfig.id.in_(deleted_ids)))
+    if updates:
+        db.session.execute(update(PLCDataConfig), updates)
+    if inserts:
+        db.session.execute(insert(PLCDataConfig), inserts)
+    return len(inserts), len(updates), len(deleted_ids)
+
+def conditional_json(payload, status=200, headers=None):
+    """ETag（本文のハッシュ）付きのJSONレスポンス。If-None-Match が一致すれば 304 を返す"""
+    response = jsonify(payload)
+    response.status_code = status
+    if headers:
+        response.headers.update(headers)
+    response.add_etag()
+    return response.make_conditional(request)
+
+def notify_config_changed(socketio, equipment_ids, config_version, source):
+    """設定が変わった設備のエッジ端末に通知（端末は再取得する）"""
+    if not socketio:
+        return
+    for equipment_id in equipment_ids:
+        try:
+            emit_to_room(socketio, 'config_changed', {
+                "equipment_id": equipment_id,
+                "config_version": config_version,
+                "source": source,
+            }, f'edge_{equipment_id}', namespace=EDGE_NAMESPACE)
+        except Exception as ws_error:
+            logger.warning("⚠️ 設定変更通知エラー (処理継続): %s", ws_error)
+
+def build_log_entry(equipment, data, timestamp):
+    """受信データからLogレコードを作成"""
+    log_entry = Log()
+    log_entry.equipment_id = equipment.id
+    log_entry.timestamp = timestamp
+    log_entry.production_count = data.get("production_count")
+    log_entry.current = data.get("current")
+    log_entry.temperature = data.get("temperature")
+    log_entry.pressure = data.get("pressure")
+    log_entry.cycle_time = data.get("cycle_time")
+    log_entry.error_code = data.get("error_code")
+    return log_entry
+
+def build_tag_values(equipment, data, timestamp, tags):
+    """受信データのうち汎用タグ（Log の固定列以外の data_type）を TagValue の行にする"""
+    return [
+        {"equipment_id": equipment.id, "tag": tag, "timestamp": timestamp, "value": float(data[tag])}
+        for tag in tags
+        if isinstance(data.get(tag), (int, float))
+    ]
+
+def store_held_samples(equipment_pk, samples):
+    """圧縮で保留していたサンプルを logs・汎用タグに追加（コミットは呼び出し側）"""
+    equipment = db.session.get(Equipment, equipment_pk)
+    if equipment is None:
+        return
+    tags = compression_registry.generic_tags(equipment_pk)
+    db.session.add_all([build_log_entry(equipment, data, timestamp) for timestamp, data in samples])
+    tag_values = [row for timestamp, data in samples for row in build_tag_values(equipment, data, timestamp, tags)]
+    if tag_values:
+        db.session.execute(insert(TagValue), tag_values)
+
+def validate_spool_batch(spool_id, seqs, samples):
+    """スプールからの再送バッチの spool_id・シーケンス番号を検証してエラーを返す（問題なければ None）"""
+    if not isinstance(spool_id, str) or not 0 < len(spool_id) <= 64:
+        return "spool_id must be a string of 1-64 characters"
+    if not isinstance(seqs, list) or len(seqs) != len(samples):
+        return "seqs must be a list with one sequence number per sample"
+    if any(not isinstance(seq, int) or isinstance(seq, bool) for seq in seqs):
+        return "seqs must be integers"
+    return None
+
+def lock_spool_checkpoint(spool_id):
+    """スプールの取込み済みシーケンス番号を返す（行がなければ作成）
+
+    アップサートで行ロックを取るため、同じバッチが並行して再送されてもコミットまで待たせられる。
+    """
+    now = datetime.utcnow()
+    stmt = upsert_statement(SpoolCheckpoint, {"spool_id": spool_id, "acked_seq": 0, "updated_at": now},
+                            ["spool_id"], ["updated_at"])
+    if stmt is None:
+        checkpoint = db.session.get(SpoolCheckpoint, spool_id, with_for_update=True)
+        if checkpoint is None:
+            checkpoint = SpoolCheckpoint(spool_id=spool_id, acked_seq=0, updated_at=now)
+            db.session.add(checkpoint)
+            db.session.flush()
+        return checkpoint.acked_seq
+    db.session.execute(stmt)
+    return db.session.execute(
+        select(SpoolCheckpoint.acked_seq).where(SpoolCheckpoint.spool_id == spool_id)
+    ).scalar_one()
+
+def apply_stored_samples(equipment, samples):
+    """保存に成功したサンプルをアラーム・異常検知・生産数の集計に反映し、最後のサンプルの zスコアを返す
+
+    保存前に反映すると、保存に失敗して再送されたサンプルを二重に数えるため、コミット後に呼ぶ。
+    ここでのエラーは保存済みのサンプルの再送を招かないよう記録だけして続行する。
+    """
+    try:
+        # アラームは別スレッドで評価
+        alarm_engine.submit(equipment.id, equipment.equipment_id, samples)
+        # 異常スコア（EWMA 基準からの zスコア）を計算して基準を更新
+        anomaly_scores = anomaly_registry.score(equipment.id, samples)
+        # 生産数（カウンターの増分）・稼働時間を時間別に集計
+        production_registry.record(equipment.id, samples)
+        # 日次・シフト別集計の元データ（圧縮で logs に保存しないサンプルも含む）
+        sample_stats_registry.record(equipment.id, samples)
+        return anomaly_scores
+    except Exception as e:
+        logger.exception("⚠️ 取込み後の集計エラー (処理継続): %s", e, extra={"equipment_id": equipment.equipment_id})
+        return {}
+
+def is_anomalous(anomaly_scores):
+    """zスコアのいずれかがしきい値以上か"""
+    return any(z is not None and abs(z) >= ANOMALY_Z_THRESHOLD for z in (anomaly_scores or {}).values())
+
+def build_realtime_payload(equipment_id, data, timestamp, anomaly_scores=None):
+    """WebSocket配信用のペイロードを作成（anomaly_scores はデータ項目ごとの zスコア）"""
+    anomaly_scores = anomaly_scores or {}
+    return {
+        "equipment_id": equipment_id,
+        "timestamp": timestamp,
+        "production_count": data.get("production_count"),
+        "current": data.get("current"),
+        "temperature": data.get("temperature"),
+        "pressure": data.get("pressure"),
+        "cycle_time": data.get("cycle_time"),
+        "error_code": data.get("error_code"),
+        "status": "normal" if not data.get("error_code") else "error",
+        "anomaly_scores": anomaly_scores,
+        "anomaly": is_anomalous(anomaly_scores)
+    }
+
+ALARM_RULE_FIELDS = ('name', 'metric', 'condition', 'threshold', 'duration_seconds', 'hysteresis', 'severity', 'enabled')
+
+def parse_alarm_rule(data, current=None):
+    """アラームルールの入力を検証し (値, エラー) を返す（current があれば部分更新）"""
+    if not isinstance(data, dict):
+        return None, "Invalid JSON"
+    values = {field: data[field] for field in ALARM_RULE_FIELDS if field in data}
+    merged = dict(current or {}, **values)
+    if not merged.get('metric'):
+        return None, "metric is required"
+    if merged.get('condition') not in ALARM_CONDITIONS:
+        return None, f"Invalid condition (expected one of {', '.join(ALARM_CONDITIONS)})"
+    if merged.get('severity', 'warning') not in ALARM_SEVERITIES:
+        return None, f"Invalid severity (expected one of {', '.join(ALARM_SEVERITIES)})"
+    for field in ('threshold', 'duration_seconds', 'hysteresis'):
+        if field not in values:
+            continue
+        try:
+            values[field] = float(values[field])
+        except (TypeError, ValueError):
+            return None, f"{field} must be a number"
+        if field != 'threshold' and values[field] < 0:
+            return None, f"{field} must not be negative"
+    if 'threshold' not in merged:
+        return None, "threshold is required"
+    return values, None
+
+def serialize_alarm_rule(rule):
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "metric": rule.metric,
+        "condition": rule.condition,
+        "threshold": rule.threshold,
+        "duration_seconds": rule.duration_seconds or 0.0,
+        "hysteresis": rule.hysteresis or 0.0,
+        "severity": rule.severity,
+        "enabled": rule.enabled,
+        "updated_at": rule.updated_at,
+    }
+
 def start_cleanup_scheduler():
     """クリーンアップスケジューラーを開始"""
     def cleanup_job():
@@ -210,7 +444,7 @@ def start_cleanup_scheduler():
                 # 24時間待機
                 time.sleep(DATA_RETENTION_CONFIG['cleanup_interval_hours'] * 3600)
                 
-                print("🕒 定期クリーンアップを開始します")
+                logger.info("🕒 定期クリーンアップを開始します")
                 
                 # 前日の日次集計を作成
                 yesterday = (datetime.utcnow() - timedelta(days=1)).date()
@@ -225,17 +459,15 @@ def start_cleanup_scheduler():
                 cleanup_old_logs()
                 
             except Exception as e:
-                print(f"❌ スケジューラーエラー: {e}")
+                logger.exception("❌ スケジューラーエラー: %s", e)
     
     # バックグラウンドスレッドで実行
     cleanup_thread = threading.Thread(target=cleanup_job, daemon=True)
     cleanup_thread.start()
-    print("🚀 クリーンアップスケジューラーを開始しました")
+    logger.info("🚀 クリーンアップスケジューラーを開始しました")
 
 def register_routes(app, socketio=None):
-    print(f"🚀 [DEBUG] ===== APIルート登録開始 =====")
-    print(f"🚀 [DEBUG] Flask app: {app}")
-    print(f"🚀 [DEBUG] SocketIO: {socketio}")
+    logger.debug("🚀 APIルート登録開始: app=%s, socketio=%s", app, socketio)
     
     @app.route("/api/register", methods=["POST"])
     def api_register():
@@ -250,59 +482,41 @@ def register_routes(app, socketio=None):
         if not equipment_id or not mac_address:
             return jsonify({"error": "equipment_id and mac_address are required"}), 400
 
-        # 既存レコード検索（cpu_serial_number > mac_address > equipment_id の優先順）
-        search_conditions = []
-        if cpu_serial_number:
-            search_conditions.append(getattr(Equipment, "cpu_serial_number") == cpu_serial_number)
-        search_conditions.extend([
-            getattr(Equipment, "mac_address") == mac_address,
-            getattr(Equipment, "equipment_id") == equipment_id
-        ])
-        
-        equipment = Equipment.query.filter(or_(*search_conditions)).first()
+        values = {
+            "equipment_id": equipment_id,
+            "manufacturer": data.get("manufacturer"),
+            "series": data.get("series"),
+            "ip": data.get("ip"),
+            "plc_ip": data.get("plc_ip"),
+            "mac_address": mac_address,
+            "cpu_serial_number": cpu_serial_number,  # CPUシリアル番号
+            "hostname": data.get("hostname"),
+            "port": data.get("port"),
+            "modbus_port": data.get("modbus_port", 502),
+            "interval": data.get("interval"),
+            "status": "登録済み",
+        }
+
+        # 起動直後に多数の端末が同時に登録するため、同じ設備の登録が競合したら1回だけやり直す
+        for attempt in range(2):
+            try:
+                register_equipment(values)
+                db.session.commit()
+                break
+            except IntegrityError as e:
+                db.session.rollback()
+                if attempt:
+                    return jsonify({"error": str(e)}), 500
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({"error": str(e)}), 500
+        fleet_state.equipments_changed()
 
-        if equipment:
-            # 既存設備の更新
-            equipment.equipment_id = equipment_id
-            equipment.manufacturer = data.get("manufacturer")
-            equipment.series = data.get("series")
-            equipment.ip = data.get("ip")
-            equipment.plc_ip = data.get("plc_ip")
-            equipment.mac_address = mac_address
-            equipment.cpu_serial_number = cpu_serial_number  # CPUシリアル番号を更新
-            equipment.hostname = data.get("hostname")
-            equipment.port = data.get("port")
-            equipment.modbus_port = data.get("modbus_port", 502)
-            equipment.interval = data.get("interval")
-            equipment.status = "登録済み"
-        else:
-            # 新規作成
-            equipment = Equipment(
-                equipment_id=equipment_id,
-                manufacturer=data.get("manufacturer"),
-                series=data.get("series"),
-                ip=data.get("ip"),
-                plc_ip=data.get("plc_ip"),
-                mac_address=mac_address,
-                cpu_serial_number=cpu_serial_number,  # CPUシリアル番号を追加
-                hostname=data.get("hostname"),
-                port=data.get("port"),
-                modbus_port=data.get("modbus_port", 502),
-                interval=data.get("interval"),
-                status="登録済み"
-            )
-            db.session.add(equipment)
-
-        try:
-            db.session.commit()
-            return jsonify({
-                "message": "登録完了", 
-                "cpu_serial_number": cpu_serial_number,
-                "equipment_id": equipment_id
-            }), 200
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": str(e)}), 500
+        return jsonify({
+            "message": "登録完了", 
+            "cpu_serial_number": cpu_serial_number,
+            "equipment_id": equipment_id
+        }), 200
 
     @app.route("/api/equipment", methods=["GET"])
     def get_all_equipment():
@@ -325,12 +539,23 @@ def register_routes(app, socketio=None):
                     "hostname": equipment.hostname,
                     "mac_address": equipment.mac_address,
                     "cpu_serial_number": getattr(equipment, "cpu_serial_number", ""),  # CPUシリアル番号を追加
-                    "updated_at": equipment.updated_at.isoformat() if equipment.updated_at else None
+                    "updated_at": equipment.updated_at
                 })
             return jsonify(equipment_list), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/fleet/overview", methods=["GET"])
+    def get_fleet_overview():
+        """全設備の状態・最新値・データの鮮度と状態別の台数（作成済みのJSON、ETag 対応）"""
+        try:
+            document = fleet_state.document()
+            response = current_app.response_class(document.body, mimetype="application/json")
+            response.set_etag(document.etag)
+            return response.make_conditional(request)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/check-equipment", methods=["POST"])
     def check_equipment():
         data = request.get_json()
@@ -368,7 +593,7 @@ def register_routes(app, socketio=None):
             if not equipment:
                 return jsonify({"error": "Equipment not found"}), 404
             
-            return jsonify({
+            return conditional_json({
                 "equipment_id": equipment.equipment_id,
                 "manufacturer": equipment.manufacturer,
                 "series": equipment.series,
@@ -380,66 +605,41 @@ def register_routes(app, socketio=None):
                 "status": equipment.status,
                 "hostname": equipment.hostname,
                 "mac_address": equipment.mac_address,
-                "cpu_serial_number": getattr(equipment, "cpu_serial_number", "")  # CPUシリアル番号を追加
-            }), 200
+                "cpu_serial_number": getattr(equipment, "cpu_serial_number", ""),  # CPUシリアル番号を追加
+                "config_version": equipment.config_version,
+                "ideal_cycle_time": equipment.ideal_cycle_time
+            })
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
     @app.route("/api/equipment/<equipment_id>", methods=["PUT"])
     def save_equipment_config(equipment_id):
         """設備基本設定を保存"""
-        print(f"🔧 [DEBUG] ===== save_equipment_config 開始 =====")
-        print(f"🔧 [DEBUG] URL equipment_id: {equipment_id}")
-        print(f"🔧 [DEBUG] リクエストメソッド: PUT")
-        
         try:
             data = request.get_json()
-            print(f"🔧 [DEBUG] 受信データ: {data}")
+            logger.debug("🔧 設備設定保存要求: %s", equipment_id, extra={"payload": data})
             
             if not data:
-                print("❌ [DEBUG] データが空です")
                 return jsonify({"error": "Invalid JSON"}), 400
 
-            # データベース内の全設備IDを確認
-            print(f"🔍 [DEBUG] データベース内の既存設備を確認中...")
-            try:
-                all_equipment = Equipment.query.all()
-                existing_ids = [eq.equipment_id for eq in all_equipment]
-                existing_cpus = [getattr(eq, 'cpu_serial_number', 'N/A') for eq in all_equipment]
-                print(f"🔍 [DEBUG] 既存設備ID一覧: {existing_ids}")
-                print(f"🔍 [DEBUG] 既存CPUシリアル番号一覧: {existing_cpus}")
-            except Exception as db_check_error:
-                print(f"⚠️ [DEBUG] データベース確認エラー: {db_check_error}")
-
             # CPUシリアル番号で既存設備を検索（不変識別子による確実な特定）
             cpu_serial_number = data.get("cpu_serial_number")
-            print(f"🔍 [DEBUG] 受信したCPUシリアル番号: '{cpu_serial_number}'")
             
             equipment = None
             
             if cpu_serial_number:
-                print(f"🔍 [DEBUG] CPUシリアル番号 '{cpu_serial_number}' で設備を検索中...")
                 # CPUシリアル番号で既存設備を検索（最優先）
                 equipment = Equipment.query.filter_by(cpu_serial_number=cpu_serial_number).first()
                 
                 if equipment:
-                    print(f"✅ [DEBUG] CPUシリアル番号で既存設備を発見!")
-                    print(f"    既存設備ID: '{equipment.equipment_id}'")
-                    print(f"    新設備ID: '{equipment_id}'")
-                    print(f"    CPUシリアル番号: '{cpu_serial_number}'")
+                    logger.info("🔄 CPUシリアル番号 %s の設備IDを更新: %s → %s",
+                                cpu_serial_number, equipment.equipment_id, equipment_id)
                     # 設備IDを新しい値に更新（設備IDは可変）
                     equipment.equipment_id = equipment_id
-                    print(f"🔄 [DEBUG] 設備IDを更新しました: '{equipment.equipment_id}' → '{equipment_id}'")
-                else:
-                    print(f"❌ [DEBUG] CPUシリアル番号 '{cpu_serial_number}' に対応する設備が見つかりません")
-                    print(f"🔄 [DEBUG] 新規作成を準備します: {equipment_id}")
-            else:
-                print(f"⚠️ [DEBUG] CPUシリアル番号が未提供です (None or empty)")
-                print(f"🔄 [DEBUG] CPUシリアル番号なしで新規作成を準備します: {equipment_id}")
             
             # 既存設備が見つからない場合は新規作成
             if not equipment:
-                print(f"🔄 [DEBUG] 新規設備を作成します: {equipment_id}")
+                logger.info("🔄 新規設備を作成します: %s (CPUシリアル番号: %s)", equipment_id, cpu_serial_number)
                 equipment = Equipment(
                     equipment_id=equipment_id,
                     manufacturer=data.get("manufacturer"),
@@ -455,10 +655,8 @@ def register_routes(app, socketio=None):
                     status="設定済み"
                 )
                 db.session.add(equipment)
-                print(f"🔄 [DEBUG] 新規設備をセッションに追加しました")
             
             # 設備情報を更新（既存設備・新規設備共通）
-            print(f"🔄 [DEBUG] 設備情報を更新中...")
             equipment.manufacturer = data.get("manufacturer", equipment.manufacturer)
             equipment.series = data.get("series", equipment.series)
             equipment.ip = data.get("raspi_ip", data.get("ip", equipment.ip))
@@ -469,22 +667,33 @@ def register_routes(app, socketio=None):
             equipment.mac_address = data.get("mac_address", equipment.mac_address)
             equipment.cpu_serial_number = data.get("cpu_serial_number", equipment.cpu_serial_number)
             equipment.hostname = data.get("hostname", equipment.hostname)
+            equipment.ideal_cycle_time = data.get("ideal_cycle_time", equipment.ideal_cycle_time)
             equipment.status = "設定済み"
             equipment.updated_at = datetime.utcnow()
-            print(f"🔄 [DEBUG] 設備情報更新完了")
 
-            print(f"💾 [DEBUG] データベースコミット実行中...")
+            # エッジ端末が使う項目が変わった場合のみ版を上げて通知
+            state = inspect(equipment)
+            edge_changed = state.pending or any(
+                state.attrs[field].history.has_changes() for field in EDGE_EQUIPMENT_FIELDS
+            )
+            previous_equipment_ids = state.attrs.equipment_id.history.deleted or []
+            interval_changed = not state.pending and state.attrs.interval.history.has_changes()
+            if edge_changed:
+                equipment.config_version = (equipment.config_version or 0) + 1
+
             db.session.commit()
-            print(f"✅ [DEBUG] 設備設定保存成功: {equipment_id}")
-            print(f"🔧 [DEBUG] ===== save_equipment_config 正常終了 =====")
+            fleet_state.equipments_changed()
+            if interval_changed:
+                # 欠測とみなす間隔を次のサンプルから反映
+                production_registry.invalidate(equipment.id)
+            if edge_changed:
+                notify_config_changed(socketio, {equipment.equipment_id, *previous_equipment_ids},
+                                      equipment.config_version, "equipment")
+            logger.info("✅ 設備設定保存成功: %s", equipment_id)
             return jsonify({"message": "Equipment config saved"}), 200
             
         except Exception as e:
-            print(f"❌ [DEBUG] 設備設定保存エラー: {str(e)}")
-            print(f"❌ [DEBUG] エラー詳細: {repr(e)}")
-            import traceback
-            print(f"❌ [DEBUG] スタックトレース: {traceback.format_exc()}")
-            print(f"🔧 [DEBUG] ===== save_equipment_config エラー終了 =====")
+            logger.exception("❌ 設備設定保存エラー: %s", equipment_id)
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
 
@@ -499,16 +708,12 @@ def register_routes(app, socketio=None):
             if not cpu_serial_number and not mac_address and not ip_address:
                 return jsonify({"error": "cpu_serial_number, mac_address, or ip_address is required"}), 400
 
-            # 検索条件の優先順位: cpu_serial_number > mac_address > ip_address
-            equipment = None
-            if cpu_serial_number:
-                equipment = Equipment.query.filter_by(cpu_serial_number=cpu_serial_number).first()
-            
-            if not equipment and mac_address:
-                equipment = Equipment.query.filter_by(mac_address=mac_address).first()
-            
-            if not equipment and ip_address:
-                equipment = Equipment.query.filter_by(ip=ip_address).first()
+            # 検索条件の優先順位: cpu_serial_number > mac_address > ip_address（1クエリ）
+            equipment = find_equipment_by_identity(
+                (Equipment.cpu_serial_number, cpu_serial_number),
+                (Equipment.mac_address, mac_address),
+                (Equipment.ip, ip_address),
+            )
 
             if not equipment:
                 return jsonify({"error": "Equipment not found"}), 404
@@ -561,6 +766,7 @@ def register_routes(app, socketio=None):
             equipment.status = "設定済み"
             equipment.updated_at = datetime.utcnow()
             db.session.commit()
+            fleet_state.equipments_changed()
 
             return jsonify({
                 "message": "Setup completed marked",
@@ -587,10 +793,14 @@ def register_routes(app, socketio=None):
                     "enabled": config.enabled,
                     "address": config.address,
                     "scale_factor": config.scale_factor,
-                    "plc_data_type": getattr(config, "plc_data_type", "word")
+                    "plc_data_type": getattr(config, "plc_data_type", "word"),
+                    "compression_mode": config.compression_mode or "none",
+                    "compression_tolerance": config.compression_tolerance or 0.0,
+                    "compression_max_interval": config.compression_max_interval or 0
                 })
             
-            return jsonify(configs), 200
+            # 一覧（配列）のまま返すため、版はヘッダーで通知
+            return conditional_json(configs, headers={"X-Config-Version": str(equipment.config_version)})
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -599,78 +809,63 @@ def register_routes(app, socketio=None):
         """PLCデータ設定を保存"""
         try:
             data = request.get_json()
-            print(f"🔧 [DEBUG] PUT /api/equipment/{equipment_id}/plc_configs 受信データ: {data}")
+            logger.debug("🔧 PLCデータ設定保存要求: %s", equipment_id, extra={"payload": data})
             
             if not isinstance(data, list):
-                print(f"❌ [DEBUG] PLCデータ形式エラー: リストではない")
                 return jsonify({"error": "Expected list of configurations"}), 400
+            for config_data in data:
+                error = validate_plc_config(config_data)
+                if error:
+                    return jsonify({"error": error}), 400
 
-            # 直接SQLで設備IDから内部IDを取得
-            try:
-                equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
-                if equipment:
-                    equipment_internal_id = equipment.id
-                    print(f"✅ [DEBUG] SQLAlchemyで設備発見: internal_id={equipment_internal_id}")
-                else:
-                    print(f"🔄 [DEBUG] SQLAlchemyで設備が見つからない、直接SQLで検索")
-                    result = db.session.execute(text("SELECT id FROM equipments WHERE equipment_id = :eq_id"), {"eq_id": equipment_id})
-                    equipment_row = result.fetchone()
-                    if equipment_row:
-                        equipment_internal_id = equipment_row[0]
-                        print(f"🔍 [DEBUG] 直接SQLで設備発見: internal_id={equipment_internal_id}")
-                    else:
-                        print(f"❌ [DEBUG] 設備が見つかりません: {equipment_id}")
-                        return jsonify({"error": "Equipment not found"}), 404
-            except Exception as eq_error:
-                print(f"🔄 [DEBUG] 設備検索エラー、直接SQLで対応: {eq_error}")
-                result = db.session.execute(text("SELECT id FROM equipments WHERE equipment_id = :eq_id"), {"eq_id": equipment_id})
-                equipment_row = result.fetchone()
-                if equipment_row:
-                    equipment_internal_id = equipment_row[0]
-                    print(f"🔍 [DEBUG] 直接SQLで設備発見: internal_id={equipment_internal_id}")
-                else:
-                    print(f"❌ [DEBUG] 設備が見つかりません: {equipment_id}")
-                    return jsonify({"error": "Equipment not found"}), 404
-
-            # 直接SQLでPLC設定を削除
-            print(f"🔄 [DEBUG] 既存PLCデータ設定を削除: equipment_id={equipment_internal_id}")
-            db.session.execute(text("DELETE FROM plc_data_configs WHERE equipment_id = :eq_id"), {"eq_id": equipment_internal_id})
+            data_types = [config_data["data_type"] for config_data in data]
+            if len(set(data_types)) != len(data_types):
+                return jsonify({"error": "Duplicate data_type"}), 400
 
-            # 直接SQLで新しい設定を追加
-            print(f"🔄 [DEBUG] 新しいPLCデータ設定を追加: {len(data)}件")
-            for config_data in data:
-                insert_data = {
-                    "equipment_id": equipment_internal_id,
-                    "data_type": config_data.get("data_type"),
-                    "enabled": config_data.get("enabled", False),
-                    "address": config_data.get("address", ""),
-                    "scale_factor": config_data.get("scale_factor", 1),
-                    "plc_data_type": config_data.get("plc_data_type", "word")
-                }
-                
-                # NULL値を除外
-                filtered_data = {k: v for k, v in insert_data.items() if v is not None}
-                
-                columns = ", ".join(filtered_data.keys())
-                placeholders = ", ".join([f":{k}" for k in filtered_data.keys()])
-                sql = f"INSERT INTO plc_data_configs ({columns}) VALUES ({placeholders})"
-                
-                print(f"🔄 [DEBUG] PLCデータ設定追加: {config_data.get('data_type')} -> {config_data.get('address')}")
-                db.session.execute(text(sql), filtered_data)
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
 
+            # 既存の設定との差分だけを反映（変更がなければ版は据え置き）
+            counter_type = production_counter_type(equipment_pk)
+            inserted, updated, deleted = apply_plc_config_diff(equipment_pk, data)
+            changed = bool(inserted or updated or deleted)
+            counter_type_changed = changed and production_counter_type(equipment_pk) != counter_type
+            if changed:
+                db.session.execute(
+                    update(Equipment).where(Equipment.id == equipment_pk)
+                    .values(config_version=Equipment.config_version + 1)
+                )
+            config_version = db.session.execute(
+                select(Equipment.config_version).where(Equipment.id == equipment_pk)
+            ).scalar()
             db.session.commit()
-            print(f"✅ [DEBUG] PLCデータ設定保存成功: {equipment_id}")
-            return jsonify({"message": "PLC configs saved (SQL fallback)"}), 200
+
+            if changed:
+                # 圧縮設定を次のサンプルから反映
+                compression_registry.invalidate(equipment_pk)
+                if counter_type_changed:
+                    # カウンターの周期（桁あふれの判定）を次のサンプルから反映
+                    production_registry.invalidate(equipment_pk)
+                notify_config_changed(socketio, [equipment_id], config_version, "plc_configs")
+            logger.info("✅ PLCデータ設定保存成功: %s (追加 %s件, 更新 %s件, 削除 %s件, 版 %s)",
+                        equipment_id, inserted, updated, deleted, config_version)
+            return jsonify({
+                "message": "PLC configs saved",
+                "config_version": config_version,
+                "changed": changed,
+                "inserted": inserted,
+                "updated": updated,
+                "deleted": deleted
+            }), 200
         except Exception as e:
-            print(f"❌ [DEBUG] PLCデータ設定保存エラー: {str(e)}")
-            print(f"❌ [DEBUG] エラー詳細: {repr(e)}")
-            import traceback
-            print(f"❌ [DEBUG] スタックトレース: {traceback.format_exc()}")
+            logger.exception("❌ PLCデータ設定保存エラー: %s", equipment_id)
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
 
 
     @app.route("/api/logs", methods=["POST"])
+    @use_workload(WORKLOAD_INGEST)
     def save_log_data():
         """改良版：ログデータをDBに保存 + WebSocketでリアルタイム配信"""
         try:
@@ -682,143 +877,330 @@ def register_routes(app, socketio=None):
             if not equipment_id:
                 return jsonify({"error": "equipment_id is required"}), 400
 
-            # ✅ データ受信ログを追加
-            print(f"📥 PLCデータ受信: 設備ID={equipment_id}, タイムスタンプ={data.get('timestamp')}")
-            print(f"   生産数={data.get('production_count')}, 電流={data.get('current')}A, 温度={data.get('temperature')}℃")
-
             # 設備の存在確認
             equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
             if not equipment:
                 return jsonify({"error": "Equipment not found"}), 404
 
             # タイムスタンプの処理
-            timestamp = data.get("timestamp")
-            if isinstance(timestamp, str):
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            elif timestamp is None:
-                timestamp = datetime.utcnow()
+            timestamp = parse_log_timestamp(data.get("timestamp"))
+
+            # 圧縮設定に従い、波形の再現に必要なサンプルだけを保存（保留中の直前サンプルを含む）
+            to_store = compression_registry.filter(equipment.id, [(timestamp, data)])
 
             # 簡潔なDB操作（greenlet回避）
             try:
-                log_entry = Log()
-                log_entry.equipment_id = equipment.id
-                log_entry.timestamp = timestamp
-                log_entry.production_count = data.get("production_count")
-                log_entry.current = data.get("current")
-                log_entry.temperature = data.get("temperature")
-                log_entry.pressure = data.get("pressure")
-                log_entry.cycle_time = data.get("cycle_time")
-                log_entry.error_code = data.get("error_code")
-                
-                # 通常のSQLAlchemyセッション管理
-                db.session.add(log_entry)
-                db.session.commit()
+                log_id = None
+                # error_code の変化をエラー発生区間として記録（同じトランザクション）
+                error_changes = error_event_registry.record(equipment.id, [(timestamp, data)])
+                if to_store:
+                    log_entries = [build_log_entry(equipment, d, ts) for ts, d in to_store]
+                    tags = compression_registry.generic_tags(equipment.id)
+                    tag_values = [row for ts, d in to_store for row in build_tag_values(equipment, d, ts, tags)]
+                    
+                    # 通常のSQLAlchemyセッション管理
+                    db.session.add_all(log_entries)
+                    if tag_values:
+                        db.session.execute(insert(TagValue), tag_values)
+                    db.session.flush()
+                    # コミット後の属性アクセスによる再読込を避けるため先に取得
+                    log_id = log_entries[-1].id
+                    db.session.commit()
+                    INGEST_ROWS_WRITTEN.labels("single").inc(len(log_entries))
+                elif error_changes:
+                    db.session.commit()
+                INGEST_BATCH_ROWS.labels("single").observe(len(to_store))
                 
-                print(f"💾 DB保存完了: ログID={log_entry.id}")
+                sample_logger.info(
+                    "💾 PLCデータ保存: 設備ID=%s, ログID=%s", equipment_id, log_id,
+                    extra={"equipment_id": equipment_id, "log_id": log_id, "stored_count": len(to_store),
+                           "production_count": data.get("production_count"),
+                           "current": data.get("current"), "temperature": data.get("temperature")}
+                )
                 
             except Exception as db_error:
                 db.session.rollback()
-                print(f"❌ DB保存エラー: {db_error}")
+                # 保留中のサンプルが失われるため圧縮状態をリセット（次のサンプルは必ず保存）
+                compression_registry.invalidate(equipment.id)
+                error_event_registry.invalidate(equipment.id)
+                logger.error("❌ DB保存エラー: %s", db_error, extra={"equipment_id": equipment_id})
                 return jsonify({"error": f"Database error: {str(db_error)}"}), 500
 
+            # アラーム・異常検知・生産数は保存の成功後に反映（圧縮で間引いたサンプルを含む）
+            anomaly_scores = apply_stored_samples(equipment, [(timestamp, data)])
+            # フリート概要の最新値・鮮度を更新
+            fleet_state.record(equipment.id, timestamp, data, is_anomalous(anomaly_scores))
+
             # WebSocketでNuxtUIにリアルタイム配信
             if socketio:
-                realtime_data = {
-                    "equipment_id": equipment_id,
-                    "timestamp": timestamp.isoformat(),
-                    "production_count": data.get("production_count"),
-                    "current": data.get("current"),
-                    "temperature": data.get("temperature"),
-                    "pressure": data.get("pressure"),
-                    "cycle_time": data.get("cycle_time"),
-                    "error_code": data.get("error_code"),
-                    "status": "normal" if not data.get("error_code") else "error"
-                }
+                realtime_data = build_realtime_payload(equipment_id, data, timestamp, anomaly_scores)
                 
                 # WebSocket送信を別のtry-catchで囲む
                 try:
                     # NuxtUIの全モニタリングクライアントに送信
-                    socketio.emit('plc_data_update', realtime_data, to='monitoring')
+                    emit_to_room(socketio, 'plc_data_update', realtime_data, 'monitoring')
                     
                     # 特定設備のモニタリングクライアントに送信
-                    socketio.emit('equipment_data_update', realtime_data, to=f'equipment_{equipment_id}')
-                    
-                    print(f"📡 WebSocket送信完了: monitoring + equipment_{equipment_id}")
+                    emit_to_room(socketio, 'equipment_data_update', realtime_data, f'equipment_{equipment_id}')
                 except Exception as ws_error:
-                    print(f"⚠️ WebSocket送信エラー (処理継続): {ws_error}")
+                    logger.warning("⚠️ WebSocket送信エラー (処理継続): %s", ws_error)
 
             return jsonify({
                 "message": "Data saved and broadcasted",
-                "saved_to_db": True,
+                "saved_to_db": any(d is data for _, d in to_store),
+                "stored_count": len(to_store),
+                "anomaly_scores": anomaly_scores,
                 "broadcasted_to_ui": bool(socketio),
-                "timestamp": timestamp.isoformat()
+                "timestamp": timestamp
             }), 200
             
         except Exception as e:
-            print(f"❌ PLCデータ処理エラー: {e}")
+            logger.exception("❌ PLCデータ処理エラー: %s", e)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/logs/batch", methods=["POST"])
+    @use_workload(WORKLOAD_INGEST)
+    def save_log_data_batch():
+        """ログデータの一括保存（エッジ側スプールからの再送用）"""
+        try:
+            data = request.get_json()
+            samples = data.get("samples") if isinstance(data, dict) else data
+            if not isinstance(samples, list):
+                return jsonify({"error": "Expected list of samples"}), 400
+            if len(samples) > LOG_BATCH_MAX_SAMPLES:
+                return jsonify({"error": f"Too many samples (max {LOG_BATCH_MAX_SAMPLES})"}), 413
+            # スプールからの再送は spool_id とサンプルごとのシーケンス番号（seqs）を伴う
+            spool_id = data.get("spool_id") if isinstance(data, dict) else None
+            seqs = data.get("seqs") if spool_id is not None else None
+            if spool_id is not None:
+                error = validate_spool_batch(spool_id, seqs, samples)
+                if error:
+                    return jsonify({"error": error}), 400
+
+            # 対象設備をまとめて取得
+            equipment_ids = {s.get("equipment_id") for s in samples if isinstance(s, dict)}
+            equipments = {
+                eq.equipment_id: eq
+                for eq in Equipment.query.filter(Equipment.equipment_id.in_(equipment_ids)).all()
+            } if equipment_ids else {}
+
+            # 取込み済みのサンプル（応答が届かず再送されたバッチ）は読み飛ばす
+            acked_seq = lock_spool_checkpoint(spool_id) if spool_id is not None else None
+            duplicate_count = 0
+
+            accepted = {}
+            rejected = []
+            latest = {}
+            for index, sample in enumerate(samples):
+                if acked_seq is not None and seqs[index] <= acked_seq:
+                    duplicate_count += 1
+                    continue
+                if not isinstance(sample, dict) or not sample.get("equipment_id"):
+                    rejected.append({"index": index, "error": "equipment_id is required"})
+                    continue
+                equipment = equipments.get(sample["equipment_id"])
+                if not equipment:
+                    rejected.append({"index": index, "error": "Equipment not found"})
+                    continue
+                try:
+                    timestamp = parse_log_timestamp(sample.get("timestamp"))
+                except (TypeError, ValueError) as e:
+                    rejected.append({"index": index, "error": f"Invalid timestamp: {e}"})
+                    continue
+
+                accepted.setdefault(equipment, []).append((timestamp, sample))
+                # サンプルは古い順に並んでいる前提
+                latest[equipment.equipment_id] = (sample, timestamp)
+
+            # 設備ごとに圧縮し、保存が必要なサンプルだけをLogレコード・タグ値にする
+            log_entries = []
+            tag_values = []
+            for equipment, equipment_samples in accepted.items():
+                tags = compression_registry.generic_tags(equipment.id)
+                for timestamp, sample in compression_registry.filter(equipment.id, equipment_samples):
+                    log_entries.append(build_log_entry(equipment, sample, timestamp))
+                    tag_values.extend(build_tag_values(equipment, sample, timestamp, tags))
+            received_count = sum(len(equipment_samples) for equipment_samples in accepted.values())
+
+            try:
+                for equipment, equipment_samples in accepted.items():
+                    error_event_registry.record(equipment.id, equipment_samples)
+                db.session.add_all(log_entries)
+                if tag_values:
+                    db.session.execute(insert(TagValue), tag_values)
+                if acked_seq is not None and seqs and max(seqs) > acked_seq:
+                    # 取込み位置はサンプルと同じトランザクションで進める
+                    db.session.execute(
+                        update(SpoolCheckpoint).where(SpoolCheckpoint.spool_id == spool_id)
+                        .values(acked_seq=max(seqs))
+                    )
+                db.session.commit()
+                INGEST_ROWS_WRITTEN.labels("batch").inc(len(log_entries))
+                INGEST_BATCH_ROWS.labels("batch").observe(len(log_entries))
+            except Exception as db_error:
+                db.session.rollback()
+                for equipment in accepted:
+                    compression_registry.invalidate(equipment.id)
+                    error_event_registry.invalidate(equipment.id)
+                logger.error("❌ DB一括保存エラー: %s", db_error)
+                return jsonify({"error": f"Database error: {str(db_error)}"}), 500
+
+            logger.info("💾 DB一括保存完了: %s件 (受信 %s件, 拒否 %s件, 重複 %s件)",
+                        len(log_entries), received_count, len(rejected), duplicate_count)
+
+            # アラーム・異常検知・生産数は保存の成功後に反映
+            anomaly_scores = {}
+            for equipment, equipment_samples in accepted.items():
+                anomaly_scores[equipment.equipment_id] = apply_stored_samples(equipment, equipment_samples)
+                timestamp, sample = equipment_samples[-1]
+                fleet_state.record(equipment.id, timestamp, sample,
+                                   is_anomalous(anomaly_scores[equipment.equipment_id]))
+
+            # 再送分の大量配信を避けるため、設備ごとに最新の1件のみ配信
+            if socketio:
+                for equipment_id, (sample, timestamp) in latest.items():
+                    realtime_data = build_realtime_payload(equipment_id, sample, timestamp, anomaly_scores.get(equipment_id))
+                    try:
+                        emit_to_room(socketio, 'plc_data_update', realtime_data, 'monitoring')
+                        emit_to_room(socketio, 'equipment_data_update', realtime_data, f'equipment_{equipment_id}')
+                    except Exception as ws_error:
+                        logger.warning("⚠️ WebSocket送信エラー (処理継続): %s", ws_error)
+
+            return jsonify({
+                "message": "Batch saved",
+                "saved_count": len(log_entries),
+                "saved_tag_values": len(tag_values),
+                "accepted_count": received_count,
+                "duplicate_count": duplicate_count,
+                "rejected": rejected
+            }), 200
+
+        except Exception as e:
+            logger.exception("❌ PLCデータ一括処理エラー: %s", e)
             return jsonify({"error": str(e)}), 500
 
     @app.route("/api/logs/<equipment_id>/latest", methods=["GET"])
     def get_latest_data(equipment_id):
         """最新データ取得（初期表示用）"""
         try:
-            equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
-            if not equipment:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
                 return jsonify({"error": "Equipment not found"}), 404
 
-            latest_log = Log.query.filter_by(equipment_id=equipment.id)\
-                                  .order_by(Log.id.desc())\
-                                  .first()
+            latest_log = fetch_latest_log(equipment_pk)
             
             if not latest_log:
                 return jsonify({"message": "No data found"}), 404
 
-            return jsonify({
-                "equipment_id": equipment_id,
-                "timestamp": latest_log.timestamp.isoformat(),
-                "production_count": latest_log.production_count,
-                "current": latest_log.current,
-                "temperature": latest_log.temperature,
-                "pressure": latest_log.pressure,
-                "cycle_time": latest_log.cycle_time,
-                "error_code": latest_log.error_code
-            }), 200
+            return jsonify({"equipment_id": equipment_id, **latest_log._mapping}), 200
 
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
     @app.route("/api/logs/<equipment_id>/history", methods=["GET"])
+    @read_replica
     def get_history_data(equipment_id):
         """履歴データ取得（グラフ表示用）"""
         try:
-            equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
-            if not equipment:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
                 return jsonify({"error": "Equipment not found"}), 404
 
             # クエリパラメータで期間指定
             limit = request.args.get('limit', 100, type=int)
+            # layout=columnar で列形式（列名 → 値のリスト）
+            layout = request.args.get('layout', 'records')
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
             
-            logs = Log.query.filter_by(equipment_id=equipment.id)\
-                           .order_by(Log.id.desc())\
-                           .limit(limit)\
-                           .all()
-
-            history_data = []
-            for log in logs:
-                history_data.append({
-                    "timestamp": log.timestamp.isoformat(),
-                    "production_count": log.production_count,
-                    "current": log.current,
-                    "temperature": log.temperature,
-                    "pressure": log.pressure,
-                    "cycle_time": log.cycle_time,
-                    "error_code": log.error_code
-                })
+            # 必要な列だけをタプルで取得（ORMインスタンスを生成しない）
+            rows = fetch_log_history(equipment_pk, limit)
 
             return jsonify({
                 "equipment_id": equipment_id,
-                "data": history_data,
-                "total_records": len(history_data)
+                "layout": layout,
+                "data": shape_rows(list(LOG_HISTORY_COLUMNS), rows, layout),
+                "total_records": len(rows)
+            }), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/logs/history/bulk", methods=["POST"])
+    @read_replica
+    def get_bulk_history():
+        """複数設備の履歴（設備ごとの列形式）
+
+        期間を points 個の時間幅に分け、幅ごとに集約した値を全設備まとめて1クエリで取得します。
+        時間幅が1日以上なら日の倍数に切り上げ、日次集計（まだない当日分などは受信サンプルの15分集計）から返します。
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            equipment_ids = data.get('equipment_ids')
+            if not isinstance(equipment_ids, list) or not equipment_ids:
+                return jsonify({"error": "equipment_ids is required"}), 400
+            equipment_ids = list(dict.fromkeys(str(equipment_id) for equipment_id in equipment_ids))
+            if len(equipment_ids) > BULK_HISTORY_MAX_EQUIPMENTS:
+                return jsonify({"error": f"Too many equipment_ids (max {BULK_HISTORY_MAX_EQUIPMENTS})"}), 413
+            metrics = data.get('metrics') or list(BULK_HISTORY_METRICS)
+            unknown = [m for m in metrics if m not in BULK_HISTORY_METRICS]
+            if unknown:
+                return jsonify({"error": f"Unknown metrics: {', '.join(map(str, unknown))}"}), 400
+            points = data.get('points', 500)
+            if not isinstance(points, int) or isinstance(points, bool) or not 1 <= points <= BULK_HISTORY_MAX_POINTS:
+                return jsonify({"error": f"points must be 1-{BULK_HISTORY_MAX_POINTS}"}), 400
+            try:
+                if data.get('start'):
+                    start = parse_utc_datetime(data['start'])
+                    end = parse_utc_datetime(data['end']) if data.get('end') else datetime.utcnow()
+                else:
+                    period = data.get('period', '24h')  # 1h, 6h, 24h, 7d, 30d
+                    end = datetime.utcnow()
+                    start = end - timedelta(hours=PERIOD_HOURS[period])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({"error": "Invalid start, end or period"}), 400
+            if start >= end:
+                return jsonify({"error": "start must be before end"}), 400
+
+            rows = db.session.execute(
+                select(Equipment.equipment_id, Equipment.id).where(Equipment.equipment_id.in_(equipment_ids))
+            ).all()
+            pks = {pk: equipment_id for equipment_id, pk in rows}
+            series = {
+                equipment_id: {"timestamp": [], **{metric: [] for metric in metrics}}
+                for equipment_id, _ in rows
+            }
+
+            bucket_seconds = max(1, math.ceil((end - start).total_seconds() / points))
+            if bucket_seconds < 86400:
+                tier = "raw_logs"
+                bucketed = fetch_bucketed_history(list(pks), metrics, start, end, bucket_seconds) if pks else []
+                for equipment_pk, bucket, *values in bucketed:
+                    columns = series[pks[equipment_pk]]
+                    columns["timestamp"].append(start + timedelta(seconds=bucket * bucket_seconds))
+                    for metric, value in zip(metrics, values):
+                        columns[metric].append(value)
+            else:
+                tier = "daily_summaries"
+                # 日次集計は日単位のため、時間幅を日の倍数に切り上げて UTC の0時から区切る
+                bucket_seconds = math.ceil(bucket_seconds / 86400) * 86400
+                origin = datetime.combine(start.date(), datetime.min.time())
+                summarized = fetch_summary_history(list(pks), metrics, origin, end, bucket_seconds) if pks else []
+                for equipment_pk, bucket, *values in summarized:
+                    columns = series[pks[equipment_pk]]
+                    columns["timestamp"].append(origin + timedelta(seconds=bucket * bucket_seconds))
+                    for metric, value in zip(metrics, values):
+                        columns[metric].append(value)
+
+            return jsonify({
+                "start": start,
+                "end": end,
+                "tier": tier,
+                "summary_method": SUMMARY_METHOD if tier == "daily_summaries" else None,
+                "bucket_seconds": bucket_seconds,
+                "metrics": metrics,
+                "equipments": series,
+                "missing": [equipment_id for equipment_id in equipment_ids if equipment_id not in series]
             }), 200
 
         except Exception as e:
@@ -848,12 +1230,31 @@ def register_routes(app, socketio=None):
         def on_connect():
             """WebSocket接続確立"""
             emit('status', {'msg': 'Connected to PLC monitoring system'})
-            print('NuxtUI client connected')
+            logger.debug('NuxtUI client connected')
 
         @socketio.on('disconnect')
         def on_disconnect():
             """WebSocket接続切断"""
-            print('NuxtUI client disconnected')
+            logger.debug('NuxtUI client disconnected')
+
+        @socketio.on('connect', namespace=EDGE_NAMESPACE)
+        def on_edge_connect(auth=None):
+            """エッジ端末の接続（auth または クエリの equipment_id / equipment_ids で購読する設備を指定）"""
+            auth = auth or {}
+            equipment_ids = auth.get('equipment_ids') or [auth.get('equipment_id') or request.args.get('equipment_id')]
+            equipment_ids = [equipment_id for equipment_id in equipment_ids if equipment_id]
+            if not equipment_ids:
+                return False
+            for equipment_id in equipment_ids:
+                join_room(f'edge_{equipment_id}')
+            # 接続直後に現在の版を返し、切断中の変更も取りこぼさないようにする
+            versions = dict(db.session.execute(
+                select(Equipment.equipment_id, Equipment.config_version)
+                .where(Equipment.equipment_id.in_(equipment_ids))
+            ).all())
+            db.session.remove()
+            emit('config_versions', {equipment_id: versions.get(equipment_id) for equipment_id in equipment_ids})
+            logger.debug('Edge client connected: %s', equipment_ids)
 
         @socketio.on('get_realtime_status')
         def on_get_realtime_status(data):
@@ -863,30 +1264,63 @@ def register_routes(app, socketio=None):
                     equipment_id = data.get('equipment_id')
                     if equipment_id:
                         # 最新データを取得してレスポンス
-                        equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
-                        if equipment:
-                            latest_log = Log.query.filter_by(equipment_id=equipment.id)\
-                                                  .order_by(Log.id.desc())\
-                                                  .first()
+                        equipment_pk = find_equipment_pk(equipment_id)
+                        if equipment_pk is not None:
+                            latest_log = fetch_latest_log(equipment_pk)
                             if latest_log:
                                 response_data = {
                                     "equipment_id": equipment_id,
-                                    "timestamp": latest_log.timestamp.isoformat(),
-                                    "production_count": latest_log.production_count,
-                                    "current": latest_log.current,
-                                    "temperature": latest_log.temperature,
-                                    "pressure": latest_log.pressure,
-                                    "cycle_time": latest_log.cycle_time,
-                                    "error_code": latest_log.error_code,
+                                    **latest_log._mapping,
                                     "status": "normal" if not latest_log.error_code else "error"
                                 }
                                 emit('realtime_status', response_data)
             except Exception as e:
-                print(f"❌ get_realtime_status エラー: {e}")
+                logger.exception("❌ get_realtime_status エラー: %s", e)
                 emit('error', {'msg': 'Failed to get status'})
 
     # 管理用API
+    @app.route("/api/logs/<equipment_id>/tags", methods=["GET"])
+    @read_replica
+    def get_tag_series(equipment_id):
+        """タグ別の時系列データ取得（固定列・汎用タグのどちらの data_type も指定可能）"""
+        try:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+
+            available = configured_tags(equipment_pk)
+            # tags=a,b で対象を指定（省略時は設定済みの全タグ）
+            tags = [t for t in request.args.get('tags', '').split(',') if t] or available
+            # 固定列は設定の有無に関係なく logs から読めるため常に指定可能
+            fixed = DataTypes.get_all()
+            unknown = [t for t in tags if t not in available and t not in fixed]
+            if unknown:
+                return jsonify({"error": f"Unknown tags: {', '.join(unknown)}"}), 400
+
+            limit = request.args.get('limit', 1000, type=int)
+            period = request.args.get('period', '1h')  # 1h, 6h, 24h, 7d, 30d
+            if period not in PERIOD_HOURS:
+                return jsonify({"error": "Invalid period"}), 400
+            layout = request.args.get('layout', 'columnar')  # columnar, records
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+
+            since = datetime.utcnow() - timedelta(hours=PERIOD_HOURS[period])
+            return jsonify({
+                "equipment_id": equipment_id,
+                "period": period,
+                "layout": layout,
+                "tags": {
+                    tag: shape_rows(TAG_SERIES_FIELDS, fetch_tag_series(equipment_pk, tag, limit, since), layout)
+                    for tag in tags
+                }
+            }), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/admin/cleanup", methods=["POST"])
+    @use_workload(WORKLOAD_BATCH)
     def manual_cleanup():
         """手動クリーンアップ実行"""
         try:
@@ -911,10 +1345,13 @@ def register_routes(app, socketio=None):
             return jsonify({"error": str(e)}), 500
 
     @app.route("/api/admin/stats", methods=["GET"])
+    @read_replica
+    @use_workload(WORKLOAD_BATCH)
     def get_database_stats():
         """データベース統計情報を取得"""
         try:
             total_logs = Log.query.count()
+            total_tag_values = db.session.execute(select(func.count(TagValue.id))).scalar()
             total_equipments = Equipment.query.count()
             total_daily_summaries = DailyLogSummary.query.count()
             total_monthly_summaries = MonthlyLogSummary.query.count()
@@ -923,30 +1360,59 @@ def register_routes(app, socketio=None):
             oldest_log = Log.query.order_by(Log.timestamp.asc()).first()
             newest_log = Log.query.order_by(Log.timestamp.desc()).first()
             
-            # 設備別ログ数
-            equipment_stats = []
-            for equipment in Equipment.query.all():
-                eq_logs = Log.query.filter_by(equipment_id=equipment.id).count()
-                equipment_stats.append({
-                    "equipment_id": equipment.equipment_id,
-                    "log_count": eq_logs
-                })
+            # 設備別ログ数（1クエリで集計）と圧縮率（起動後の受信件数 / 保存件数）
+            equipment_stats = [
+                {"equipment_id": equipment_id, "log_count": log_count,
+                 "compression": compression_registry.stats(equipment_pk)}
+                for equipment_pk, equipment_id, log_count in db.session.query(
+                    Equipment.id, Equipment.equipment_id, func.count(Log.id)
+                ).outerjoin(Log, Log.equipment_id == Equipment.id).group_by(
+                    Equipment.id, Equipment.equipment_id
+                ).order_by(Equipment.id).all()
+            ]
             
             return jsonify({
                 "total_logs": total_logs,
+                "total_tag_values": total_tag_values,
                 "total_equipments": total_equipments,
                 "total_daily_summaries": total_daily_summaries,
                 "total_monthly_summaries": total_monthly_summaries,
-                "oldest_log": oldest_log.timestamp.isoformat() if oldest_log else None,
-                "newest_log": newest_log.timestamp.isoformat() if newest_log else None,
+                "oldest_log": oldest_log.timestamp if oldest_log else None,
+                "newest_log": newest_log.timestamp if newest_log else None,
                 "equipment_stats": equipment_stats,
-                "retention_config": DATA_RETENTION_CONFIG
+                "retention_config": DATA_RETENTION_CONFIG,
+                "replicas": replica_router.status(),
+                "pools": workload_engines.status()
             }), 200
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/admin/compression_stats", methods=["GET"])
+    def get_compression_stats():
+        """設備ごとの圧縮率（プロセス起動後の受信件数 / 保存件数）"""
+        try:
+            stats = compression_registry.stats()
+            equipment_ids = dict(
+                db.session.query(Equipment.id, Equipment.equipment_id).filter(Equipment.id.in_(list(stats))).all()
+            ) if stats else {}
+            received = sum(s["received"] for s in stats.values())
+            stored = sum(s["stored"] for s in stats.values())
+            return jsonify({
+                "equipments": [
+                    {"equipment_id": equipment_ids.get(pk), **s} for pk, s in sorted(stats.items())
+                ],
+                "total": {
+                    "received": received,
+                    "stored": stored,
+                    "compression_ratio": round(received / stored, 2) if stored else None,
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/admin/create_summary", methods=["POST"])
+    @use_workload(WORKLOAD_BATCH)
     def manual_create_summary():
         """手動で集計データ作成"""
         try:
@@ -969,6 +1435,27 @@ def register_routes(app, socketio=None):
                 
                 threading.Thread(target=create_monthly_summary, args=(year, month), daemon=True).start()
                 return jsonify({"message": f"{year}年{month}月の月次集計を開始しました"}), 200
+
+            elif summary_type == 'shift':
+                # 現地日付（シフトの日付）の範囲。省略時は前日
+                yesterday = shift_calendar.local_date(datetime.utcnow()) - timedelta(days=1)
+                start_date = date.fromisoformat(data['date']) if data.get('date') else yesterday
+                end_date = date.fromisoformat(data['end_date']) if data.get('end_date') else start_date
+                app = current_app._get_current_object()
+
+                def run_shift_summaries():
+                    with app.app_context():
+                        try:
+                            shifts, rows = create_shift_summaries(start_date, end_date)
+                            logger.info("✅ シフト集計を作成しました: %s〜%s (%sシフト, %s行)", start_date, end_date, shifts, rows)
+                        except Exception as e:
+                            logger.exception("❌ シフト集計作成エラー: %s", e)
+                            db.session.rollback()
+                        finally:
+                            db.session.remove()
+
+                threading.Thread(target=run_shift_summaries, daemon=True).start()
+                return jsonify({"message": f"{start_date}〜{end_date}のシフト集計を開始しました"}), 200
             
             else:
                 return jsonify({"error": "Invalid summary type"}), 400
@@ -977,87 +1464,487 @@ def register_routes(app, socketio=None):
             return jsonify({"error": str(e)}), 500
 
     @app.route("/api/logs/<equipment_id>/history_optimized", methods=["GET"])
+    @read_replica
     def get_history_data_optimized(equipment_id):
         """最適化された履歴データ取得"""
         try:
-            equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
-            if not equipment:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
                 return jsonify({"error": "Equipment not found"}), 404
 
             # パラメータ取得
             limit = request.args.get('limit', 100, type=int)
             period = request.args.get('period', '1h')  # 1h, 6h, 24h, 7d, 30d
+            layout = request.args.get('layout', 'records')  # records, columnar
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+            
+            if period not in PERIOD_HOURS:
+                return jsonify({"error": "Invalid period"}), 400
+            start_time = datetime.utcnow() - timedelta(hours=PERIOD_HOURS[period])
             
             # 期間に応じてデータソースを選択
-            if period in ['1h', '6h', '24h']:
+            if PERIOD_HOURS[period] <= 24:
                 # 短期間は詳細データ
-                time_map = {'1h': 1, '6h': 6, '24h': 24}
-                start_time = datetime.utcnow() - timedelta(hours=time_map[period])
-                
-                logs = Log.query.filter(
-                    Log.equipment_id == equipment.id,
-                    Log.timestamp >= start_time
-                ).order_by(Log.timestamp.desc()).limit(limit).all()
-                
-                data = [{
-                    "timestamp": log.timestamp.isoformat(),
-                    "production_count": log.production_count,
-                    "current": log.current,
-                    "temperature": log.temperature,
-                    "pressure": log.pressure,
-                    "cycle_time": log.cycle_time,
-                    "error_code": log.error_code
-                } for log in logs]
+                rows = fetch_log_history(equipment_pk, limit, since=start_time)
+                fields = list(LOG_HISTORY_COLUMNS)
                 data_source = "raw_logs"
                 
-            elif period in ['7d', '30d']:
+            else:
                 # 長期間は日次集計データ
-                days_map = {'7d': 7, '30d': 30}
-                start_date = (datetime.utcnow() - timedelta(days=days_map[period])).date()
-                
-                summaries = db.session.query(DailyLogSummary)\
-                    .filter_by(equipment_id=equipment.id)\
-                    .filter(text("date >= :start_date"))\
-                    .params(start_date=start_date)\
-                    .order_by(text("date DESC"))\
-                    .all()
-                
-                data = [{
-                    "date": summary.date.isoformat(),
-                    "production_count": summary.production_count_total,
-                    "current_avg": summary.current_avg,
-                    "current_max": summary.current_max,
-                    "current_min": summary.current_min,
-                    "temperature_avg": summary.temperature_avg,
-                    "temperature_max": summary.temperature_max,
-                    "temperature_min": summary.temperature_min,
-                    "pressure_avg": summary.pressure_avg,
-                    "error_count": summary.error_count,
-                    "data_count": summary.data_count
-                } for summary in summaries]
+                rows = fetch_daily_summaries(equipment_pk, start_time.date())
+                fields = list(DAILY_SUMMARY_COLUMNS)
                 data_source = "daily_summaries"
-            
-            else:
-                return jsonify({"error": "Invalid period"}), 400
 
             return jsonify({
                 "equipment_id": equipment_id,
                 "period": period,
                 "data_source": data_source,
-                "data": data,
-                "total_records": len(data)
+                "summary_method": SUMMARY_METHOD if data_source == "daily_summaries" else None,
+                "layout": layout,
+                "data": shape_rows(fields, rows, layout),
+                "total_records": len(rows)
+            }), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/equipment/<equipment_id>/alarm_rules", methods=["GET"])
+    def get_alarm_rules(equipment_id):
+        """設備のアラームルール一覧"""
+        equipment_pk = find_equipment_pk(equipment_id)
+        if equipment_pk is None:
+            return jsonify({"error": "Equipment not found"}), 404
+        rules = AlarmRule.query.filter_by(equipment_id=equipment_pk).order_by(AlarmRule.id).all()
+        return jsonify([serialize_alarm_rule(rule) for rule in rules]), 200
+
+    @app.route("/api/equipment/<equipment_id>/alarm_rules", methods=["POST"])
+    def create_alarm_rule(equipment_id):
+        """アラームルールを追加"""
+        try:
+            values, error = parse_alarm_rule(request.get_json(silent=True))
+            if error:
+                return jsonify({"error": error}), 400
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+
+            rule = AlarmRule(equipment_id=equipment_pk, **values)
+            db.session.add(rule)
+            db.session.commit()
+            alarm_engine.invalidate(equipment_pk)
+            logger.info("✅ アラームルール追加: %s (%s %s %s)", equipment_id, rule.metric, rule.condition, rule.threshold)
+            return jsonify(serialize_alarm_rule(rule)), 201
+        except Exception as e:
+            logger.exception("❌ アラームルール追加エラー: %s", equipment_id)
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/alarm_rules/<int:rule_id>", methods=["PUT"])
+    def update_alarm_rule(rule_id):
+        """アラームルールを更新（送信した項目のみ）"""
+        try:
+            rule = db.session.get(AlarmRule, rule_id)
+            if rule is None:
+                return jsonify({"error": "Alarm rule not found"}), 404
+            values, error = parse_alarm_rule(request.get_json(silent=True), serialize_alarm_rule(rule))
+            if error:
+                return jsonify({"error": error}), 400
+
+            for field, value in values.items():
+                setattr(rule, field, value)
+            equipment_pk = rule.equipment_id
+            db.session.commit()
+            alarm_engine.invalidate(equipment_pk)
+            return jsonify(serialize_alarm_rule(rule)), 200
+        except Exception as e:
+            logger.exception("❌ アラームルール更新エラー: %s", rule_id)
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/alarm_rules/<int:rule_id>", methods=["DELETE"])
+    def delete_alarm_rule(rule_id):
+        """アラームルールを削除（発生履歴も削除）"""
+        try:
+            equipment_pk = db.session.execute(
+                select(AlarmRule.equipment_id).where(AlarmRule.id == rule_id)
+            ).scalar()
+            if equipment_pk is None:
+                return jsonify({"error": "Alarm rule not found"}), 404
+            db.session.execute(delete(AlarmEvent).where(AlarmEvent.rule_id == rule_id))
+            db.session.execute(delete(AlarmRule).where(AlarmRule.id == rule_id))
+            db.session.commit()
+            alarm_engine.invalidate(equipment_pk)
+            return jsonify({"message": "Alarm rule deleted"}), 200
+        except Exception as e:
+            logger.exception("❌ アラームルール削除エラー: %s", rule_id)
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/alarms", methods=["GET"])
+    def get_alarms():
+        """アラーム発生履歴（新しい順）。active=true で発報中のみ"""
+        try:
+            limit = min(request.args.get('limit', 100, type=int), 1000)
+            stmt = (
+                select(AlarmEvent.id, AlarmEvent.rule_id, AlarmRule.name, AlarmRule.metric, AlarmRule.condition,
+                       AlarmRule.threshold, AlarmEvent.severity, Equipment.equipment_id,
+                       AlarmEvent.raised_at, AlarmEvent.raised_value, AlarmEvent.cleared_at, AlarmEvent.cleared_value)
+                .join(AlarmRule, AlarmRule.id == AlarmEvent.rule_id)
+                .join(Equipment, Equipment.id == AlarmEvent.equipment_id)
+                .order_by(AlarmEvent.raised_at.desc())
+                .limit(limit)
+            )
+            equipment_id = request.args.get('equipment_id')
+            if equipment_id:
+                equipment_pk = find_equipment_pk(equipment_id)
+                if equipment_pk is None:
+                    return jsonify({"error": "Equipment not found"}), 404
+                stmt = stmt.where(AlarmEvent.equipment_id == equipment_pk)
+            if request.args.get('active', '').lower() in ('1', 'true'):
+                stmt = stmt.where(AlarmEvent.cleared_at.is_(None))
+            return jsonify([row._asdict() for row in db.session.execute(stmt)]), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/logs/<equipment_id>/anomaly", methods=["GET"])
+    @read_replica
+    def get_anomaly_scores(equipment_id):
+        """異常スコアの1分集計（データ項目ごと、新しい順）"""
+        try:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+
+            metrics = [m for m in request.args.get('metrics', '').split(',') if m] or list(ANOMALY_METRICS)
+            unknown = [m for m in metrics if m not in ANOMALY_METRICS]
+            if unknown:
+                return jsonify({"error": f"Unknown metrics: {', '.join(unknown)}"}), 400
+
+            limit = request.args.get('limit', 1440, type=int)
+            period = request.args.get('period', '24h')  # 1h, 6h, 24h, 7d, 30d
+            if period not in PERIOD_HOURS:
+                return jsonify({"error": "Invalid period"}), 400
+            layout = request.args.get('layout', 'columnar')  # columnar, records
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+
+            since = datetime.utcnow() - timedelta(hours=PERIOD_HOURS[period])
+            return jsonify({
+                "equipment_id": equipment_id,
+                "period": period,
+                "layout": layout,
+                "z_threshold": ANOMALY_Z_THRESHOLD,
+                "metrics": {
+                    metric: shape_rows(ANOMALY_SCORE_COLUMNS, fetch_anomaly_scores(equipment_pk, metric, limit, since), layout)
+                    for metric in metrics
+                }
+            }), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def error_period():
+        """period パラメーターから (開始, 終了, period) を返す（不正なら None）"""
+        period = request.args.get('period', '30d')  # 1h, 6h, 24h, 7d, 30d
+        if period not in PERIOD_HOURS:
+            return None
+        end = datetime.utcnow()
+        return end - timedelta(hours=PERIOD_HOURS[period]), end, period
+
+    def overlapping_error_events(columns, start, end):
+        """期間 [start, end) と重なるエラー発生区間の SELECT"""
+        return select(*columns).where(
+            ErrorEvent.started_at < end,
+            or_(ErrorEvent.ended_at.is_(None), ErrorEvent.ended_at > start),
+        )
+
+    @app.route("/api/errors/top", methods=["GET"])
+    @read_replica
+    def get_top_error_codes():
+        """期間内に発生したエラーコードの上位（発生回数順）"""
+        try:
+            window = error_period()
+            if window is None:
+                return jsonify({"error": "Invalid period"}), 400
+            start, end, period = window
+            limit = min(request.args.get('limit', 10, type=int), 100)
+
+            stmt = select(
+                ErrorEvent.error_code,
+                func.count().label("occurrences"),
+                func.count(func.distinct(ErrorEvent.equipment_id)).label("equipments"),
+                func.coalesce(func.sum(ErrorEvent.duration_seconds), 0).label("total_duration_seconds"),
+                func.max(ErrorEvent.started_at).label("last_started_at"),
+            ).where(ErrorEvent.started_at >= start, ErrorEvent.started_at < end)
+            equipment_id = request.args.get('equipment_id')
+            if equipment_id:
+                equipment_pk = find_equipment_pk(equipment_id)
+                if equipment_pk is None:
+                    return jsonify({"error": "Equipment not found"}), 404
+                stmt = stmt.where(ErrorEvent.equipment_id == equipment_pk)
+            rows = db.session.execute(
+                stmt.group_by(ErrorEvent.error_code)
+                .order_by(func.count().desc(), ErrorEvent.error_code)
+                .limit(limit)
+            ).all()
+            return jsonify({
+                "period": period,
+                "equipment_id": equipment_id,
+                "codes": [row._asdict() for row in rows]
             }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/errors/reliability", methods=["GET"])
+    @read_replica
+    def get_error_reliability():
+        """設備ごとの発生回数・停止時間・稼働率・MTBF/MTTR（エラー発生区間から計算）"""
+        try:
+            window = error_period()
+            if window is None:
+                return jsonify({"error": "Invalid period"}), 400
+            start, end, period = window
+
+            stmt = overlapping_error_events(
+                (Equipment.equipment_id, ErrorEvent.error_code, ErrorEvent.started_at, ErrorEvent.ended_at), start, end
+            ).join(Equipment, Equipment.id == ErrorEvent.equipment_id)
+            equipment_id = request.args.get('equipment_id')
+            if equipment_id:
+                stmt = stmt.where(Equipment.equipment_id == equipment_id)
+            events = {}
+            for row in db.session.execute(stmt.order_by(ErrorEvent.started_at)):
+                events.setdefault(row.equipment_id, []).append((row.error_code, row.started_at, row.ended_at))
+            if equipment_id and equipment_id not in events:
+                if find_equipment_pk(equipment_id) is None:
+                    return jsonify({"error": "Equipment not found"}), 404
+                events[equipment_id] = []
+
+            return jsonify({
+                "period": period,
+                "start": start,
+                "end": end,
+                "equipments": {
+                    eq_id: reliability(equipment_events, start, end)
+                    for eq_id, equipment_events in sorted(events.items())
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/errors/timeline", methods=["GET"])
+    @read_replica
+    def get_error_timeline():
+        """設備のエラー発生区間（期間と重なるもの、古い順）"""
+        try:
+            equipment_id = request.args.get('equipment_id')
+            if not equipment_id:
+                return jsonify({"error": "equipment_id is required"}), 400
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+            window = error_period()
+            if window is None:
+                return jsonify({"error": "Invalid period"}), 400
+            start, end, period = window
+            layout = request.args.get('layout', 'records')  # records, columnar
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+
+            fields = ("error_code", "started_at", "ended_at", "duration_seconds")
+            stmt = overlapping_error_events(
+                (ErrorEvent.error_code, ErrorEvent.started_at, ErrorEvent.ended_at, ErrorEvent.duration_seconds), start, end
+            ).where(ErrorEvent.equipment_id == equipment_pk)
+            codes = [int(c) for c in request.args.get('codes', '').split(',') if c.strip().isdigit()]
+            if codes:
+                stmt = stmt.where(ErrorEvent.error_code.in_(codes))
+            limit = min(request.args.get('limit', 1000, type=int), 10000)
+            rows = db.session.execute(stmt.order_by(ErrorEvent.started_at).limit(limit)).all()
+            return jsonify({
+                "equipment_id": equipment_id,
+                "period": period,
+                "layout": layout,
+                "events": shape_rows(fields, rows, layout)
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/logs/<equipment_id>/percentiles", methods=["GET"])
+    @read_replica
+    def get_percentiles(equipment_id):
+        """日付の範囲の分位点（日次・月次集計のスケッチを結合。当日分は含まない）"""
+        try:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+            metrics = [m for m in request.args.get('metrics', '').split(',') if m] or list(SKETCH_METRICS)
+            unknown = [m for m in metrics if m not in SKETCH_METRICS]
+            if unknown:
+                return jsonify({"error": f"Unknown metrics: {', '.join(unknown)}"}), 400
+            try:
+                end_date = (date.fromisoformat(request.args['end']) if request.args.get('end')
+                            else datetime.utcnow().date() - timedelta(days=1))
+                start_date = (date.fromisoformat(request.args['start']) if request.args.get('start')
+                              else end_date - timedelta(days=29))
+                quantiles = [float(q) for q in request.args.get('quantiles', '0.5,0.95,0.99').split(',')]
+            except ValueError:
+                return jsonify({"error": "Invalid start, end or quantiles"}), 400
+            if start_date > end_date or any(not 0 <= q <= 1 for q in quantiles):
+                return jsonify({"error": "Invalid start, end or quantiles"}), 400
+
+            sketches, sources = range_sketches(equipment_pk, start_date, end_date, metrics)
+            return jsonify({
+                "equipment_id": equipment_id,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "sources": sources,
+                "summary_method": SUMMARY_METHOD,
+                "metrics": {
+                    metric: dict(
+                        count=sketch.count,
+                        avg=sketch.avg,
+                        min=sketch.min if sketch.count else None,
+                        max=sketch.max if sketch.count else None,
+                        **{f"p{q * 100:g}": sketch.quantile(q) for q in quantiles}
+                    )
+                    for metric, sketch in sketches.items()
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/shifts", methods=["GET"])
+    def get_shift_calendar():
+        """シフトカレンダーと現在のシフト"""
+        current = shift_calendar.locate(datetime.utcnow())
+        return jsonify(dict(shift_calendar.describe(), current=current._asdict() if current else None)), 200
+
+    @app.route("/api/logs/<equipment_id>/shifts", methods=["GET"])
+    @read_replica
+    def get_shift_summaries(equipment_id):
+        """シフト別集計（シフトの日付の範囲、新しい順）"""
+        try:
+            equipment_pk = find_equipment_pk(equipment_id)
+            if equipment_pk is None:
+                return jsonify({"error": "Equipment not found"}), 404
+            try:
+                end_date = (date.fromisoformat(request.args['end']) if request.args.get('end')
+                            else shift_calendar.local_date(datetime.utcnow()))
+                start_date = (date.fromisoformat(request.args['start']) if request.args.get('start')
+                              else end_date - timedelta(days=6))
+            except ValueError:
+                return jsonify({"error": "Invalid date (YYYY-MM-DD)"}), 400
+            layout = request.args.get('layout', 'records')  # records, columnar
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+
+            rows = fetch_shift_summaries(equipment_pk, start_date, end_date, request.args.get('shift'))
+            return jsonify({
+                "equipment_id": equipment_id,
+                "timezone": shift_calendar.tz_name,
+                "summary_method": SUMMARY_METHOD,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "layout": layout,
+                "summaries": shape_rows(tuple(SHIFT_SUMMARY_COLUMNS), rows, layout)
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def production_period():
+        """period パラメーターから (開始, 終了, period) を返す（開始は時間帯の境界。不正なら None）"""
+        period = request.args.get('period', '24h')  # 1h, 6h, 24h, 7d, 30d
+        if period not in PERIOD_HOURS:
+            return None
+        end = datetime.utcnow()
+        start = end.replace(minute=0, second=0, microsecond=0) - timedelta(hours=PERIOD_HOURS[period] - 1)
+        return start, end, period
+
+    @app.route("/api/oee", methods=["GET"])
+    @read_replica
+    def get_fleet_oee():
+        """設備ごとの生産数・稼働率・性能稼働率・OEE（時間別集計から計算）"""
+        try:
+            window = production_period()
+            if window is None:
+                return jsonify({"error": "Invalid period"}), 400
+            start, end, period = window
+            planned_seconds = (end - start).total_seconds()
+            return jsonify({
+                "period": period,
+                "start": start,
+                "end": end,
+                "equipments": {
+                    row.equipment_id: oee(row.production, row.covered_seconds, row.error_seconds,
+                                          planned_seconds, row.ideal_cycle_time)
+                    for row in sorted(production_totals(start), key=lambda row: row.equipment_id)
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/equipment/<equipment_id>/oee", methods=["GET"])
+    @read_replica
+    def get_equipment_oee(equipment_id):
+        """設備の OEE（期間合計と時間別）"""
+        try:
+            equipment = db.session.execute(
+                select(Equipment.id, Equipment.ideal_cycle_time).where(Equipment.equipment_id == equipment_id)
+            ).first()
+            if equipment is None:
+                return jsonify({"error": "Equipment not found"}), 404
+            window = production_period()
+            if window is None:
+                return jsonify({"error": "Invalid period"}), 400
+            start, end, period = window
+            layout = request.args.get('layout', 'columnar')  # columnar, records
+            if layout not in LAYOUTS:
+                return jsonify({"error": "Invalid layout"}), 400
+
+            fields = ("hour", "production", "resets", "availability", "performance", "oee", "error_seconds", "gap_seconds")
+            hourly = []
+            totals = {"production": 0, "covered_seconds": 0.0, "error_seconds": 0.0}
+            for row in fetch_production_hourly(equipment.id, start):
+                # 集計中の時間帯は経過時間を計画時間とする
+                planned = min(3600.0, (end - row.hour).total_seconds())
+                metrics = oee(row.production or 0, row.covered_seconds or 0.0, row.error_seconds or 0.0,
+                              planned, equipment.ideal_cycle_time)
+                hourly.append((row.hour, row.production or 0, row.resets or 0, metrics["availability"],
+                               metrics["performance"], metrics["oee"], metrics["error_seconds"], metrics["gap_seconds"]))
+                totals["production"] += row.production or 0
+                totals["covered_seconds"] += row.covered_seconds or 0.0
+                totals["error_seconds"] += row.error_seconds or 0.0
+            return jsonify({
+                "equipment_id": equipment_id,
+                "period": period,
+                "start": start,
+                "end": end,
+                "ideal_cycle_time": equipment.ideal_cycle_time,
+                "totals": oee(totals["production"], totals["covered_seconds"], totals["error_seconds"],
+                              (end - start).total_seconds(), equipment.ideal_cycle_time),
+                "layout": layout,
+                "hourly": shape_rows(fields, hourly, layout)
+            }), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
     # スケジューラー開始
     start_cleanup_scheduler()
+    # アラーム評価ワーカー開始
+    alarm_engine.start(app, socketio)
+    # 異常検知の基準値・スコア集計の定期保存
+    anomaly_registry.start(app)
+    # 生産数の時間別集計の定期保存
+    production_registry.start(app)
+    # 受信サンプルの15分集計の定期保存
+    sample_stats_registry.start(app)
+    # 圧縮で保留中のサンプルの定期保存（設備の停止・通信断時）
+    compression_registry.start(app, store_held_samples)
+    # 終了したシフトの集計
+    shift_summary_scheduler.start(app)
     
     # APIルート登録完了ログ
-    print(f"🚀 [DEBUG] ===== APIルート登録完了 =====")
-    print(f"🚀 [DEBUG] 登録されたルート:")
-    for rule in app.url_map.iter_rules():
-        if rule.rule.startswith('/api/'):
-            print(f"    {rule.methods} {rule.rule}")
-    print(f"🚀 [DEBUG] ==========================") 
\ No newline at end of file
+    if logger.isEnabledFor(logging.DEBUG):
+        for rule in app.url_map.iter_rules():
+            if rule.rule.startswith('/api/'):
+                logger.debug("🚀 ルート登録: %s %s", sorted(rule.methods), rule.rule) 
\ No newline at end of file
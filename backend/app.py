@@ -1,26 +1,38 @@
 from flask import Flask
 from flask_migrate import Migrate
 from flask_socketio import SocketIO
+import logging
 import os
 from dotenv import load_dotenv
 from backend.db import db
+from backend.db.query_stats import init_query_stats
+from backend.db.routing import init_replicas, normalize_database_url
+from backend.db.workloads import WORKLOAD_INTERACTIVE, engine_options, init_workloads, workloads_supported
+from backend.json_provider import SocketIOJSON, init_json
+from backend.logging_config import configure_logging
+from backend.metrics import init_metrics
 from flask_cors import CORS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 migrate = Migrate()
 socketio = SocketIO()
 
 def create_app():
+    # ログはキュー経由で別スレッドから出力
+    configure_logging()
+
     app = Flask(__name__)
+    # レスポンスJSONを orjson で生成（datetime はそのまま渡せる）
+    init_json(app)
 
     # CORS設定を追加
     CORS(app, origins=["http://localhost:3000", "http://localhost:3001"])
 
-    database_url = os.getenv("DATABASE_URL")
-    if database_url and database_url.startswith("postgresql://"):
-        database_url = database_url.replace("postgresql://", "postgresql+psycopg2://")
-    elif not database_url:
+    database_url = normalize_database_url(os.getenv("DATABASE_URL"))
+    if not database_url:
         # DATABASE_URLが設定されていない場合はSQLiteを使用
         database_url = 'sqlite:///instance/plc_monitoring.db'
 
@@ -37,15 +49,29 @@ def create_app():
             'check_same_thread': False,  # SQLite用：マルチスレッド対応
         } if 'sqlite' in database_url else {}
     }
+    if workloads_supported(database_url):
+        # 既定のエンジンは interactive のプール（取込み・バッチは init_workloads で別のプール）
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+            WORKLOAD_INTERACTIVE, database_url, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
 
     db.init_app(app)
     migrate.init_app(app, db)
+    # ワークロード（ingest / interactive / batch）ごとの接続プール
+    init_workloads(app, db, database_url)
+    # 読み取りレプリカ（DATABASE_REPLICA_URLS）
+    init_replicas(app)
+
+    # /metrics エンドポイントとリクエスト計測フック
+    init_metrics(app)
+    # クエリ数・DB時間・スロークエリ・N+1 の計測
+    init_query_stats(app)
     
     # Socket.IO初期化（threading modeでgreenletエラーを回避）
     socketio.init_app(
         app, 
         cors_allowed_origins=["http://localhost:3000", "http://localhost:3001"],
         async_mode='threading',
+        json=SocketIOJSON,
         logger=False,
         engineio_logger=False
     )
@@ -55,9 +81,9 @@ def create_app():
     from backend.api.routes import register_routes
     register_routes(app, socketio)  # socketioを渡す
 
-    print(f"✅ Registered tables: {db.Model.metadata.tables.keys()}")
-    print(f"✅ URL Map:\n{app.url_map}")
-    print(f"✅ Socket.IO initialized with threading mode")
+    logger.info("✅ Registered tables: %s", list(db.Model.metadata.tables.keys()))
+    logger.debug("✅ URL Map:\n%s", app.url_map)
+    logger.info("✅ Socket.IO initialized with threading mode")
 
     return app, socketio  # socketioも一緒に返す
 
@@ -66,7 +92,7 @@ def get_socketio():
     return socketio
 
 def periodic_log_fetch():
-    print("📡 periodic_log_fetch started (dummy)")
+    logger.info("📡 periodic_log_fetch started (dummy)")
 
 def wait_for_db(session):
     import time
@@ -76,10 +102,10 @@ def wait_for_db(session):
             # SQLAlchemy 2.x対応: textを使用
             session.execute(text("SELECT 1"))
             session.commit()  # トランザクションをコミット
-            print("✅ データベース接続確認完了")
+            logger.info("✅ データベース接続確認完了")
             break
         except Exception as e:
             time.sleep(1)
-            print(f"Waiting for DB... ({e})")
+            logger.warning("Waiting for DB... (%s)", e)
 
 __all__ = ["create_app", "get_socketio", "db", "periodic_log_fetch", "wait_for_db"]
@@ -0,0 +1,4 @@
+"""
+ベンチマーク
+各スクリプトは `python -m backend.benchmarks.<name>` で実行します。
+"""
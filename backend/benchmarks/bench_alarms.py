@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+アラームルールエンジンのベンチマーク
+多数の設備にルールを割り当て（デフォルト 1000設備 × 10ルール = 1万ルール）、
+決定的な信号（ゆっくりした変動 + ノイズ + まれなスパイク）で以下を計測します。
+
+- capacity: 評価のみを1スレッドで連続実行した時の処理能力（サンプル/秒、1サンプルあたりの時間）
+- paced:    目標レート（デフォルト 5000サンプル/秒）で submit し続けた時に
+            ワーカーが追いつくか（キューの最大滞留、送信終了から評価完了までの遅れ）
+
+DBへの保存・Socket.IO配信は含みません（ルールはメモリ上でコンパイル）。
+
+例:
+    python -m backend.benchmarks.bench_alarms
+    python -m backend.benchmarks.bench_alarms --equipments 2000 --rules-per-equipment 5 --rate 10000 --output bench_alarms.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.alarm_engine import AlarmEngine, CompiledRule
+
+# ルールの雛形（metric, condition, threshold, duration_seconds, hysteresis）
+RULE_TEMPLATES = [
+    ("temperature", "gt", 80.0, 30.0, 2.0),
+    ("temperature", "lt", 5.0, 0.0, 1.0),
+    ("temperature", "rate_gt", 3.0, 0.0, 0.0),
+    ("current", "gt", 18.0, 10.0, 0.5),
+    ("current", "lt", 1.0, 60.0, 0.0),
+    ("current", "rate_gt", 8.0, 0.0, 0.0),
+    ("pressure", "gt", 1.2, 5.0, 0.05),
+    ("pressure", "lt", 0.3, 5.0, 0.05),
+    ("cycle_time", "gt", 20.0, 0.0, 1.0),
+    ("cycle_time", "ge", 30.0, 0.0, 0.0),
+]
+
+
+def build_rules(equipments, rules_per_equipment):
+    """{equipment_pk: [(rule_id, metric, condition, threshold, duration, hysteresis), ...]}"""
+    rules = {}
+    rule_id = 0
+    for pk in range(1, equipments + 1):
+        rules[pk] = []
+        for i in range(rules_per_equipment):
+            rule_id += 1
+            rules[pk].append((rule_id,) + RULE_TEMPLATES[(pk + i) % len(RULE_TEMPLATES)])
+    return rules
+
+
+def make_engine(rules):
+    def rule_loader(equipment_pk):
+        return [CompiledRule(rule_id, metric, condition, threshold, duration, hysteresis)
+                for rule_id, metric, condition, threshold, duration, hysteresis in rules.get(equipment_pk, [])]
+    return AlarmEngine(rule_loader=rule_loader, max_queue=1_000_000)
+
+
+def generate_samples(equipments, count, seed, anchor):
+    """設備を順に巡回するサンプル列 [(equipment_pk, timestamp, data)]（各設備の時刻は単調増加）"""
+    rng = random.Random(seed)
+    samples = []
+    for n in range(count):
+        pk = n % equipments + 1
+        t = n // equipments
+        spike = rng.random() < 0.001
+        samples.append((pk, anchor + timedelta(seconds=t), {
+            "temperature": 60.0 + 25.0 * math.sin(t / 300 + pk) + rng.gauss(0, 0.5) + (15.0 if spike else 0.0),
+            "current": 12.0 + 6.5 * math.sin(t / 120 + pk) + rng.gauss(0, 0.2),
+            "pressure": 0.8 + 0.45 * math.sin(t / 600 + pk) + rng.gauss(0, 0.01),
+            "cycle_time": 15.0 + rng.gauss(0, 2.0),
+            "production_count": t,
+            "error_code": 0,
+        }))
+    return samples
+
+
+def bench_capacity(rules, samples):
+    """評価のみを連続実行した時の処理能力"""
+    engine = make_engine(rules)
+    # 評価器のコンパイル（初回のみ）は別に計測
+    started = time.perf_counter()
+    for pk in rules:
+        engine.evaluator(pk)
+    compile_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    events = 0
+    for pk, timestamp, data in samples:
+        events += len(engine.process([(pk, f"BENCH_{pk:05d}", [(timestamp, data)])]))
+    elapsed = time.perf_counter() - started
+    return {
+        "compile_ms": round(compile_s * 1000, 2),
+        "samples": len(samples),
+        "elapsed_s": round(elapsed, 3),
+        "samples_per_second": round(len(samples) / elapsed),
+        "us_per_sample": round(elapsed / len(samples) * 1e6, 2),
+        "transitions": events,
+    }
+
+
+def bench_paced(rules, samples, rate):
+    """rate サンプル/秒で submit し、ワーカーが追いつくかを計測"""
+    engine = make_engine(rules).start()
+    max_depth = 0
+    stop = threading.Event()
+
+    def watch_depth():
+        nonlocal max_depth
+        while not stop.wait(0.01):
+            max_depth = max(max_depth, engine.queue_depth())
+
+    watcher = threading.Thread(target=watch_depth, daemon=True)
+    watcher.start()
+    started = time.perf_counter()
+    for n, (pk, timestamp, data) in enumerate(samples):
+        # 目標時刻まで待って送信（遅れている場合は待たずに送信）
+        delay = started + n / rate - time.perf_counter()
+        if delay > 0.001:
+            time.sleep(delay)
+        engine.submit(pk, f"BENCH_{pk:05d}", [(timestamp, data)])
+    sent = time.perf_counter()
+    engine.flush()
+    drained = time.perf_counter()
+    stop.set()
+    watcher.join()
+    return {
+        "target_rate": rate,
+        "samples": len(samples),
+        "achieved_rate": round(len(samples) / (sent - started)),
+        "max_queue_depth": max_depth,
+        "drain_lag_ms": round((drained - sent) * 1000, 2),
+        "dropped": engine.dropped,
+        "kept_up": engine.dropped == 0 and drained - sent < 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='アラームルールエンジンのベンチマーク')
+    parser.add_argument('--equipments', type=int, default=1000, help='設備数')
+    parser.add_argument('--rules-per-equipment', type=int, default=10, help='1設備あたりのルール数')
+    parser.add_argument('--rate', type=int, default=5000, help='paced の送信レート（サンプル/秒）')
+    parser.add_argument('--duration', type=float, default=10.0, help='paced の送信時間（秒）')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    rules = build_rules(args.equipments, args.rules_per_equipment)
+    samples = generate_samples(args.equipments, int(args.rate * args.duration), args.seed, datetime(2026, 1, 1))
+    result = {
+        "equipments": args.equipments,
+        "rules": sum(len(equipment_rules) for equipment_rules in rules.values()),
+        "capacity": bench_capacity(rules, samples),
+        "paced": bench_paced(rules, samples, args.rate),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+取込みデータ圧縮ベンチマーク
+安定稼働中の設備を模した決定的な信号（ゆっくりしたドリフト + 微小ノイズ、
+サイクルごとの生産数の増加、まれなエラー）を圧縮方式ごとに処理し、以下を計測します。
+
+- 圧縮率（受信件数 / 保存件数）
+- 保存したサンプルから再現した信号の最大誤差（デッドバンドは前値保持、スウィングドアは直線補間）
+- error_code の変化・production_count の増加がすべて保存されているか
+- 1サンプルあたりの処理時間
+
+例:
+    python -m backend.benchmarks.bench_compression
+    python -m backend.benchmarks.bench_compression --samples 86400 --output bench_compression.json
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.compression import ANALOG_FIELDS, EquipmentCompressor
+
+# 方式ごとの設定 {data_type: (mode, tolerance, max_interval)}
+SCENARIOS = {
+    "none": {},
+    "deadband_abs": {
+        "current": ("deadband_abs", 0.1, 600), "temperature": ("deadband_abs", 0.3, 600),
+        "pressure": ("deadband_abs", 0.005, 600), "cycle_time": ("deadband_abs", 0.2, 600),
+    },
+    "deadband_pct": {
+        "current": ("deadband_pct", 1.0, 600), "temperature": ("deadband_pct", 1.0, 600),
+        "pressure": ("deadband_pct", 1.0, 600), "cycle_time": ("deadband_pct", 1.0, 600),
+    },
+    "swinging_door": {
+        "current": ("swinging_door", 0.1, 600), "temperature": ("swinging_door", 0.3, 600),
+        "pressure": ("swinging_door", 0.005, 600), "cycle_time": ("swinging_door", 0.2, 600),
+    },
+}
+
+
+def generate_samples(count, hz, seed):
+    """安定稼働中の設備を模したサンプル列"""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    interval = 1.0 / hz
+    production_count = 0
+    error_code = 0
+    samples = []
+    for i in range(count):
+        t = i * interval
+        # 約15秒サイクルで生産数が増加
+        if t % 15.0 < interval:
+            production_count += 1
+        if error_code == 0 and rng.random() < 0.0005:
+            error_code = rng.choice([101, 102, 103, 201, 202])
+        elif error_code and rng.random() < 0.05:
+            error_code = 0
+        samples.append((start + timedelta(seconds=t), {
+            "production_count": production_count,
+            "current": round(12.5 + 0.4 * math.sin(t / 1800) + rng.gauss(0, 0.02), 3),
+            "temperature": round(25.0 + 2.0 * math.sin(t / 7200) + rng.gauss(0, 0.05), 2),
+            "pressure": round(0.8 + 0.01 * math.sin(t / 3600) + rng.gauss(0, 0.001), 4),
+            "cycle_time": round(15.0 + rng.gauss(0, 0.05), 2),
+            "error_code": error_code,
+        }))
+    return samples
+
+
+def reconstruction_error(samples, stored, settings):
+    """保存したサンプルから元の信号を再現し、項目ごとの最大誤差を返す"""
+    stored_t = [ts.timestamp() for ts, _ in stored]
+    errors = {}
+    for field in ANALOG_FIELDS:
+        interpolate = settings.get(field, ("none",))[0] == "swinging_door"
+        worst = 0.0
+        for timestamp, data in samples:
+            t = timestamp.timestamp()
+            i = bisect.bisect_right(stored_t, t) - 1
+            left_t, left = stored_t[i], stored[i][1][field]
+            if interpolate and stored_t[i] != t and i + 1 < len(stored):
+                right_t, right = stored_t[i + 1], stored[i + 1][1][field]
+                value = left + (right - left) * (t - left_t) / (right_t - left_t)
+            else:
+                value = left
+            worst = max(worst, abs(value - data[field]))
+        errors[field] = round(worst, 4)
+    return errors
+
+
+def discrete_changes_kept(samples, stored):
+    """error_code / production_count が変化したサンプルがすべて保存されているか"""
+    stored_ts = {ts for ts, _ in stored}
+    previous = None
+    for timestamp, data in samples:
+        changed = previous is not None and (
+            data["error_code"] != previous["error_code"]
+            or data["production_count"] != previous["production_count"]
+        )
+        if changed and timestamp not in stored_ts:
+            return False
+        previous = data
+    return True
+
+
+def run_scenario(samples, settings):
+    compressor = EquipmentCompressor(settings)
+    started = time.perf_counter()
+    stored = []
+    for timestamp, data in samples:
+        stored.extend(compressor.offer(timestamp, data))
+    elapsed = time.perf_counter() - started
+    return {
+        **compressor.stats(),
+        "us_per_sample": round(elapsed / len(samples) * 1e6, 3),
+        "max_error": reconstruction_error(samples, stored, settings),
+        "discrete_changes_kept": discrete_changes_kept(samples, stored),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='取込みデータ圧縮ベンチマーク')
+    parser.add_argument('--samples', type=int, default=86400, help='1設備あたりのサンプル数')
+    parser.add_argument('--hz', type=float, default=1.0, help='サンプリング周波数')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    samples = generate_samples(args.samples, args.hz, args.seed)
+    result = {
+        "samples": args.samples,
+        "hz": args.hz,
+        "scenarios": {name: dict(run_scenario(samples, settings), settings=settings)
+                      for name, settings in SCENARIOS.items()},
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
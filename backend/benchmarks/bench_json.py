@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+JSONシリアライズ・ベンチマーク
+1設備に約1万行のログを投入し、履歴取得APIのレスポンス時間を
+標準json（Flask デフォルト相当）と orjson のプロバイダーで比較します。
+あわせて1万行分のシリアライズ処理単体の時間も計測します。
+
+例:
+    python -m backend.benchmarks.bench_json
+    python -m backend.benchmarks.bench_json --rows 50000 --output bench_json.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmarks.bench_backend import make_app, seed_dataset, timed
+
+
+def bench_serialization(rows, repeat):
+    """1万行分のレスポンス生成: isoformat() + Flask 標準プロバイダー と orjson + datetime そのまま"""
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from backend.json_provider import FastJSONProvider, orjson
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    base = datetime.utcnow()
+    records = [{
+        "timestamp": base.replace(microsecond=i % 1000000),
+        "production_count": i, "current": 12.5, "temperature": 25.1,
+        "pressure": 0.812, "cycle_time": 15.2, "error_code": 0,
+    } for i in range(rows)]
+
+    def legacy():
+        data = [dict(r, timestamp=r["timestamp"].isoformat()) for r in records]
+        default_provider.dumps({"data": data})
+
+    results = {"legacy_isoformat_stdlib": timed(legacy, repeat)}
+    for backend in (["stdlib", "orjson"] if orjson is not None else ["stdlib"]):
+        provider = FastJSONProvider(app, backend)
+        results[f"native_datetime_{backend}"] = timed(lambda: provider.dumps({"data": records}), repeat)
+    return results
+
+
+def bench_history(database_url, rows, repeat, seed):
+    """履歴APIのレスポンス時間（プロバイダー別）"""
+    from backend.json_provider import FastJSONProvider, orjson
+
+    app = make_app(database_url)
+    from backend.db import db
+    with app.app_context():
+        db.create_all()
+    anchor = datetime.utcnow().replace(second=0, microsecond=0)
+    # 24時間に rows 件より少し多く入るサンプリング周波数
+    hz = rows * 1.05 / 86400
+    equipment_ids, total = seed_dataset(app, 1, 1, hz, 0, seed, anchor)
+    equipment_id = equipment_ids[0]
+
+    client = app.test_client()
+    urls = {
+        "history": f"/api/logs/{equipment_id}/history?limit={rows}",
+        "history_optimized_24h": f"/api/logs/{equipment_id}/history_optimized?period=24h&limit={rows}",
+    }
+    results = {"seeded_rows": total}
+    for backend in (["stdlib", "orjson"] if orjson is not None else ["stdlib"]):
+        app.json = FastJSONProvider(app, backend)
+        for name, url in urls.items():
+            sizes = []
+
+            def request_once():
+                response = client.get(url)
+                assert response.status_code == 200, response.get_data(as_text=True)[:200]
+                sizes.append(len(response.get_data()))
+
+            request_once()  # ウォームアップ
+            results[f"{name}_{backend}"] = dict(timed(request_once, repeat), response_bytes=sizes[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSONシリアライズ・ベンチマーク')
+    parser.add_argument('--database-url', default=None, help='データベースURL（デフォルト: 一時SQLite）')
+    parser.add_argument('--rows', type=int, default=10000, help='レスポンスの行数')
+    parser.add_argument('--repeat', type=int, default=10, help='各項目の繰り返し回数')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_json_'), 'bench.db')}"
+    result = {
+        "rows": args.rows,
+        "serialization": bench_serialization(args.rows, args.repeat),
+        "endpoints": bench_history(database_url, args.rows, args.repeat, args.seed),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+メトリクス計測のオーバーヘッド・ベンチマーク
+Counter / Histogram 単体の記録コストと、POST /api/logs を
+計測フックなし・ありで交互に実行した場合のレイテンシ差を計測します。
+
+例:
+    python -m backend.benchmarks.bench_metrics
+    python -m backend.benchmarks.bench_metrics --requests 5000 --output bench_metrics.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmarks.bench_backend import quiet, summarize
+
+
+def bench_primitives(number):
+    """メトリクス操作1回あたりのコスト（ナノ秒）"""
+    from backend.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench", ("route",))
+    histogram = registry.histogram("bench_seconds", "bench", ("endpoint", "method", "status"))
+    child = histogram.labels("save_log_data", "POST", 200)
+
+    cases = {
+        "counter_inc": lambda: counter.labels("single").inc(),
+        "histogram_observe": lambda: child.observe(0.0042),
+        "histogram_labels_observe": lambda: histogram.labels("save_log_data", "POST", 200).observe(0.0042),
+        "perf_counter": time.perf_counter,
+    }
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = round(best / number * 1e9, 1)
+    results["render_ms"] = round(timeit.timeit(registry.render, number=100) / 100 * 1000, 3)
+    return results
+
+
+def _make_app(database_url, metrics_enabled):
+    os.environ['DATABASE_URL'] = database_url
+    # サーバー側ログはキュー経由で出力されるため quiet() では抑制できない
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ['METRICS_ENABLED'] = "true" if metrics_enabled else "false"
+    os.environ['QUERY_STATS_ENABLED'] = os.environ['METRICS_ENABLED']
+    with quiet():
+        from backend.app import create_app
+        from backend.db import db
+        app, _ = create_app()
+        with app.app_context():
+            db.create_all()
+    return app
+
+
+def bench_ingest(requests_count, rounds):
+    """計測フックなし・ありのアプリで /api/logs を交互に実行"""
+    workdir = tempfile.mkdtemp(prefix="bench_metrics_")
+    # フックなしのアプリを先に作成（SQLAlchemy のイベントはプロセス全体に登録されるため）
+    apps = {
+        "disabled": _make_app(f"sqlite:///{os.path.join(workdir, 'disabled.db')}", False),
+        "enabled": _make_app(f"sqlite:///{os.path.join(workdir, 'enabled.db')}", True),
+    }
+    clients = {}
+    for name, app in apps.items():
+        client = app.test_client()
+        with quiet():
+            client.post('/api/register', json={"equipment_id": "BENCH_0001", "mac_address": "02:00:00:00:00:01"})
+        clients[name] = client
+
+    sample = {"equipment_id": "BENCH_0001", "production_count": 1, "current": 12.5,
+              "temperature": 25.0, "pressure": 0.8, "cycle_time": 15.0, "error_code": 0}
+    samples = {name: [] for name in clients}
+    per_round = max(1, requests_count // rounds)
+    with quiet():
+        for _ in range(rounds):
+            for name, client in clients.items():
+                for _ in range(per_round):
+                    started = time.perf_counter()
+                    response = client.post('/api/logs', json=sample)
+                    samples[name].append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.data
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    results["overhead_p50_ms"] = round(results["enabled"]["p50_ms"] - results["disabled"]["p50_ms"], 3)
+    results["overhead_p50_ratio"] = round(results["enabled"]["p50_ms"] / results["disabled"]["p50_ms"] - 1, 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='メトリクス計測のオーバーヘッド・ベンチマーク')
+    parser.add_argument('--number', type=int, default=200000, help='単体操作の繰り返し回数')
+    parser.add_argument('--requests', type=int, default=2000, help='/api/logs のリクエスト数（各アプリ）')
+    parser.add_argument('--rounds', type=int, default=10, help='フックなし・ありを交互に実行する回数')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    result = {
+        "primitives_ns": bench_primitives(args.number),
+        "ingest": bench_ingest(args.requests, args.rounds),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
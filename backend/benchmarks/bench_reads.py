@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+履歴読み出しベンチマーク（ORM インスタンス生成 と 列指定のタプル取得 の比較）
+1設備に大量のログを投入し、同じ件数を以下の方法で読み出して
+レイテンシとピークメモリ（tracemalloc）を計測します。
+
+- orm:      Log.query ... .all() で ORM インスタンスを生成して dict に詰め替え（従来の実装）
+- core:     必要な列だけを SELECT してタプルから dict を生成
+- columnar: 必要な列だけを SELECT して列形式に変換
+
+あわせて /history エンドポイントの records / columnar レイアウトの応答時間とサイズも計測します。
+
+例:
+    python -m backend.benchmarks.bench_reads
+    python -m backend.benchmarks.bench_reads --rows 100000 --output bench_reads.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmarks.bench_backend import make_app, seed_dataset, summarize
+
+
+def _orm_history(equipment_id, limit):
+    """従来の実装: ORM インスタンスを生成して dict に詰め替え"""
+    from backend.db.models import Equipment, Log
+
+    equipment = Equipment.query.filter_by(equipment_id=equipment_id).first()
+    logs = Log.query.filter_by(equipment_id=equipment.id).order_by(Log.id.desc()).limit(limit).all()
+    return [{
+        "timestamp": log.timestamp,
+        "production_count": log.production_count,
+        "current": log.current,
+        "temperature": log.temperature,
+        "pressure": log.pressure,
+        "cycle_time": log.cycle_time,
+        "error_code": log.error_code,
+    } for log in logs]
+
+
+def _core_history(equipment_id, limit, layout):
+    from backend.db.readers import LOG_HISTORY_COLUMNS, fetch_log_history, find_equipment_pk, shape_rows
+
+    rows = fetch_log_history(find_equipment_pk(equipment_id), limit)
+    return shape_rows(list(LOG_HISTORY_COLUMNS), rows, layout)
+
+
+def measure(app, func, repeat):
+    """レイテンシ（セッション破棄込み）と、別途 tracemalloc でピークメモリを計測"""
+    from backend.db import db
+
+    def run_once():
+        with app.app_context():
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            db.session.remove()
+        del result
+        return elapsed
+
+    run_once()  # ウォームアップ（ステートメントキャッシュ）
+    samples = [run_once() for _ in range(repeat)]
+
+    # tracemalloc は実行速度を大きく落とすため、レイテンシとは別の回で計測
+    tracemalloc.start()
+    run_once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(summarize(samples), peak_memory_mb=round(peak / 1024 / 1024, 2))
+
+
+def bench_endpoints(app, equipment_id, limit, repeat):
+    client = app.test_client()
+    results = {}
+    for layout in ("records", "columnar"):
+        url = f"/api/logs/{equipment_id}/history?limit={limit}&layout={layout}"
+        samples = []
+        size = 0
+        for i in range(repeat + 1):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.get_data(as_text=True)[:200]
+            size = len(response.get_data())
+            if i:
+                samples.append(elapsed)
+        results[layout] = dict(summarize(samples), response_bytes=size)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='履歴読み出しベンチマーク（ORM と列指定取得の比較）')
+    parser.add_argument('--database-url', default=None, help='データベースURL（デフォルト: 一時SQLite）')
+    parser.add_argument('--rows', type=int, default=50000, help='読み出す行数')
+    parser.add_argument('--repeat', type=int, default=5, help='各項目の繰り返し回数')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_reads_'), 'bench.db')}"
+    app = make_app(database_url)
+    from backend.db import db
+    with app.app_context():
+        db.create_all()
+    anchor = datetime.utcnow().replace(second=0, microsecond=0)
+    equipment_ids, total = seed_dataset(app, 1, 1, args.rows * 1.02 / 86400, 0, args.seed, anchor)
+    equipment_id = equipment_ids[0]
+
+    result = {
+        "rows": args.rows,
+        "seeded_rows": total,
+        "readers": {
+            "orm": measure(app, lambda: _orm_history(equipment_id, args.rows), args.repeat),
+            "core": measure(app, lambda: _core_history(equipment_id, args.rows, "records"), args.repeat),
+            "columnar": measure(app, lambda: _core_history(equipment_id, args.rows, "columnar"), args.repeat),
+        },
+        "endpoints": bench_endpoints(app, equipment_id, args.rows, args.repeat),
+    }
+    readers = result["readers"]
+    result["speedup"] = {
+        name: {
+            "latency": round(readers["orm"]["p50_ms"] / readers[name]["p50_ms"], 2),
+            "memory": round(readers["orm"]["peak_memory_mb"] / readers[name]["peak_memory_mb"], 2),
+        }
+        for name in ("core", "columnar")
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
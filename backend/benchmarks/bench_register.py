@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+登録ストーム負荷試験（工場の一斉電源投入を模擬）
+多数の端末が同時に POST /api/register を送信した時のレイテンシを
+HDRヒストグラムで計測します（全スレッドをバリアで揃えてから一斉に送信）。
+
+- new:      未登録の端末が一斉に登録（INSERT ... ON CONFLICT の経路）
+- existing: 登録済みの端末が再起動して再登録（優先順の検索 + 更新の経路）
+- lookup:   同じ端末が /api/equipment/search で自分の設定を検索
+
+--server を省略すると一時SQLiteでアプリを起動し、同一プロセスのスレッド型サーバーに送信します。
+--preload で事前に別の設備を登録しておくと、設備数が多い場合の検索コストを確認できます。
+
+例:
+    python -m backend.benchmarks.bench_register --count 1000
+    python -m backend.benchmarks.bench_register --count 1000 --preload 100000
+    python -m backend.benchmarks.bench_register --server http://localhost:5000 --count 1000 --output bench_register.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmarks.histogram import LatencyHistogram
+
+
+def device(index):
+    """端末 index の識別情報"""
+    return {
+        "equipment_id": f"STORM_{index + 1:05d}",
+        "mac_address": f"02:00:00:{index >> 16 & 0xff:02x}:{index >> 8 & 0xff:02x}:{index & 0xff:02x}",
+        "cpu_serial_number": f"STORM{index + 1:011d}",
+        "ip": f"10.{index >> 16 & 0xff}.{index >> 8 & 0xff}.{index & 0xff}",
+        "manufacturer": "StormTest",
+        "interval": 1,
+    }
+
+
+def storm(server_url, count, concurrency, request_for):
+    """concurrency 本のスレッドで count 件のリクエストを一斉に送信"""
+    histogram = LatencyHistogram()
+    errors = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency)
+
+    def worker(indexes):
+        session = requests.Session()
+        barrier.wait()
+        for index in indexes:
+            method, path, kwargs = request_for(index)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, f"{server_url}{path}", timeout=60, **kwargs)
+                kind = None if response.status_code == 200 else f"http_{response.status_code}"
+            except requests.exceptions.RequestException as e:
+                kind = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                histogram.record_seconds(elapsed)
+                if kind:
+                    errors[kind] = errors.get(kind, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(range(i, count, concurrency),)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": count,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_requests_per_second": round(count / elapsed, 1),
+        "errors": errors,
+        "latency": histogram.summary_ms(),
+    }
+
+
+def register_request(index):
+    return "POST", "/api/register", {"json": device(index)}
+
+
+def search_request(index):
+    identity = device(index)
+    return "GET", "/api/equipment/search", {"params": {
+        "cpu_serial_number": identity["cpu_serial_number"],
+        "mac_address": identity["mac_address"],
+        "ip_address": identity["ip"],
+    }}
+
+
+def start_local_server(preload=0):
+    """一時SQLiteでアプリを起動（スレッド型サーバー）し、URLを返す"""
+    from sqlalchemy import insert
+    from werkzeug.serving import make_server
+    from backend.benchmarks.bench_backend import SEED_CHUNK_SIZE, make_app
+    from backend.db import db
+    from backend.db.models import Equipment
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_register_'), 'bench.db')}"
+    app = make_app(database_url)
+    with app.app_context():
+        db.create_all()
+        # 負荷試験の端末とは重ならない識別情報で既存設備を投入
+        for start in range(0, preload, SEED_CHUNK_SIZE):
+            db.session.execute(insert(Equipment), [
+                dict(device(index), equipment_id=f"FLEET_{index:07d}", cpu_serial_number=f"FLEET{index:011d}",
+                     mac_address=f"06:{device(index)['mac_address'][3:]}", ip=f"172.{device(index)['ip'][3:]}")
+                for index in range(start, min(start + SEED_CHUNK_SIZE, preload))
+            ])
+        db.session.commit()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登録ストーム負荷試験')
+    parser.add_argument('--server', default=None, help='サーバーURL（省略時は一時SQLiteで起動）')
+    parser.add_argument('--count', type=int, default=1000, help='端末数')
+    parser.add_argument('--concurrency', type=int, default=None, help='同時送信数（デフォルト: 端末数）')
+    parser.add_argument('--preload', type=int, default=0, help='事前に登録しておく設備数（ローカル起動時のみ）')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    server_url = args.server or start_local_server(args.preload)
+    concurrency = min(args.concurrency or args.count, args.count)
+    result = {
+        "config": {"server": args.server or "local (sqlite)", "count": args.count,
+                   "concurrency": concurrency, "preload": 0 if args.server else args.preload},
+        "new": storm(server_url, args.count, concurrency, register_request),
+        "existing": storm(server_url, args.count, concurrency, register_request),
+        "lookup": storm(server_url, args.count, concurrency, search_request),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+SLMP一括読出しスループットベンチマーク
+localhost上のSLMP模擬PLCに対して、
+- 項目ごとの個別読出し
+- plan_batch_reads による一括読出し
+のスループットと、応答デコード単体の処理時間を計測します。
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from backend.edge.plc_simulator import SLMPSimulatedPLC
+from backend.edge.slmp import SLMPClient, plan_batch_reads, decode_block
+
+PLC_DATA_TYPES = ["word", "dword", "float32", "word"]
+
+
+def make_configs(item_count, stride):
+    """D0 から stride ワード間隔で item_count 個のデータ項目を配置"""
+    return [{
+        "data_type": f"tag_{i}",
+        "enabled": True,
+        "address": f"D{i * stride}",
+        "scale_factor": 10 if i % 3 == 0 else 1,
+        "plc_data_type": PLC_DATA_TYPES[i % len(PLC_DATA_TYPES)],
+    } for i in range(item_count)]
+
+
+async def _measure(client, blocks, duration):
+    reads = 0
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        await client.read_blocks(blocks)
+        reads += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_read": len(blocks),
+        "reads_per_second": round(reads / elapsed, 1),
+        "avg_read_ms": round(elapsed / reads * 1000, 3),
+    }
+
+
+def measure_decode(blocks, iterations):
+    """ネットワークを介さず、応答バッファからのデコード時間のみを計測"""
+    buffers = [memoryview(bytearray(block.count * 2)) for block in blocks]
+    values = {}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for block, data in zip(blocks, buffers):
+            decode_block(block, data, values)
+    elapsed = time.perf_counter() - started
+    item_count = sum(len(block.items) for block in blocks)
+    return {
+        "decode_us_per_read": round(elapsed / iterations * 1e6, 3),
+        "decode_ns_per_item": round(elapsed / iterations / item_count * 1e9, 1),
+    }
+
+
+async def run(item_count, stride, duration):
+    configs = make_configs(item_count, stride)
+    plc = SLMPSimulatedPLC("BENCH", configs=[], latency=0.0, jitter=0.0)
+    port = await plc.start()
+    client = SLMPClient("127.0.0.1", port)
+    await client.connect()
+    try:
+        batched = plan_batch_reads(configs)
+        # 個別読出しは1項目1コマンド
+        single = [block for config in configs for block in plan_batch_reads([config])]
+
+        return {
+            "item_count": item_count,
+            "stride_words": stride,
+            "per_item": await _measure(client, single, duration),
+            "batched": await _measure(client, batched, duration),
+            "decode": measure_decode(batched, 20000),
+        }
+    finally:
+        await client.close()
+        await plc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SLMP一括読出しベンチマーク')
+    parser.add_argument('--items', type=int, default=64, help='データ項目数')
+    parser.add_argument('--stride', type=int, default=4, help='項目間のアドレス間隔（ワード）')
+    parser.add_argument('--duration', type=float, default=3.0, help='各計測の実行時間（秒）')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.items, args.stride, args.duration))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+タグ保存形式ベンチマーク（横持ち logs と 縦持ち tag_values の比較）
+同じ決定的なデータを以下の2形式で別々のSQLiteファイルに保存し、
+ストレージサイズ（VACUUM後のファイルサイズ）と1タグの時系列取得時間を比較します。
+
+- wide:   logs（固定6列、使わない列は NULL）
+- narrow: tag_values（設備 × タグ × 時刻 → 値、使うタグだけを保存）
+
+--tags で1サンプルあたりのタグ数（1〜6）を指定します。
+設定されていないタグが多いほど横持ちは NULL だらけの疎な行になります。
+公平のため、logs にも tag_values と同等の (equipment_id, timestamp) インデックスを作成して計測します。
+
+例:
+    python -m backend.benchmarks.bench_tags
+    python -m backend.benchmarks.bench_tags --samples 200000 --tags 2 --output bench_tags.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmarks.bench_backend import SEED_CHUNK_SIZE, make_app, summarize
+
+FIXED_TAGS = ["current", "temperature", "pressure", "cycle_time", "production_count", "error_code"]
+
+
+def generate_rows(equipments, samples, tags, seed, anchor):
+    """設備ごとに samples 件、1サンプルあたり tags 個のタグ値（古い順）"""
+    rng = random.Random(seed)
+    used = FIXED_TAGS[:tags]
+    for pk in range(1, equipments + 1):
+        for n in range(samples):
+            timestamp = anchor - timedelta(seconds=samples - n)
+            yield pk, timestamp, {tag: round(rng.uniform(0, 100), 2) for tag in used}
+
+
+def seed(app, layout, args, anchor):
+    from sqlalchemy import insert, text
+    from backend.db import db
+    from backend.db.models import Equipment, Log, TagValue
+
+    with app.app_context():
+        db.create_all()
+        if layout == "wide":
+            db.session.execute(text("CREATE INDEX IF NOT EXISTS bench_idx_logs_equipment_timestamp ON logs (equipment_id, timestamp)"))
+        for i in range(args.equipments):
+            db.session.add(Equipment(equipment_id=f"BENCH_{i + 1:04d}", manufacturer="Bench",
+                                     series="BENCH-PLC", mac_address=f"02:00:00:00:00:{i:02x}",
+                                     cpu_serial_number=f"BENCH{i + 1:011d}"))
+        db.session.commit()
+
+        rows = []
+        for pk, timestamp, values in generate_rows(args.equipments, args.samples, args.tags, args.seed, anchor):
+            if layout == "wide":
+                rows.append({"equipment_id": pk, "timestamp": timestamp, **values})
+            else:
+                # 汎用タグとして保存（tag_ 接頭辞で固定列と区別）
+                rows.extend({"equipment_id": pk, "tag": f"tag_{tag}", "timestamp": timestamp, "value": value}
+                            for tag, value in values.items())
+            if len(rows) >= SEED_CHUNK_SIZE:
+                db.session.execute(insert(Log if layout == "wide" else TagValue), rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(Log if layout == "wide" else TagValue), rows)
+        db.session.commit()
+        db.session.execute(text("VACUUM"))
+
+
+def bench_queries(app, layout, args, anchor):
+    from backend.db import db
+    from backend.db.readers import fetch_tag_series
+
+    prefix = "" if layout == "wide" else "tag_"
+    tags = [prefix + tag for tag in FIXED_TAGS[:args.tags]]
+    since = anchor - timedelta(hours=1)
+    results = {}
+    for name, tag_list, since_value in (("one_tag_1h", tags[:1], since),
+                                        ("one_tag_all", tags[:1], None),
+                                        ("all_tags_1h", tags, since)):
+        samples = []
+        for i in range(args.repeat + 1):
+            with app.app_context():
+                started = time.perf_counter()
+                count = sum(len(fetch_tag_series(1, tag, args.samples, since_value)) for tag in tag_list)
+                elapsed = time.perf_counter() - started
+                db.session.remove()
+            if i:
+                samples.append(elapsed)
+        results[name] = dict(summarize(samples), rows=count)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='タグ保存形式ベンチマーク（横持ちと縦持ちの比較）')
+    parser.add_argument('--equipments', type=int, default=5, help='設備数')
+    parser.add_argument('--samples', type=int, default=50000, help='1設備あたりのサンプル数')
+    parser.add_argument('--tags', type=int, default=2, choices=range(1, 7), help='1サンプルあたりのタグ数')
+    parser.add_argument('--repeat', type=int, default=10, help='各クエリの繰り返し回数')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args()
+
+    anchor = datetime(2026, 1, 1)
+    workdir = tempfile.mkdtemp(prefix='bench_tags_')
+    result = {"equipments": args.equipments, "samples": args.samples, "tags": args.tags, "layouts": {}}
+    for layout in ("wide", "narrow"):
+        path = os.path.join(workdir, f"{layout}.db")
+        app = make_app(f"sqlite:///{path}")
+        started = time.perf_counter()
+        seed(app, layout, args, anchor)
+        result["layouts"][layout] = {
+            "seed_s": round(time.perf_counter() - started, 2),
+            "size_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+            "queries": bench_queries(app, layout, args, anchor),
+        }
+    layouts = result["layouts"]
+    result["narrow_vs_wide"] = {
+        "size": round(layouts["narrow"]["size_mb"] / layouts["wide"]["size_mb"], 2),
+        **{name: round(layouts["narrow"]["queries"][name]["p50_ms"] / layouts["wide"]["queries"][name]["p50_ms"], 2)
+           for name in layouts["wide"]["queries"]},
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+HDR（High Dynamic Range）形式のレイテンシヒストグラム
+値（マイクロ秒）を対数・線形の2段バケットで記録し、相対誤差1%未満で
+パーセンタイルを求めます。バケットは疎な辞書で保持するため、
+プロセス間でのマージやJSONでの受け渡しが可能です。
+"""
+
+SUB_BUCKET_BITS = 8                       # 下位バケット 256 個（相対誤差 < 1/128）
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _index_of(value):
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    top = value >> shift
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (top - SUB_BUCKET_HALF)
+
+
+def _range_of(index):
+    """バケットが表す値の範囲 (下限, 上限)"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    top = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """マイクロ秒単位のHDR形式ヒストグラム"""
+
+    def __init__(self):
+        self.counts = {}
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def record(self, value_us, count=1):
+        value = max(0, int(value_us))
+        index = _index_of(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def record_seconds(self, seconds, count=1):
+        self.record(seconds * 1e6, count)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+        return self
+
+    def percentile(self, q):
+        """q（0〜100）パーセンタイル値（マイクロ秒、バケット上限で近似）"""
+        if self.total_count == 0:
+            return None
+        rank = max(1, int(round(q / 100.0 * self.total_count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_range_of(index)[1], self.max_value)
+        return self.max_value
+
+    def mean(self):
+        if self.total_count == 0:
+            return None
+        total = 0
+        for index, count in self.counts.items():
+            low, high = _range_of(index)
+            total += (low + high) / 2 * count
+        return total / self.total_count
+
+    def summary_ms(self, percentiles=(50, 90, 95, 99, 99.9)):
+        """主要パーセンタイルをミリ秒で返す"""
+        if self.total_count == 0:
+            return {"count": 0}
+        result = {
+            "count": self.total_count,
+            "min_ms": round(self.min_value / 1000, 3),
+            "mean_ms": round(self.mean() / 1000, 3),
+            "max_ms": round(self.max_value / 1000, 3),
+        }
+        for q in percentiles:
+            result[f"p{q:g}_ms"] = round(self.percentile(q) / 1000, 3)
+        return result
+
+    def to_dict(self):
+        return {
+            "counts": {str(k): v for k, v in self.counts.items()},
+            "total_count": self.total_count,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(k): v for k, v in data["counts"].items()}
+        histogram.total_count = data["total_count"]
+        histogram.min_value = data["min_value"]
+        histogram.max_value = data["max_value"]
+        return histogram
+
+    def percentile_distribution(self, ticks_per_half=5):
+        """HdrHistogram の .hgrm 形式（Value, Percentile, TotalCount, 1/(1-Percentile)）の文字列"""
+        lines = [f"{'Value(ms)':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>16}", ""]
+        if self.total_count == 0:
+            return "\n".join(lines)
+        q = 0.0
+        step = 50.0
+        while q < 100.0:
+            for _ in range(ticks_per_half):
+                value = self.percentile(q) / 1000
+                rank = max(1, int(round(q / 100.0 * self.total_count)))
+                inverse = 1 / (1 - q / 100.0)
+                lines.append(f"{value:12.3f} {q / 100.0:14.12f} {rank:10d} {inverse:16.2f}")
+                q += step / ticks_per_half
+            step /= 2
+            if step < 1e-4:
+                break
+        lines.append(f"{self.max_value / 1000:12.3f} {1.0:14.12f} {self.total_count:10d}")
+        lines.append(f"#[Mean    = {self.mean() / 1000:12.3f}, Max = {self.max_value / 1000:12.3f}]")
+        lines.append(f"#[Total count    = {self.total_count:12d}]")
+        return "\n".join(lines)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+/api/logs 取込み負荷生成ツール
+多数の設備IDを複数プロセス × 複数スレッドで模擬し、目標レート（サンプル/秒）で
+データを送信します。送信はオープンループ（予定時刻基準）で行い、
+予定時刻からの遅延をHDRヒストグラムに記録するため、
+サーバーが詰まった場合の待ち時間も計測結果に含まれます。
+
+例:
+    python -m backend.benchmarks.load_generator --equipments 2000 --rate 5000 --duration 60
+    python -m backend.benchmarks.load_generator --equipments 2000 --rate 5000 --batch-size 50
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from backend.benchmarks.histogram import LatencyHistogram
+
+
+def equipment_ids(count, prefix="LOAD"):
+    return [f"{prefix}_{i + 1:05d}" for i in range(count)]
+
+
+def make_sample(equipment_id, rng, production_counts):
+    production_counts[equipment_id] = production_counts.get(equipment_id, 0) + (1 if rng.random() < 0.05 else 0)
+    return {
+        "equipment_id": equipment_id,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "production_count": production_counts[equipment_id],
+        "current": round(12.5 + rng.uniform(-2.0, 2.0), 2),
+        "temperature": round(25.0 + rng.uniform(-5.0, 5.0), 1),
+        "pressure": round(0.8 + rng.uniform(-0.2, 0.2), 3),
+        "cycle_time": round(15.0 + rng.uniform(-3.0, 3.0), 1),
+        "error_code": 0 if rng.random() >= 0.01 else rng.choice([101, 102, 103, 201, 202]),
+    }
+
+
+def register_equipments(server_url, ids, threads=16):
+    """負荷試験用の設備を登録（既存の場合は更新）"""
+    session_local = threading.local()
+    failures = []
+
+    def register(chunk):
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        for equipment_id in chunk:
+            try:
+                response = session.post(f"{server_url}/api/register", json={
+                    "equipment_id": equipment_id,
+                    "mac_address": f"02:00:{equipment_id[-5:]}",
+                    "manufacturer": "LoadTest",
+                    "interval": 1,
+                }, timeout=30)
+                if response.status_code != 200:
+                    failures.append((equipment_id, response.status_code))
+            except requests.exceptions.RequestException as e:
+                failures.append((equipment_id, str(e)))
+
+    workers = [threading.Thread(target=register, args=(ids[i::threads],)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return failures
+
+
+class _ThreadStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()   # 予定時刻から応答までの時間
+        self.service = LatencyHistogram()   # 実際の送信から応答までの時間
+        self.requests = 0
+        self.samples = 0
+        self.errors = {}
+
+    def record_error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def _sender_thread(server_url, ids, request_interval, batch_size, start_at, end_at, seed, stats):
+    """1スレッド分の送信ループ（Session を使い回して接続を再利用）"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    url = f"{server_url}/api/logs/batch" if batch_size > 1 else f"{server_url}/api/logs"
+    production_counts = {}
+    cursor = rng.randrange(len(ids))
+    # スレッド毎に開始位相をずらす
+    scheduled = start_at + rng.uniform(0, request_interval)
+
+    while scheduled < end_at:
+        now = time.perf_counter()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+        samples = []
+        for _ in range(batch_size):
+            samples.append(make_sample(ids[cursor], rng, production_counts))
+            cursor = (cursor + 1) % len(ids)
+        body = {"samples": samples} if batch_size > 1 else samples[0]
+
+        sent_at = time.perf_counter()
+        try:
+            response = session.post(url, json=body, timeout=30)
+            if response.status_code != 200:
+                stats.record_error(f"http_{response.status_code}")
+            else:
+                stats.samples += len(samples)
+        except requests.exceptions.Timeout:
+            stats.record_error("timeout")
+        except requests.exceptions.ConnectionError:
+            stats.record_error("connection")
+        except requests.exceptions.RequestException as e:
+            stats.record_error(type(e).__name__)
+        finished = time.perf_counter()
+
+        stats.requests += 1
+        stats.latency.record_seconds(finished - scheduled)
+        stats.service.record_seconds(finished - sent_at)
+        scheduled += request_interval
+
+
+def _worker_process(worker_index, server_url, ids, threads, request_interval, batch_size,
+                    start_at_wall, duration, seed, result_queue):
+    """1プロセス分：スレッドを起動して結果をキューへ返す"""
+    # プロセス間で開始時刻を揃える（壁時計 → 単調時計へ変換）
+    start_at = time.perf_counter() + max(0.0, start_at_wall - time.time())
+    end_at = start_at + duration
+    stats_list = [_ThreadStats() for _ in range(threads)]
+    workers = [
+        threading.Thread(target=_sender_thread, args=(
+            server_url, ids[i::threads], request_interval, batch_size, start_at, end_at,
+            seed * 1000 + worker_index * 100 + i, stats_list[i]
+        ), daemon=True)
+        for i in range(threads) if ids[i::threads]
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    latency = LatencyHistogram()
+    service = LatencyHistogram()
+    errors = {}
+    for stats in stats_list:
+        latency.merge(stats.latency)
+        service.merge(stats.service)
+        for kind, count in stats.errors.items():
+            errors[kind] = errors.get(kind, 0) + count
+    result_queue.put({
+        "requests": sum(s.requests for s in stats_list),
+        "samples": sum(s.samples for s in stats_list),
+        "errors": errors,
+        "latency": latency.to_dict(),
+        "service": service.to_dict(),
+    })
+
+
+def run_load(server_url, equipment_count=1000, rate=1000.0, duration=30.0, batch_size=1,
+             processes=None, threads_per_process=32, seed=42, register=True):
+    """負荷を生成して集計結果を返す"""
+    processes = processes or max(1, min(multiprocessing.cpu_count(), 8))
+    ids = equipment_ids(equipment_count)
+    if register:
+        print(f"📋 負荷試験用設備を登録中: {equipment_count}台")
+        failures = register_equipments(server_url, ids)
+        if failures:
+            print(f"⚠️ 設備登録失敗: {len(failures)}件 {failures[:3]}")
+
+    total_threads = processes * threads_per_process
+    # スレッド1本あたりのリクエスト間隔（秒）
+    request_interval = total_threads * batch_size / rate
+    start_at_wall = time.time() + 1.0
+
+    print(f"🚀 負荷生成開始: 目標 {rate:,.0f}サンプル/秒, 設備 {equipment_count}台, "
+          f"{processes}プロセス × {threads_per_process}スレッド, バッチ {batch_size}件, {duration}秒")
+    result_queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_worker_process, args=(
+            p, server_url, ids[p::processes], threads_per_process, request_interval, batch_size,
+            start_at_wall, duration, seed, result_queue
+        ))
+        for p in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    results = [result_queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start_at_wall
+
+    latency = LatencyHistogram()
+    service = LatencyHistogram()
+    errors = {}
+    for result in results:
+        latency.merge(LatencyHistogram.from_dict(result["latency"]))
+        service.merge(LatencyHistogram.from_dict(result["service"]))
+        for kind, count in result["errors"].items():
+            errors[kind] = errors.get(kind, 0) + count
+
+    requests_total = sum(r["requests"] for r in results)
+    samples_total = sum(r["samples"] for r in results)
+    error_total = sum(errors.values())
+    return {
+        "config": {
+            "server": server_url,
+            "equipments": equipment_count,
+            "target_samples_per_second": rate,
+            "duration_seconds": duration,
+            "batch_size": batch_size,
+            "processes": processes,
+            "threads_per_process": threads_per_process,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": requests_total,
+        "samples_saved": samples_total,
+        "throughput_samples_per_second": round(samples_total / elapsed, 1),
+        "throughput_requests_per_second": round(requests_total / elapsed, 1),
+        "errors": errors,
+        "error_rate": round(error_total / requests_total, 6) if requests_total else None,
+        "latency": latency.summary_ms(),
+        "service_time": service.summary_ms(),
+        "_latency_histogram": latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/logs 取込み負荷生成ツール')
+    parser.add_argument('--server', default='http://localhost:5000', help='サーバーURL')
+    parser.add_argument('--equipments', type=int, default=1000, help='模擬する設備数')
+    parser.add_argument('--rate', type=float, default=1000.0, help='目標レート（サンプル/秒、全体）')
+    parser.add_argument('--duration', type=float, default=30.0, help='実行時間（秒）')
+    parser.add_argument('--batch-size', type=int, default=1, help='1リクエストあたりのサンプル数（2以上で /api/logs/batch）')
+    parser.add_argument('--processes', type=int, default=None, help='プロセス数（デフォルト: CPU数、最大8）')
+    parser.add_argument('--threads', type=int, default=32, help='プロセスあたりのスレッド数')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--skip-register', action='store_true', help='設備登録を省略')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    parser.add_argument('--hgrm', default=None, help='レイテンシ分布（.hgrm形式）の出力先')
+    args = parser.parse_args()
+
+    result = run_load(
+        args.server, args.equipments, args.rate, args.duration, args.batch_size,
+        args.processes, args.threads, args.seed, register=not args.skip_register
+    )
+    histogram = result.pop("_latency_histogram")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.hgrm:
+        with open(args.hgrm, "w") as f:
+            f.write(histogram.percentile_distribution())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+取込みデータの圧縮（デッドバンド / スウィングドア）
+安定稼働中の設備から届くほぼ同じ値のサンプルを保存せず、
+許容誤差内で波形を再現できるサンプルだけを logs に保存します。
+
+データ項目ごとの設定（PLCDataConfig）:
+    compression_mode          none / deadband_abs / deadband_pct / swinging_door
+    compression_tolerance     許容誤差（deadband_pct は直前の保存値に対する%）
+    compression_max_interval  この秒数以上保存が空いたら必ず保存（0で無効）
+
+- 1サンプル（1行）にまとめて保存するため、いずれかの項目が保存を必要とすれば行ごと保存
+- error_code の変化と production_count の増加（リセット含む）は必ず保存
+  （前値保持で再現するため、変化したサンプル自体を保存すれば変化時刻も正確に再現できる）
+- スウィングドアは基準点からの直線で再現できなくなった時点で「直前のサンプル」を保存
+  （再現は直線補間。他の理由で今回のサンプルを保存した場合も誤差は許容範囲内）
+- Log の固定列以外の data_type（汎用タグ）も同じ設定で圧縮
+- 状態はプロセス内メモリに保持（再起動後の最初のサンプルは必ず保存）
+- スウィングドアで保留中の直前サンプルは、受信から 収集周期 × COMPRESSION_HELD_FACTOR
+  （最小 COMPRESSION_HELD_MIN_SECONDS）経っても保存されなければ定期確認で保存
+  （設備の停止・通信断で波形の末尾が欠けない。再起動で失う保留もこの時間分まで）
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+from backend.db import db
+from backend.db.models import DataTypes, Equipment, PLCDataConfig
+from backend.db.workloads import WORKLOAD_INGEST, workload
+from backend.metrics import registry
+from backend.timestamps import utc_seconds
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MODES = ("none", "deadband_abs", "deadband_pct", "swinging_door")
+# 圧縮対象のアナログ値（production_count / error_code は変化時に必ず保存）
+ANALOG_FIELDS = (DataTypes.CURRENT, DataTypes.TEMPERATURE, DataTypes.PRESSURE, DataTypes.CYCLE_TIME)
+DISCRETE_FIELDS = (DataTypes.PRODUCTION_COUNT, DataTypes.ERROR_CODE)
+
+# 保留中の直前サンプルを保存するまでの時間（設備の収集周期 × COMPRESSION_HELD_FACTOR と
+# COMPRESSION_HELD_MIN_SECONDS の大きい方）と、その確認間隔（秒）
+COMPRESSION_HELD_FACTOR = 3
+COMPRESSION_HELD_MIN_SECONDS = float(os.getenv("COMPRESSION_HELD_MIN_SECONDS", "10"))
+COMPRESSION_SWEEP_SECONDS = 5
+
+COMPRESSION_SAMPLES = registry.counter(
+    "plc_compression_samples_total", "Ingested samples by compression result", ("result",))
+
+
+class MetricCompressor:
+    """1データ項目の圧縮状態"""
+
+    __slots__ = ("mode", "tolerance", "archived_t", "archived_v", "slope_upper", "slope_lower")
+
+    def __init__(self, mode="none", tolerance=0.0):
+        self.mode = mode if mode in COMPRESSION_MODES else "none"
+        self.tolerance = max(0.0, float(tolerance or 0.0))
+        self.archived_t = None
+        self.archived_v = None
+        self.slope_upper = float("inf")
+        self.slope_lower = float("-inf")
+
+    def archive(self, t, v):
+        """保存したサンプルを基準点にする"""
+        self.archived_t = t
+        self.archived_v = v if isinstance(v, (int, float)) else None
+        self.slope_upper = float("inf")
+        self.slope_lower = float("-inf")
+
+    def fits(self, t, v):
+        """基準点から (t, v) への直線が、これまでのサンプルを許容誤差内で再現できるか"""
+        if self.mode != "swinging_door" or v is None or self.archived_v is None:
+            return True
+        dt = t - self.archived_t
+        if dt <= 0:
+            return True
+        return self.slope_lower <= (v - self.archived_v) / dt <= self.slope_upper
+
+    def evaluate(self, t, v):
+        """(直前のサンプルを保存すべきか, 今回のサンプルを保存すべきか)"""
+        if v is None:
+            return False, False
+        if self.mode == "none" or self.archived_v is None or not isinstance(v, (int, float)):
+            return False, True
+        if self.mode == "deadband_abs":
+            return False, abs(v - self.archived_v) > self.tolerance
+        if self.mode == "deadband_pct":
+            return False, abs(v - self.archived_v) > abs(self.archived_v) * self.tolerance / 100.0
+
+        # スウィングドア: 基準点からの傾きが、これまでのサンプルを許容誤差内で通る範囲（扉）を
+        # 外れたら直前のサンプルを保存（直前のサンプルまでは直線補間で再現できる）
+        dt = t - self.archived_t
+        if dt <= 0:
+            return False, True
+        store_held = not self.fits(t, v)
+        self.slope_upper = min(self.slope_upper, (v + self.tolerance - self.archived_v) / dt)
+        self.slope_lower = max(self.slope_lower, (v - self.tolerance - self.archived_v) / dt)
+        return store_held, False
+
+
+class EquipmentCompressor:
+    """1設備分の圧縮状態（サンプルは時刻順に渡す）"""
+
+    def __init__(self, settings, interval=0):
+        # 設定済みの汎用タグ（Log の固定列以外の data_type）
+        self.generic_tags = tuple(tag for tag in settings if tag not in DataTypes.get_all())
+        self.metrics = {
+            field: MetricCompressor(*settings.get(field, ("none", 0.0))[:2])
+            for field in ANALOG_FIELDS + self.generic_tags
+        }
+        self.max_interval = min(
+            (s[2] for s in settings.values() if len(s) > 2 and s[2]), default=0
+        )
+        self.last_stored_t = None
+        self.previous = None    # 直前のサンプル (t, timestamp, data)
+        self.held = None        # 直前のサンプルのうち未保存のもの
+        self.held_at = None     # held を受信した時刻（time.monotonic）
+        self.held_max_age = max(COMPRESSION_HELD_MIN_SECONDS, COMPRESSION_HELD_FACTOR * (interval or 0))
+        self.received = 0
+        self.stored = 0
+        self.lock = threading.Lock()
+
+    def _archive(self, t, data):
+        for field, metric in self.metrics.items():
+            metric.archive(t, data.get(field))
+        self.last_stored_t = t
+
+    def _evaluate(self, t, data):
+        store_held = store_current = False
+        for field, metric in self.metrics.items():
+            held, current = metric.evaluate(t, data.get(field))
+            store_held |= held
+            store_current |= current
+        if self.max_interval and t - self.last_stored_t >= self.max_interval:
+            store_current = True
+        return store_held, store_current
+
+    def offer(self, timestamp, data):
+        """サンプルを渡し、保存すべき (timestamp, data) のリストを返す（0〜2件、時刻順）"""
+        t = utc_seconds(timestamp)
+        self.received += 1
+        if self.previous is not None and t < self.previous[0]:
+            # 時刻が逆行したサンプルは状態を変えずにそのまま保存
+            self.stored += 1
+            return [(timestamp, data)]
+
+        if self.last_stored_t is None:
+            store_held, store_current = False, True
+        else:
+            store_held, store_current = self._evaluate(t, data)
+            previous_data = self.previous[2]
+            if any(data.get(field) != previous_data.get(field) for field in DISCRETE_FIELDS):
+                store_current = True
+
+        to_store = []
+        if store_held and self.held is not None:
+            held_t, held_timestamp, held_data = self.held
+            to_store.append((held_timestamp, held_data))
+            self._archive(held_t, held_data)
+            # 新しい基準点から今回のサンプルを評価し直す
+            store_current |= self._evaluate(t, data)[1]
+        if store_current:
+            to_store.append((timestamp, data))
+            self._archive(t, data)
+            self.held = None
+        else:
+            self.held = (t, timestamp, data)
+            self.held_at = time.monotonic()
+
+        self.previous = (t, timestamp, data)
+        self.stored += len(to_store)
+        return to_store
+
+    def take_stale_held(self, now):
+        """held_max_age 以上保存されていない保留中のサンプルを基準点にして返す（なければ None）"""
+        if self.held is None or now - self.held_at < self.held_max_age:
+            return None
+        held_t, held_timestamp, held_data = self.held
+        self._archive(held_t, held_data)
+        self.held = None
+        self.stored += 1
+        return held_timestamp, held_data
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "stored": self.stored,
+            "compression_ratio": round(self.received / self.stored, 2) if self.stored else None,
+        }
+
+
+def load_equipment_interval(equipment_pk):
+    """設備の収集周期（秒）"""
+    return db.session.execute(
+        select(Equipment.interval).where(Equipment.id == equipment_pk)
+    ).scalar() or 0
+
+
+def load_compression_settings(equipment_pk):
+    """設備の圧縮設定 {data_type: (mode, tolerance, max_interval)}"""
+    rows = db.session.execute(
+        select(
+            PLCDataConfig.data_type,
+            PLCDataConfig.compression_mode,
+            PLCDataConfig.compression_tolerance,
+            PLCDataConfig.compression_max_interval,
+        ).where(PLCDataConfig.equipment_id == equipment_pk)
+    ).all()
+    return {
+        data_type: (mode or "none", tolerance or 0.0, max_interval or 0)
+        for data_type, mode, tolerance, max_interval in rows
+    }
+
+
+class CompressionRegistry:
+    """設備ごとの圧縮状態（設定はDBから遅延ロードし、設定変更時に破棄）"""
+
+    def __init__(self):
+        self._compressors = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, equipment_pk):
+        compressor = self._compressors.get(equipment_pk)
+        if compressor is None:
+            settings = load_compression_settings(equipment_pk)
+            interval = load_equipment_interval(equipment_pk)
+            with self._lock:
+                compressor = self._compressors.setdefault(equipment_pk, EquipmentCompressor(settings, interval))
+        return compressor
+
+    def filter(self, equipment_pk, samples):
+        """[(timestamp, data), ...]（時刻順）から保存すべきサンプルを返す"""
+        compressor = self.get(equipment_pk)
+        to_store = []
+        with compressor.lock:
+            for timestamp, data in samples:
+                to_store.extend(compressor.offer(timestamp, data))
+        COMPRESSION_SAMPLES.labels("stored").inc(len(to_store))
+        COMPRESSION_SAMPLES.labels("dropped").inc(len(samples) - len(to_store))
+        return to_store
+
+    def generic_tags(self, equipment_pk):
+        """設備に設定済みの汎用タグ（TagValue に保存する data_type）"""
+        return self.get(equipment_pk).generic_tags
+
+    def invalidate(self, equipment_pk):
+        with self._lock:
+            self._compressors.pop(equipment_pk, None)
+
+    def flush_held(self, store, now=None):
+        """長く保存されていない保留中のサンプルを store(equipment_pk, [(timestamp, data)]) で保存し、件数を返す
+
+        保存に失敗した設備は圧縮状態をリセット（次のサンプルは必ず保存）。
+        """
+        now = time.monotonic() if now is None else now
+        flushed = 0
+        for equipment_pk, compressor in list(self._compressors.items()):
+            with compressor.lock:
+                sample = compressor.take_stale_held(now)
+            if sample is None:
+                continue
+            try:
+                store(equipment_pk, [sample])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.invalidate(equipment_pk)
+                logger.error("❌ 保留サンプルの保存エラー: %s", e, extra={"equipment_id": equipment_pk})
+                continue
+            # 受信時に dropped と数えたサンプルを後から保存した件数
+            COMPRESSION_SAMPLES.labels("held_flushed").inc()
+            flushed += 1
+        return flushed
+
+    def start(self, app, store, interval=COMPRESSION_SWEEP_SECONDS):
+        """保留中のサンプルを定期的に確認・保存するスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context(), workload(WORKLOAD_INGEST):
+                        try:
+                            flushed = self.flush_held(store)
+                            if flushed:
+                                logger.debug("💾 保留サンプルを保存: %s設備", flushed)
+                        finally:
+                            db.session.remove()
+                except Exception as e:
+                    logger.exception("❌ 保留サンプルの確認エラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="compression-held-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def stats(self, equipment_pk=None):
+        if equipment_pk is not None:
+            compressor = self._compressors.get(equipment_pk)
+            return compressor.stats() if compressor else None
+        return {pk: compressor.stats() for pk, compressor in list(self._compressors.items())}
+
+
+compression_registry = CompressionRegistry()
@@ -2,11 +2,15 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy import create_engine
 
+from backend.db.routing import RoutingSession
+
 # スレッドセーフなセッション管理のためのSQLAlchemy設定
+# （replica_reads() の範囲の SELECT は読み取りレプリカへ振り分け）
 db = SQLAlchemy(
     engine_options={
         'pool_pre_ping': True,
         'pool_recycle': 300,
         'echo': False,
-    }
+    },
+    session_options={'class_': RoutingSession},
 ) 
\ No newline at end of file
@@ -8,9 +8,9 @@ class Equipment(db.Model):
     equipment_id = db.Column(db.String(50), unique=True, nullable=False)
     manufacturer = db.Column(db.String(50))
     series = db.Column(db.String(50))
-    ip = db.Column(db.String(100))        # ラズパイのIPアドレス
+    ip = db.Column(db.String(100), index=True)        # ラズパイのIPアドレス
     plc_ip = db.Column(db.String(100))    # PLCのIPアドレス（新規追加）
-    mac_address = db.Column(db.String(50))  # ラズパイのMACアドレス
+    mac_address = db.Column(db.String(50), index=True)  # ラズパイのMACアドレス
     cpu_serial_number = db.Column(db.String(50), unique=True)  # ラズパイのCPUシリアル番号（不変識別子）
     hostname = db.Column(db.String(100))    # ラズパイのホスト名
     port = db.Column(db.Integer)             # PLCのポート
@@ -18,6 +18,8 @@ class Equipment(db.Model):
     interval = db.Column(db.Integer)
     status = db.Column(db.String(50), default="正常")
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    config_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # PLCデータ設定の版（変更ごとに+1）
+    ideal_cycle_time = db.Column(db.Float)  # 理論サイクルタイム（秒/個、OEE の性能稼働率に使用）
     
     # リレーション
     plc_configs = db.relationship('PLCDataConfig', backref='equipment', lazy=True, cascade='all, delete-orphan')
@@ -45,20 +47,27 @@ class PLCDataConfig(db.Model):
     enabled = db.Column(db.Boolean, default=True)
     address = db.Column(db.String(20), nullable=False)    # D100, D101など
     scale_factor = db.Column(db.Integer, default=1)       # 倍率
-    plc_data_type = db.Column(db.String(20), default='word')  # bit, word, dword, float32
+    plc_data_type = db.Column(db.String(20), default='word')  # bit, word, dword, int16, int32, float32
+    compression_mode = db.Column(db.String(20), default='none')   # none, deadband_abs, deadband_pct, swinging_door
+    compression_tolerance = db.Column(db.Float, default=0.0)      # 許容誤差（deadband_pct は%）
+    compression_max_interval = db.Column(db.Integer, default=0)   # 最大保存間隔（秒、0で無効）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # ユニーク制約: 同じ設備の同じデータ型は1つまで
     __table_args__ = (db.UniqueConstraint('equipment_id', 'data_type', name='uq_equipment_data_type'),)
     
-    def __init__(self, equipment_id, data_type, enabled=True, address="", scale_factor=1, plc_data_type="word"):
+    def __init__(self, equipment_id, data_type, enabled=True, address="", scale_factor=1, plc_data_type="word",
+                 compression_mode="none", compression_tolerance=0.0, compression_max_interval=0):
         self.equipment_id = equipment_id
         self.data_type = data_type
         self.enabled = enabled
         self.address = address
         self.scale_factor = scale_factor
         self.plc_data_type = plc_data_type
+        self.compression_mode = compression_mode
+        self.compression_tolerance = compression_tolerance
+        self.compression_max_interval = compression_max_interval
 
 class Log(db.Model):
     """ログテーブル（全データ項目対応版）"""
@@ -77,6 +86,173 @@ class Log(db.Model):
     error_code = db.Column(db.Integer)            # エラーコード
     
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # 設備別の期間検索（履歴・複数設備の履歴・集計）
+    __table_args__ = (db.Index('idx_logs_equipment_timestamp', 'equipment_id', 'timestamp'),)
+
+class TagValue(db.Model):
+    """汎用タグ値テーブル（縦持ち: 設備 × タグ × 時刻 → 値）
+    Log の固定列（DataTypes）以外の data_type を、スキーマ変更なしで保存する"""
+    __tablename__ = 'tag_values'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    tag = db.Column(db.String(50), nullable=False)          # PLCDataConfig.data_type
+    timestamp = db.Column(db.DateTime, nullable=False)
+    value = db.Column(db.Float)
+
+    __table_args__ = (db.Index('idx_tag_values_equipment_tag_timestamp', 'equipment_id', 'tag', 'timestamp'),)
+
+class SpoolCheckpoint(db.Model):
+    """エッジ側スプールごとの取込み済みシーケンス番号（再送バッチの重複取込み防止）"""
+    __tablename__ = 'spool_checkpoints'
+    spool_id = db.Column(db.String(64), primary_key=True)       # SampleSpool.spool_id
+    acked_seq = db.Column(db.BigInteger, nullable=False, default=0)  # 取込み済みの最大シーケンス番号
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ErrorEvent(db.Model):
+    """エラー発生区間テーブル（error_code の変化から取込み時に作成。ended_at が NULL なら継続中）"""
+    __tablename__ = 'error_events'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    error_code = db.Column(db.Integer, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime)
+    duration_seconds = db.Column(db.Float)      # 終了時に記録
+
+    __table_args__ = (
+        db.Index('idx_error_events_equipment_started_at', 'equipment_id', 'started_at'),
+        db.Index('idx_error_events_code_started_at', 'error_code', 'started_at'),
+        db.Index('idx_error_events_equipment_ended_at', 'equipment_id', 'ended_at'),
+    )
+
+class AlarmRule(db.Model):
+    """アラームルールテーブル（設備 × データ項目のしきい値・変化率・継続時間の条件）"""
+    __tablename__ = 'alarm_rules'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False, index=True)
+    name = db.Column(db.String(100))
+    metric = db.Column(db.String(50), nullable=False)          # PLCDataConfig.data_type
+    condition = db.Column(db.String(20), nullable=False)       # gt, ge, lt, le, rate_gt, rate_lt
+    threshold = db.Column(db.Float, nullable=False)
+    duration_seconds = db.Column(db.Float, default=0.0)        # 条件がこの秒数続いたら発報
+    hysteresis = db.Column(db.Float, default=0.0)              # 解除までの戻り幅
+    severity = db.Column(db.String(20), default='warning')     # info, warning, critical
+    enabled = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, equipment_id, metric, condition, threshold, name="", duration_seconds=0.0, hysteresis=0.0,
+                 severity="warning", enabled=True):
+        self.equipment_id = equipment_id
+        self.name = name
+        self.metric = metric
+        self.condition = condition
+        self.threshold = threshold
+        self.duration_seconds = duration_seconds
+        self.hysteresis = hysteresis
+        self.severity = severity
+        self.enabled = enabled
+
+class AlarmEvent(db.Model):
+    """アラーム発生テーブル（発報〜解除の区間。cleared_at が NULL なら発報中）"""
+    __tablename__ = 'alarm_events'
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('alarm_rules.id', ondelete='CASCADE'), nullable=False)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    severity = db.Column(db.String(20))
+    raised_at = db.Column(db.DateTime, nullable=False)
+    raised_value = db.Column(db.Float)
+    cleared_at = db.Column(db.DateTime)
+    cleared_value = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('idx_alarm_events_equipment_raised_at', 'equipment_id', 'raised_at'),
+        db.Index('idx_alarm_events_rule_cleared_at', 'rule_id', 'cleared_at'),
+    )
+
+class AnomalyCheckpoint(db.Model):
+    """異常検知の基準値（設備 × データ項目の EWMA 平均・分散）のチェックポイント"""
+    __tablename__ = 'anomaly_checkpoints'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    metric = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)    # 基準に反映したサンプル数
+    mean = db.Column(db.Float)
+    variance = db.Column(db.Float)
+    last_timestamp = db.Column(db.DateTime)                      # 最後に反映したサンプルの時刻
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('equipment_id', 'metric', name='uq_anomaly_checkpoints_equipment_metric'),)
+
+class AnomalyScore(db.Model):
+    """異常スコアの1分集計テーブル"""
+    __tablename__ = 'anomaly_scores'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    metric = db.Column(db.String(50), nullable=False)
+    minute = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer)          # スコア対象のサンプル数
+    anomalies = db.Column(db.Integer)        # |z| がしきい値以上のサンプル数
+    score_max = db.Column(db.Float)          # 最大 |z|
+    score_avg = db.Column(db.Float)          # 平均 |z|
+    baseline_mean = db.Column(db.Float)      # 分の終わりの基準（EWMA）平均
+    baseline_std = db.Column(db.Float)       # 分の終わりの基準（EWMA）標準偏差
+
+    __table_args__ = (db.UniqueConstraint('equipment_id', 'metric', 'minute', name='uq_anomaly_scores_equipment_metric_minute'),)
+
+class ProductionHourlySummary(db.Model):
+    """生産数・稼働時間の時間別集計テーブル（取込み時に逐次集計）"""
+    __tablename__ = 'production_hourly'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)
+    production = db.Column(db.Integer, default=0)        # 生産数（カウンターの増分の合計）
+    resets = db.Column(db.Integer, default=0)            # カウンターのリセット回数
+    samples = db.Column(db.Integer, default=0)           # 受信サンプル数
+    covered_seconds = db.Column(db.Float, default=0.0)   # サンプルがあった時間（欠測を除く）
+    error_seconds = db.Column(db.Float, default=0.0)     # うち error_code が 0 以外の時間
+    last_count = db.Column(db.Integer)                   # 保存時点の直前のカウンター値（再起動後の復元用）
+    last_timestamp = db.Column(db.DateTime)
+    last_error_code = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('equipment_id', 'hour', name='uq_production_hourly_equipment_hour'),)
+
+class SampleStats(db.Model):
+    """受信サンプルの15分集計（圧縮で logs に保存しなかったサンプルを含む。日次・シフト別集計の元データ）"""
+    __tablename__ = 'sample_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)          # 15分の開始（UTC）
+    data_count = db.Column(db.Integer)                      # 受信サンプル数
+    error_count = db.Column(db.Integer)                     # error_code が 0 より大きいサンプル数
+    production_count_max = db.Column(db.Integer)            # 生産数の最大値
+
+    # データ項目ごとの件数・合計・最小・最大（平均 = 合計 ÷ 件数）
+    current_count = db.Column(db.Integer)
+    current_sum = db.Column(db.Float)
+    current_min = db.Column(db.Float)
+    current_max = db.Column(db.Float)
+    temperature_count = db.Column(db.Integer)
+    temperature_sum = db.Column(db.Float)
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    pressure_count = db.Column(db.Integer)
+    pressure_sum = db.Column(db.Float)
+    pressure_min = db.Column(db.Float)
+    pressure_max = db.Column(db.Float)
+    cycle_time_count = db.Column(db.Integer)
+    cycle_time_sum = db.Column(db.Float)
+    cycle_time_min = db.Column(db.Float)
+    cycle_time_max = db.Column(db.Float)
+    current_sketch = db.Column(db.LargeBinary)              # 電流の分位点スケッチ（DDSketch）
+    cycle_time_sketch = db.Column(db.LargeBinary)           # サイクルタイムの分位点スケッチ（DDSketch）
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('equipment_id', 'bucket', name='uq_sample_stats_equipment_bucket'),
+        db.Index('idx_sample_stats_bucket', 'bucket'),
+    )
 
 class DailyLogSummary(db.Model):
     """日次集計ログテーブル"""
@@ -99,6 +275,8 @@ class DailyLogSummary(db.Model):
     cycle_time_avg = db.Column(db.Float)                # 平均サイクルタイム
     error_count = db.Column(db.Integer)                 # エラー発生回数
     data_count = db.Column(db.Integer)                  # 元データ件数
+    current_sketch = db.Column(db.LargeBinary)          # 電流の分位点スケッチ（DDSketch）
+    cycle_time_sketch = db.Column(db.LargeBinary)       # サイクルタイムの分位点スケッチ（DDSketch）
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -107,7 +285,8 @@ class DailyLogSummary(db.Model):
     
     def __init__(self, equipment_id, date, production_count_total=None, current_avg=None, current_max=None, current_min=None,
                  temperature_avg=None, temperature_max=None, temperature_min=None, pressure_avg=None, pressure_max=None,
-                 pressure_min=None, cycle_time_avg=None, error_count=None, data_count=None):
+                 pressure_min=None, cycle_time_avg=None, error_count=None, data_count=None, current_sketch=None,
+                 cycle_time_sketch=None):
         self.equipment_id = equipment_id
         self.date = date
         self.production_count_total = production_count_total
@@ -123,6 +302,42 @@ class DailyLogSummary(db.Model):
         self.cycle_time_avg = cycle_time_avg
         self.error_count = error_count
         self.data_count = data_count
+        self.current_sketch = current_sketch
+        self.cycle_time_sketch = cycle_time_sketch
+
+class ShiftLogSummary(db.Model):
+    """シフト別集計ログテーブル（工場の現地時刻のシフトで区切った日次集計と同じ項目）"""
+    __tablename__ = 'shift_log_summaries'
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipments.id'), nullable=False)
+    shift_date = db.Column(db.Date, nullable=False)     # シフトが始まった現地日付
+    shift = db.Column(db.String(20), nullable=False)    # シフト名
+    start_at = db.Column(db.DateTime, nullable=False)   # シフトの開始（UTC）
+    end_at = db.Column(db.DateTime, nullable=False)     # シフトの終了（UTC）
+
+    # 統計データ（DailyLogSummary と同じ）
+    production_count_total = db.Column(db.Integer)
+    current_avg = db.Column(db.Float)
+    current_max = db.Column(db.Float)
+    current_min = db.Column(db.Float)
+    temperature_avg = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    temperature_min = db.Column(db.Float)
+    pressure_avg = db.Column(db.Float)
+    pressure_max = db.Column(db.Float)
+    pressure_min = db.Column(db.Float)
+    cycle_time_avg = db.Column(db.Float)
+    error_count = db.Column(db.Integer)
+    data_count = db.Column(db.Integer)
+    current_sketch = db.Column(db.LargeBinary)
+    cycle_time_sketch = db.Column(db.LargeBinary)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('equipment_id', 'shift_date', 'shift', name='uq_shift_log_summaries_equipment_date_shift'),
+        db.Index('idx_shift_log_summaries_end_at', 'end_at'),
+    )
 
 class MonthlyLogSummary(db.Model):
     """月次集計ログテーブル"""
@@ -144,6 +359,9 @@ class MonthlyLogSummary(db.Model):
     cycle_time_avg = db.Column(db.Float)
     error_count_total = db.Column(db.Integer)
     operational_days = db.Column(db.Integer)            # 稼働日数
+    data_count = db.Column(db.Integer)                  # 元データ件数（日次集計の合計）
+    current_sketch = db.Column(db.LargeBinary)          # 日次スケッチの結合
+    cycle_time_sketch = db.Column(db.LargeBinary)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -152,7 +370,8 @@ class MonthlyLogSummary(db.Model):
     
     def __init__(self, equipment_id, year, month, production_count_total=None, current_avg=None, current_max=None, 
                  current_min=None, temperature_avg=None, temperature_max=None, temperature_min=None, pressure_avg=None,
-                 cycle_time_avg=None, error_count_total=None, operational_days=None):
+                 cycle_time_avg=None, error_count_total=None, operational_days=None, data_count=None,
+                 current_sketch=None, cycle_time_sketch=None):
         self.equipment_id = equipment_id
         self.year = year
         self.month = month
@@ -167,6 +386,9 @@ class MonthlyLogSummary(db.Model):
         self.cycle_time_avg = cycle_time_avg
         self.error_count_total = error_count_total
         self.operational_days = operational_days
+        self.data_count = data_count
+        self.current_sketch = current_sketch
+        self.cycle_time_sketch = cycle_time_sketch
 
 # データ型定数
 class DataTypes:
@@ -204,11 +426,13 @@ class PLCDataTypes:
     BIT = "bit"
     WORD = "word"
     DWORD = "dword"
+    INT16 = "int16"
+    INT32 = "int32"
     FLOAT32 = "float32"
     
     @classmethod
     def get_all(cls):
-        return [cls.BIT, cls.WORD, cls.DWORD, cls.FLOAT32]
+        return [cls.BIT, cls.WORD, cls.DWORD, cls.INT16, cls.INT32, cls.FLOAT32]
     
     @classmethod
     def get_display_names(cls):
@@ -216,6 +440,8 @@ class PLCDataTypes:
             cls.BIT: "Bit",
             cls.WORD: "Word (16bit)",
             cls.DWORD: "DWord (32bit)",
+            cls.INT16: "Int16 (符号付き16bit)",
+            cls.INT32: "Int32 (符号付き32bit)",
             cls.FLOAT32: "Float32"
         }
 
@@ -0,0 +1,181 @@
+"""
+SQLクエリ計測
+SQLAlchemy のエンジンイベントでリクエスト・バックグラウンドジョブ単位に
+クエリ数とDB時間を集計し、以下を検出します。
+
+- 閾値を超えたスロークエリ（バインドパラメータ付きでログ出力）
+- 1単位内で同じ形のステートメントが繰り返される N+1 パターン
+
+開発時はレスポンスヘッダー（X-DB-Queries など）、本番では /metrics で確認できます。
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import re
+import time
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.metrics import COUNT_BUCKETS, HTTP_REQUEST_DB_DURATION, JOB_DURATION, registry
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# 同じ形のステートメントがこの回数以上実行されたら N+1 として報告
+REPEATED_QUERY_THRESHOLD = int(os.getenv("REPEATED_QUERY_THRESHOLD", "10"))
+# ログに出すパラメータ・ステートメントの最大文字数
+MAX_LOGGED_LENGTH = 500
+
+HTTP_REQUEST_DB_QUERIES = registry.histogram(
+    "plc_http_request_db_queries", "SQL statements executed per HTTP request by Flask endpoint",
+    ("endpoint",), COUNT_BUCKETS)
+JOB_DB_QUERIES = registry.histogram(
+    "plc_job_db_queries", "SQL statements executed per background job run", ("job",), COUNT_BUCKETS)
+JOB_DB_DURATION = registry.histogram(
+    "plc_job_db_seconds", "Database time spent per background job run", ("job",), JOB_DURATION.buckets)
+SLOW_QUERIES = registry.counter(
+    "plc_db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("source",))
+REPEATED_QUERIES = registry.counter(
+    "plc_db_repeated_query_shapes_total", "Statement shapes repeated within one request or job (N+1)",
+    ("source",))
+
+_current = contextvars.ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) / IN (%(p_1)s, ...) など件数で変わる部分をまとめる
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+def statement_shape(statement):
+    """パラメータ数の違いを無視したステートメントの形"""
+    return _PARAM_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _truncate(value):
+    text = repr(value) if not isinstance(value, str) else value
+    return text if len(text) <= MAX_LOGGED_LENGTH else text[:MAX_LOGGED_LENGTH] + "..."
+
+
+class QueryStats:
+    """1リクエスト・1ジョブ分のクエリ集計"""
+
+    __slots__ = ("source", "count", "seconds", "shapes", "slow_count")
+
+    def __init__(self, source):
+        self.source = source
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.slow_count = 0
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold=REPEATED_QUERY_THRESHOLD):
+        """閾値以上繰り返されたステートメントの形と回数 [(shape, count), ...]"""
+        merged = {}
+        for statement, count in self.shapes.items():
+            shape = statement_shape(statement)
+            merged[shape] = merged.get(shape, 0) + count
+        return sorted(
+            ((shape, count) for shape, count in merged.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def report(self):
+        """N+1 の検出結果をログ出力してメトリクスに記録"""
+        repeated = self.repeated()
+        if repeated:
+            REPEATED_QUERIES.labels(self.source).inc(len(repeated))
+            for shape, count in repeated:
+                logger.warning("⚠️ N+1の可能性: %s で同じ形のクエリを%s回実行: %s",
+                               self.source, count, _truncate(shape),
+                               extra={"source": self.source, "repeat_count": count})
+        return repeated
+
+
+def current_query_stats():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def track_queries(source):
+    """ブロック（またはデコレートした関数）内のクエリを集計"""
+    stats = QueryStats(source)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        stats.report()
+        JOB_DB_QUERIES.labels(source).observe(stats.count)
+        JOB_DB_DURATION.labels(source).observe(stats.seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_stack = conn.info.get("query_started")
+    if not started_stack:
+        return
+    elapsed = time.perf_counter() - started_stack.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        source = stats.source if stats is not None else "unknown"
+        SLOW_QUERIES.labels(source).inc()
+        if stats is not None:
+            stats.slow_count += 1
+        logger.warning("🐢 スロークエリ (%.1fms, %s): %s パラメータ: %s",
+                       elapsed * 1000, source, _truncate(statement), _truncate(parameters),
+                       extra={"source": source, "duration_ms": round(elapsed * 1000, 3)})
+
+
+def init_query_stats(app):
+    """エンジンイベントとリクエスト単位の集計フックを登録"""
+    if os.getenv("QUERY_STATS_ENABLED", "true").lower() in ("0", "false", "no"):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    # 開発時（デバッグモード）またはQUERY_STATS_HEADERS=trueでレスポンスヘッダーに出力
+    headers_enabled = os.getenv("QUERY_STATS_HEADERS", "").lower() in ("1", "true", "yes")
+
+    @app.before_request
+    def _start_query_stats():
+        stats = QueryStats(request.endpoint or "unmatched")
+        g._query_stats_token = _current.set(stats)
+
+    @app.after_request
+    def _finish_query_stats(response):
+        stats = _current.get()
+        if stats is None or "_query_stats_token" not in g:
+            return response
+        repeated = stats.report()
+        HTTP_REQUEST_DB_DURATION.labels(stats.source).observe(stats.seconds)
+        HTTP_REQUEST_DB_QUERIES.labels(stats.source).observe(stats.count)
+        if headers_enabled or app.debug:
+            response.headers["X-DB-Queries"] = str(stats.count)
+            response.headers["X-DB-Time-ms"] = f"{stats.seconds * 1000:.2f}"
+            response.headers["X-DB-Slow-Queries"] = str(stats.slow_count)
+            if repeated:
+                response.headers["X-DB-Repeated-Queries"] = ", ".join(str(count) for _, count in repeated)
+        return response
+
+    @app.teardown_request
+    def _reset_query_stats(exc):
+        token = g.pop("_query_stats_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,441 @@
+"""
+読み取り専用クエリ
+履歴・集計の読み出しは必要な列だけを SELECT してタプルのまま受け取り、
+ORM インスタンスの生成やアイデンティティマップへの登録を行いません。
+結果は行形式（dict のリスト）または列形式（列名 → 値のリスト）に変換して返します。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Integer, and_, case, cast, func, select
+
+from backend.db import db
+from backend.db.models import (
+    AnomalyScore, DailyLogSummary, DataTypes, Equipment, Log, PLCDataConfig, ProductionHourlySummary, SampleStats,
+    ShiftLogSummary, TagValue,
+)
+
+# 履歴APIで返すログの列（出力名 → 列）
+LOG_HISTORY_COLUMNS = {
+    "timestamp": Log.timestamp,
+    "production_count": Log.production_count,
+    "current": Log.current,
+    "temperature": Log.temperature,
+    "pressure": Log.pressure,
+    "cycle_time": Log.cycle_time,
+    "error_code": Log.error_code,
+}
+
+# 履歴API（7d/30d）で返す日次集計の列
+DAILY_SUMMARY_COLUMNS = {
+    "date": DailyLogSummary.date,
+    "production_count": DailyLogSummary.production_count_total,
+    "current_avg": DailyLogSummary.current_avg,
+    "current_max": DailyLogSummary.current_max,
+    "current_min": DailyLogSummary.current_min,
+    "temperature_avg": DailyLogSummary.temperature_avg,
+    "temperature_max": DailyLogSummary.temperature_max,
+    "temperature_min": DailyLogSummary.temperature_min,
+    "pressure_avg": DailyLogSummary.pressure_avg,
+    "error_count": DailyLogSummary.error_count,
+    "data_count": DailyLogSummary.data_count,
+}
+
+# シフト別集計の列
+SHIFT_SUMMARY_COLUMNS = {
+    "shift_date": ShiftLogSummary.shift_date,
+    "shift": ShiftLogSummary.shift,
+    "start_at": ShiftLogSummary.start_at,
+    "end_at": ShiftLogSummary.end_at,
+    "production_count": ShiftLogSummary.production_count_total,
+    "current_avg": ShiftLogSummary.current_avg,
+    "current_max": ShiftLogSummary.current_max,
+    "current_min": ShiftLogSummary.current_min,
+    "temperature_avg": ShiftLogSummary.temperature_avg,
+    "temperature_max": ShiftLogSummary.temperature_max,
+    "temperature_min": ShiftLogSummary.temperature_min,
+    "pressure_avg": ShiftLogSummary.pressure_avg,
+    "cycle_time_avg": ShiftLogSummary.cycle_time_avg,
+    "error_count": ShiftLogSummary.error_count,
+    "data_count": ShiftLogSummary.data_count,
+}
+
+# 複数設備の履歴（POST /api/logs/history/bulk）で使うデータ項目 → 時間幅ごとの集約
+# 詳細ログ・日次集計のどちらから返す場合も同じ意味になるように集約する
+#   max:   生産カウンターの最大値（読み値。時間幅の生産数ではない）
+#   avg:   平均（日次集計・15分集計は件数で重み付け）
+#   count: error_code が 0 より大きいサンプル数
+BULK_HISTORY_METRICS = {
+    "production_count": "max",
+    "current": "avg",
+    "temperature": "avg",
+    "pressure": "avg",
+    "cycle_time": "avg",
+    "error_count": "count",
+}
+
+# タグ別時系列の列
+TAG_SERIES_FIELDS = ("timestamp", "value")
+
+# 異常スコアの1分集計の列
+ANOMALY_SCORE_COLUMNS = {
+    "minute": AnomalyScore.minute,
+    "samples": AnomalyScore.samples,
+    "anomalies": AnomalyScore.anomalies,
+    "score_max": AnomalyScore.score_max,
+    "score_avg": AnomalyScore.score_avg,
+    "baseline_mean": AnomalyScore.baseline_mean,
+    "baseline_std": AnomalyScore.baseline_std,
+}
+
+# 生産数の時間別集計の列
+PRODUCTION_HOURLY_COLUMNS = {
+    "hour": ProductionHourlySummary.hour,
+    "production": ProductionHourlySummary.production,
+    "resets": ProductionHourlySummary.resets,
+    "covered_seconds": ProductionHourlySummary.covered_seconds,
+    "error_seconds": ProductionHourlySummary.error_seconds,
+}
+
+LAYOUTS = ("records", "columnar")
+
+
+def _labeled(columns):
+    return [column.label(name) for name, column in columns.items()]
+
+
+def find_equipment_pk(equipment_id):
+    """設備ID（文字列）から内部IDを取得（見つからなければ None）"""
+    return db.session.execute(
+        select(Equipment.id).where(Equipment.equipment_id == equipment_id)
+    ).scalar()
+
+
+def fetch_log_history(equipment_pk, limit, since=None):
+    """ログ履歴を新しい順にタプルで取得（since 指定時は期間内をタイムスタンプ順）"""
+    stmt = select(*_labeled(LOG_HISTORY_COLUMNS)).where(Log.equipment_id == equipment_pk)
+    if since is not None:
+        stmt = stmt.where(Log.timestamp >= since).order_by(Log.timestamp.desc())
+    else:
+        stmt = stmt.order_by(Log.id.desc())
+    return db.session.execute(stmt.limit(limit)).all()
+
+
+def fetch_latest_log(equipment_pk):
+    """最新のログ1件（なければ None）"""
+    return db.session.execute(
+        select(*_labeled(LOG_HISTORY_COLUMNS))
+        .where(Log.equipment_id == equipment_pk)
+        .order_by(Log.id.desc())
+        .limit(1)
+    ).first()
+
+
+# 設備一覧（フリート概要）で使う設備の列
+FLEET_EQUIPMENT_COLUMNS = {
+    "equipment_pk": Equipment.id,
+    "equipment_id": Equipment.equipment_id,
+    "manufacturer": Equipment.manufacturer,
+    "series": Equipment.series,
+    "interval": Equipment.interval,
+    "status": Equipment.status,
+}
+
+
+def fetch_fleet_equipments():
+    """全設備のフリート概要用の列"""
+    return db.session.execute(select(*_labeled(FLEET_EQUIPMENT_COLUMNS))).all()
+
+
+def fetch_fleet_latest_logs():
+    """設備ごとの最新のログ（設備ごとに (equipment_id, timestamp) のインデックスで最大時刻を引く）"""
+    latest = (
+        select(func.max(Log.timestamp)).where(Log.equipment_id == Equipment.id).correlate(Equipment).scalar_subquery()
+    )
+    return db.session.execute(
+        select(Equipment.id.label("equipment_pk"), *_labeled(LOG_HISTORY_COLUMNS))
+        .join(Log, and_(Log.equipment_id == Equipment.id, Log.timestamp == latest))
+    ).all()
+
+
+def configured_tags(equipment_pk):
+    """設備に設定済みの data_type（固定列・汎用タグの両方）"""
+    return db.session.execute(
+        select(PLCDataConfig.data_type).where(PLCDataConfig.equipment_id == equipment_pk)
+    ).scalars().all()
+
+
+def fetch_tag_series(equipment_pk, tag, limit, since=None):
+    """1タグの時系列 (timestamp, value) を新しい順に取得
+    固定列の data_type は logs から、それ以外は tag_values から読み出す"""
+    if tag in DataTypes.get_all():
+        column, timestamp = LOG_HISTORY_COLUMNS[tag], Log.timestamp
+        stmt = select(timestamp, column).where(Log.equipment_id == equipment_pk, column.isnot(None))
+    else:
+        timestamp = TagValue.timestamp
+        stmt = select(timestamp, TagValue.value).where(
+            TagValue.equipment_id == equipment_pk, TagValue.tag == tag
+        )
+    if since is not None:
+        stmt = stmt.where(timestamp >= since)
+    return db.session.execute(stmt.order_by(timestamp.desc()).limit(limit)).all()
+
+
+def fetch_anomaly_scores(equipment_pk, metric, limit, since=None):
+    """1データ項目の異常スコアの1分集計を新しい順にタプルで取得"""
+    stmt = select(*_labeled(ANOMALY_SCORE_COLUMNS)).where(
+        AnomalyScore.equipment_id == equipment_pk, AnomalyScore.metric == metric
+    )
+    if since is not None:
+        stmt = stmt.where(AnomalyScore.minute >= since)
+    return db.session.execute(stmt.order_by(AnomalyScore.minute.desc()).limit(limit)).all()
+
+
+def fetch_production_hourly(equipment_pk, since):
+    """since 以降の生産数の時間別集計を古い順にタプルで取得"""
+    return db.session.execute(
+        select(*_labeled(PRODUCTION_HOURLY_COLUMNS))
+        .where(ProductionHourlySummary.equipment_id == equipment_pk, ProductionHourlySummary.hour >= since)
+        .order_by(ProductionHourlySummary.hour)
+    ).all()
+
+
+def production_totals(since, equipment_pk=None):
+    """since 以降の生産数・稼働時間を設備ごとに合計（設備ID・理論サイクルタイム付き）"""
+    stmt = (
+        select(
+            Equipment.equipment_id,
+            Equipment.ideal_cycle_time,
+            func.coalesce(func.sum(ProductionHourlySummary.production), 0).label("production"),
+            func.coalesce(func.sum(ProductionHourlySummary.covered_seconds), 0).label("covered_seconds"),
+            func.coalesce(func.sum(ProductionHourlySummary.error_seconds), 0).label("error_seconds"),
+        )
+        .join(Equipment, Equipment.id == ProductionHourlySummary.equipment_id)
+        .where(ProductionHourlySummary.hour >= since)
+        .group_by(Equipment.equipment_id, Equipment.ideal_cycle_time)
+    )
+    if equipment_pk is not None:
+        stmt = stmt.where(ProductionHourlySummary.equipment_id == equipment_pk)
+    return db.session.execute(stmt).all()
+
+
+def fetch_daily_summaries(equipment_pk, start_date):
+    """start_date 以降の日次集計を新しい順にタプルで取得"""
+    return db.session.execute(
+        select(*_labeled(DAILY_SUMMARY_COLUMNS))
+        .where(DailyLogSummary.equipment_id == equipment_pk, DailyLogSummary.date >= start_date)
+        .order_by(DailyLogSummary.date.desc())
+    ).all()
+
+
+def fetch_shift_summaries(equipment_pk, start_date, end_date, shift=None):
+    """シフトの日付が start_date〜end_date のシフト別集計を新しい順にタプルで取得"""
+    stmt = select(*_labeled(SHIFT_SUMMARY_COLUMNS)).where(
+        ShiftLogSummary.equipment_id == equipment_pk,
+        ShiftLogSummary.shift_date >= start_date,
+        ShiftLogSummary.shift_date <= end_date,
+    )
+    if shift:
+        stmt = stmt.where(ShiftLogSummary.shift == shift)
+    return db.session.execute(stmt.order_by(ShiftLogSummary.start_at.desc())).all()
+
+
+def _bucket_index(column, start, bucket_seconds):
+    """start からの経過秒 / bucket_seconds の整数部"""
+    origin = start.replace(tzinfo=timezone.utc).timestamp()
+    if db.engine.dialect.name == "sqlite":
+        # julianday の換算は丸め誤差で境界の値が前の幅に入るため、整数秒（時間幅は1秒以上）で計算
+        # start 以降の行だけなので CAST の切り捨てで足りる
+        return cast((cast(func.strftime("%s", column), Integer) - origin) / bucket_seconds, Integer)
+    return cast(func.floor((func.extract("epoch", column) - origin) / bucket_seconds), Integer)
+
+
+def _log_history_column(metric):
+    kind = BULK_HISTORY_METRICS[metric]
+    if kind == "max":
+        return func.max(getattr(Log, metric))
+    if kind == "count":
+        return func.coalesce(func.sum(case((Log.error_code > 0, 1), else_=0)), 0)
+    return func.avg(getattr(Log, metric))
+
+
+def fetch_bucketed_history(equipment_pks, metrics, start, end, bucket_seconds):
+    """複数設備のログを bucket_seconds 秒幅で集約し (equipment_id, 幅の番号, 値...) を設備・時刻順に取得（1クエリ）"""
+    bucket = _bucket_index(Log.timestamp, start, bucket_seconds).label("bucket")
+    return db.session.execute(
+        select(Log.equipment_id, bucket, *[_log_history_column(metric).label(metric) for metric in metrics])
+        .where(Log.equipment_id.in_(equipment_pks), Log.timestamp >= start, Log.timestamp < end)
+        .group_by(Log.equipment_id, bucket)
+        .order_by(Log.equipment_id, bucket)
+    ).all()
+
+
+def _daily_history_columns(metric):
+    """日次集計の1項目を時間幅ごとに集約する列（平均は (重み付き合計, 重み)）"""
+    kind = BULK_HISTORY_METRICS[metric]
+    if kind == "max":
+        return [func.max(DailyLogSummary.production_count_total)]
+    if kind == "count":
+        return [func.sum(DailyLogSummary.error_count)]
+    column = getattr(DailyLogSummary, f"{metric}_avg")
+    # 件数のない古い行は1件として数える
+    weight = case((column.isnot(None), func.coalesce(DailyLogSummary.data_count, 1)), else_=0)
+    return [func.sum(column * weight), func.sum(weight)]
+
+
+def _stats_history_columns(metric):
+    """受信サンプルの15分集計の1項目を時間幅ごとに集約する列（平均は (合計, 件数)）"""
+    kind = BULK_HISTORY_METRICS[metric]
+    if kind == "max":
+        return [func.max(SampleStats.production_count_max)]
+    if kind == "count":
+        return [func.sum(SampleStats.error_count)]
+    return [func.sum(getattr(SampleStats, f"{metric}_sum")), func.sum(getattr(SampleStats, f"{metric}_count"))]
+
+
+def fetch_summary_history(equipment_pks, metrics, origin, end, bucket_seconds):
+    """複数設備の日次集計を bucket_seconds 秒幅（日の倍数）で集約し (equipment_id, 幅の番号, 値...) を設備・時刻順に返す
+
+    日次集計がまだない日（当日など）は受信サンプルの15分集計から同じ意味の値を求めて合算する。
+    origin は UTC の0時。
+    """
+    last_day = db.session.execute(
+        select(func.max(DailyLogSummary.date))
+        .where(DailyLogSummary.equipment_id.in_(equipment_pks),
+               DailyLogSummary.date >= origin.date(), DailyLogSummary.date <= end.date())
+    ).scalar()
+    cutoff = datetime.combine(last_day + timedelta(days=1), datetime.min.time()) if last_day else origin
+
+    parts = []
+    if last_day:
+        bucket = _bucket_index(DailyLogSummary.date, origin, bucket_seconds).label("bucket")
+        parts.append(db.session.execute(
+            select(DailyLogSummary.equipment_id, bucket,
+                   *[column for metric in metrics for column in _daily_history_columns(metric)])
+            .where(DailyLogSummary.equipment_id.in_(equipment_pks),
+                   DailyLogSummary.date >= origin.date(), DailyLogSummary.date <= last_day)
+            .group_by(DailyLogSummary.equipment_id, bucket)
+        ).all())
+    if cutoff < end:
+        bucket = _bucket_index(SampleStats.bucket, origin, bucket_seconds).label("bucket")
+        parts.append(db.session.execute(
+            select(SampleStats.equipment_id, bucket,
+                   *[column for metric in metrics for column in _stats_history_columns(metric)])
+            .where(SampleStats.equipment_id.in_(equipment_pks), SampleStats.bucket >= cutoff,
+                   SampleStats.bucket < end)
+            .group_by(SampleStats.equipment_id, bucket)
+        ).all())
+
+    # 時間幅が日次集計と15分集計にまたがる場合は合算
+    merged = {}
+    for rows in parts:
+        for equipment_pk, bucket_index, *values in rows:
+            acc = merged.setdefault((equipment_pk, bucket_index), {})
+            values = iter(values)
+            for metric in metrics:
+                kind = BULK_HISTORY_METRICS[metric]
+                value = next(values)
+                if kind == "avg":
+                    weight = next(values) or 0
+                    total, count = acc.get(metric, (0.0, 0))
+                    acc[metric] = (total + (value or 0.0), count + weight)
+                elif value is not None:
+                    previous = acc.get(metric)
+                    if previous is None:
+                        acc[metric] = value
+                    else:
+                        acc[metric] = max(previous, value) if kind == "max" else previous + value
+    result = []
+    for (equipment_pk, bucket_index), acc in sorted(merged.items()):
+        values = []
+        for metric in metrics:
+            value = acc.get(metric)
+            if BULK_HISTORY_METRICS[metric] == "avg":
+                value = value[0] / value[1] if value and value[1] else None
+            elif value is None and BULK_HISTORY_METRICS[metric] == "count":
+                value = 0
+            values.append(value)
+        result.append((equipment_pk, bucket_index, *values))
+    return result
+
+
+def _stats_avg(metric):
+    """15分集計の合計・件数から求めた平均"""
+    return (func.sum(getattr(SampleStats, f"{metric}_sum"))
+            / func.nullif(func.sum(getattr(SampleStats, f"{metric}_count")), 0))
+
+
+def sample_stats_aggregates(start, end):
+    """期間 [start, end) の受信サンプルの15分集計を設備ごとに集計（日次・シフト別集計の元データ）
+
+    圧縮で logs に保存しなかったサンプルも含むため、平均・件数は受信した全サンプルから求まる。
+    start / end は15分単位であること。
+    """
+    return db.session.execute(
+        select(
+            SampleStats.equipment_id,
+            func.coalesce(func.max(SampleStats.production_count_max), 0).label("production_count_total"),
+            _stats_avg(DataTypes.CURRENT).label("current_avg"),
+            func.max(SampleStats.current_max).label("current_max"),
+            func.min(SampleStats.current_min).label("current_min"),
+            _stats_avg(DataTypes.TEMPERATURE).label("temperature_avg"),
+            func.max(SampleStats.temperature_max).label("temperature_max"),
+            func.min(SampleStats.temperature_min).label("temperature_min"),
+            _stats_avg(DataTypes.PRESSURE).label("pressure_avg"),
+            func.max(SampleStats.pressure_max).label("pressure_max"),
+            func.min(SampleStats.pressure_min).label("pressure_min"),
+            _stats_avg(DataTypes.CYCLE_TIME).label("cycle_time_avg"),
+            func.coalesce(func.sum(SampleStats.error_count), 0).label("error_count"),
+            func.sum(SampleStats.data_count).label("data_count"),
+        )
+        .where(SampleStats.bucket >= start, SampleStats.bucket < end)
+        .group_by(SampleStats.equipment_id)
+    ).all()
+
+
+def _weighted_daily_avg(column):
+    """日次平均を元データ件数で重み付けした平均（件数のない古い行だけなら単純平均）"""
+    weight = case((column.isnot(None), DailyLogSummary.data_count), else_=0)
+    weighted = func.sum(column * DailyLogSummary.data_count) / func.nullif(func.sum(weight), 0)
+    return func.coalesce(weighted, func.avg(column))
+
+
+def monthly_summary_aggregates(start_date, end_date):
+    """期間内の日次集計を設備ごとに集計（月次集計の元データ）"""
+    return db.session.execute(
+        select(
+            DailyLogSummary.equipment_id,
+            func.coalesce(func.max(DailyLogSummary.production_count_total), 0).label("production_count_total"),
+            _weighted_daily_avg(DailyLogSummary.current_avg).label("current_avg"),
+            func.max(DailyLogSummary.current_max).label("current_max"),
+            func.min(DailyLogSummary.current_min).label("current_min"),
+            _weighted_daily_avg(DailyLogSummary.temperature_avg).label("temperature_avg"),
+            func.max(DailyLogSummary.temperature_max).label("temperature_max"),
+            func.min(DailyLogSummary.temperature_min).label("temperature_min"),
+            _weighted_daily_avg(DailyLogSummary.pressure_avg).label("pressure_avg"),
+            _weighted_daily_avg(DailyLogSummary.cycle_time_avg).label("cycle_time_avg"),
+            func.coalesce(func.sum(DailyLogSummary.error_count), 0).label("error_count_total"),
+            func.count().label("operational_days"),
+            func.sum(DailyLogSummary.data_count).label("data_count"),
+        )
+        .where(DailyLogSummary.date >= start_date, DailyLogSummary.date <= end_date)
+        .group_by(DailyLogSummary.equipment_id)
+    ).all()
+
+
+def to_records(fields, rows):
+    """行形式: [{列名: 値, ...}, ...]"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def to_columnar(fields, rows):
+    """列形式: {列名: [値, ...], ...}（キーが1回しか出現しないため転送量が小さい）"""
+    if not rows:
+        return {field: [] for field in fields}
+    return {field: list(values) for field, values in zip(fields, zip(*rows))}
+
+
+def shape_rows(fields, rows, layout="records"):
+    if layout == "columnar":
+        return to_columnar(fields, rows)
+    return to_records(fields, rows)
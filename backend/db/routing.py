@@ -0,0 +1,201 @@
+"""
+読み取りレプリカへの振り分け
+DATABASE_REPLICA_URLS にレプリカ（PostgreSQL のストリーミングレプリケーション）を
+設定すると、履歴・集計などの読み取り専用の処理をレプリカで実行し、
+取込み（INSERT）などの書き込みはプライマリ（DATABASE_URL）に残します。
+
+- 振り分けは replica_reads() の範囲（または @read_replica を付けたAPI）の SELECT だけ
+  （INSERT / UPDATE / DELETE と flush は範囲内でも常にプライマリ）
+- 定期的に接続と遅延（最後に受信した WAL の適用までの秒数）を確認し、
+  応答しない・遅延が REPLICA_MAX_LAG_SECONDS を超えたレプリカは使わない
+- 使えるレプリカがない場合はプライマリで実行
+- レプリカ未設定（SQLite を含む）では何もしない
+
+環境変数:
+    DATABASE_REPLICA_URLS    レプリカの接続URL（カンマ区切り）
+    REPLICA_MAX_LAG_SECONDS  使用する遅延の上限（秒）
+    REPLICA_CHECK_SECONDS    接続・遅延の確認間隔（秒）
+"""
+
+import contextlib
+import contextvars
+import functools
+import itertools
+import logging
+import os
+import threading
+import time
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+
+from backend.db.workloads import current_engine
+from backend.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_SECONDS = int(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+
+# 受信済みの WAL をすべて適用済みなら 0（プライマリに更新がない間も遅延扱いにしない）
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+REPLICA_LAG = registry.gauge(
+    "plc_db_replica_lag_seconds", "Replay lag of each read replica (-1 while unreachable)", ("replica",))
+ROUTED_READS = registry.counter(
+    "plc_db_routed_reads_total", "Read-only scopes by the database they were routed to", ("target",))
+
+# replica_reads() の範囲で SELECT に使うエンジン（None ならプライマリ）
+_read_engine = contextvars.ContextVar("read_engine", default=None)
+
+
+def normalize_database_url(url):
+    """postgresql:// を psycopg2 ドライバー指定の URL にする"""
+    if url and url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    return url
+
+
+class Replica:
+    """1台のレプリカの接続と状態"""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = False
+        self.lag = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(REPLICA_LAG_SQL).scalar()
+            self.lag = float(lag or 0)
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning("⚠️ レプリカ %s に接続できません: %s", self.name, e)
+            self.healthy = False
+            self.lag = None
+        REPLICA_LAG.labels(self.name).set(self.lag if self.lag is not None else -1)
+        return self.healthy
+
+
+class ReplicaRouter:
+    """読み取り先のレプリカを選ぶ（遅延が上限内のものを順番に使用）"""
+
+    def __init__(self, max_lag=REPLICA_MAX_LAG_SECONDS):
+        self.max_lag = max_lag
+        self.replicas = []
+        self._cycle = itertools.count()
+        self._thread = None
+
+    def configure(self, urls, engine_options=None):
+        """レプリカのエンジンを作成（URL が空なら振り分けなし）"""
+        self.dispose()
+        for index, url in enumerate(u.strip() for u in urls if u.strip()):
+            engine = create_engine(normalize_database_url(url), **(engine_options or {}))
+            self.replicas.append(Replica(f"replica{index + 1}", engine))
+        if self.replicas:
+            for replica in self.replicas:
+                replica.check()
+            logger.info("✅ 読み取りレプリカ: %s",
+                        ", ".join(f"{r.name}({'ok' if r.healthy else 'down'})" for r in self.replicas))
+        return self
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+        self.replicas = []
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def pick(self, max_lag=None):
+        """使えるレプリカのエンジン（なければ None = プライマリ）"""
+        limit = self.max_lag if max_lag is None else max_lag
+        candidates = [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= limit]
+        if not candidates:
+            return None
+        return candidates[next(self._cycle) % len(candidates)].engine
+
+    def check_all(self):
+        return sum(replica.check() for replica in self.replicas)
+
+    def status(self):
+        return [
+            {"name": r.name, "healthy": r.healthy, "lag_seconds": r.lag, "url": r.engine.url.render_as_string()}
+            for r in self.replicas
+        ]
+
+    def start(self, interval=REPLICA_CHECK_SECONDS):
+        """接続・遅延の定期確認のスレッドを開始（レプリカ未設定なら何もしない）"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_all()
+                except Exception as e:
+                    logger.exception("❌ レプリカ確認エラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="replica-check", daemon=True)
+        self._thread.start()
+        return self
+
+
+replica_router = ReplicaRouter()
+
+
+@contextlib.contextmanager
+def replica_reads(max_lag=None):
+    """範囲内の SELECT をレプリカで実行（使えるレプリカがなければプライマリ）"""
+    if not replica_router.enabled:
+        yield None
+        return
+    engine = replica_router.pick(max_lag)
+    ROUTED_READS.labels("replica" if engine is not None else "primary").inc()
+    token = _read_engine.set(engine)
+    try:
+        yield engine
+    finally:
+        _read_engine.reset(token)
+
+
+def read_replica(func):
+    """読み取り専用のAPI・ジョブをレプリカで実行するデコレーター"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """replica_reads() の範囲の SELECT はレプリカ、それ以外は現在のワークロードのプールで実行するセッション"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = _read_engine.get()
+            if (engine is not None and not self._flushing
+                    and clause is not None and getattr(clause, "is_select", False)):
+                return engine
+            engine = current_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_replicas(app):
+    """DATABASE_REPLICA_URLS のレプリカを設定し、確認スレッドを開始"""
+    urls = os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    # プールの大きさ・接続待ちの上限は interactive と同じ（接続待ちの計測はプライマリのみ）
+    options = {k: v for k, v in app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items()
+               if k not in ("connect_args", "poolclass")}
+    replica_router.configure(urls, options).start()
+    return replica_router
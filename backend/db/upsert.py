@@ -0,0 +1,61 @@
+"""
+INSERT ... ON CONFLICT（アップサート）
+PostgreSQL / SQLite では1文で挿入と競合時の更新を行います。
+それ以外のデータベースでは None を返すため、呼び出し側で通常の検索・更新に切り替えてください。
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.db import db
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def supports_upsert():
+    return db.engine.dialect.name in _DIALECT_INSERTS
+
+
+def upsert_statement(model, values, index_elements, update_columns=None):
+    """index_elements（一意制約の列）が競合したら update_columns を更新する INSERT 文
+
+    update_columns を省略すると index_elements 以外の全ての値を更新します。
+    """
+    dialect_insert = _DIALECT_INSERTS.get(db.engine.dialect.name)
+    if dialect_insert is None:
+        return None
+    stmt = dialect_insert(model).values(values)
+    if update_columns is None:
+        update_columns = [column for column in values if column not in index_elements]
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+
+
+# upsert_rows で1文にまとめる最大行数（SQLite のバインド変数の上限を超えないよう分割）
+UPSERT_CHUNK_ROWS = 500
+
+
+def upsert_rows(model, rows, index_elements):
+    """行（dict）のリストをアップサート（アップサート非対応のDBは1件ずつ検索して更新）
+
+    同じ一意キーの行を1回の呼び出しに2件以上含めないでください。
+    """
+    if not rows:
+        return
+    update_columns = [column for column in rows[0] if column not in index_elements]
+    if supports_upsert():
+        for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+            db.session.execute(upsert_statement(
+                model, rows[start:start + UPSERT_CHUNK_ROWS], index_elements, update_columns))
+        return
+    for row in rows:
+        existing = model.query.filter_by(**{column: row[column] for column in index_elements}).first()
+        if existing is None:
+            db.session.add(model(**row))
+        else:
+            for column in update_columns:
+                setattr(existing, column, row[column])
@@ -0,0 +1,214 @@
+"""
+処理の種類（ワークロード）ごとの接続プール（バルクヘッド）
+1つのプールを全処理で共有すると、長い集計・30日分の履歴などで接続を使い切り、
+取込み（/api/logs）が接続待ちで止まってサンプルを取りこぼします。
+プライマリへの接続を次の3つのエンジン（プール）に分け、互いの接続を使わないようにします。
+
+- ingest:      取込みAPIと、取込み結果の定期保存（生産数・異常検知・アラーム）
+- interactive: 画面からの参照・設定変更（指定のない処理はすべてこちら）
+- batch:       管理API・日次/月次/シフト集計・クリーンアップ
+
+ワークロードごとにプールの大きさ・接続待ちの上限（秒）・ステートメントタイムアウト
+（PostgreSQL の statement_timeout）を設定できます。接続の使用数・待ち時間は /metrics で確認できます。
+
+環境変数（<NAME> は INGEST / INTERACTIVE / BATCH）:
+    DB_POOL_<NAME>_SIZE               常時保持する接続数
+    DB_POOL_<NAME>_OVERFLOW           一時的に追加できる接続数
+    DB_POOL_<NAME>_TIMEOUT            接続待ちの上限（秒）
+    DB_<NAME>_STATEMENT_TIMEOUT_MS    1ステートメントの実行時間の上限（ミリ秒、0で無制限）
+    DB_WORKLOAD_POOLS                 false でプールを分けない（全処理が interactive）
+"""
+
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import time
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from backend.metrics import DB_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_INGEST = "ingest"
+WORKLOAD_INTERACTIVE = "interactive"
+WORKLOAD_BATCH = "batch"
+WORKLOADS = (WORKLOAD_INGEST, WORKLOAD_INTERACTIVE, WORKLOAD_BATCH)
+
+# ワークロード → (size, overflow, 接続待ち秒, statement_timeout ミリ秒) のデフォルト
+# 取込みは短いステートメントを多数実行するため接続を多めに持ち、待ち・実行時間の上限は短く
+WORKLOAD_POOL_DEFAULTS = {
+    WORKLOAD_INGEST: (10, 5, 5, 5000),
+    WORKLOAD_INTERACTIVE: (5, 5, 10, 30000),
+    WORKLOAD_BATCH: (2, 1, 60, 600000),
+}
+
+POOL_WAIT = registry.histogram(
+    "plc_db_pool_wait_seconds", "Time spent waiting for a pooled connection by workload", ("workload",),
+    DB_BUCKETS + (10.0, 30.0, 60.0))
+POOL_TIMEOUTS = registry.counter(
+    "plc_db_pool_timeouts_total", "Connection checkouts that gave up waiting by workload", ("workload",))
+POOL_CHECKED_OUT = registry.gauge(
+    "plc_db_pool_checked_out", "Connections currently in use by workload", ("workload",))
+POOL_CAPACITY = registry.gauge(
+    "plc_db_pool_capacity", "Maximum connections (size + overflow) by workload", ("workload",))
+
+# 現在の処理のワークロード（None なら interactive）
+_workload = contextvars.ContextVar("workload", default=None)
+
+
+class WorkloadPool:
+    """設定値（環境変数で上書き）"""
+
+    def __init__(self, name):
+        size, overflow, timeout, statement_timeout = WORKLOAD_POOL_DEFAULTS[name]
+        prefix = name.upper()
+        self.name = name
+        self.size = int(os.getenv(f"DB_POOL_{prefix}_SIZE", size))
+        self.overflow = int(os.getenv(f"DB_POOL_{prefix}_OVERFLOW", overflow))
+        self.timeout = float(os.getenv(f"DB_POOL_{prefix}_TIMEOUT", timeout))
+        self.statement_timeout_ms = int(os.getenv(f"DB_{prefix}_STATEMENT_TIMEOUT_MS", statement_timeout))
+
+    def describe(self):
+        return {
+            "size": self.size,
+            "overflow": self.overflow,
+            "timeout": self.timeout,
+            "statement_timeout_ms": self.statement_timeout_ms,
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """接続の取得にかかった時間・タイムアウトを記録する QueuePool（workload はサブクラスで設定）"""
+
+    workload = WORKLOAD_INTERACTIVE
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.labels(self.workload).inc()
+            raise
+        finally:
+            POOL_WAIT.labels(self.workload).observe(time.perf_counter() - started)
+
+
+def _pool_class(workload):
+    return type(f"{workload.capitalize()}QueuePool", (TimedQueuePool,), {"workload": workload})
+
+
+def engine_options(workload, database_url, base_options=None):
+    """ワークロードのエンジン設定（プール・接続待ち・ステートメントタイムアウト）"""
+    pool = WorkloadPool(workload)
+    options = dict(base_options or {})
+    options.update(
+        poolclass=_pool_class(workload),
+        pool_size=pool.size,
+        max_overflow=pool.overflow,
+        pool_timeout=pool.timeout,
+    )
+    connect_args = dict(options.get("connect_args") or {})
+    if database_url.startswith("postgresql") and pool.statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={pool.statement_timeout_ms}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def workloads_supported(database_url):
+    """プールを分けられる接続先か（インメモリ SQLite は接続ごとに別のDBになるため不可）"""
+    if os.getenv("DB_WORKLOAD_POOLS", "true").lower() in ("0", "false", "no"):
+        return False
+    in_memory = ":memory:" in database_url or database_url.rstrip("/") == "sqlite:"
+    return not (database_url.startswith("sqlite") and in_memory)
+
+
+class WorkloadEngines:
+    """ワークロードごとのエンジン（interactive は Flask-SQLAlchemy の既定のエンジン）"""
+
+    def __init__(self):
+        self.engines = {}
+        self.pools = {}
+
+    def configure(self, default_engine, database_url, base_options=None):
+        self.dispose()
+        self.engines[WORKLOAD_INTERACTIVE] = default_engine
+        if not workloads_supported(database_url):
+            return self
+        for workload in (WORKLOAD_INGEST, WORKLOAD_BATCH):
+            self.engines[workload] = create_engine(
+                database_url, **engine_options(workload, database_url, base_options))
+        for workload, engine in self.engines.items():
+            self.pools[workload] = WorkloadPool(workload)
+            POOL_CHECKED_OUT.labels(workload).set_function(
+                lambda engine=engine: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+            POOL_CAPACITY.labels(workload).set(self.pools[workload].size + self.pools[workload].overflow)
+        logger.info("✅ 接続プール: %s", ", ".join(
+            f"{w}(size={p.size}, overflow={p.overflow}, timeout={p.timeout}s)" for w, p in self.pools.items()))
+        return self
+
+    def dispose(self):
+        for workload, engine in self.engines.items():
+            if workload != WORKLOAD_INTERACTIVE:
+                engine.dispose()
+        self.engines = {}
+        self.pools = {}
+
+    def get(self, workload):
+        """ワークロードのエンジン（専用のエンジンがなければ None = 既定のエンジン）"""
+        if workload is None or workload == WORKLOAD_INTERACTIVE:
+            return None
+        return self.engines.get(workload)
+
+    def status(self):
+        if not self.pools:
+            return {}
+        return {
+            workload: dict(self.pools[workload].describe(),
+                           checked_out=engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else None)
+            for workload, engine in self.engines.items()
+        }
+
+
+workload_engines = WorkloadEngines()
+
+
+def current_engine():
+    """現在のワークロードのエンジン（None なら既定のエンジン）"""
+    return workload_engines.get(_workload.get())
+
+
+@contextlib.contextmanager
+def workload(name):
+    """範囲内のDBアクセスをワークロードのプールで実行"""
+    if name not in WORKLOADS:
+        raise ValueError(f"Unknown workload: {name}")
+    token = _workload.set(name)
+    try:
+        yield
+    finally:
+        _workload.reset(token)
+
+
+def use_workload(name):
+    """APIルート・ジョブをワークロードのプールで実行するデコレーター"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with workload(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_workloads(app, db, database_url):
+    """ingest / batch のエンジンを作成（interactive は db.engine）"""
+    base_options = {k: v for k, v in app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items()
+                    if k not in ("poolclass", "pool_size", "max_overflow", "pool_timeout")}
+    with app.app_context():
+        default_engine = db.engine
+    return workload_engines.configure(default_engine, database_url, base_options)
@@ -12,13 +12,26 @@ import json
 from datetime import datetime
 import threading
 import argparse
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class PLCDataSender:
-    def __init__(self, server_url="http://localhost:5000", equipment_id="DEMO_001"):
+    def __init__(self, server_url="http://localhost:5000", equipment_id="DEMO_001", spool_path=None):
         self.server_url = server_url
         self.equipment_id = equipment_id
         self.running = False
         
+        # スプール指定時は一旦ローカルに保存し、バックグラウンドで古い順に再送
+        self.spool = None
+        self.drainer = None
+        if spool_path:
+            from backend.edge.spool import SampleSpool, SpoolDrainer
+            self.spool = SampleSpool(spool_path)
+            self.drainer = SpoolDrainer(self.spool, server_url).start()
+        
         # ベース値
         self.base_values = {
             "production_count": 0,
@@ -83,6 +96,11 @@ class PLCDataSender:
     
     def send_data(self, data):
         """データをサーバーに送信"""
+        if self.spool is not None:
+            self.spool.append(data)
+            self.drainer.notify()
+            return True
+        
         try:
             url = f"{self.server_url}/api/logs"
             headers = {"Content-Type": "application/json"}
@@ -116,6 +134,9 @@ class PLCDataSender:
             print(f"❌ エラー発生: {e}")
         finally:
             self.running = False
+            if self.drainer is not None:
+                self.drainer.stop(timeout=5)
+                print(f"📦 スプール未送信: {self.spool.pending_count()}件")
             print("📊 データ送信終了")
     
     def stop(self):
@@ -165,13 +186,31 @@ def main():
                        help='設備ID (デフォルト: DEMO_001)')
     parser.add_argument('--interval', type=float, default=2.0,
                        help='送信間隔（秒） (デフォルト: 2.0)')
-    parser.add_argument('--mode', choices=['single', 'continuous', 'register'], 
+    parser.add_argument('--mode', choices=['single', 'continuous', 'register', 'load'], 
                        default='continuous',
                        help='動作モード (デフォルト: continuous)')
+    parser.add_argument('--equipments', type=int, default=1000,
+                       help='loadモード: 模擬する設備数 (デフォルト: 1000)')
+    parser.add_argument('--rate', type=float, default=1000.0,
+                       help='loadモード: 目標レート（サンプル/秒） (デフォルト: 1000)')
+    parser.add_argument('--duration', type=float, default=30.0,
+                       help='loadモード: 実行時間（秒） (デフォルト: 30)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                       help='loadモード: 1リクエストあたりのサンプル数 (デフォルト: 1)')
+    parser.add_argument('--spool', default=None,
+                       help='スプールファイルのパス（指定時はサーバー停止中もデータを保持して後で再送）')
     
     args = parser.parse_args()
     
-    sender = PLCDataSender(args.server, args.equipment_id)
+    if args.mode == 'load':
+        # 多数設備の負荷生成（詳細なオプションは backend.benchmarks.load_generator を直接使用）
+        from backend.benchmarks.load_generator import run_load
+        result = run_load(args.server, args.equipments, args.rate, args.duration, args.batch_size)
+        result.pop("_latency_histogram")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    
+    sender = PLCDataSender(args.server, args.equipment_id, spool_path=args.spool)
     
     print("=" * 60)
     print("🏭 PLCデータ送信デモツール")
@@ -0,0 +1,4 @@
+"""
+エッジ（ゲートウェイ）側モジュール
+ラズパイ・ゲートウェイ上で動作するPLCポーリング関連の機能を提供
+"""
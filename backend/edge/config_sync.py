@@ -0,0 +1,117 @@
+"""
+サーバーからの設定取得と変更通知の購読（エッジ側）
+- GET は ETag を保持して If-None-Match を付与（変更がなければ 304 で本文を受け取らない）
+- Socket.IO の /edge 名前空間で config_changed を受け取ったら即座に再取得
+- 接続（再接続）時にサーバーが返す版と手元の版を比較し、切断中の変更も取りこぼさない
+- 通知が届かない場合に備え、長い間隔で条件付き取得も行う
+"""
+
+import threading
+
+import requests
+
+EDGE_NAMESPACE = "/edge"
+
+
+class ConfigSync:
+    """設備ごとのPLCデータ設定を条件付き取得で同期"""
+
+    def __init__(self, server_url, on_change=None, refresh_interval=600.0, session=None):
+        self.server_url = server_url.rstrip("/")
+        self.on_change = on_change          # on_change(equipment_id, configs)
+        self.refresh_interval = refresh_interval
+        self.session = session or requests.Session()
+        self._etags = {}
+        self._bodies = {}
+        self.versions = {}
+        self._client = None
+        self._stop = threading.Event()
+
+    def get_json(self, path):
+        """条件付きGET。(本文, 変更があったか, 応答ヘッダー) を返す
+
+        ヘッダーは呼び出しごとに返す（通知・定期取得のスレッドが並行して呼んでも混ざらない）。
+        """
+        headers = {}
+        if path in self._etags:
+            headers["If-None-Match"] = self._etags[path]
+        response = self.session.get(f"{self.server_url}{path}", headers=headers, timeout=10)
+        if response.status_code == 304:
+            return self._bodies[path], False, response.headers
+        response.raise_for_status()
+        body = response.json()
+        if response.headers.get("ETag"):
+            self._etags[path] = response.headers["ETag"]
+            self._bodies[path] = body
+        return body, True, response.headers
+
+    def fetch_configs(self, equipment_id):
+        """PLCデータ設定を取得（(設定, 変更があったか)）"""
+        configs, changed, headers = self.get_json(self._configs_path(equipment_id))
+        if changed and headers.get("X-Config-Version"):
+            self.versions[equipment_id] = int(headers["X-Config-Version"])
+        return configs, changed
+
+    def refresh(self, equipment_id):
+        """設定を再取得し、変わっていれば on_change を呼ぶ"""
+        configs, changed = self.fetch_configs(equipment_id)
+        if changed and self.on_change:
+            try:
+                self.on_change(equipment_id, configs)
+            except Exception:
+                # 反映できなかった設定は次回に本文から取得し直す（304 で読み飛ばさない）
+                self._etags.pop(self._configs_path(equipment_id), None)
+                raise
+        return changed
+
+    @staticmethod
+    def _configs_path(equipment_id):
+        return f"/api/equipment/{equipment_id}/plc_configs"
+
+    def watch(self, equipment_ids):
+        """変更通知の購読と定期的な条件付き取得を開始"""
+        import socketio
+
+        equipment_ids = list(equipment_ids)
+        client = socketio.Client(reconnection=True)
+
+        @client.on("config_changed", namespace=EDGE_NAMESPACE)
+        def on_config_changed(data):
+            self._refresh_quietly(data.get("equipment_id"))
+
+        @client.on("config_versions", namespace=EDGE_NAMESPACE)
+        def on_config_versions(versions):
+            for equipment_id, version in versions.items():
+                if version != self.versions.get(equipment_id):
+                    self.versions[equipment_id] = version
+                    self._refresh_quietly(equipment_id)
+
+        try:
+            client.connect(self.server_url, namespaces=[EDGE_NAMESPACE], auth={"equipment_ids": equipment_ids})
+            self._client = client
+        except Exception as e:
+            # 通知が使えなくても定期取得で動作を継続
+            print(f"⚠️ 設定変更通知に接続できません（定期取得のみ）: {e}")
+
+        def periodic():
+            while not self._stop.wait(self.refresh_interval):
+                for equipment_id in equipment_ids:
+                    self._refresh_quietly(equipment_id)
+
+        threading.Thread(target=periodic, daemon=True).start()
+
+    def _refresh_quietly(self, equipment_id):
+        if not equipment_id:
+            return
+        try:
+            self.refresh(equipment_id)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ 設定の再取得に失敗: {equipment_id}: {e}")
+        except Exception as e:
+            # on_change などの失敗で通知・定期取得のスレッドを止めない（次の通知・定期取得で再試行）
+            print(f"❌ 設定の反映に失敗: {equipment_id}: {e!r}")
+
+    def close(self):
+        self._stop.set()
+        if self._client is not None:
+            self._client.disconnect()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+PLCシミュレーター
+localhost上に多数の模擬PLCエンドポイントを起動し、
+ポーリングスケジューラーの動作確認に使用します。
+
+プロトコル:
+    text: クライアント → "READ\\n" / サーバー → JSON 1行（各データ項目の値）
+    slmp: 三菱 SLMP 3Eフレーム（バイナリ）のワード単位一括読出し・書込み
+"""
+
+import asyncio
+import json
+import random
+import struct
+import argparse
+
+from backend.edge.slmp import DEVICE_CODES, PLC_TYPE_LAYOUTS, parse_device_address
+
+# SLMP模擬PLCのデータ配置（アドレスが重ならないよう配置）
+SIMULATED_PLC_CONFIGS = [
+    {"data_type": "production_count", "enabled": True, "address": "D150", "scale_factor": 1, "plc_data_type": "word"},
+    {"data_type": "current", "enabled": True, "address": "D100", "scale_factor": 10, "plc_data_type": "word"},
+    {"data_type": "temperature", "enabled": True, "address": "D104", "scale_factor": 1, "plc_data_type": "float32"},
+    {"data_type": "pressure", "enabled": True, "address": "D102", "scale_factor": 100, "plc_data_type": "word"},
+    {"data_type": "cycle_time", "enabled": True, "address": "D200", "scale_factor": 10, "plc_data_type": "dword"},
+    {"data_type": "error_code", "enabled": True, "address": "D300", "scale_factor": 1, "plc_data_type": "word"},
+]
+
+
+# 整数型は符号の有無によらず生のビット列として書き込む
+_UNSIGNED_LAYOUTS = {1: struct.Struct("<H"), 2: struct.Struct("<I")}
+
+
+class SimulatedPLC:
+    """1台分の模擬PLC"""
+
+    def __init__(self, name, latency=0.005, jitter=0.005, failure_rate=0.0, hang_rate=0.0):
+        self.name = name
+        self.latency = latency            # 平均応答遅延（秒）
+        self.jitter = jitter              # 応答遅延の揺らぎ（秒）
+        self.failure_rate = failure_rate  # 接続を切断する確率
+        self.hang_rate = hang_rate        # 応答しない（タイムアウトさせる）確率
+        self.production_count = 0
+        self.request_count = 0
+        self.server = None
+        self.port = None
+
+    def read_values(self):
+        """現在値を生成"""
+        if random.random() < 0.05:
+            self.production_count += 1
+        return {
+            "production_count": self.production_count,
+            "current": round(12.5 + random.uniform(-2.0, 2.0), 2),
+            "temperature": round(25.0 + random.uniform(-5.0, 5.0), 1),
+            "pressure": round(0.8 + random.uniform(-0.2, 0.2), 3),
+            "cycle_time": round(15.0 + random.uniform(-3.0, 3.0), 1),
+            "error_code": 0 if random.random() >= 0.01 else random.choice([101, 102, 103, 201, 202]),
+        }
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.request_count += 1
+
+                if random.random() < self.failure_rate:
+                    break
+                if random.random() < self.hang_rate:
+                    await asyncio.sleep(3600)
+
+                await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+                writer.write(json.dumps(self.read_values()).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class SLMPSimulatedPLC(SimulatedPLC):
+    """SLMP 3Eフレーム（バイナリ）で応答する模擬PLC"""
+
+    WORDS_PER_DEVICE = 65536
+
+    def __init__(self, name, configs=None, **options):
+        super().__init__(name, **options)
+        self.configs = configs if configs is not None else SIMULATED_PLC_CONFIGS
+        self.memory = {code: bytearray(self.WORDS_PER_DEVICE * 2) for code, _ in DEVICE_CODES.values()}
+
+    def write_value(self, address, plc_data_type, value, scale_factor=1):
+        """デバイスメモリに値を書き込む（実値 × 倍率 = 生値）"""
+        device, number, bit = parse_device_address(address)
+        memory = self.memory[DEVICE_CODES[device][0]]
+        words, unpacker = PLC_TYPE_LAYOUTS[plc_data_type]
+        raw = value * (scale_factor or 1)
+        if plc_data_type != "float32":
+            # 実機のレジスタと同じく範囲を超えた値は回り込む（65535 の次は 0、負の値は2の補数）
+            raw = int(round(raw)) % (1 << (16 * words))
+            unpacker = _UNSIGNED_LAYOUTS[words]
+        if bit is not None:
+            word = struct.unpack_from("<H", memory, number * 2)[0]
+            raw = (word | (1 << bit)) if raw else (word & ~(1 << bit))
+        unpacker.pack_into(memory, number * 2, raw)
+
+    def refresh(self):
+        """現在値をデバイスメモリへ反映"""
+        values = self.read_values()
+        for config in self.configs:
+            if config["data_type"] in values:
+                self.write_value(config["address"], config["plc_data_type"],
+                                 values[config["data_type"]], config.get("scale_factor", 1))
+
+    def _response(self, end_code, data=b""):
+        header = struct.pack("<HBBHBHH", 0x00D0, 0x00, 0xFF, 0x03FF, 0x00, 2 + len(data), end_code)
+        return header, data
+
+    def execute(self, body):
+        """要求データ（監視タイマー以降）を処理し (ヘッダ, データ) を返す"""
+        if len(body) < 12:
+            return self._response(0xC061)
+        command, subcommand, start_low, start_high, code, count = struct.unpack_from("<HHHBBH", body, 2)
+        start = start_low | (start_high << 16)
+        memory = self.memory.get(code)
+        if memory is None or subcommand != 0x0000:
+            return self._response(0xC059)
+        if start + count > self.WORDS_PER_DEVICE:
+            return self._response(0xC056)
+
+        if command == 0x0401:
+            self.refresh()
+            return self._response(0, memoryview(memory)[start * 2:(start + count) * 2])
+        if command == 0x1401:
+            payload = body[12:12 + count * 2]
+            memory[start * 2:start * 2 + len(payload)] = payload
+            return self._response(0)
+        return self._response(0xC059)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(9)
+                subheader, _, _, _, _, length = struct.unpack("<HBBHBH", header)
+                body = await reader.readexactly(length)
+                self.request_count += 1
+                if subheader != 0x0050:
+                    break
+
+                if random.random() < self.failure_rate:
+                    break
+                if random.random() < self.hang_rate:
+                    await asyncio.sleep(3600)
+                if self.latency:
+                    await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+                response_header, data = self.execute(body)
+                writer.write(response_header)
+                if data:
+                    writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class SimulatedFleet:
+    """模擬PLC群（各PLCが個別のポートで待ち受け）"""
+
+    def __init__(self, count, plc_factory=SimulatedPLC, **plc_options):
+        self.plcs = [plc_factory(f"SIM_{i + 1:04d}", **plc_options) for i in range(count)]
+
+    async def start(self, host="127.0.0.1"):
+        for plc in self.plcs:
+            await plc.start(host)
+        return [(plc.name, host, plc.port) for plc in self.plcs]
+
+    async def stop(self):
+        for plc in self.plcs:
+            await plc.stop()
+
+
+async def read_simulated_plc(target):
+    """テキストプロトコルで模擬PLCから1回読み出す（PollTarget.reader用）"""
+    conn = target.connection
+    if conn is None:
+        conn = await asyncio.open_connection(target.host, target.port)
+        target.connection = conn
+    reader, writer = conn
+    try:
+        writer.write(b"READ\n")
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("PLC closed connection")
+        return json.loads(line)
+    except BaseException:
+        # 応答途中で失敗した接続は再利用しない
+        target.close_connection()
+        raise
+
+
+async def _serve(count, base_port, latency, failure_rate, protocol):
+    plc_factory = SLMPSimulatedPLC if protocol == "slmp" else SimulatedPLC
+    fleet = SimulatedFleet(count, plc_factory=plc_factory, latency=latency, failure_rate=failure_rate)
+    for i, plc in enumerate(fleet.plcs):
+        await plc.start(port=base_port + i if base_port else 0)
+        print(f"🏭 {plc.name}: 127.0.0.1:{plc.port}")
+    print(f"✅ 模擬PLCを{count}台起動しました（Ctrl+Cで停止）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PLCシミュレーター')
+    parser.add_argument('--count', type=int, default=10, help='模擬PLC台数')
+    parser.add_argument('--base-port', type=int, default=0, help='開始ポート（0で自動割り当て）')
+    parser.add_argument('--latency', type=float, default=0.005, help='平均応答遅延（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='切断確率')
+    parser.add_argument('--protocol', choices=['text', 'slmp'], default='text', help='応答プロトコル')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve(args.count, args.base_port, args.latency, args.failure_rate, args.protocol))
+    except KeyboardInterrupt:
+        print("\n⏹️ 停止しました")
+
+
+if __name__ == "__main__":
+    main()
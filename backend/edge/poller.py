@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+複数PLCポーリングスケジューラー
+1プロセスで多数の設備を asyncio で同時にポーリングします。
+
+- Equipment.interval をキーにしたタイマーホイールで次回実行を管理
+- 起動時刻にジッターを入れて一斉アクセス（thundering herd）を回避
+- PLC毎のタイムアウトとサーキットブレーカー
+- ポーリング遅延・デッドライン超過のメトリクスを定期出力
+"""
+
+import asyncio
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# ポーリング遅延ヒストグラムの上限値（ミリ秒）
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class CircuitBreaker:
+    """PLC単位のサーキットブレーカー（closed → open → half_open → closed）"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold  # 連続失敗でopenにする回数
+        self.reset_timeout = reset_timeout          # open後に試行を再開するまでの秒数
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+
+    def allow(self, now):
+        """今回のポーリングを実行してよいか"""
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # 1回だけ試行を許可
+            self.state = self.HALF_OPEN
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self, now):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class PollTarget:
+    """ポーリング対象（設備1台分）"""
+
+    def __init__(self, equipment_id, interval, reader, host=None, port=None, timeout=None,
+                 configs=None, breaker=None):
+        self.equipment_id = equipment_id
+        self.interval = float(interval or 60)
+        self.reader = reader                # async def reader(target) -> dict
+        self.host = host
+        self.port = port
+        # タイムアウトは周期の半分（最大5秒）をデフォルトにする
+        self.timeout = timeout if timeout is not None else min(5.0, self.interval / 2)
+        self.configs = configs or []        # PLCデータ設定（プロトコル別リーダーが使用）
+        self.breaker = breaker or CircuitBreaker()
+        self.connection = None              # リーダーが保持する接続（再利用用）
+        self.in_flight = False
+        self.active = True
+
+    def close_connection(self):
+        if self.connection is not None:
+            writer = self.connection[1]
+            try:
+                writer.close()
+            except Exception:
+                pass
+            self.connection = None
+
+
+class TimerWheel:
+    """ハッシュ化タイマーホイール（スロット幅 tick 秒、slots 個で一周）"""
+
+    def __init__(self, tick=0.05, slots=512, now=None):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current_tick = self._tick_of(time.monotonic() if now is None else now)
+
+    def _tick_of(self, when):
+        return int(when / self.tick)
+
+    def schedule(self, item, when):
+        tick = max(self._tick_of(when), self.current_tick)
+        self.slots[tick % len(self.slots)].append((tick, when, item))
+
+    def advance(self, now):
+        """now までに期限を迎えた項目を (when, item) のリストで返す"""
+        target_tick = self._tick_of(now)
+        due = []
+        # 長時間ブロックされた場合でも一周分以上は走査しない
+        start = max(self.current_tick, target_tick - len(self.slots) + 1)
+        for tick in range(start, target_tick + 1):
+            slot = self.slots[tick % len(self.slots)]
+            if not slot:
+                continue
+            remaining = []
+            for entry in slot:
+                if entry[0] <= target_tick:
+                    due.append((entry[1], entry[2]))
+                else:
+                    remaining.append(entry)
+            slot[:] = remaining
+        self.current_tick = target_tick + 1
+        return due
+
+
+class PollMetrics:
+    """ポーリング遅延・デッドライン超過の集計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.equipments = {}
+            self.started_at = time.time()
+
+    def _entry(self, equipment_id):
+        entry = self.equipments.get(equipment_id)
+        if entry is None:
+            entry = {
+                "polls": 0,
+                "successes": 0,
+                "failures": 0,
+                "timeouts": 0,
+                "missed_deadlines": 0,
+                "breaker_skips": 0,
+                "latency_sum_ms": 0.0,
+                "latency_max_ms": 0.0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+            self.equipments[equipment_id] = entry
+        return entry
+
+    def record_poll(self, equipment_id, latency_s, ok, timed_out=False):
+        latency_ms = latency_s * 1000.0
+        with self._lock:
+            entry = self._entry(equipment_id)
+            entry["polls"] += 1
+            if ok:
+                entry["successes"] += 1
+            else:
+                entry["failures"] += 1
+            if timed_out:
+                entry["timeouts"] += 1
+            entry["latency_sum_ms"] += latency_ms
+            entry["latency_max_ms"] = max(entry["latency_max_ms"], latency_ms)
+            entry["latency_buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def record_missed_deadline(self, equipment_id, count=1):
+        with self._lock:
+            self._entry(equipment_id)["missed_deadlines"] += count
+
+    def record_breaker_skip(self, equipment_id):
+        with self._lock:
+            self._entry(equipment_id)["breaker_skips"] += 1
+
+    @staticmethod
+    def _percentile(buckets, q):
+        total = sum(buckets)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(buckets):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        """全体と設備別の集計値を返す"""
+        with self._lock:
+            totals = {"polls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+                      "missed_deadlines": 0, "breaker_skips": 0}
+            buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            latency_sum = 0.0
+            per_equipment = {}
+            for equipment_id, entry in self.equipments.items():
+                for key in totals:
+                    totals[key] += entry[key]
+                for i, count in enumerate(entry["latency_buckets"]):
+                    buckets[i] += count
+                latency_sum += entry["latency_sum_ms"]
+                per_equipment[equipment_id] = {
+                    key: entry[key] for key in totals
+                }
+                per_equipment[equipment_id]["latency_max_ms"] = round(entry["latency_max_ms"], 3)
+                per_equipment[equipment_id]["latency_p95_ms"] = self._percentile(entry["latency_buckets"], 0.95)
+
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "equipment_count": len(per_equipment),
+                "polls_per_second": round(totals["polls"] / elapsed, 2),
+                **totals,
+                "latency_avg_ms": round(latency_sum / totals["polls"], 3) if totals["polls"] else None,
+                "latency_p50_ms": self._percentile(buckets, 0.50),
+                "latency_p95_ms": self._percentile(buckets, 0.95),
+                "latency_p99_ms": self._percentile(buckets, 0.99),
+                "latency_buckets_ms": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"], buckets)),
+                "equipments": per_equipment,
+            }
+
+
+class PollScheduler:
+    """asyncioベースの複数PLCポーリングスケジューラー"""
+
+    def __init__(self, sink=None, metrics=None, tick=0.05, jitter_ratio=1.0, max_concurrency=256):
+        self.sink = sink                    # async/sync def sink(target, data)
+        self.metrics = metrics or PollMetrics()
+        self.wheel = TimerWheel(tick=tick)
+        self.jitter_ratio = jitter_ratio    # 初回実行を interval * ratio の範囲で分散
+        self.max_concurrency = max_concurrency
+        self.targets = {}
+        self._tasks = set()
+        self._semaphore = None
+        self._loop = None
+
+    def _now(self):
+        # asyncio のループ時刻は time.monotonic() と同じ時計
+        return self._loop.time() if self._loop else time.monotonic()
+
+    def add_target(self, target):
+        """ポーリング対象を追加（初回実行時刻はジッターで分散）"""
+        if target.equipment_id in self.targets:
+            self.remove_target(target.equipment_id)
+        self.targets[target.equipment_id] = target
+        first_due = self._now() + random.uniform(0, target.interval * self.jitter_ratio)
+        self.wheel.schedule(target, first_due)
+
+    def remove_target(self, equipment_id):
+        target = self.targets.pop(equipment_id, None)
+        if target:
+            # ホイール上のエントリは発火時に破棄する
+            target.active = False
+            target.close_connection()
+
+    async def run(self, stop_event=None):
+        """stop_event がセットされるまでポーリングを続ける"""
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        stop_event = stop_event or asyncio.Event()
+
+        try:
+            while not stop_event.is_set():
+                now = self._loop.time()
+                for due, target in self.wheel.advance(now):
+                    if not target.active:
+                        continue
+                    self._dispatch(target, due, now)
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.wheel.tick)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            for target in self.targets.values():
+                target.close_connection()
+
+    def _dispatch(self, target, due, now):
+        next_due = due + target.interval
+        if next_due <= now:
+            # 1周期以上遅れている場合は取りこぼした回数をデッドライン超過として数える
+            missed = int((now - due) // target.interval)
+            self.metrics.record_missed_deadline(target.equipment_id, missed)
+            next_due = due + (missed + 1) * target.interval
+        self.wheel.schedule(target, next_due)
+
+        if target.in_flight:
+            # 前回のポーリングが終わっていない
+            self.metrics.record_missed_deadline(target.equipment_id)
+            return
+        if not target.breaker.allow(now):
+            self.metrics.record_breaker_skip(target.equipment_id)
+            return
+
+        target.in_flight = True
+        task = self._loop.create_task(self._poll(target, due))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _poll(self, target, due):
+        try:
+            async with self._semaphore:
+                started = self._loop.time()
+                ok = False
+                timed_out = False
+                data = None
+                try:
+                    data = await asyncio.wait_for(target.reader(target), timeout=target.timeout)
+                    ok = True
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    target.close_connection()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ ポーリング失敗 {target.equipment_id}: {e}")
+
+                finished = self._loop.time()
+                self.metrics.record_poll(target.equipment_id, finished - started, ok, timed_out)
+                if ok:
+                    target.breaker.record_success()
+                else:
+                    target.breaker.record_failure(finished)
+                if finished > due + target.interval:
+                    self.metrics.record_missed_deadline(target.equipment_id)
+
+            if ok and self.sink is not None:
+                result = self.sink(target, data)
+                if asyncio.iscoroutine(result):
+                    await result
+        finally:
+            target.in_flight = False
+
+
+class HttpLogSink:
+    """ポーリング結果をサーバーの /api/logs に送信（送信はスレッドプールで実行）"""
+
+    def __init__(self, server_url, max_workers=16, spool_path=None):
+        self.url = f"{server_url}/api/logs"
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # スプール指定時はローカルに追記し、バッチで古い順に再送
+        self.spool = None
+        self.drainer = None
+        if spool_path:
+            from backend.edge.spool import SampleSpool, SpoolDrainer
+            self.spool = SampleSpool(spool_path)
+            self.drainer = SpoolDrainer(self.spool, server_url).start()
+
+    def _spool(self, payload):
+        self.spool.append(payload)
+        self.drainer.notify()
+
+    def _post(self, payload):
+        try:
+            response = self.session.post(self.url, json=payload, timeout=5)
+            if response.status_code != 200:
+                print(f"❌ データ送信失敗: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ 通信エラー: {e}")
+
+    async def __call__(self, target, data):
+        payload = dict(data)
+        payload["equipment_id"] = target.equipment_id
+        payload["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + "Z"
+        send = self._spool if self.spool is not None else self._post
+        await asyncio.get_running_loop().run_in_executor(self.executor, send, payload)
+
+
+async def _report_metrics(metrics, interval, stop_event):
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        snapshot = metrics.snapshot()
+        print(f"📊 polls={snapshot['polls']} ({snapshot['polls_per_second']}/s) "
+              f"failures={snapshot['failures']} timeouts={snapshot['timeouts']} "
+              f"missed={snapshot['missed_deadlines']} breaker_skips={snapshot['breaker_skips']} "
+              f"p50={snapshot['latency_p50_ms']}ms p95={snapshot['latency_p95_ms']}ms "
+              f"p99={snapshot['latency_p99_ms']}ms")
+
+
+def load_targets_from_server(server_url, reader, config_sync=None):
+    """サーバーに登録済みの設備とPLCデータ設定からポーリング対象を作成
+
+    config_sync（ConfigSync）を渡すと設定を条件付きGETで取得し、ETagと設定バージョンを記録します。
+    """
+    session = config_sync.session if config_sync else requests.Session()
+    response = session.get(f"{server_url}/api/equipment", timeout=10)
+    response.raise_for_status()
+
+    targets = []
+    for equipment in response.json():
+        if not equipment.get("plc_ip") or not equipment.get("port"):
+            continue
+        if config_sync:
+            configs, _ = config_sync.fetch_configs(equipment["equipment_id"])
+        else:
+            configs = session.get(
+                f"{server_url}/api/equipment/{equipment['equipment_id']}/plc_configs", timeout=10
+            ).json()
+        targets.append(PollTarget(
+            equipment["equipment_id"],
+            equipment.get("interval") or 60,
+            reader,
+            host=equipment["plc_ip"],
+            port=equipment["port"],
+            configs=configs,
+        ))
+    return targets
+
+
+async def run_targets(targets, duration=None, sink=None, report_interval=5.0):
+    """ポーリング対象を duration 秒（None の場合は無期限）ポーリングし、最終メトリクスを返す"""
+    scheduler = PollScheduler(sink=sink)
+    for target in targets:
+        scheduler.add_target(target)
+
+    stop_event = asyncio.Event()
+    reporter = asyncio.create_task(_report_metrics(scheduler.metrics, report_interval, stop_event))
+    runner = asyncio.create_task(scheduler.run(stop_event))
+    try:
+        if duration is None:
+            await runner
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        stop_event.set()
+        await asyncio.gather(runner, reporter)
+    return scheduler.metrics.snapshot()
+
+
+async def run_simulation(count, interval, duration, server_url=None, failure_rate=0.0,
+                         latency=0.005, protocol="text", report_interval=5.0, spool_path=None):
+    """localhost上の模擬PLC群をポーリングし、最終メトリクスを返す"""
+    from backend.edge.plc_simulator import (
+        SimulatedFleet, SimulatedPLC, SLMPSimulatedPLC, SIMULATED_PLC_CONFIGS, read_simulated_plc
+    )
+    from backend.edge.slmp import SLMPReader
+
+    if protocol == "slmp":
+        fleet = SimulatedFleet(count, plc_factory=SLMPSimulatedPLC, latency=latency, failure_rate=failure_rate)
+        reader = SLMPReader()
+    else:
+        fleet = SimulatedFleet(count, plc_factory=SimulatedPLC, latency=latency, failure_rate=failure_rate)
+        reader = read_simulated_plc
+    endpoints = await fleet.start()
+    targets = [
+        PollTarget(name, interval, reader, host=host, port=port, configs=SIMULATED_PLC_CONFIGS)
+        for name, host, port in endpoints
+    ]
+
+    print(f"🚀 ポーリング開始: {count}台, 周期={interval}秒, 実行時間={duration}秒, プロトコル={protocol}")
+    try:
+        sink = HttpLogSink(server_url, spool_path=spool_path) if server_url else None
+        return await run_targets(targets, duration, sink, report_interval)
+    finally:
+        await fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='複数PLCポーリングスケジューラー')
+    parser.add_argument('--simulate', type=int, default=50, help='模擬PLC台数')
+    parser.add_argument('--interval', type=float, default=1.0, help='ポーリング周期（秒）')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='実行時間（秒）。省略時はシミュレーション30秒、--from-server は無期限')
+    parser.add_argument('--server', default=None, help='送信先サーバーURL（省略時は送信しない）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='模擬PLCの切断確率')
+    parser.add_argument('--protocol', choices=['text', 'slmp'], default='text', help='模擬PLCのプロトコル')
+    parser.add_argument('--from-server', action='store_true',
+                        help='サーバー登録済みの設備を SLMP でポーリング（--server 必須）')
+    parser.add_argument('--spool', default=None, help='送信前に保存するスプールファイルのパス')
+    parser.add_argument('--metrics-file', default=None, help='最終メトリクスのJSON出力先')
+    args = parser.parse_args()
+
+    if args.from_server:
+        if not args.server:
+            parser.error("--from-server には --server が必要です")
+        from backend.edge.config_sync import ConfigSync
+        from backend.edge.slmp import SLMPReader
+        reader = SLMPReader()
+        targets_by_id = {}
+
+        def on_config_change(equipment_id, configs):
+            # 次回のポーリングから新しい設定で読出し計画を作り直す
+            target = targets_by_id.get(equipment_id)
+            if target is not None:
+                target.configs = configs
+                reader.invalidate(equipment_id)
+                print(f"🔄 PLCデータ設定を更新: {equipment_id}")
+
+        config_sync = ConfigSync(args.server, on_change=on_config_change)
+        targets = load_targets_from_server(args.server, reader, config_sync)
+        targets_by_id.update((target.equipment_id, target) for target in targets)
+        config_sync.watch(targets_by_id)
+        print(f"🚀 ポーリング開始: {len(targets)}台（サーバー登録設備）")
+        try:
+            snapshot = asyncio.run(run_targets(targets, args.duration, HttpLogSink(args.server, spool_path=args.spool)))
+        finally:
+            config_sync.close()
+    else:
+        snapshot = asyncio.run(run_simulation(
+            args.simulate, args.interval, args.duration or 30.0,
+            server_url=args.server, failure_rate=args.failure_rate, protocol=args.protocol,
+            spool_path=args.spool
+        ))
+    print(json.dumps({k: v for k, v in snapshot.items() if k != "equipments"}, indent=2, ensure_ascii=False))
+    if args.metrics_file:
+        with open(args.metrics_file, "w") as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+三菱 SLMP（MCプロトコル）3Eフレーム・バイナリ通信クライアント
+設備に設定された全データ項目を最少回数の一括読出しコマンドで取得し、
+応答は BufferedProtocol で使い回しバッファへ直接受信し、
+memoryview 上で word/dword/int16/int32/float32 をデコードします。
+"""
+
+import asyncio
+import re
+import struct
+
+# デバイスコード（バイナリ）とアドレス表記の基数
+DEVICE_CODES = {
+    "D": (0xA8, 10),   # データレジスタ
+    "W": (0xB4, 16),   # リンクレジスタ
+    "R": (0xAF, 10),   # ファイルレジスタ
+    "ZR": (0xB0, 10),  # ファイルレジスタ（連番）
+}
+
+# PLCデータ型ごとの占有ワード数とデコード形式（リトルエンディアン、下位ワードが先）
+# word / dword は符号なし（0〜65535 / 0〜4294967295。生産数カウンターの桁あふれの判定と同じ範囲）
+# 温度などの負の値は符号付きの int16 / int32 を使う
+PLC_TYPE_LAYOUTS = {
+    "bit": (1, struct.Struct("<H")),
+    "word": (1, struct.Struct("<H")),
+    "dword": (2, struct.Struct("<I")),
+    "int16": (1, struct.Struct("<h")),
+    "int32": (2, struct.Struct("<i")),
+    "float32": (2, struct.Struct("<f")),
+}
+
+MAX_POINTS_PER_READ = 960      # 一括読出し（ワード単位）の最大点数
+DEFAULT_MAX_GAP = 128          # この程度の空きなら1回の読出しにまとめる（ワード）
+DEFAULT_MONITORING_TIMER = 16  # 監視タイマー（250ms単位 → 4秒）
+
+CMD_BATCH_READ = 0x0401
+SUBCMD_WORD = 0x0000
+CMD_BATCH_WRITE = 0x1401
+
+_REQUEST_HEADER = struct.Struct("<HBBHBHH")       # サブヘッダ〜監視タイマー
+_READ_BODY = struct.Struct("<HHHBBH")             # コマンド, サブコマンド, 先頭デバイス(3byte), デバイスコード, 点数
+_RESPONSE_HEADER = struct.Struct("<HBBHBHH")      # サブヘッダ〜終了コード
+RESPONSE_HEADER_SIZE = _RESPONSE_HEADER.size      # 11バイト
+
+_ADDRESS_PATTERN = re.compile(r"^(ZR|[A-Z])([0-9A-F]+)(?:\.([0-9A-F]))?$")
+
+
+class SLMPError(Exception):
+    """SLMP通信・応答エラー"""
+
+    def __init__(self, message, end_code=None):
+        super().__init__(message)
+        self.end_code = end_code
+
+
+def parse_device_address(address):
+    """'D100' / 'W1A' / 'D100.3' を (デバイス, 番号, ビット位置) に分解"""
+    match = _ADDRESS_PATTERN.match((address or "").strip().upper())
+    if not match or match.group(1) not in DEVICE_CODES:
+        raise ValueError(f"Unsupported device address: {address}")
+    device, number, bit = match.groups()
+    radix = DEVICE_CODES[device][1]
+    return device, int(number, radix), int(bit, 16) if bit is not None else None
+
+
+class ReadItem:
+    """一括読出しブロック内のデータ項目"""
+
+    __slots__ = ("data_type", "offset", "unpacker", "bit", "scale_factor")
+
+    def __init__(self, data_type, offset, unpacker, bit, scale_factor):
+        self.data_type = data_type
+        self.offset = offset            # ブロック先頭からのバイトオフセット
+        self.unpacker = unpacker
+        self.bit = bit
+        self.scale_factor = scale_factor or 1
+
+
+class ReadBlock:
+    """1回の一括読出しコマンドで取得する連続領域"""
+
+    def __init__(self, device, start, count):
+        self.device = device
+        self.start = start
+        self.count = count
+        self.items = []
+        self.request = None
+
+    def __repr__(self):
+        return f"ReadBlock({self.device}{self.start}, {self.count} words, {len(self.items)} items)"
+
+
+def plan_batch_reads(configs, max_gap=DEFAULT_MAX_GAP, max_points=MAX_POINTS_PER_READ):
+    """
+    有効なPLCデータ設定から一括読出しブロックを計画する
+    近接するアドレスは max_gap ワードまでの空きを含めて1ブロックにまとめる
+    """
+    spans = []
+    for config in configs:
+        if not config.get("enabled", True):
+            continue
+        plc_data_type = config.get("plc_data_type") or "word"
+        if plc_data_type not in PLC_TYPE_LAYOUTS:
+            raise ValueError(f"Unsupported plc_data_type: {plc_data_type}")
+        device, number, bit = parse_device_address(config.get("address"))
+        words = PLC_TYPE_LAYOUTS[plc_data_type][0]
+        spans.append((device, number, words, config, plc_data_type, bit))
+
+    spans.sort(key=lambda s: (s[0], s[1]))
+
+    blocks = []
+    current = None
+    for device, number, words, config, plc_data_type, bit in spans:
+        end = number + words
+        if (current is not None and current.device == device
+                and number <= current.start + current.count + max_gap
+                and max(end, current.start + current.count) - current.start <= max_points):
+            current.count = max(end, current.start + current.count) - current.start
+        else:
+            current = ReadBlock(device, number, words)
+            blocks.append(current)
+        current.items.append(ReadItem(
+            config.get("data_type"),
+            (number - current.start) * 2,
+            PLC_TYPE_LAYOUTS[plc_data_type][1],
+            bit,
+            config.get("scale_factor", 1),
+        ))
+
+    for block in blocks:
+        block.request = encode_batch_read(block.device, block.start, block.count)
+    return blocks
+
+
+def _encode_frame(body, monitoring_timer=DEFAULT_MONITORING_TIMER):
+    # 要求データ長 = 監視タイマー(2) + 本体
+    return _REQUEST_HEADER.pack(0x0050, 0x00, 0xFF, 0x03FF, 0x00, 2 + len(body), monitoring_timer) + body
+
+
+def encode_batch_read(device, start, count, monitoring_timer=DEFAULT_MONITORING_TIMER):
+    """ワード単位一括読出し（0401/0000）の要求フレームを作成"""
+    if not 0 < count <= MAX_POINTS_PER_READ:
+        raise ValueError(f"Invalid read count: {count}")
+    body = _READ_BODY.pack(CMD_BATCH_READ, SUBCMD_WORD, start & 0xFFFF, (start >> 16) & 0xFF,
+                           DEVICE_CODES[device][0], count)
+    return _encode_frame(body, monitoring_timer)
+
+
+def encode_batch_write(device, start, payload, monitoring_timer=DEFAULT_MONITORING_TIMER):
+    """ワード単位一括書込み（1401/0000）の要求フレームを作成（シミュレーター・試験用）"""
+    count = len(payload) // 2
+    body = _READ_BODY.pack(CMD_BATCH_WRITE, SUBCMD_WORD, start & 0xFFFF, (start >> 16) & 0xFF,
+                           DEVICE_CODES[device][0], count) + bytes(payload)
+    return _encode_frame(body, monitoring_timer)
+
+
+def decode_block(block, data, values):
+    """応答データ（memoryview）から各項目をデコードし values に格納"""
+    for item in block.items:
+        raw = item.unpacker.unpack_from(data, item.offset)[0]
+        if item.bit is not None:
+            values[item.data_type] = (raw >> item.bit) & 1
+        elif item.scale_factor != 1:
+            # PLC上の生値 ÷ 倍率 = 実値
+            values[item.data_type] = raw / item.scale_factor
+        else:
+            values[item.data_type] = raw
+    return values
+
+
+class _SLMPProtocol(asyncio.BufferedProtocol):
+    """応答フレームを SLMPClient のバッファへ直接受信するプロトコル"""
+
+    def __init__(self, view):
+        self._view = view
+        self._filled = 0
+        self._expected = 9          # ヘッダ受信前はデータ長までの9バイト
+        self._waiter = None
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._fail(exc or SLMPError("Connection closed during response"))
+
+    def expect_response(self):
+        """次の応答フレームの受信を開始し、完了時にデータ長を返す Future を返す"""
+        if self.transport is None:
+            raise SLMPError("Connection closed")
+        self._filled = 0
+        self._expected = 9
+        self._waiter = asyncio.get_running_loop().create_future()
+        self.transport.resume_reading()
+        return self._waiter
+
+    def get_buffer(self, sizehint):
+        # 1フレーム分だけ受け付け、次のフレームの先頭を読み込まない
+        return self._view[self._filled:self._expected]
+
+    def buffer_updated(self, nbytes):
+        self._filled += nbytes
+        if self._filled < self._expected:
+            return
+        if self._expected == 9:
+            subheader, _, _, _, _, length = struct.unpack_from("<HBBHBH", self._view, 0)
+            if subheader != 0x00D0:
+                self._fail(SLMPError(f"Unexpected subheader: 0x{subheader:04X}"))
+                return
+            if length > len(self._view) - 9:
+                self._fail(SLMPError(f"Response too large: {length} bytes"))
+                return
+            if length < 2:
+                self._fail(SLMPError(f"Response too short: {length} bytes"))
+                return
+            self._expected = 9 + length
+            return
+        # フレーム受信完了。次の要求まで受信を止める
+        self.transport.pause_reading()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(self._expected - 9)
+
+    def _fail(self, exc):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(exc)
+        if self.transport is not None:
+            self.transport.close()
+
+
+class SLMPClient:
+    """asyncio版 SLMP 3Eフレーム（バイナリ）クライアント"""
+
+    def __init__(self, host, port, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.protocol = None
+        self.transport = None
+        # 応答受信用バッファ（最大960ワード + ヘッダ）を使い回す
+        self._buffer = bytearray(RESPONSE_HEADER_SIZE + MAX_POINTS_PER_READ * 2)
+        self._view = memoryview(self._buffer)
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await asyncio.wait_for(
+            loop.create_connection(lambda: _SLMPProtocol(self._view), self.host, self.port),
+            timeout=self.timeout
+        )
+        self.transport.pause_reading()
+
+    async def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = self.protocol = None
+
+    async def request(self, frame):
+        """要求フレームを送信して応答データ部の memoryview を返す（次の要求まで有効）"""
+        if self.transport is None or self.transport.is_closing():
+            await self.connect()
+        waiter = self.protocol.expect_response()
+        self.transport.write(frame)
+        length = await waiter
+        body = self._view[9:9 + length]
+        end_code = struct.unpack_from("<H", body, 0)[0]
+        if end_code != 0:
+            raise SLMPError(f"SLMP end code 0x{end_code:04X}", end_code)
+        return body[2:]
+
+    async def read_words(self, device, start, count):
+        data = await self.request(encode_batch_read(device, start, count))
+        if len(data) != count * 2:
+            raise SLMPError(f"Short response: expected {count * 2} bytes, got {len(data)}")
+        return data
+
+    async def read_blocks(self, blocks):
+        """計画済みブロックを順に読み出して {data_type: 値} を返す"""
+        values = {}
+        for block in blocks:
+            data = await self.request(block.request)
+            if len(data) != block.count * 2:
+                raise SLMPError(f"Short response: expected {block.count * 2} bytes, got {len(data)}")
+            decode_block(block, data, values)
+        return values
+
+    async def write_words(self, device, start, payload):
+        await self.request(encode_batch_write(device, start, payload))
+
+
+class SLMPReader:
+    """PollTarget.reader 用の SLMP リーダー（読出し計画を設備毎にキャッシュ）"""
+
+    def __init__(self, max_gap=DEFAULT_MAX_GAP):
+        self.max_gap = max_gap
+        self._plans = {}
+        self._clients = {}
+
+    def invalidate(self, equipment_id):
+        """PLCデータ設定の変更時に読出し計画を破棄"""
+        self._plans.pop(equipment_id, None)
+
+    async def __call__(self, target):
+        plan = self._plans.get(target.equipment_id)
+        if plan is None:
+            plan = plan_batch_reads(target.configs, max_gap=self.max_gap)
+            self._plans[target.equipment_id] = plan
+
+        client = self._clients.get(target.equipment_id)
+        if client is None or target.connection is None:
+            client = SLMPClient(target.host, target.port, timeout=target.timeout)
+            await client.connect()
+            self._clients[target.equipment_id] = client
+            target.connection = (client.protocol, client.transport)
+        try:
+            return await client.read_blocks(plan)
+        except BaseException:
+            # 応答途中で失敗した接続は再利用しない
+            target.close_connection()
+            raise
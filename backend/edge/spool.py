@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+エッジ側ストア＆フォワード・スプール
+サンプルはまずローカルの SQLite（WALモード）に追記し、
+サーバーへは古い順にバッチで再送します。
+
+- ディスク使用量の上限を超えた場合は最古のサンプルから破棄
+- 送信済み位置（ack オフセット）は削除と同一トランザクションで記録し、
+  クラッシュ後も未送信分だけを再送
+- 応答が届かず同じバッチを再送した場合に備え、スプールIDとシーケンス番号を送信し、
+  サーバー側で取込み済みのサンプルを読み飛ばす
+- ネットワーク断の間に溜まったデータは復旧後にまとめて高速送信
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+import requests
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # ディスク使用量の上限（256MB）
+DEFAULT_BATCH_SIZE = 500               # 1回の再送で送るサンプル数
+
+
+class SampleSpool:
+    """SQLite WAL を使った追記専用のサンプルスプール"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, synchronous="FULL"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped_count = 0
+        self._lock = threading.Lock()
+        self._appends_since_check = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: 電源断でもコミット済みのサンプルを失わない
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS spool_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO spool_state (key, value) VALUES ('acked_seq', 0)")
+        self._conn.execute("INSERT OR IGNORE INTO spool_state (key, value) VALUES ('dropped_count', 0)")
+        # サーバー側の重複判定キー。seq は AUTOINCREMENT のため削除後も再利用されない
+        self._conn.execute("INSERT OR IGNORE INTO spool_state (key, value) VALUES ('spool_id', ?)",
+                           (secrets.randbits(62),))
+        self.dropped_count = self._state("dropped_count")
+        self.spool_id = f"{self._state('spool_id'):016x}"
+
+    def _state(self, key):
+        return self._conn.execute("SELECT value FROM spool_state WHERE key = ?", (key,)).fetchone()[0]
+
+    @property
+    def acked_seq(self):
+        with self._lock:
+            return self._state("acked_seq")
+
+    def append(self, sample):
+        """サンプルを追記してシーケンス番号を返す"""
+        payload = json.dumps(sample, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO samples (payload, created_at) VALUES (?, ?)", (payload, time.time())
+            )
+            self._appends_since_check += 1
+            if self._appends_since_check >= 100:
+                self._appends_since_check = 0
+                self._enforce_budget()
+            return cursor.lastrowid
+
+    def read_batch(self, limit=DEFAULT_BATCH_SIZE):
+        """未送信のサンプルを古い順に最大 limit 件返す [(seq, sample), ...]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, payload FROM samples"
+                " WHERE seq > (SELECT value FROM spool_state WHERE key = 'acked_seq')"
+                " ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(seq, json.loads(payload)) for seq, payload in rows]
+
+    def ack(self, upto_seq):
+        """upto_seq までを送信済みとして記録し、該当サンプルを削除"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE spool_state SET value = MAX(value, ?) WHERE key = 'acked_seq'", (upto_seq,)
+                )
+                self._conn.execute("DELETE FROM samples WHERE seq <= ?", (upto_seq,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM samples"
+                " WHERE seq > (SELECT value FROM spool_state WHERE key = 'acked_seq')"
+            ).fetchone()[0]
+
+    def used_bytes(self):
+        """データベースの使用量（空きページを除く）
+        WAL は自動チェックポイント（約1000ページ）で上限があるため含めない
+        """
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist) * page_size
+
+    def _enforce_budget(self):
+        """上限を超えていれば最古のサンプルから破棄（ロック取得済みで呼ぶ）"""
+        if self.used_bytes() <= self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+        # 1割ずつ破棄して上限内に収める
+        drop = max(1, total // 10)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM samples WHERE seq IN (SELECT seq FROM samples ORDER BY seq LIMIT ?)", (drop,)
+            )
+            self._conn.execute(
+                "UPDATE spool_state SET value = value + ? WHERE key = 'dropped_count'", (drop,)
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self.dropped_count += drop
+        print(f"⚠️ スプール容量上限超過: 最古の{drop}件を破棄しました（累計 {self.dropped_count}件）")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolDrainer:
+    """スプールの未送信サンプルを /api/logs/batch へ古い順に送信するバックグラウンドスレッド"""
+
+    def __init__(self, spool, server_url, batch_size=DEFAULT_BATCH_SIZE, idle_interval=1.0,
+                 max_backoff=30.0, timeout=10.0):
+        self.spool = spool
+        self.url = f"{server_url}/api/logs/batch"
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval   # 未送信がない時の確認間隔（秒）
+        self.max_backoff = max_backoff       # 送信失敗時の最大待機（秒）
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.sent_count = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """新しいサンプルが追記されたことを通知"""
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def drain_once(self):
+        """1バッチ送信して送信件数を返す（未送信なしは0、失敗時は例外）"""
+        batch = self.spool.read_batch(self.batch_size)
+        if not batch:
+            return 0
+        response = self.session.post(self.url, json={
+            "spool_id": self.spool.spool_id,
+            "seqs": [seq for seq, _ in batch],
+            "samples": [sample for _, sample in batch],
+        }, timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} - {response.text[:200]}")
+        result = response.json()
+        if result.get("rejected"):
+            # 設備未登録などサーバー側で受け付けられないサンプルは再送しても解消しないため破棄
+            print(f"⚠️ サーバーが{len(result['rejected'])}件のサンプルを拒否しました: {result['rejected'][:3]}")
+        self.spool.ack(batch[-1][0])
+        self.sent_count += len(batch)
+        return len(batch)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+                backoff = 1.0
+                if sent == self.batch_size:
+                    # 未送信が溜まっている間は待たずに続けて送信
+                    continue
+            except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+                print(f"❌ スプール再送失敗（{backoff:.0f}秒後に再試行）: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            self._wakeup.wait(self.idle_interval)
+            self._wakeup.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='エッジ側スプール管理ツール')
+    parser.add_argument('path', help='スプールファイルのパス')
+    parser.add_argument('--drain', default=None, metavar='SERVER_URL', help='未送信分をサーバーへ送信して終了')
+    args = parser.parse_args()
+
+    spool = SampleSpool(args.path)
+    pending = spool.pending_count()
+    print(f"📦 未送信: {pending:,}件, 送信済み位置: {spool.acked_seq}, "
+          f"容量上限による破棄: {spool.dropped_count:,}件, 使用量: {spool.used_bytes():,}バイト")
+
+    if args.drain and pending:
+        drainer = SpoolDrainer(spool, args.drain)
+        started = time.time()
+        while drainer.drain_once():
+            pass
+        elapsed = time.time() - started
+        print(f"✅ {drainer.sent_count:,}件を送信しました（{elapsed:.1f}秒, "
+              f"{drainer.sent_count / max(elapsed, 1e-9):,.0f}件/秒）")
+    spool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+エラーコードの発生区間（取込み時に抽出）
+error_code の変化を取込み時に検出し、(設備, コード, 開始, 終了, 継続時間) の区間を
+error_events に保存します。発生回数・停止時間・MTBF/MTTR の集計は logs を読まずに
+この表だけで行えます。
+
+- 0 → コード: 区間を開始（ended_at は NULL）
+- コード → 0: 区間を終了
+- コード → 別のコード: 前の区間を終了し、同じ時刻に次の区間を開始
+- error_code を含まないサンプル・時刻が前後したサンプルは無視
+- 状態（現在のコード・開始時刻）はプロセス内メモリに保持し、
+  再起動後は設備の最初のサンプルで未終了の区間から復元
+"""
+
+import threading
+
+from sqlalchemy import delete, insert, select, update
+
+from backend.db import db
+from backend.db.models import ErrorEvent, Log
+from backend.timestamps import naive_utc, utc_seconds
+
+
+class ErrorCodeTracker:
+    """1設備の現在のエラーコードと未終了区間の開始時刻"""
+
+    __slots__ = ("code", "started_at", "last_t", "lock")
+
+    def __init__(self, code=0, started_at=None):
+        self.code = code
+        self.started_at = started_at
+        self.last_t = utc_seconds(started_at) if started_at is not None else None
+        self.lock = threading.Lock()
+
+    def offer(self, timestamp, error_code):
+        """1サンプルを反映し、区間の変化 [(op, values), ...]（op は open / close）を返す"""
+        if error_code is None:
+            return []
+        timestamp = naive_utc(timestamp)
+        t = utc_seconds(timestamp)
+        if self.last_t is not None and t < self.last_t:
+            return []
+        self.last_t = t
+        code = int(error_code)
+        if code == self.code:
+            return []
+        changes = []
+        if self.code:
+            changes.append(("close", {
+                "ended_at": timestamp,
+                "duration_seconds": max(0.0, t - utc_seconds(self.started_at)),
+            }))
+        if code:
+            changes.append(("open", {"error_code": code, "started_at": timestamp}))
+        self.code = code
+        self.started_at = timestamp if code else None
+        return changes
+
+
+def load_error_tracker(equipment_pk):
+    """未終了の区間から現在のエラー状態を復元"""
+    row = db.session.execute(
+        select(ErrorEvent.error_code, ErrorEvent.started_at)
+        .where(ErrorEvent.equipment_id == equipment_pk, ErrorEvent.ended_at.is_(None))
+        .order_by(ErrorEvent.started_at.desc())
+        .limit(1)
+    ).first()
+    return ErrorCodeTracker(*row) if row else ErrorCodeTracker()
+
+
+def apply_error_changes(equipment_pk, changes):
+    """区間の変化をセッションに反映（コミットは呼び出し側）"""
+    for op, values in changes:
+        if op == "open":
+            db.session.execute(insert(ErrorEvent).values(equipment_id=equipment_pk, **values))
+        else:
+            db.session.execute(
+                update(ErrorEvent)
+                .where(ErrorEvent.equipment_id == equipment_pk, ErrorEvent.ended_at.is_(None))
+                .values(**values)
+            )
+
+
+class ErrorEventRegistry:
+    """設備ごとのエラー状態（未終了の区間から遅延ロードし、保存失敗時に破棄）"""
+
+    def __init__(self):
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def get(self, equipment_pk):
+        tracker = self._trackers.get(equipment_pk)
+        if tracker is None:
+            loaded = load_error_tracker(equipment_pk)
+            with self._lock:
+                tracker = self._trackers.setdefault(equipment_pk, loaded)
+        return tracker
+
+    def record(self, equipment_pk, samples):
+        """[(timestamp, data), ...]（時刻順）の error_code の変化をセッションに反映し、変化の数を返す"""
+        tracker = self.get(equipment_pk)
+        with tracker.lock:
+            changes = [change for timestamp, data in samples
+                       for change in tracker.offer(timestamp, data.get("error_code"))]
+        apply_error_changes(equipment_pk, changes)
+        return len(changes)
+
+    def invalidate(self, equipment_pk):
+        with self._lock:
+            self._trackers.pop(equipment_pk, None)
+
+
+error_event_registry = ErrorEventRegistry()
+
+
+def rebuild_error_events(equipment_pk, chunk_size=10000):
+    """logs から設備のエラー区間を作り直す（既存の区間は削除）。作成した区間数を返す"""
+    db.session.execute(delete(ErrorEvent).where(ErrorEvent.equipment_id == equipment_pk))
+    tracker = ErrorCodeTracker()
+    created = 0
+    rows = db.session.execute(
+        select(Log.timestamp, Log.error_code)
+        .where(Log.equipment_id == equipment_pk, Log.error_code.isnot(None))
+        .order_by(Log.timestamp)
+        .execution_options(yield_per=chunk_size)
+    )
+    changes = []
+    for timestamp, error_code in rows:
+        changes.extend(tracker.offer(timestamp, error_code))
+        if len(changes) >= chunk_size:
+            created += sum(1 for op, _ in changes if op == "open")
+            apply_error_changes(equipment_pk, changes)
+            changes = []
+    created += sum(1 for op, _ in changes if op == "open")
+    apply_error_changes(equipment_pk, changes)
+    db.session.commit()
+    error_event_registry.invalidate(equipment_pk)
+    return created
+
+
+def reliability(events, start, end):
+    """期間 [start, end) の区間から発生回数・停止時間・MTBF/MTTR（秒）を計算
+
+    events: [(error_code, started_at, ended_at), ...]（期間と重なるもの。未終了は ended_at=None）
+    停止時間は期間内に収まる部分だけを数え、MTBF は（期間 − 停止時間）/ 期間内に始まった発生回数。
+    """
+    period_seconds = (end - start).total_seconds()
+    failures = 0
+    downtime = 0.0
+    repaired = 0
+    repair_total = 0.0
+    for _, started_at, ended_at in events:
+        if started_at >= start:
+            failures += 1
+            if ended_at is not None:
+                repaired += 1
+                repair_total += (ended_at - started_at).total_seconds()
+        clipped_end = min(ended_at or end, end)
+        downtime += max(0.0, (clipped_end - max(started_at, start)).total_seconds())
+    return {
+        "failures": failures,
+        "downtime_seconds": round(downtime, 1),
+        "availability": round(1 - downtime / period_seconds, 4) if period_seconds > 0 else None,
+        "mtbf_seconds": round((period_seconds - downtime) / failures, 1) if failures else None,
+        "mttr_seconds": round(repair_total / repaired, 1) if repaired else None,
+    }
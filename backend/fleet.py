@@ -0,0 +1,193 @@
+"""
+フリート概要（全設備の状態・最新値・データの鮮度）
+ダッシュボードの一覧表示用に、設備ごとの最新のサンプルをプロセス内メモリの表に保持し、
+1つの JSON（状態別の台数つき）として返します。設備一覧と設備ごとの /latest を呼ぶ必要はありません。
+
+- 表は取込み時（保存の有無に関係なく受信したサンプル）と設備の登録・変更時に更新
+- JSON は変更があったとき、または設備がデータ途絶（stale）に変わる時刻を過ぎたときだけ作り直す
+  （それ以外は作成済みのバイト列をそのまま返す）
+- 状態: running（正常）/ error（error_code が 0 以外）/ stale（データ途絶）/ no_data（受信なし）
+- データ途絶: 最後のサンプルから 収集周期 × FLEET_STALE_FACTOR（最小 FLEET_STALE_MIN_SECONDS）秒が経過
+- 最初の取得時に設備ごとの最新のログから表を作成
+"""
+
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta
+
+from backend.db.readers import LOG_HISTORY_COLUMNS, fetch_fleet_equipments, fetch_fleet_latest_logs
+from backend.json_provider import dumps_bytes
+from backend.metrics import registry
+from backend.timestamps import naive_utc
+
+FLEET_STALE_FACTOR = 3
+FLEET_STALE_MIN_SECONDS = float(os.getenv("FLEET_STALE_MIN_SECONDS", "30"))
+
+FLEET_STATUSES = ("running", "error", "stale", "no_data")
+# 最新値として保持するデータ項目（ログの固定列）
+FLEET_VALUE_FIELDS = tuple(name for name in LOG_HISTORY_COLUMNS if name != "timestamp")
+
+FLEET_DOCUMENT_BUILDS = registry.counter(
+    "plc_fleet_document_builds_total", "Fleet overview documents rebuilt by reason", ("reason",))
+
+
+class FleetEntry:
+    """1設備の状態"""
+
+    __slots__ = ("equipment_id", "manufacturer", "series", "interval", "equipment_status", "last_seen", "values",
+                 "anomaly")
+
+    def __init__(self, equipment_id, manufacturer=None, series=None, interval=None, equipment_status=None):
+        self.equipment_id = equipment_id
+        self.manufacturer = manufacturer
+        self.series = series
+        self.interval = interval
+        self.equipment_status = equipment_status
+        self.last_seen = None
+        self.values = {}
+        self.anomaly = False
+
+    @property
+    def stale_after(self):
+        """データ途絶とみなす秒数"""
+        return max(FLEET_STALE_MIN_SECONDS, FLEET_STALE_FACTOR * (self.interval or 0))
+
+    def status(self, now):
+        if self.last_seen is None:
+            return "no_data"
+        if (now - self.last_seen).total_seconds() >= self.stale_after:
+            return "stale"
+        return "error" if self.values.get("error_code") else "running"
+
+    def to_dict(self, status):
+        return {
+            "equipment_id": self.equipment_id,
+            "manufacturer": self.manufacturer,
+            "series": self.series,
+            "equipment_status": self.equipment_status,
+            "status": status,
+            "last_seen": self.last_seen,
+            "stale_after_seconds": self.stale_after,
+            "anomaly": self.anomaly,
+            **{field: self.values.get(field) for field in FLEET_VALUE_FIELDS},
+        }
+
+
+class FleetDocument:
+    """作成済みの JSON と ETag"""
+
+    __slots__ = ("body", "etag", "version", "expires_at")
+
+    def __init__(self, body, etag, version, expires_at):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        self.expires_at = expires_at
+
+
+class FleetState:
+    """設備ごとの状態の表（最初の取得時に DB から作成）"""
+
+    def __init__(self):
+        self._entries = None            # 設備の内部ID → FleetEntry（None は未作成）
+        self._equipments_changed = False
+        self._version = 0
+        self._document = None
+        self._lock = threading.Lock()
+
+    def record(self, equipment_pk, timestamp, data, anomaly=False):
+        """受信した最新のサンプルを反映（表の作成前・古いサンプルは無視）"""
+        timestamp = naive_utc(timestamp)
+        with self._lock:
+            if self._entries is None:
+                return
+            entry = self._entries.get(equipment_pk)
+            if entry is None:
+                # 表の作成後に登録された設備は、設備一覧の再読込で追加
+                self._equipments_changed = True
+                self._version += 1
+                return
+            if entry.last_seen is not None and timestamp < entry.last_seen:
+                return
+            entry.last_seen = timestamp
+            entry.values = {field: data.get(field) for field in FLEET_VALUE_FIELDS}
+            entry.anomaly = anomaly
+            self._version += 1
+
+    def equipments_changed(self):
+        """設備の登録・変更後に呼ぶ（次回の取得時に設備一覧を読み直す）"""
+        with self._lock:
+            self._equipments_changed = True
+            self._version += 1
+
+    def _load(self):
+        entries = {}
+        for row in fetch_fleet_equipments():
+            entries[row.equipment_pk] = FleetEntry(row.equipment_id, row.manufacturer, row.series, row.interval,
+                                                   row.status)
+        for row in fetch_fleet_latest_logs():
+            entry = entries.get(row.equipment_pk)
+            if entry is not None and row.timestamp is not None:
+                entry.last_seen = row.timestamp
+                entry.values = {field: getattr(row, field) for field in FLEET_VALUE_FIELDS}
+        return entries
+
+    def _reload_equipments(self):
+        """設備一覧だけを読み直し、最新値は保持"""
+        rows = fetch_fleet_equipments()
+        with self._lock:
+            self._equipments_changed = False
+            entries = {}
+            for row in rows:
+                entry = self._entries.get(row.equipment_pk) or FleetEntry(row.equipment_id)
+                entry.equipment_id = row.equipment_id
+                entry.manufacturer = row.manufacturer
+                entry.series = row.series
+                entry.interval = row.interval
+                entry.equipment_status = row.status
+                entries[row.equipment_pk] = entry
+            self._entries = entries
+            self._version += 1
+
+    def document(self, now=None):
+        """フリート概要の JSON（変更がなければ作成済みのものを返す）"""
+        now = now or datetime.utcnow()
+        if self._entries is None:
+            loaded = self._load()
+            with self._lock:
+                if self._entries is None:
+                    self._entries = loaded
+                    self._equipments_changed = False
+                    self._version += 1
+        elif self._equipments_changed:
+            self._reload_equipments()
+
+        with self._lock:
+            document = self._document
+            if document is not None and document.version == self._version and now < document.expires_at:
+                return document
+            FLEET_DOCUMENT_BUILDS.labels("expired" if document is not None and document.version == self._version
+                                         else "changed").inc()
+            self._document = self._build(now)
+            return self._document
+
+    def _build(self, now):
+        counts = dict.fromkeys(FLEET_STATUSES, 0)
+        equipments = []
+        expires_at = datetime.max
+        for entry in sorted(self._entries.values(), key=lambda e: e.equipment_id):
+            status = entry.status(now)
+            counts[status] += 1
+            equipments.append(entry.to_dict(status))
+            if status in ("running", "error"):
+                # この設備がデータ途絶に変わる時刻に作り直す
+                expires_at = min(expires_at, entry.last_seen + timedelta(seconds=entry.stale_after))
+        content = {"total": len(equipments), "counts": counts, "equipments": equipments}
+        # ETag は作成時刻を除いた内容から（内容が同じなら作り直しても変わらない）
+        etag = hashlib.sha1(dumps_bytes(content)).hexdigest()
+        body = dumps_bytes(dict(content, generated_at=now))
+        return FleetDocument(body, etag, self._version, expires_at)
+
+
+fleet_state = FleetState()
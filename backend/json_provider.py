@@ -0,0 +1,111 @@
+"""
+高速JSONシリアライズ
+orjson があれば Flask のレスポンスと Socket.IO の送信データを orjson で生成します。
+datetime / date はそのまま渡せば ISO 8601 形式（isoformat() と同じ表記）で出力されるため、
+各エンドポイントで1行ずつ isoformat() を呼ぶ必要はありません。
+orjson が未インストールの場合は標準の json モジュールで同じ出力を行います。
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson なしでも動作させる
+    orjson = None
+
+
+def _default(obj):
+    """orjson・標準json が直接扱えない型の変換"""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_orjson(obj, sort_keys=False, indent=False):
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def _dumps_stdlib(obj, sort_keys=False, indent=False):
+    return json.dumps(
+        obj, default=_default, sort_keys=sort_keys, ensure_ascii=False,
+        indent=2 if indent else None, separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+def dumps_bytes(obj, sort_keys=False, indent=False):
+    """JSONをバイト列で返す（レスポンスやキャッシュ用）"""
+    if orjson is not None:
+        return _dumps_orjson(obj, sort_keys, indent)
+    return _dumps_stdlib(obj, sort_keys, indent)
+
+
+def loads(s):
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN / Infinity など標準json のみが受け付ける入力
+            pass
+    return json.loads(s)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask 用 JSON プロバイダー（app.json に設定）"""
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        if backend is None:
+            backend = "orjson" if orjson is not None else "stdlib"
+        if backend == "orjson" and orjson is None:
+            raise RuntimeError("orjson is not installed")
+        self.backend = backend
+        self._dumps = _dumps_orjson if backend == "orjson" else _dumps_stdlib
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys),
+                           indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self._dumps(obj, sort_keys=self.sort_keys, indent=indent), mimetype=self.mimetype
+        )
+
+
+class SocketIOJSON:
+    """python-socketio の json 引数用（dumps/loads は標準json互換で str を返す）"""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return dumps_bytes(obj).decode("utf-8")
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return loads(s)
+
+
+def init_json(app):
+    """Flask のレスポンスを高速JSONプロバイダーに切り替える（JSON_BACKEND=stdlib で標準json）"""
+    app.json = FastJSONProvider(app, os.getenv("JSON_BACKEND") or None)
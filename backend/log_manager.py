@@ -20,6 +20,7 @@ if not os.getenv('DATABASE_URL'):
 from backend.app import create_app
 from backend.db import db
 from backend.db.models import Equipment, Log, DailyLogSummary, MonthlyLogSummary
+from backend.summaries import write_daily_summary, write_monthly_summary
 from sqlalchemy import text
 
 def show_stats():
@@ -142,64 +143,8 @@ def create_daily_summary_manual(date_str):
                 print("キャンセルしました")
                 return
         
-        created_count = 0
-        equipments = Equipment.query.all()
-        
-        for equipment in equipments:
-            # 指定日のログデータを取得
-            start_date = datetime.combine(target_date, datetime.min.time())
-            end_date = start_date + timedelta(days=1)
-            
-            daily_logs = Log.query.filter(
-                Log.equipment_id == equipment.id,
-                Log.timestamp >= start_date,
-                Log.timestamp < end_date
-            ).all()
-            
-            if not daily_logs:
-                continue
-            
-            # 統計計算
-            current_values = [log.current for log in daily_logs if log.current is not None]
-            temp_values = [log.temperature for log in daily_logs if log.temperature is not None]
-            pressure_values = [log.pressure for log in daily_logs if log.pressure is not None]
-            cycle_values = [log.cycle_time for log in daily_logs if log.cycle_time is not None]
-            
-            production_total = max([log.production_count for log in daily_logs if log.production_count is not None], default=0)
-            error_count = len([log for log in daily_logs if log.error_code and log.error_code > 0])
-            
-            # 既存削除
-            existing_summary = DailyLogSummary.query.filter_by(
-                equipment_id=equipment.id,
-                date=target_date
-            ).first()
-            if existing_summary:
-                db.session.delete(existing_summary)
-            
-            # 新規作成
-            daily_summary = DailyLogSummary(
-                equipment_id=equipment.id,
-                date=target_date,
-                production_count_total=production_total,
-                current_avg=sum(current_values) / len(current_values) if current_values else None,
-                current_max=max(current_values) if current_values else None,
-                current_min=min(current_values) if current_values else None,
-                temperature_avg=sum(temp_values) / len(temp_values) if temp_values else None,
-                temperature_max=max(temp_values) if temp_values else None,
-                temperature_min=min(temp_values) if temp_values else None,
-                pressure_avg=sum(pressure_values) / len(pressure_values) if pressure_values else None,
-                pressure_max=max(pressure_values) if pressure_values else None,
-                pressure_min=min(pressure_values) if pressure_values else None,
-                cycle_time_avg=sum(cycle_values) / len(cycle_values) if cycle_values else None,
-                error_count=error_count,
-                data_count=len(daily_logs)
-            )
-            
-            db.session.add(daily_summary)
-            created_count += 1
-            print(f"  {equipment.equipment_id}: {len(daily_logs)}件のログから集計作成")
-        
-        db.session.commit()
+        # 受信サンプルの15分集計からの集計は定期ジョブと同じ処理（DB側の集計 + 分位点スケッチ）
+        created_count = write_daily_summary(target_date)
         print(f"✅ 日次集計作成完了: {created_count}設備")
 
 def create_monthly_summary_manual(year, month):
@@ -218,56 +163,72 @@ def create_monthly_summary_manual(year, month):
                 print("キャンセルしました")
                 return
         
-        created_count = 0
-        equipments = Equipment.query.all()
+        # 日次集計の重み付き集計とスケッチの結合は定期ジョブと同じ処理
+        created_count = write_monthly_summary(year, month)
+        print(f"✅ 月次集計作成完了: {created_count}設備")
+
+def rebuild_error_events_manual(equipment_id=None):
+    """logs からエラー発生区間を作り直す（既存データの移行用）"""
+    from backend.error_events import rebuild_error_events
+
+    app, socketio = create_app()
+    
+    with app.app_context():
+        query = Equipment.query
+        if equipment_id:
+            query = query.filter_by(equipment_id=equipment_id)
+        equipments = query.all()
+        if not equipments:
+            print(f"❌ 設備が見つかりません: {equipment_id}")
+            return
         
+        total = 0
         for equipment in equipments:
-            # 指定月の日次集計を取得
-            from calendar import monthrange
-            start_date = datetime(year, month, 1).date()
-            end_date = datetime(year, month, monthrange(year, month)[1]).date()
-            
-            daily_summaries = db.session.query(DailyLogSummary)\
-                .filter_by(equipment_id=equipment.id)\
-                .filter(text("date >= :start_date"))\
-                .filter(text("date <= :end_date"))\
-                .params(start_date=start_date, end_date=end_date)\
-                .all()
-            
-            if not daily_summaries:
-                continue
-            
-            # 月次集計の計算
-            production_total = max([ds.production_count_total for ds in daily_summaries if ds.production_count_total], default=0)
-            current_avgs = [ds.current_avg for ds in daily_summaries if ds.current_avg is not None]
-            error_total = sum([ds.error_count for ds in daily_summaries if ds.error_count])
-            
-            # 既存削除
-            existing_summary = MonthlyLogSummary.query.filter_by(
-                equipment_id=equipment.id,
-                year=year,
-                month=month
-            ).first()
-            if existing_summary:
-                db.session.delete(existing_summary)
-            
-            # 新規作成
-            monthly_summary = MonthlyLogSummary(
-                equipment_id=equipment.id,
-                year=year,
-                month=month,
-                production_count_total=production_total,
-                current_avg=sum(current_avgs) / len(current_avgs) if current_avgs else None,
-                error_count_total=error_total,
-                operational_days=len(daily_summaries)
-            )
-            
-            db.session.add(monthly_summary)
-            created_count += 1
-            print(f"  {equipment.equipment_id}: {len(daily_summaries)}日分から集計作成")
+            created = rebuild_error_events(equipment.id)
+            total += created
+            print(f"🔁 {equipment.equipment_id}: {created:,}件の区間を作成")
         
-        db.session.commit()
-        print(f"✅ 月次集計作成完了: {created_count}設備")
+        print(f"✅ エラー発生区間の再作成完了: {len(equipments)}設備, {total:,}件")
+
+def rebuild_sample_stats_manual(equipment_id=None):
+    """logs から受信サンプルの15分集計を作成（sample_stats がなかった期間の移行用）"""
+    from backend.sample_stats import rebuild_sample_stats
+
+    app, socketio = create_app()
+    
+    with app.app_context():
+        query = Equipment.query
+        if equipment_id:
+            query = query.filter_by(equipment_id=equipment_id)
+        equipments = query.all()
+        if not equipments:
+            print(f"❌ 設備が見つかりません: {equipment_id}")
+            return
+        
+        total = 0
+        for equipment in equipments:
+            created = rebuild_sample_stats(equipment.id)
+            total += created
+            print(f"🔁 {equipment.equipment_id}: {created:,}件の15分集計を作成")
+        
+        print(f"✅ 15分集計の作成完了: {len(equipments)}設備, {total:,}件")
+
+def create_shift_summaries_manual(start_str, end_str=None):
+    """現地日付（シフトの日付）の範囲のシフト別集計を手動作成"""
+    from backend.shifts import create_shift_summaries, shift_calendar
+    app, socketio = create_app()
+    
+    with app.app_context():
+        try:
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else start_date
+        except ValueError:
+            print("❌ 日付形式が正しくありません (YYYY-MM-DD)")
+            return
+        
+        print(f"📊 {start_date}〜{end_date}のシフト集計を作成します ({shift_calendar.tz_name})")
+        shifts, rows = create_shift_summaries(start_date, end_date)
+        print(f"✅ シフト集計作成完了: {shifts}シフト, {rows}件")
 
 def main():
     parser = argparse.ArgumentParser(description='PLCログデータ管理ツール')
@@ -289,6 +250,19 @@ def main():
     monthly_parser.add_argument('year', type=int, help='対象年')
     monthly_parser.add_argument('month', type=int, help='対象月')
     
+    # シフト別集計作成
+    shifts_parser = subparsers.add_parser('shifts', help='シフト別集計を作成')
+    shifts_parser.add_argument('start', help='対象のシフトの日付（YYYY-MM-DD、工場の現地日付）')
+    shifts_parser.add_argument('end', nargs='?', default=None, help='範囲の最終日（省略時は start のみ）')
+    
+    # エラー発生区間の再作成
+    errors_parser = subparsers.add_parser('rebuild-errors', help='logs からエラー発生区間を再作成')
+    errors_parser.add_argument('--equipment', default=None, help='対象の設備ID（省略時は全設備）')
+    
+    # 受信サンプルの15分集計の移行
+    stats_parser = subparsers.add_parser('rebuild-stats', help='logs から受信サンプルの15分集計を作成（移行用）')
+    stats_parser.add_argument('--equipment', default=None, help='対象の設備ID（省略時は全設備）')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -303,6 +277,12 @@ def main():
         create_daily_summary_manual(args.date)
     elif args.command == 'monthly':
         create_monthly_summary_manual(args.year, args.month)
+    elif args.command == 'shifts':
+        create_shift_summaries_manual(args.start, args.end)
+    elif args.command == 'rebuild-errors':
+        rebuild_error_events_manual(args.equipment)
+    elif args.command == 'rebuild-stats':
+        rebuild_sample_stats_manual(args.equipment)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
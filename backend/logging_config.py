@@ -0,0 +1,116 @@
+"""
+サーバー側ログ設定
+ログレコードはキュー（QueueHandler）に積むだけにし、整形と出力は
+QueueListener の専用スレッドで行います。リクエスト処理スレッドが
+標準出力の書き込みで待たされることはありません。
+
+環境変数:
+    LOG_LEVEL          ルートのログレベル（デフォルト: INFO）
+    LOG_LEVELS         モジュール別レベル（例: "backend.api=DEBUG,sqlalchemy.engine=WARNING"）
+    LOG_FORMAT         json（デフォルト）または text
+    LOG_SAMPLE_EVERY   サンプル毎のログを N 件に1件だけ出力（デフォルト: 100、1で全件）
+"""
+
+import atexit
+import datetime
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# 取込み1件ごとのログ用ロガー（間引いて出力）
+SAMPLE_LOGGER_NAME = "backend.api.routes.samples"
+
+# LogRecord の標準属性（これ以外は extra として JSON に出力）
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行のJSON形式"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """N 件に1件だけ通すフィルター（WARNING 以上は常に通す）"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        if next(self._counter) % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """同一プロセス内のキュー用：整形をリスナースレッドに任せるため record をそのまま積む"""
+
+    def prepare(self, record):
+        return record
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """ルートロガーをキュー経由の非同期出力に設定（複数回呼んでも1度だけ）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    else:
+        formatter = JsonFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_InProcessQueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    sample_logger = logging.getLogger(SAMPLE_LOGGER_NAME)
+    sample_logger.addFilter(SamplingFilter(int(os.getenv("LOG_SAMPLE_EVERY", "100"))))
@@ -0,0 +1,281 @@
+"""
+Prometheus形式のメトリクス収集
+外部ライブラリに依存しない軽量な Counter / Gauge / Histogram と、
+Flaskリクエストの計測フック、/metrics エンドポイントを提供します。
+（DB時間・クエリ数は backend.db.query_stats で記録）
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+# リクエスト・ジョブ時間用のバケット（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 1リクエストあたりのDB時間用のバケット（秒）
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# 件数用のバケット
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._by_raw_labels = {}
+        self._lock = threading.Lock()
+
+    def _child(self, labelvalues):
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def labels(self, *labelvalues):
+        # ホットパス: 変換前のラベル値で引けるようにキャッシュ
+        child = self._by_raw_labels.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+            child = self._child(tuple(str(v) for v in labelvalues))
+            self._by_raw_labels[labelvalues] = child
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labelvalues, child in sorted(self._children.items()):
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._child(()).inc(amount)
+
+    def _render_child(self, labelvalues, child):
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """値を収集時に関数から取得する"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._child(()).set(value)
+
+    def set_function(self, function):
+        self._child(()).set_function(function)
+
+    def _render_child(self, labelvalues, child):
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._child(()).observe(value)
+
+    def _render_child(self, labelvalues, child):
+        with child._lock:
+            counts = list(child.counts)
+            total_sum = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録とテキスト形式での出力"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "plc_http_request_duration_seconds", "HTTP request latency by Flask endpoint",
+    ("endpoint", "method", "status"))
+HTTP_REQUEST_DB_DURATION = registry.histogram(
+    "plc_http_request_db_seconds", "Database time spent per HTTP request by Flask endpoint",
+    ("endpoint",), DB_BUCKETS)
+INGEST_ROWS_WRITTEN = registry.counter(
+    "plc_ingest_rows_written_total", "Log rows written by ingest endpoints", ("route",))
+INGEST_BATCH_ROWS = registry.histogram(
+    "plc_ingest_rows_per_request", "Log rows written per ingest request", ("route",), COUNT_BUCKETS)
+SOCKET_EMITS = registry.counter(
+    "plc_socketio_emits_total", "Socket.IO events emitted by room", ("event", "room"))
+JOB_DURATION = registry.histogram(
+    "plc_job_duration_seconds", "Background job duration", ("job",))
+JOB_LAST_RUN = registry.gauge(
+    "plc_job_last_run_timestamp_seconds", "Unix time the background job last finished", ("job",))
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def emit_to_room(socketio, event_name, data, room, namespace=None):
+    """Socket.IO 送信とルーム別送信数の記録"""
+    socketio.emit(event_name, data, to=room, namespace=namespace)
+    SOCKET_EMITS.labels(event_name, room).inc()
+
+
+def timed_job(job_name):
+    """バックグラウンドジョブの実行時間を記録するデコレーター"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                JOB_DURATION.labels(job_name).observe(time.perf_counter() - started)
+                JOB_LAST_RUN.labels(job_name).set(time.time())
+        return wrapper
+    return decorator
+
+
+def init_metrics(app):
+    """リクエスト計測フックと /metrics エンドポイントを登録"""
+    if os.getenv("METRICS_ENABLED", "true").lower() in ("0", "false", "no"):
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            HTTP_REQUEST_DURATION.labels(endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus形式のメトリクスを出力"""
+        return Response(registry.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,286 @@
+"""
+生産数・稼働率の時間別集計（取込み時に逐次計算）と OEE
+production_count を累積カウンターとして扱い、サンプル間の増分を時間帯（1時間）ごとに
+積み上げます。同時にサンプルの間隔とエラーコードから稼働時間・エラー時間を数え、
+production_hourly に保存します。生産数・OEE の集計は logs を読まずにこの表だけで行えます。
+
+- 増分: 値が増えたら差分、減ったらリセット（0から数え直し）とみなして今回の値
+  ただし直前の値がカウンター上限（word: 65535 / dword: 4294967295）付近で、
+  今回の値が小さい場合は桁あふれ（ロールオーバー）として上限を回り込んだ差分
+- 稼働時間: サンプル間の間隔が 収集周期 × PRODUCTION_GAP_FACTOR（最小 PRODUCTION_GAP_MIN_SECONDS）
+  を超えない区間（超えたら欠測）
+- エラー時間: 上記のうち、区間の始まりのサンプルの error_code が 0 以外の時間
+- サンプル間の区間は時間帯の境界で按分し、増分は後ろのサンプルの時間帯に計上
+- 時刻が前後・重複したサンプル（再送分など）は無視
+- 集計中の時間帯はプロセス内メモリに保持し、PRODUCTION_FLUSH_SECONDS ごとに保存
+  （再起動後は設備の最初のサンプルで最新の時間帯の行から直前の値と集計を復元）
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from backend.db import db
+from backend.db.models import DataTypes, Equipment, PLCDataConfig, ProductionHourlySummary
+from backend.db.upsert import upsert_rows
+from backend.db.workloads import WORKLOAD_INGEST, workload
+from backend.metrics import registry
+from backend.timestamps import naive_utc, utc_seconds
+
+logger = logging.getLogger(__name__)
+
+# 欠測とみなすサンプル間隔（設備の収集周期 × PRODUCTION_GAP_FACTOR と PRODUCTION_GAP_MIN_SECONDS の大きい方）
+PRODUCTION_GAP_FACTOR = 3
+PRODUCTION_GAP_MIN_SECONDS = float(os.getenv("PRODUCTION_GAP_MIN_SECONDS", "10"))
+PRODUCTION_FLUSH_SECONDS = int(os.getenv("PRODUCTION_FLUSH_SECONDS", "60"))
+
+# PLCのデータ型 → カウンターの周期（上限 + 1）
+COUNTER_MODULUS = {"word": 1 << 16, "dword": 1 << 32}
+# 上限付近 / 0付近とみなす幅（周期に対する割合）
+ROLLOVER_MARGIN = 0.1
+
+PRODUCTION_SAMPLES = registry.counter(
+    "plc_production_samples_total", "Samples applied to the production counter by result", ("result",))
+
+
+def _hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def counter_delta(previous, current, modulus=None):
+    """累積カウンターの増分 (増分, リセットか) を返す"""
+    if current >= previous:
+        return current - previous, False
+    if modulus and modulus * (1 - ROLLOVER_MARGIN) <= previous < modulus and current < modulus * ROLLOVER_MARGIN:
+        return modulus - previous + current, False
+    return current, True
+
+
+class HourBucket:
+    """1時間帯の集計"""
+
+    __slots__ = ("production", "resets", "samples", "covered_seconds", "error_seconds")
+
+    def __init__(self, production=0, resets=0, samples=0, covered_seconds=0.0, error_seconds=0.0):
+        self.production = production
+        self.resets = resets
+        self.samples = samples
+        self.covered_seconds = covered_seconds
+        self.error_seconds = error_seconds
+
+
+class ProductionTracker:
+    """1設備の直前の値と時間帯ごとの集計"""
+
+    def __init__(self, max_gap, modulus=None, last_count=None, last_timestamp=None, last_error_code=0, buckets=None):
+        self.max_gap = max_gap
+        self.modulus = modulus
+        self.last_count = last_count
+        self.last_timestamp = last_timestamp
+        self.last_t = utc_seconds(last_timestamp) if last_timestamp is not None else None
+        self.last_error_code = last_error_code or 0
+        self.buckets = buckets or {}    # 時間帯 → HourBucket
+        self.dirty = set()              # 前回の保存以降に更新した時間帯
+        self.lock = threading.Lock()
+
+    def bucket(self, hour):
+        bucket = self.buckets.get(hour)
+        if bucket is None:
+            bucket = self.buckets[hour] = HourBucket()
+        self.dirty.add(hour)
+        return bucket
+
+    def offer(self, timestamp, data):
+        """1サンプルを反映"""
+        timestamp = naive_utc(timestamp)
+        t = utc_seconds(timestamp)
+        if self.last_t is not None and t <= self.last_t:
+            PRODUCTION_SAMPLES.labels("out_of_order").inc()
+            return
+        if self.last_t is not None and t - self.last_t <= self.max_gap:
+            self._spread(self.last_timestamp, timestamp, bool(self.last_error_code))
+        bucket = self.bucket(_hour(timestamp))
+        bucket.samples += 1
+        count = data.get(DataTypes.PRODUCTION_COUNT)
+        if isinstance(count, (int, float)) and not isinstance(count, bool):
+            count = int(count)
+            if self.last_count is not None:
+                delta, reset = counter_delta(self.last_count, count, self.modulus)
+                bucket.production += delta
+                if reset:
+                    bucket.resets += 1
+                    PRODUCTION_SAMPLES.labels("reset").inc()
+            self.last_count = count
+        error_code = data.get(DataTypes.ERROR_CODE)
+        if error_code is not None:
+            self.last_error_code = int(error_code)
+        self.last_timestamp = timestamp
+        self.last_t = t
+        PRODUCTION_SAMPLES.labels("applied").inc()
+
+    def _spread(self, start, end, error):
+        """start〜end の区間を時間帯の境界で分けて稼働（エラー）時間に加算"""
+        hour = _hour(start)
+        while start < end:
+            boundary = hour + timedelta(hours=1)
+            segment_end = min(end, boundary)
+            seconds = (segment_end - start).total_seconds()
+            bucket = self.bucket(hour)
+            bucket.covered_seconds += seconds
+            if error:
+                bucket.error_seconds += seconds
+            start, hour = segment_end, boundary
+
+
+def production_counter_type(equipment_pk):
+    """production_count のPLCデータ型（設定がない場合は PLCDataConfig の既定の word）"""
+    plc_data_type = db.session.execute(
+        select(PLCDataConfig.plc_data_type).where(
+            PLCDataConfig.equipment_id == equipment_pk, PLCDataConfig.data_type == DataTypes.PRODUCTION_COUNT
+        )
+    ).scalar()
+    return plc_data_type or "word"
+
+
+def load_production_tracker(equipment_pk):
+    """設備の収集周期・カウンターのデータ型と最新の時間帯の行から状態を復元"""
+    interval = db.session.execute(
+        select(Equipment.interval).where(Equipment.id == equipment_pk)
+    ).scalar()
+    max_gap = max(PRODUCTION_GAP_MIN_SECONDS, PRODUCTION_GAP_FACTOR * (interval or 0))
+    latest = db.session.execute(
+        select(ProductionHourlySummary)
+        .where(ProductionHourlySummary.equipment_id == equipment_pk)
+        .order_by(ProductionHourlySummary.hour.desc())
+        .limit(1)
+    ).scalar()
+    modulus = COUNTER_MODULUS.get(production_counter_type(equipment_pk))
+    if latest is None:
+        return ProductionTracker(max_gap, modulus)
+    return ProductionTracker(
+        max_gap, modulus,
+        last_count=latest.last_count, last_timestamp=latest.last_timestamp, last_error_code=latest.last_error_code,
+        buckets={latest.hour: HourBucket(latest.production or 0, latest.resets or 0, latest.samples or 0,
+                                         latest.covered_seconds or 0.0, latest.error_seconds or 0.0)},
+    )
+
+
+class ProductionRegistry:
+    """設備ごとの生産数カウンター（最新の時間帯の行から遅延ロード）"""
+
+    def __init__(self):
+        self._trackers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, equipment_pk):
+        tracker = self._trackers.get(equipment_pk)
+        if tracker is None:
+            loaded = load_production_tracker(equipment_pk)
+            with self._lock:
+                tracker = self._trackers.setdefault(equipment_pk, loaded)
+        return tracker
+
+    def record(self, equipment_pk, samples):
+        """[(timestamp, data), ...]（時刻順）を時間帯ごとの集計に反映"""
+        tracker = self.get(equipment_pk)
+        with tracker.lock:
+            for timestamp, data in samples:
+                tracker.offer(timestamp, data)
+
+    def flush(self):
+        """更新のあった時間帯を保存し、保存した行数を返す"""
+        rows = []
+        taken = {}
+        now = datetime.utcnow()
+        for equipment_pk, tracker in list(self._trackers.items()):
+            with tracker.lock:
+                dirty, tracker.dirty = tracker.dirty, set()
+                if not dirty:
+                    continue
+                taken[tracker] = dirty
+                for hour in dirty:
+                    bucket = tracker.buckets[hour]
+                    rows.append({
+                        "equipment_id": equipment_pk, "hour": hour, "production": bucket.production,
+                        "resets": bucket.resets, "samples": bucket.samples,
+                        "covered_seconds": bucket.covered_seconds, "error_seconds": bucket.error_seconds,
+                        "last_count": tracker.last_count, "last_timestamp": tracker.last_timestamp,
+                        "last_error_code": tracker.last_error_code, "updated_at": now,
+                    })
+        try:
+            upsert_rows(ProductionHourlySummary, rows, ["equipment_id", "hour"])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # 次回に保存し直す
+            for tracker, dirty in taken.items():
+                with tracker.lock:
+                    tracker.dirty |= dirty
+            raise
+        # 終わった時間帯（最新のサンプルより前）は以後更新されないためメモリから外す
+        for tracker in taken:
+            with tracker.lock:
+                current = _hour(tracker.last_timestamp) if tracker.last_timestamp is not None else None
+                for hour in [h for h in tracker.buckets if h != current and h not in tracker.dirty]:
+                    del tracker.buckets[hour]
+        return len(rows)
+
+    def start(self, app, interval=PRODUCTION_FLUSH_SECONDS):
+        """定期保存のスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context(), workload(WORKLOAD_INGEST):
+                        try:
+                            saved = self.flush()
+                            if saved:
+                                logger.debug("💾 生産数の時間別集計: %s件", saved)
+                        finally:
+                            db.session.remove()
+                except Exception as e:
+                    logger.exception("❌ 生産数の時間別集計の保存エラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="production-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def invalidate(self, equipment_pk):
+        """収集周期・カウンターのデータ型の変更時に状態を破棄（次のサンプルで読み直す）"""
+        with self._lock:
+            self._trackers.pop(equipment_pk, None)
+
+
+production_registry = ProductionRegistry()
+
+
+def oee(production, covered_seconds, error_seconds, planned_seconds, ideal_cycle_time=None):
+    """稼働率・性能稼働率・OEE（品質は不良数のデータがないため 1 とみなす）
+
+    稼働率 = 稼働時間（欠測・エラーを除く）/ 計画時間
+    性能稼働率 = 理論サイクルタイム × 生産数 / 稼働時間（理論サイクルタイム未設定なら None）
+    """
+    run_seconds = max(0.0, covered_seconds - error_seconds)
+    availability = run_seconds / planned_seconds if planned_seconds > 0 else None
+    performance = (ideal_cycle_time * production / run_seconds
+                   if ideal_cycle_time and run_seconds > 0 else None)
+    return {
+        "production": production,
+        "production_per_hour": round(production * 3600 / run_seconds, 2) if run_seconds > 0 else None,
+        "run_seconds": round(run_seconds, 1),
+        "error_seconds": round(error_seconds, 1),
+        "gap_seconds": round(max(0.0, planned_seconds - covered_seconds), 1),
+        "planned_seconds": round(planned_seconds, 1),
+        "availability": round(availability, 4) if availability is not None else None,
+        "performance": round(performance, 4) if performance is not None else None,
+        "quality": None,
+        "oee": round(availability * performance, 4) if availability is not None and performance is not None else None,
+    }
@@ -0,0 +1,252 @@
+"""
+受信サンプルの15分集計（取込み時に逐次計算）
+圧縮（backend/compression.py）で logs に保存しなかったサンプルも含め、受信した全サンプルの
+件数・合計・最小・最大と分位点スケッチを15分ごとに積み上げ、sample_stats に保存します。
+日次・シフト別の集計はこの表から作るため、圧縮の有無で平均・最大・最小・件数・分位点は変わりません。
+
+- 15分単位のため、UTC の日付と現地時刻のシフト（境界は15分単位）のどちらにも区切りが揃う
+- 集計中の15分はプロセス内メモリに保持し、SAMPLE_STATS_FLUSH_SECONDS ごとに保存
+  （メモリにない15分に初めてサンプルが届いたら保存済みの行から続きを集計するため、再起動・遅れて届いたデータも合算）
+- logs からの作成（rebuild_sample_stats）は移行用。圧縮で保存しなかったサンプルは復元できない
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from backend.db import db
+from backend.db.models import DataTypes, Log, SampleStats
+from backend.db.upsert import upsert_rows
+from backend.db.workloads import WORKLOAD_INGEST, workload
+from backend.sketch import DDSketch
+from backend.timestamps import naive_utc
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_STATS_BUCKET_MINUTES = 15
+SAMPLE_STATS_FLUSH_SECONDS = int(os.getenv("SAMPLE_STATS_FLUSH_SECONDS", "60"))
+SAMPLE_STATS_CHUNK_ROWS = 10000
+SAMPLE_STATS_INSERT_ROWS = 500
+
+# 平均・最大・最小を集計するデータ項目（sample_stats の <metric>_count / _sum / _min / _max 列）
+STATS_METRICS = (DataTypes.CURRENT, DataTypes.TEMPERATURE, DataTypes.PRESSURE, DataTypes.CYCLE_TIME)
+# スケッチを保存するデータ項目（集計テーブルの <metric>_sketch 列）
+SKETCH_METRICS = (DataTypes.CURRENT, DataTypes.CYCLE_TIME)
+
+
+def bucket_of(timestamp):
+    """時刻を含む15分の開始時刻"""
+    return timestamp.replace(minute=timestamp.minute - timestamp.minute % SAMPLE_STATS_BUCKET_MINUTES,
+                             second=0, microsecond=0)
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class StatsBucket:
+    """15分間の受信サンプルの集計"""
+
+    __slots__ = ("data_count", "error_count", "production_count_max", "metrics", "sketches")
+
+    def __init__(self):
+        self.data_count = 0
+        self.error_count = 0
+        self.production_count_max = None
+        self.metrics = {metric: [0, 0.0, None, None] for metric in STATS_METRICS}   # 件数, 合計, 最小, 最大
+        self.sketches = {metric: DDSketch() for metric in SKETCH_METRICS}
+
+    def add(self, data):
+        self.data_count += 1
+        error_code = data.get(DataTypes.ERROR_CODE)
+        if _number(error_code) and error_code > 0:
+            self.error_count += 1
+        count = data.get(DataTypes.PRODUCTION_COUNT)
+        if _number(count) and (self.production_count_max is None or count > self.production_count_max):
+            self.production_count_max = int(count)
+        for metric, stats in self.metrics.items():
+            value = data.get(metric)
+            if not _number(value):
+                continue
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = value if stats[2] is None else min(stats[2], value)
+            stats[3] = value if stats[3] is None else max(stats[3], value)
+            if metric in self.sketches:
+                self.sketches[metric].add(value)
+
+    def to_row(self):
+        row = {
+            "data_count": self.data_count,
+            "error_count": self.error_count,
+            "production_count_max": self.production_count_max,
+        }
+        for metric, (count, total, minimum, maximum) in self.metrics.items():
+            row.update({f"{metric}_count": count, f"{metric}_sum": total,
+                        f"{metric}_min": minimum, f"{metric}_max": maximum})
+        for metric, sketch in self.sketches.items():
+            row[f"{metric}_sketch"] = sketch.to_bytes() if sketch.count else None
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        bucket = cls()
+        bucket.data_count = row.data_count or 0
+        bucket.error_count = row.error_count or 0
+        bucket.production_count_max = row.production_count_max
+        for metric in STATS_METRICS:
+            bucket.metrics[metric] = [getattr(row, f"{metric}_count") or 0, getattr(row, f"{metric}_sum") or 0.0,
+                                      getattr(row, f"{metric}_min"), getattr(row, f"{metric}_max")]
+        for metric in SKETCH_METRICS:
+            blob = getattr(row, f"{metric}_sketch")
+            if blob:
+                bucket.sketches[metric] = DDSketch.from_bytes(blob)
+        return bucket
+
+
+class EquipmentStats:
+    """1設備の集計中の15分"""
+
+    def __init__(self):
+        self.buckets = {}       # 15分の開始時刻 → StatsBucket
+        self.dirty = set()      # 前回の保存以降に更新した15分
+        self.latest = None      # 最新のサンプルの15分
+        self.lock = threading.Lock()
+
+
+def load_stats_bucket(equipment_pk, bucket):
+    """保存済みの15分の集計（なければ空）"""
+    row = db.session.execute(
+        select(SampleStats).where(SampleStats.equipment_id == equipment_pk, SampleStats.bucket == bucket)
+    ).scalar()
+    return StatsBucket.from_row(row) if row is not None else StatsBucket()
+
+
+class SampleStatsRegistry:
+    """設備ごとの受信サンプルの15分集計"""
+
+    def __init__(self):
+        self._equipments = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _get(self, equipment_pk):
+        stats = self._equipments.get(equipment_pk)
+        if stats is None:
+            with self._lock:
+                stats = self._equipments.setdefault(equipment_pk, EquipmentStats())
+        return stats
+
+    def record(self, equipment_pk, samples):
+        """受信した [(timestamp, data), ...] を15分ごとの集計に反映（圧縮で保存しないサンプルも渡す）"""
+        stats = self._get(equipment_pk)
+        with stats.lock:
+            for timestamp, data in samples:
+                key = bucket_of(naive_utc(timestamp))
+                bucket = stats.buckets.get(key)
+                if bucket is None:
+                    bucket = stats.buckets[key] = load_stats_bucket(equipment_pk, key)
+                bucket.add(data)
+                stats.dirty.add(key)
+                if stats.latest is None or key > stats.latest:
+                    stats.latest = key
+
+    def flush(self):
+        """更新のあった15分を保存し、保存した行数を返す"""
+        rows = []
+        taken = {}
+        now = datetime.utcnow()
+        for equipment_pk, stats in list(self._equipments.items()):
+            with stats.lock:
+                dirty, stats.dirty = stats.dirty, set()
+                if not dirty:
+                    continue
+                taken[stats] = dirty
+                for key in dirty:
+                    rows.append(dict(stats.buckets[key].to_row(), equipment_id=equipment_pk, bucket=key,
+                                     updated_at=now))
+        try:
+            upsert_rows(SampleStats, rows, ["equipment_id", "bucket"])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # 次回に保存し直す
+            for stats, dirty in taken.items():
+                with stats.lock:
+                    stats.dirty |= dirty
+            raise
+        # 最新以外の15分はメモリから外す（再び届いたら保存済みの行から続ける）
+        for stats in taken:
+            with stats.lock:
+                for key in [k for k in stats.buckets if k != stats.latest and k not in stats.dirty]:
+                    del stats.buckets[key]
+        return len(rows)
+
+    def start(self, app, interval=SAMPLE_STATS_FLUSH_SECONDS):
+        """定期保存のスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context(), workload(WORKLOAD_INGEST):
+                        try:
+                            saved = self.flush()
+                            if saved:
+                                logger.debug("💾 受信サンプルの15分集計: %s件", saved)
+                        finally:
+                            db.session.remove()
+                except Exception as e:
+                    logger.exception("❌ 受信サンプルの15分集計の保存エラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="sample-stats-flush", daemon=True)
+        self._thread.start()
+        return self
+
+
+sample_stats_registry = SampleStatsRegistry()
+
+
+def rebuild_sample_stats(equipment_pk, chunk_size=SAMPLE_STATS_CHUNK_ROWS):
+    """logs から設備の15分集計を作成し、作成した行数を返す（移行用）
+
+    既存の15分集計より前の期間（この表がなかった期間）だけを作成し、取込み時の集計は上書きしない。
+    """
+    sample_stats_registry.flush()
+    until = db.session.execute(
+        select(func.min(SampleStats.bucket)).where(SampleStats.equipment_id == equipment_pk)
+    ).scalar()
+    stmt = select(Log.timestamp, Log.production_count, Log.error_code, *[getattr(Log, m) for m in STATS_METRICS])
+    stmt = stmt.where(Log.equipment_id == equipment_pk)
+    if until is not None:
+        stmt = stmt.where(Log.timestamp < until)
+    rows = db.session.execute(stmt.order_by(Log.timestamp).execution_options(yield_per=chunk_size))
+
+    fields = (DataTypes.PRODUCTION_COUNT, DataTypes.ERROR_CODE) + STATS_METRICS
+    now = datetime.utcnow()
+    created = 0
+    pending = []
+    key = bucket = None
+    for timestamp, *values in rows:
+        if bucket_of(timestamp) != key:
+            if bucket is not None:
+                pending.append(dict(bucket.to_row(), equipment_id=equipment_pk, bucket=key, updated_at=now))
+            if len(pending) >= SAMPLE_STATS_INSERT_ROWS:
+                db.session.execute(insert(SampleStats), pending)
+                created += len(pending)
+                pending = []
+            key, bucket = bucket_of(timestamp), StatsBucket()
+        bucket.add(dict(zip(fields, values)))
+    if bucket is not None:
+        pending.append(dict(bucket.to_row(), equipment_id=equipment_pk, bucket=key, updated_at=now))
+    if pending:
+        db.session.execute(insert(SampleStats), pending)
+        created += len(pending)
+    db.session.commit()
+    return created
@@ -0,0 +1,229 @@
+"""
+シフトカレンダーとシフト別集計（工場の現地時刻で区切る）
+日次集計は UTC の0時で区切られるため、シフト単位の報告用に
+現地時刻のシフト（例: A 06:00-14:00 / B 14:00-22:00 / C 22:00-06:00）ごとの集計を
+shift_log_summaries に保存します。項目は日次集計と同じです。
+
+- シフトの日付（shift_date）はシフトが始まった現地日付（C 22:00-06:00 は開始日の扱い）
+- DB の時刻は UTC（タイムゾーンなし）のため、境界は現地時刻から UTC に変換して集計
+- 終了したシフトを SHIFT_SUMMARY_DELAY_MINUTES 後に集計（遅れて届くデータの猶予）
+- 元データは受信サンプルの15分集計（backend/sample_stats.py）のため、シフトの境界は15分単位
+
+環境変数:
+    PLANT_TIMEZONE   工場のタイムゾーン（デフォルト Asia/Tokyo）
+    SHIFT_CALENDAR   シフト定義「名前=開始-終了」のカンマ区切り
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, select
+
+from backend.db import db
+from backend.db.models import ShiftLogSummary
+from backend.db.workloads import WORKLOAD_BATCH, use_workload, workload
+from backend.sample_stats import SAMPLE_STATS_BUCKET_MINUTES
+from backend.summaries import summarize_samples
+from backend.metrics import timed_job
+
+logger = logging.getLogger(__name__)
+
+PLANT_TIMEZONE = os.getenv("PLANT_TIMEZONE", "Asia/Tokyo")
+SHIFT_CALENDAR = os.getenv("SHIFT_CALENDAR", "A=06:00-14:00,B=14:00-22:00,C=22:00-06:00")
+SHIFT_SUMMARY_DELAY_MINUTES = int(os.getenv("SHIFT_SUMMARY_DELAY_MINUTES", "15"))
+# 終了したシフトの確認間隔（秒）
+SHIFT_SUMMARY_CHECK_SECONDS = 600
+# 集計済みのシフトがない場合にさかのぼる日数
+SHIFT_SUMMARY_LOOKBACK_DAYS = 1
+
+Shift = namedtuple("Shift", ("name", "start", "end"))
+# 1回分のシフト（start_at / end_at は UTC・タイムゾーンなし）
+ShiftWindow = namedtuple("ShiftWindow", ("shift_date", "name", "start_at", "end_at"))
+
+
+def _parse_time(value):
+    hour, minute = value.strip().split(":")
+    return dt_time(int(hour), int(minute))
+
+
+class ShiftCalendar:
+    """現地時刻のシフト定義"""
+
+    def __init__(self, shifts, tz_name=PLANT_TIMEZONE):
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+        self.shifts = list(shifts)
+        if not self.shifts:
+            raise ValueError("シフトが定義されていません")
+        names = [shift.name for shift in self.shifts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"シフト名が重複しています: {', '.join(names)}")
+        # 1日（分単位）の中でシフト同士が重ならないことを確認
+        used = {}
+        for shift in self.shifts:
+            start = shift.start.hour * 60 + shift.start.minute
+            end = shift.end.hour * 60 + shift.end.minute
+            if start == end:
+                raise ValueError(f"シフト {shift.name} の開始と終了が同じです")
+            if start % SAMPLE_STATS_BUCKET_MINUTES or end % SAMPLE_STATS_BUCKET_MINUTES:
+                raise ValueError(f"シフト {shift.name} の開始・終了は{SAMPLE_STATS_BUCKET_MINUTES}分単位で指定してください")
+            minute = start
+            while minute != end:
+                if minute in used:
+                    raise ValueError(f"シフト {shift.name} と {used[minute]} が重なっています")
+                used[minute] = shift.name
+                minute = (minute + 1) % 1440
+
+    @classmethod
+    def parse(cls, spec=SHIFT_CALENDAR, tz_name=PLANT_TIMEZONE):
+        """「A=06:00-14:00,B=14:00-22:00」形式の定義から作成"""
+        shifts = []
+        for item in spec.split(","):
+            if not item.strip():
+                continue
+            try:
+                name, span = item.split("=")
+                start, end = span.split("-")
+                shifts.append(Shift(name.strip(), _parse_time(start), _parse_time(end)))
+            except ValueError:
+                raise ValueError(f"シフト定義を解釈できません: {item.strip()}（例: A=06:00-14:00）")
+        return cls(shifts, tz_name)
+
+    def _to_utc(self, day, at):
+        local = datetime.combine(day, at, tzinfo=self.tz)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def local_date(self, moment):
+        """UTC（タイムゾーンなし）の時刻の現地日付"""
+        return moment.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+
+    def windows_on(self, shift_date):
+        """現地日付に始まるシフトを開始順に返す"""
+        windows = []
+        for shift in self.shifts:
+            end_date = shift_date + timedelta(days=1) if shift.end <= shift.start else shift_date
+            windows.append(ShiftWindow(shift_date, shift.name,
+                                       self._to_utc(shift_date, shift.start), self._to_utc(end_date, shift.end)))
+        return sorted(windows, key=lambda window: window.start_at)
+
+    def windows_ending(self, after, until):
+        """after < 終了時刻 <= until のシフトを終了順に返す"""
+        windows = []
+        day = self.local_date(after) - timedelta(days=1)
+        last_day = self.local_date(until)
+        while day <= last_day:
+            windows.extend(w for w in self.windows_on(day) if after < w.end_at <= until)
+            day += timedelta(days=1)
+        return sorted(windows, key=lambda window: window.end_at)
+
+    def locate(self, moment):
+        """UTC（タイムゾーンなし）の時刻を含むシフト（シフト外なら None）"""
+        day = self.local_date(moment)
+        for window in self.windows_on(day - timedelta(days=1)) + self.windows_on(day):
+            if window.start_at <= moment < window.end_at:
+                return window
+        return None
+
+    def describe(self):
+        return {
+            "timezone": self.tz_name,
+            "shifts": [
+                {"name": shift.name, "start": shift.start.strftime("%H:%M"), "end": shift.end.strftime("%H:%M")}
+                for shift in self.shifts
+            ],
+        }
+
+
+shift_calendar = ShiftCalendar.parse()
+
+
+@timed_job("create_shift_summary")
+@use_workload(WORKLOAD_BATCH)
+def create_shift_summary(window):
+    """1回分のシフトの集計を作成（既存の集計は作り直し）。集計した設備数を返す"""
+    rows = summarize_samples(window.start_at, window.end_at)
+    if rows:
+        db.session.execute(
+            delete(ShiftLogSummary).where(
+                ShiftLogSummary.shift_date == window.shift_date,
+                ShiftLogSummary.shift == window.name,
+                ShiftLogSummary.equipment_id.in_([row["equipment_id"] for row in rows]),
+            )
+        )
+        db.session.execute(insert(ShiftLogSummary), [
+            dict(row, shift_date=window.shift_date, shift=window.name, start_at=window.start_at, end_at=window.end_at)
+            for row in rows
+        ])
+    db.session.commit()
+    return len(rows)
+
+
+def create_shift_summaries(start_date, end_date, calendar=shift_calendar):
+    """現地日付 start_date〜end_date に始まり、終了済みのシフトを集計。(シフト数, 行数) を返す"""
+    now = datetime.utcnow()
+    shifts = rows = 0
+    day = start_date
+    while day <= end_date:
+        for window in calendar.windows_on(day):
+            if window.end_at > now:
+                continue
+            rows += create_shift_summary(window)
+            shifts += 1
+        day += timedelta(days=1)
+    return shifts, rows
+
+
+class ShiftSummaryScheduler:
+    """終了したシフトを順に集計するバックグラウンドジョブ"""
+
+    def __init__(self, calendar=shift_calendar, delay_minutes=SHIFT_SUMMARY_DELAY_MINUTES):
+        self.calendar = calendar
+        self.delay = timedelta(minutes=delay_minutes)
+        self.last_end = None      # 集計済みの最後のシフトの終了時刻
+        self._thread = None
+
+    def run_pending(self, now=None):
+        """前回以降に終了したシフトを集計し、集計したシフト数を返す"""
+        until = (now or datetime.utcnow()) - self.delay
+        if self.last_end is None:
+            latest = db.session.execute(select(func.max(ShiftLogSummary.end_at))).scalar()
+            self.last_end = latest or until - timedelta(days=SHIFT_SUMMARY_LOOKBACK_DAYS)
+        windows = self.calendar.windows_ending(self.last_end, until)
+        for window in windows:
+            rows = create_shift_summary(window)
+            self.last_end = window.end_at
+            logger.info("✅ シフト集計を作成しました: %s %s (%s設備)", window.shift_date, window.name, rows)
+        return len(windows)
+
+    def start(self, app, interval=SHIFT_SUMMARY_CHECK_SECONDS):
+        """定期確認のスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context(), workload(WORKLOAD_BATCH):
+                        try:
+                            self.run_pending()
+                        except Exception:
+                            db.session.rollback()
+                            raise
+                        finally:
+                            db.session.remove()
+                except Exception as e:
+                    logger.exception("❌ シフト集計エラー: %s", e)
+
+        self._thread = threading.Thread(target=run, name="shift-summary", daemon=True)
+        self._thread.start()
+        return self
+
+
+shift_summary_scheduler = ShiftSummaryScheduler()
+
@@ -0,0 +1,188 @@
+"""
+分位点スケッチ（DDSketch）
+値を対数スケールのビン（相対誤差 alpha）に数えるだけの、結合（merge）可能な要約です。
+日次・月次などの集計行にバイト列で保存し、任意の期間の p50 / p95 / p99 を
+集計行のスケッチを結合するだけで求められます（元データの走査は不要）。
+
+- 分位点の相対誤差は alpha 以内（デフォルト 1%）
+- 件数・合計・最小・最大は正確な値を保持
+- ビン数が SKETCH_MAX_BINS を超えたら、絶対値の小さい側のビンをまとめる
+- 保存形式: バージョン(1) + alpha・合計・最小・最大(float64) + 各ストアの (キー差分, 件数) を可変長整数で
+"""
+
+import math
+import struct
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_MAX_BINS = 2048
+# これより絶対値の小さい値は 0 として数える
+SKETCH_MIN_VALUE = 1e-9
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<Bdddd")
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+class DDSketch:
+    """相対誤差つきの分位点スケッチ"""
+
+    __slots__ = ("alpha", "gamma_ln", "positive", "negative", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, alpha=SKETCH_RELATIVE_ACCURACY):
+        self.alpha = alpha
+        self.gamma_ln = math.log((1 + alpha) / (1 - alpha))
+        self.positive = {}      # キー → 件数
+        self.negative = {}      # 絶対値のキー → 件数
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, magnitude):
+        return math.ceil(math.log(magnitude) / self.gamma_ln)
+
+    def _value(self, key):
+        return 2 * math.exp(key * self.gamma_ln) / (1 + math.exp(self.gamma_ln))
+
+    def add(self, value, weight=1):
+        if value > SKETCH_MIN_VALUE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + weight
+        elif value < -SKETCH_MIN_VALUE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + weight
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.positive) + len(self.negative) > SKETCH_MAX_BINS:
+            self._collapse()
+
+    def merge(self, other):
+        """別のスケッチ（同じ alpha）を取り込む"""
+        if other is None or not other.count:
+            return self
+        if not math.isclose(other.alpha, self.alpha):
+            raise ValueError(f"alpha が異なるスケッチは結合できません: {self.alpha} / {other.alpha}")
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.positive) + len(self.negative) > SKETCH_MAX_BINS:
+            self._collapse()
+        return self
+
+    def _collapse(self):
+        """絶対値の小さい側のビンをまとめてビン数を上限内に収める"""
+        excess = len(self.positive) + len(self.negative) - SKETCH_MAX_BINS
+        for store in (self.negative, self.positive):
+            if excess <= 0 or len(store) < 2:
+                continue
+            keys = sorted(store)
+            merged = keys[:min(excess, len(keys) - 1) + 1]
+            store[merged[-1]] += sum(store.pop(key) for key in merged[:-1])
+            excess -= len(merged) - 1
+
+    def quantile(self, q):
+        """分位点（0〜1）の近似値（空なら None）"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(self.min, -self._value(key))
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self.max, self._value(key))
+        return self.max
+
+    @property
+    def avg(self):
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self):
+        out = bytearray(_HEADER.pack(_FORMAT_VERSION, self.alpha, self.sum,
+                                     self.min if self.count else 0.0, self.max if self.count else 0.0))
+        _write_varint(out, self.zero_count)
+        for store in (self.positive, self.negative):
+            _write_varint(out, len(store))
+            previous = 0
+            for key in sorted(store):
+                _write_varint(out, _zigzag(key - previous))
+                _write_varint(out, store[key])
+                previous = key
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, alpha, total, minimum, maximum = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"未対応のスケッチ形式です: {version}")
+        sketch = cls(alpha)
+        pos = _HEADER.size
+        sketch.zero_count, pos = _read_varint(data, pos)
+        for store in (sketch.positive, sketch.negative):
+            size, pos = _read_varint(data, pos)
+            key = 0
+            for _ in range(size):
+                delta, pos = _read_varint(data, pos)
+                key += _unzigzag(delta)
+                store[key], pos = _read_varint(data, pos)
+        sketch.count = sketch.zero_count + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        if sketch.count:
+            sketch.sum, sketch.min, sketch.max = total, minimum, maximum
+        return sketch
+
+
+def merge_sketches(blobs, alpha=SKETCH_RELATIVE_ACCURACY):
+    """保存済みスケッチ（バイト列、None は無視）を結合"""
+    merged = DDSketch(alpha)
+    for blob in blobs:
+        if blob:
+            merged.merge(DDSketch.from_bytes(blob))
+    return merged
@@ -0,0 +1,165 @@
+"""
+日次・月次集計の作成（定期ジョブ・管理API・管理ツールで共通）
+集計値は DB 側の集計クエリで計算し、分位点用のスケッチ（DDSketch）は
+保存済みのスケッチを設備ごとに結合します。
+
+- 日次: 受信サンプルの15分集計（sample_stats）→ 平均・最大・最小など + current / cycle_time のスケッチ
+  （圧縮で logs に保存しなかったサンプルも含む、受信した全サンプルの集計。SUMMARY_METHOD）
+- 月次: 日次集計 → 件数で重み付けした平均 + 日次スケッチの結合
+  （日ごとの件数が異なっても日次平均の単純平均にはならない）
+- 任意の期間の分位点は、期間に含まれる月は月次、それ以外は日次のスケッチを結合
+- 15分集計の読み出しは読み取りレプリカ（設定時）で実行し、集計行の書き込みはプライマリ
+  （月次は直前に書いた日次集計を読むためプライマリ）
+"""
+
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, or_, select
+
+from backend.db import db
+from backend.db.models import DailyLogSummary, MonthlyLogSummary, SampleStats
+from backend.db.readers import monthly_summary_aggregates, sample_stats_aggregates
+from backend.db.routing import replica_reads
+from backend.sample_stats import SKETCH_METRICS, sample_stats_registry
+from backend.sketch import merge_sketches
+
+# 集計の元データ（API の summary_method）: 圧縮の有無によらず受信した全サンプル
+SUMMARY_METHOD = "all_received_samples"
+
+
+def _merge_rows(rows, metrics):
+    """(スケッチ...) の行をデータ項目ごとに結合 {metric: DDSketch}"""
+    return {metric: merge_sketches(row[i] for row in rows) for i, metric in enumerate(metrics)}
+
+
+def _equipment_sketches(stmt):
+    """(equipment_pk, スケッチ...) の行を設備ごとに結合 {equipment_pk: {metric: DDSketch}}"""
+    rows_by_equipment = {}
+    for equipment_pk, *blobs in db.session.execute(stmt):
+        rows_by_equipment.setdefault(equipment_pk, []).append(blobs)
+    return {equipment_pk: _merge_rows(rows, SKETCH_METRICS) for equipment_pk, rows in rows_by_equipment.items()}
+
+
+def _sketch_columns(sketches):
+    return {
+        f"{metric}_sketch": sketches[metric].to_bytes() if sketches and sketches[metric].count else None
+        for metric in SKETCH_METRICS
+    }
+
+
+def summarize_samples(start, end):
+    """期間 [start, end)（15分単位）の受信サンプルを設備ごとに集計した行（dict、スケッチ付き）のリスト
+
+    集計中の15分をメモリから保存してから読むため、直前までに受信したサンプルも含まれる。
+    """
+    sample_stats_registry.flush()
+    with replica_reads():
+        aggregates = sample_stats_aggregates(start, end)
+        if not aggregates:
+            return []
+        sketches = _equipment_sketches(
+            select(SampleStats.equipment_id,
+                   *[getattr(SampleStats, f"{metric}_sketch") for metric in SKETCH_METRICS])
+            .where(SampleStats.bucket >= start, SampleStats.bucket < end)
+        )
+    return [
+        dict(row._mapping, **_sketch_columns(sketches.get(row.equipment_id)))
+        for row in aggregates
+    ]
+
+
+def write_daily_summary(target_date):
+    """指定日（UTC）の日次集計を作り直し、集計した設備数を返す（コミットまで行う）"""
+    start = datetime.combine(target_date, datetime.min.time())
+    rows = summarize_samples(start, start + timedelta(days=1))
+    if rows:
+        # 受信のあった設備の既存の日次集計を削除
+        db.session.execute(
+            delete(DailyLogSummary).where(
+                DailyLogSummary.date == target_date,
+                DailyLogSummary.equipment_id.in_([row["equipment_id"] for row in rows])
+            )
+        )
+        db.session.execute(insert(DailyLogSummary), [dict(row, date=target_date) for row in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def write_monthly_summary(year, month):
+    """指定月の月次集計を日次集計から作り直し、集計した設備数を返す（コミットまで行う）"""
+    start_date = date(year, month, 1)
+    end_date = date(year, month, monthrange(year, month)[1])
+    aggregates = monthly_summary_aggregates(start_date, end_date)
+    if aggregates:
+        sketches = _equipment_sketches(
+            select(DailyLogSummary.equipment_id,
+                   *[getattr(DailyLogSummary, f"{metric}_sketch") for metric in SKETCH_METRICS])
+            .where(DailyLogSummary.date >= start_date, DailyLogSummary.date <= end_date)
+        )
+        db.session.execute(
+            delete(MonthlyLogSummary).where(
+                MonthlyLogSummary.year == year,
+                MonthlyLogSummary.month == month,
+                MonthlyLogSummary.equipment_id.in_([row.equipment_id for row in aggregates])
+            )
+        )
+        rows = []
+        for row in aggregates:
+            values = dict(row._mapping, year=year, month=month, **_sketch_columns(sketches.get(row.equipment_id)))
+            # スケッチがある項目は正確な合計・件数から平均を求める
+            for metric, sketch in (sketches.get(row.equipment_id) or {}).items():
+                if sketch.count:
+                    values[f"{metric}_avg"] = sketch.avg
+            rows.append(values)
+        db.session.execute(insert(MonthlyLogSummary), rows)
+    db.session.commit()
+    return len(aggregates)
+
+
+def range_sketches(equipment_pk, start_date, end_date, metrics=SKETCH_METRICS):
+    """日付 start_date〜end_date（UTC）のスケッチを結合し、({metric: DDSketch}, 使用した集計の件数) を返す
+
+    期間に丸ごと含まれ、月次集計がある月は月次のスケッチを、それ以外の日は日次のスケッチを使います。
+    """
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        first = date(year, month, 1)
+        last = date(year, month, monthrange(year, month)[1])
+        if first >= start_date and last <= end_date:
+            months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    sketch_rows = []
+    covered = set()
+    if months:
+        rows = db.session.execute(
+            select(MonthlyLogSummary.year, MonthlyLogSummary.month,
+                   *[getattr(MonthlyLogSummary, f"{metric}_sketch") for metric in metrics])
+            .where(MonthlyLogSummary.equipment_id == equipment_pk,
+                   or_(*[and_(MonthlyLogSummary.year == y, MonthlyLogSummary.month == m) for y, m in months]))
+        ).all()
+        for row_year, row_month, *blobs in rows:
+            covered.add((row_year, row_month))
+            sketch_rows.append(blobs)
+
+    # 月次で賄えない日付の範囲（月単位に分割し、月次がある月を除く）
+    ranges = []
+    day = start_date
+    while day <= end_date:
+        month_end = date(day.year, day.month, monthrange(day.year, day.month)[1])
+        until = min(month_end, end_date)
+        if (day.year, day.month) not in covered:
+            ranges.append((day, until))
+        day = until + timedelta(days=1)
+    daily_rows = 0
+    if ranges:
+        rows = db.session.execute(
+            select(*[getattr(DailyLogSummary, f"{metric}_sketch") for metric in metrics])
+            .where(DailyLogSummary.equipment_id == equipment_pk,
+                   or_(*[DailyLogSummary.date.between(first, last) for first, last in ranges]))
+        ).all()
+        daily_rows = len(rows)
+        sketch_rows.extend(rows)
+    return _merge_rows(sketch_rows, metrics), {"monthly": len(covered), "daily": daily_rows}
@@ -0,0 +1,23 @@
+"""
+タイムスタンプの変換
+DB の日時列はタイムゾーンなしの UTC で保存するため、受信した日時（"...Z" などの
+タイムゾーン付き）も取込み時に UTC のタイムゾーンなしにそろえます。
+秒への変換はサーバーのタイムゾーンに依存しないよう UTC とみなして計算します
+（タイムゾーンなしの datetime.timestamp() はローカル時刻として解釈されるため使わない）。
+"""
+
+from datetime import datetime, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def naive_utc(timestamp):
+    """タイムゾーン付きの datetime を UTC（タイムゾーンなし）に変換（タイムゾーンなしはそのまま）"""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def utc_seconds(timestamp):
+    """UNIX 時刻（秒）。タイムゾーンなしの datetime は UTC とみなす"""
+    return (naive_utc(timestamp) - _EPOCH).total_seconds()
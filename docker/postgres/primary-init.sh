@@ -0,0 +1,10 @@
+#!/bin/bash
+# プライマリの初期化（docker-compose.replica.yml）: レプリケーション用のユーザーとスロット
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-SQL
+    CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD 'repl_pass';
+    SELECT pg_create_physical_replication_slot('replica1');
+SQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,16 @@
+#!/bin/bash
+# レプリカの起動（docker-compose.replica.yml）: 初回のみプライマリからベースバックアップを取得
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    echo "📥 プライマリからベースバックアップを取得しています..."
+    until pg_basebackup -h postgres-primary -U replicator -D "$PGDATA" -S replica1 -X stream -R -P; do
+        echo "⏳ プライマリを待機しています..."
+        rm -rf "${PGDATA:?}"/*
+        sleep 2
+    done
+    chown -R postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+fi
+
+exec gosu postgres postgres -c hot_standby=on
@@ -0,0 +1,96 @@
+"""
+しきい値アラームの評価器: しきい値・変化率・継続時間・ヒステリシス
+"""
+
+import pytest
+
+from backend.alarm_engine import CompiledRule, EquipmentEvaluator
+
+
+def _run(evaluator, samples):
+    """[(t, data), ...] を評価し、[(t, event, rule_id, value), ...] を返す"""
+    return [
+        (t, event, rule.rule_id, value)
+        for t, data in samples
+        for event, rule, value in evaluator.evaluate(t, data)
+    ]
+
+
+def test_threshold_raises_and_clears_once():
+    evaluator = EquipmentEvaluator([
+        CompiledRule(1, "temperature", "gt", 80),
+        CompiledRule(2, "temperature", "le", 20),
+    ])
+    samples = [(t, {"temperature": v}) for t, v in enumerate([70, 81, 85, 80, 20, 19, 21])]
+
+    assert _run(evaluator, samples) == [
+        (1, "raised", 1, 81), (3, "cleared", 1, 80),
+        (4, "raised", 2, 20), (6, "cleared", 2, 21),
+    ]
+
+
+def test_ignores_missing_non_numeric_and_out_of_order_samples():
+    rule = CompiledRule(1, "current", "ge", 10)
+    evaluator = EquipmentEvaluator([rule])
+
+    assert evaluator.evaluate(1.0, {"temperature": 99}) == []
+    assert evaluator.evaluate(2.0, {"current": "12"}) == []
+    assert evaluator.evaluate(3.0, {"current": True}) == []
+    assert evaluator.evaluate(4.0, {"current": 5}) == []
+    # 再送などで時刻が戻った・重複したサンプルは評価しない
+    assert evaluator.evaluate(4.0, {"current": 12}) == []
+    assert evaluator.evaluate(3.5, {"current": 12}) == []
+    assert not rule.active
+    assert [event for event, _, _ in evaluator.evaluate(5.0, {"current": 12})] == ["raised"]
+
+
+def test_rate_of_change_uses_previous_sample():
+    evaluator = EquipmentEvaluator([
+        CompiledRule(1, "pressure", "rate_gt", 0.5),
+        CompiledRule(2, "pressure", "rate_lt", -1.0),
+    ])
+    # 変化率（/秒）: -, +0.25, +1.0, 0, -2.0, 0
+    samples = [(0, {"pressure": 1.0}), (4, {"pressure": 2.0}), (5, {"pressure": 3.0}),
+               (7, {"pressure": 3.0}), (8, {"pressure": 1.0}), (10, {"pressure": 1.0})]
+
+    transitions = _run(evaluator, samples)
+    assert [(t, event, rule_id) for t, event, rule_id, _ in transitions] == [
+        (5, "raised", 1), (7, "cleared", 1), (8, "raised", 2), (10, "cleared", 2),
+    ]
+    assert transitions[0][3] == pytest.approx(1.0)
+    assert transitions[2][3] == pytest.approx(-2.0)
+
+
+def test_duration_requires_condition_to_persist():
+    rule = CompiledRule(1, "current", "gt", 10, duration=30)
+    evaluator = EquipmentEvaluator([rule])
+
+    # 条件を満たした時刻から30秒続くまで発報しない。途中で外れたら数え直し
+    samples = [(0, 11), (20, 12), (25, 9), (30, 11), (50, 11), (60, 11), (70, 11), (80, 5)]
+    assert _run(evaluator, [(t, {"current": v}) for t, v in samples]) == [
+        (60, "raised", 1, 11), (80, "cleared", 1, 5),
+    ]
+    assert rule.pending_since is None
+
+
+def test_hysteresis_delays_clear():
+    upper = CompiledRule(1, "temperature", "gt", 80, hysteresis=5)
+    lower = CompiledRule(2, "cycle_time", "lt", 10, hysteresis=2)
+    evaluator = EquipmentEvaluator([upper, lower])
+
+    samples = [(t, {"temperature": v}) for t, v in enumerate([81, 78, 76, 75.5, 75, 79, 81])]
+    # 発報中は 80 - 5 = 75 以下に戻るまで解除しない。解除後は元のしきい値で判定
+    assert _run(evaluator, samples) == [(0, "raised", 1, 81), (4, "cleared", 1, 75), (6, "raised", 1, 81)]
+
+    samples = [(t, {"cycle_time": v}) for t, v in enumerate([9, 11, 11.9, 12, 10.5], start=10)]
+    assert _run(evaluator, samples) == [(10, "raised", 2, 9), (13, "cleared", 2, 12)]
+
+
+def test_restored_active_rule_clears_without_raising_again():
+    # 未解除の AlarmEvent から復元した発報中のルール
+    rule = CompiledRule(1, "temperature", "gt", 80, hysteresis=5, active=True)
+    evaluator = EquipmentEvaluator([rule])
+
+    assert evaluator.evaluate(0, {"temperature": 90}) == []
+    assert evaluator.evaluate(1, {"temperature": 77}) == []
+    assert [event for event, _, _ in evaluator.evaluate(2, {"temperature": 74})] == ["cleared"]
@@ -0,0 +1,106 @@
+"""
+複数設備の履歴一括取得: 詳細ログ・日次集計のどちらでも同じ意味の値と、日次集計の時間幅
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend.db import db
+from backend.db.models import DailyLogSummary
+from backend.sample_stats import sample_stats_registry
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    # 設備の主キーはDBごとに1から振られるため、他のテストのメモリ上の状態を持ち込まない
+    monkeypatch.setattr(sample_stats_registry, "_equipments", {})
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.application = app
+    for equipment_id in ("S1", "S2"):
+        client.post("/api/register", json={"equipment_id": equipment_id, "mac_address": equipment_id,
+                                           "cpu_serial_number": equipment_id})
+    return client
+
+
+def _bulk(client, **body):
+    response = client.post("/api/logs/history/bulk", json={"equipment_ids": ["S1", "S2", "NONE"], **body})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def _post_samples(client, samples):
+    response = client.post("/api/logs/batch", json={"samples": [
+        {"equipment_id": "S1", "timestamp": timestamp.isoformat() + "Z", **data} for timestamp, data in samples
+    ]})
+    assert response.status_code == 200
+
+
+def test_raw_tier_aggregates_per_bucket(client):
+    start = datetime(2025, 1, 15)
+    _post_samples(client, [
+        (start + timedelta(seconds=10), {"current": 1.0, "production_count": 5, "error_code": 0}),
+        (start + timedelta(seconds=20), {"current": 3.0, "production_count": 7, "error_code": 12}),
+        (start + timedelta(seconds=30), {"current": 5.0, "production_count": 6, "error_code": 3}),
+        (start + timedelta(seconds=70), {"current": 8.0, "production_count": 9, "error_code": 0}),
+    ])
+
+    body = _bulk(client, start="2025-01-15T00:00:00Z", end="2025-01-15T00:02:00Z", points=2)
+    assert (body["tier"], body["bucket_seconds"], body["summary_method"]) == ("raw_logs", 60, None)
+    assert body["missing"] == ["NONE"]
+    s1 = body["equipments"]["S1"]
+    assert s1["current"] == [3.0, 8.0]
+    assert s1["production_count"] == [7, 9]
+    # エラーコードの値ではなく、エラーのサンプル数
+    assert s1["error_count"] == [2, 0]
+    assert body["equipments"]["S2"]["timestamp"] == []
+
+
+def test_daily_tier_buckets_by_points_and_fills_current_day(client):
+    today = datetime.utcnow().date()
+    origin = today - timedelta(days=5)
+    with client.application.app_context():
+        for offset, current, count, errors, production in [(0, 10.0, 100, 1, 50), (1, 20.0, 300, 2, 80),
+                                                           (3, 30.0, 100, 0, 120), (4, None, 50, 4, 130)]:
+            db.session.add(DailyLogSummary(
+                equipment_id=1, date=origin + timedelta(days=offset), current_avg=current,
+                production_count_total=production, error_count=errors, data_count=count,
+            ))
+        db.session.commit()
+    # 日次集計がまだない当日分は受信サンプルから
+    midnight = datetime.combine(today, datetime.min.time())
+    _post_samples(client, [
+        (midnight + timedelta(minutes=1), {"current": 60.0, "production_count": 140, "error_code": 1}),
+        (midnight + timedelta(minutes=2), {"current": 90.0, "production_count": 150, "error_code": 0}),
+    ])
+    # 15分集計は定期保存（SAMPLE_STATS_FLUSH_SECONDS）後に読める
+    with client.application.app_context():
+        sample_stats_registry.flush()
+
+    end = midnight + timedelta(hours=1)
+    body = _bulk(client, start=origin.isoformat() + "T06:00:00Z", end=end.isoformat() + "Z", points=3,
+                 metrics=["current", "production_count", "error_count"])
+    # 4日19時間 / 3 → 2日幅に切り上げ（UTC の0時から区切り、当日は3つ目の幅）
+    assert (body["tier"], body["bucket_seconds"]) == ("daily_summaries", 2 * 86400)
+    assert body["summary_method"] == "all_received_samples"
+    s1 = body["equipments"]["S1"]
+    assert s1["timestamp"] == [
+        (datetime.combine(origin, datetime.min.time()) + timedelta(days=2 * i)).isoformat()
+        for i in range(3)
+    ]
+    # 平均は件数で重み付け（値のない日は重みに含めない）、エラー数は合計、生産カウンターは最大
+    assert s1["current"] == pytest.approx([(10.0 * 100 + 20.0 * 300) / 400, 30.0, 75.0])
+    assert s1["error_count"] == [3, 0, 5]
+    assert s1["production_count"] == [80, 120, 150]
+    assert body["equipments"]["S2"]["current"] == []
+
+
+def test_unknown_metric_is_rejected(client):
+    response = client.post("/api/logs/history/bulk", json={"equipment_ids": ["S1"], "metrics": ["error_code"]})
+    assert response.status_code == 400
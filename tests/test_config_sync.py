@@ -0,0 +1,70 @@
+"""
+エッジ側の設定同期: 条件付き取得・設定バージョン・反映失敗時の継続
+"""
+
+from backend.edge.config_sync import ConfigSync
+
+
+class _Response:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    """設備ごとの設定・ETag・版を返すサーバーの代わり"""
+
+    def __init__(self):
+        self.configs = {"E1": ([{"data_type": "current"}], 3), "E2": ([], 7)}
+        self.requests = []
+
+    def get(self, url, headers, timeout):
+        equipment_id = url.split("/")[-2]
+        self.requests.append((equipment_id, headers.get("If-None-Match")))
+        configs, version = self.configs[equipment_id]
+        etag = f'"{equipment_id}-{version}"'
+        if headers.get("If-None-Match") == etag:
+            return _Response(304, headers={"ETag": etag})
+        return _Response(200, configs, {"ETag": etag, "X-Config-Version": str(version)})
+
+
+def test_fetch_configs_records_version_per_response():
+    session = _Session()
+    sync = ConfigSync("http://server", session=session)
+
+    assert sync.fetch_configs("E1") == ([{"data_type": "current"}], True)
+    assert sync.fetch_configs("E2") == ([], True)
+    assert sync.versions == {"E1": 3, "E2": 7}
+
+    # 変更がなければ 304 で手元の本文を返す
+    assert sync.fetch_configs("E1") == ([{"data_type": "current"}], False)
+    assert session.requests[-1] == ("E1", '"E1-3"')
+
+
+def test_failed_on_change_does_not_stop_refresh():
+    session = _Session()
+    applied = []
+
+    def on_change(equipment_id, configs):
+        if not applied:
+            applied.append(None)
+            raise RuntimeError("PLC unreachable")
+        applied.append((equipment_id, configs))
+
+    sync = ConfigSync("http://server", on_change=on_change, session=session)
+    # 例外は記録だけして呼び出し元（通知・定期取得のスレッド）に伝えない
+    sync._refresh_quietly("E1")
+    # 反映に失敗した設定は 304 にせず取得し直して再度反映する
+    sync._refresh_quietly("E1")
+    assert session.requests == [("E1", None), ("E1", None)]
+    assert applied[-1] == ("E1", [{"data_type": "current"}])
+    sync._refresh_quietly("E1")
+    assert session.requests[-1] == ("E1", '"E1-3"')
+    assert len(applied) == 2
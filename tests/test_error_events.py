@@ -0,0 +1,120 @@
+"""
+エラーコードの発生区間: 取込み時の区間抽出と MTBF/MTTR の計算
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db import db
+from backend.db.models import ErrorEvent
+from backend.error_events import ErrorCodeTracker, error_event_registry, reliability
+
+T0 = datetime(2025, 1, 15, 8, 0, 0)
+
+
+def _at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+def test_tracker_transitions():
+    tracker = ErrorCodeTracker()
+
+    assert tracker.offer(_at(0), 0) == []
+    assert tracker.offer(_at(10), 101) == [("open", {"error_code": 101, "started_at": _at(10)})]
+    assert tracker.offer(_at(20), 101) == []
+    # 別のコードへの変化は前の区間を終了し、同じ時刻に次の区間を開始
+    assert tracker.offer(_at(40), 202) == [
+        ("close", {"ended_at": _at(40), "duration_seconds": 30.0}),
+        ("open", {"error_code": 202, "started_at": _at(40)}),
+    ]
+    assert tracker.offer(_at(45), 0) == [("close", {"ended_at": _at(45), "duration_seconds": 5.0})]
+    assert (tracker.code, tracker.started_at) == (0, None)
+
+
+def test_tracker_ignores_missing_and_out_of_order_samples():
+    tracker = ErrorCodeTracker()
+    tracker.offer(_at(10), 0)
+
+    assert tracker.offer(_at(20), None) == []
+    # 時刻が戻ったサンプル（再送分など）は無視
+    assert tracker.offer(_at(5), 101) == []
+    # タイムゾーン付きの時刻も UTC として扱う
+    aware = (T0 + timedelta(seconds=30, hours=9)).isoformat() + "+09:00"
+    assert tracker.offer(datetime.fromisoformat(aware), "7") == [
+        ("open", {"error_code": 7, "started_at": _at(30)}),
+    ]
+
+
+def test_restored_tracker_closes_open_event():
+    # 未終了の区間から復元した状態（再起動後）
+    tracker = ErrorCodeTracker(code=101, started_at=_at(0))
+
+    assert tracker.offer(_at(-5), 0) == []
+    assert tracker.offer(_at(60), 101) == []
+    assert tracker.offer(_at(90), 0) == [("close", {"ended_at": _at(90), "duration_seconds": 90.0})]
+
+
+def test_reliability_clips_events_to_period():
+    start, end = _at(0), _at(1000)
+    events = [
+        (101, _at(-100), _at(50)),     # 期間前に発生: 停止時間は期間内の50秒だけ、発生回数に数えない
+        (102, _at(200), _at(300)),     # 100秒
+        (103, _at(600), _at(620)),     # 20秒
+        (104, _at(900), None),         # 未終了: 期間の終わりまでの100秒、修理時間には数えない
+    ]
+
+    result = reliability(events, start, end)
+    assert result == {
+        "failures": 3,
+        "downtime_seconds": 270.0,
+        "availability": 0.73,
+        "mtbf_seconds": pytest.approx((1000 - 270) / 3, abs=0.1),
+        "mttr_seconds": 60.0,
+    }
+
+
+def test_reliability_without_events():
+    assert reliability([], _at(0), _at(3600)) == {
+        "failures": 0, "downtime_seconds": 0.0, "availability": 1.0, "mtbf_seconds": None, "mttr_seconds": None,
+    }
+    assert reliability([], _at(0), _at(0))["availability"] is None
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    # 設備の主キーはDBごとに1から振られるため、他のテストのメモリ上の状態を持ち込まない
+    monkeypatch.setattr(error_event_registry, "_trackers", {})
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    app.test_client().post("/api/register", json={"equipment_id": "S1", "mac_address": "S1",
+                                                  "cpu_serial_number": "S1"})
+    return app
+
+
+def test_ingest_records_events_and_restores_after_restart(app):
+    client = app.test_client()
+
+    def post(seconds, code):
+        response = client.post("/api/logs", json={"equipment_id": "S1", "timestamp": _at(seconds).isoformat() + "Z",
+                                                  "current": 1.0, "error_code": code})
+        assert response.status_code == 200
+
+    post(0, 0)
+    post(10, 101)
+    post(20, 101)
+    # 再起動（メモリの状態を失う）後も未終了の区間を終了できる
+    error_event_registry.invalidate(1)
+    post(70, 0)
+    post(80, 5)
+
+    with app.app_context():
+        events = db.session.execute(
+            db.select(ErrorEvent.error_code, ErrorEvent.started_at, ErrorEvent.ended_at, ErrorEvent.duration_seconds)
+            .order_by(ErrorEvent.started_at)
+        ).all()
+    assert [tuple(event) for event in events] == [(101, _at(10), _at(70), 60.0), (5, _at(80), None, None)]
@@ -0,0 +1,138 @@
+"""
+複数PLCポーリングスケジューラー: 模擬PLC群に対する周期・ジッター・タイムアウト・サーキットブレーカー
+"""
+
+import asyncio
+
+import pytest
+
+from backend.edge.plc_simulator import SimulatedFleet, read_simulated_plc
+from backend.edge.poller import CircuitBreaker, PollScheduler, PollTarget, TimerWheel
+
+
+def _poll_fleet(count, interval, duration, jitter_ratio=0.0, timeout=None, breaker_factory=None, **plc_options):
+    """模擬PLC群を duration 秒ポーリングし、(メトリクス, 設備別の受信時刻) を返す"""
+    received = {}
+
+    def sink(target, data):
+        received.setdefault(target.equipment_id, []).append(loop.time() - started)
+
+    async def run():
+        nonlocal loop, started
+        plc_options.setdefault("latency", 0.001)
+        plc_options.setdefault("jitter", 0.0)
+        fleet = SimulatedFleet(count, **plc_options)
+        endpoints = await fleet.start()
+        loop = asyncio.get_running_loop()
+        scheduler = PollScheduler(sink=sink, tick=0.01, jitter_ratio=jitter_ratio)
+        started = loop.time()
+        for name, host, port in endpoints:
+            scheduler.add_target(PollTarget(
+                name, interval, read_simulated_plc, host=host, port=port, timeout=timeout,
+                breaker=breaker_factory() if breaker_factory else None,
+            ))
+        stop_event = asyncio.Event()
+        runner = asyncio.create_task(scheduler.run(stop_event))
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            stop_event.set()
+            await runner
+            await fleet.stop()
+        return scheduler.metrics.snapshot()
+
+    loop = started = None
+    return asyncio.run(run()), received
+
+
+def test_polls_follow_interval():
+    snapshot, received = _poll_fleet(3, interval=0.2, duration=1.05)
+
+    assert snapshot["failures"] == 0
+    assert snapshot["missed_deadlines"] == 0
+    for times in received.values():
+        # ジッターなし: 0, 0.2, ... 1.0 秒の6回
+        assert len(times) == 6
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert all(gap == pytest.approx(0.2, abs=0.05) for gap in gaps)
+
+
+def test_first_polls_are_spread_over_interval():
+    snapshot, received = _poll_fleet(40, interval=1.0, duration=1.1, jitter_ratio=1.0)
+
+    assert snapshot["failures"] == 0
+    first_polls = [times[0] for times in received.values()]
+    assert len(first_polls) == 40
+    assert max(first_polls) < 1.05
+    # 初回実行は [0, interval) に分散し、一斉アクセスにならない
+    quarters = {min(int(t / 0.25), 3) for t in first_polls}
+    assert quarters == {0, 1, 2, 3}
+
+
+def test_hung_plc_times_out_and_opens_breaker():
+    snapshot, received = _poll_fleet(
+        1, interval=0.05, duration=0.6, timeout=0.03, hang_rate=1.0,
+        breaker_factory=lambda: CircuitBreaker(failure_threshold=3, reset_timeout=10.0),
+    )
+
+    assert not received
+    assert snapshot["successes"] == 0
+    # 3回連続のタイムアウトでopenになり、以降は試行しない
+    assert snapshot["timeouts"] == snapshot["failures"] == snapshot["polls"] == 3
+    assert snapshot["breaker_skips"] > 0
+
+
+def test_breaker_probes_once_per_reset_timeout():
+    snapshot, received = _poll_fleet(
+        1, interval=0.02, duration=1.0, failure_rate=1.0,
+        breaker_factory=lambda: CircuitBreaker(failure_threshold=3, reset_timeout=0.3),
+    )
+
+    assert not received
+    # 連続3回の失敗後は 0.3 秒毎に half_open の試行が1回だけ行われる
+    assert 4 <= snapshot["polls"] <= 7
+    assert snapshot["breaker_skips"] > 20
+
+
+def test_slow_plc_counts_missed_deadlines():
+    snapshot, received = _poll_fleet(1, interval=0.1, duration=1.0, timeout=1.0, latency=0.25)
+
+    polls = snapshot["polls"]
+    assert 2 <= polls <= 4
+    assert snapshot["failures"] == 0
+    # 応答待ちの間に来た周期は実行されずデッドライン超過として数える
+    assert snapshot["missed_deadlines"] >= 10 - polls - 1
+
+
+def test_circuit_breaker_transitions():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=5.0)
+    breaker.record_failure(0.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert not breaker.allow(5.9)
+    assert breaker.allow(6.0)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # half_open での失敗は即座に open に戻る
+    breaker.record_failure(6.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow(11.0)
+
+    assert breaker.allow(11.1)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_timer_wheel_fires_due_items_once():
+    wheel = TimerWheel(tick=0.1, slots=8, now=0.0)
+    wheel.schedule("a", 0.25)
+    wheel.schedule("b", 2.05)  # 一周（0.8秒）より先
+
+    # 期限判定はスロット幅（tick）単位
+    assert wheel.advance(0.19) == []
+    assert wheel.advance(0.2) == [(0.25, "a")]
+    assert wheel.advance(1.0) == []
+    assert wheel.advance(2.0) == [(2.05, "b")]
+    assert wheel.advance(5.0) == []
@@ -0,0 +1,59 @@
+"""
+生産数の時間別集計: 再起動（状態の再読込）後の取込み
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db import db
+from backend.db.models import ProductionHourlySummary
+from backend.production import production_registry
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.application = app
+    client.post("/api/register", json={"equipment_id": "P1", "mac_address": "P1", "cpu_serial_number": "P1"})
+    client.put("/api/equipment/P1", json={"cpu_serial_number": "P1", "interval": 1})
+    yield client
+    production_registry.invalidate(1)
+
+
+def _utc(timestamp):
+    return timestamp.isoformat() + "Z"
+
+
+def test_ingest_after_tracker_reload(client):
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    for i in range(3):
+        response = client.post("/api/logs", json={
+            "equipment_id": "P1", "timestamp": _utc(start + timedelta(seconds=i)), "production_count": i,
+        })
+        assert response.status_code == 200
+    with client.application.app_context():
+        production_registry.flush()
+
+    # 再起動後と同じく、最新の時間帯の行（タイムゾーンなし）から状態を復元
+    production_registry.invalidate(1)
+    response = client.post("/api/logs", json={
+        "equipment_id": "P1", "timestamp": _utc(start + timedelta(seconds=3)), "production_count": 5,
+    })
+    assert response.status_code == 200
+
+    with client.application.app_context():
+        production_registry.flush()
+        row = db.session.execute(
+            db.select(ProductionHourlySummary).where(ProductionHourlySummary.hour == start)
+        ).scalar_one()
+        assert row.production == 5
+        assert row.samples == 4
+        assert row.covered_seconds == pytest.approx(3.0)
+        assert row.last_timestamp == start + timedelta(seconds=3)
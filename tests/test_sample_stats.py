@@ -0,0 +1,146 @@
+"""
+日次・シフト別集計の元データ（受信サンプルの15分集計）と、圧縮で保留中のサンプルの保存
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend.compression import EquipmentCompressor, compression_registry
+from backend.db import db
+from backend.db.models import DailyLogSummary, Log, SampleStats
+from backend.sample_stats import sample_stats_registry
+from backend.shifts import Shift, ShiftCalendar, ShiftWindow, create_shift_summary
+from backend.summaries import write_daily_summary
+
+DAY = date(2025, 1, 15)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    # 設備の主キーはDBごとに1から振られるため、他のテストのメモリ上の状態を持ち込まない
+    monkeypatch.setattr(sample_stats_registry, "_equipments", {})
+    monkeypatch.setattr(compression_registry, "_compressors", {})
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.application = app
+    client.post("/api/register", json={"equipment_id": "S1", "mac_address": "S1", "cpu_serial_number": "S1"})
+    return client
+
+
+def _put_configs(client, **compression):
+    return client.put("/api/equipment/S1/plc_configs", json=[
+        {"data_type": "current", "enabled": True, "address": "D100", **compression},
+    ])
+
+
+def _post_samples(client, start, values, step=timedelta(seconds=10), counters=True):
+    samples = [
+        {"equipment_id": "S1", "timestamp": (start + step * i).isoformat() + "Z", "current": value}
+        for i, value in enumerate(values)
+    ]
+    if counters:
+        for i, sample in enumerate(samples):
+            sample.update(production_count=100 + i // 100, error_code=5 if i == 3 else 0)
+    response = client.post("/api/logs/batch", json={"samples": samples})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _count(client, model):
+    with client.application.app_context():
+        return db.session.scalar(db.select(db.func.count()).select_from(model))
+
+
+def test_daily_summary_uses_every_received_sample(client):
+    assert _put_configs(client, compression_mode="deadband_abs", compression_tolerance=1.0).status_code == 200
+    # 1.0 以内の揺らぎは圧縮で保存しないが、集計には含める
+    values = [10.0, 10.4, 10.8, 10.2, 10.6, 10.9, 10.1, 13.0, 12.5, 12.9] * 30
+    start = datetime.combine(DAY, datetime.min.time())
+    assert _post_samples(client, start, values)["accepted_count"] == len(values)
+    assert _count(client, Log) < len(values) / 4
+
+    with client.application.app_context():
+        assert write_daily_summary(DAY) == 1
+        summary = db.session.execute(db.select(DailyLogSummary)).scalar_one()
+        assert summary.data_count == len(values)
+        assert summary.current_avg == pytest.approx(sum(values) / len(values))
+        assert (summary.current_min, summary.current_max) == (10.0, 13.0)
+        assert summary.error_count == 1
+        assert summary.production_count_total == 102
+        # 10秒間隔 × 300件 = 50分 → 15分集計4行
+        assert db.session.scalar(db.select(db.func.count()).select_from(SampleStats)) == 4
+
+
+def test_stats_continue_from_saved_bucket(client):
+    start = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=6)
+    _post_samples(client, start, [1.0, 2.0, 3.0])
+    with client.application.app_context():
+        sample_stats_registry.flush()
+
+    # 再起動（メモリの集計を失う）後に同じ15分へ遅れて届いたサンプルも合算する
+    sample_stats_registry._equipments.clear()
+    _post_samples(client, start + timedelta(seconds=30), [6.0])
+    window = ShiftWindow(DAY, "A", start, start + timedelta(hours=8))
+    with client.application.app_context():
+        assert create_shift_summary(window) == 1
+        row = db.session.execute(db.select(SampleStats)).scalar_one()
+        assert (row.data_count, row.current_count, row.current_sum) == (4, 4, 12.0)
+
+
+def test_shift_boundaries_must_align_with_stats_buckets():
+    ShiftCalendar([Shift("A", datetime.strptime("06:15", "%H:%M").time(),
+                         datetime.strptime("14:45", "%H:%M").time())], "UTC")
+    with pytest.raises(ValueError):
+        ShiftCalendar.parse("A=06:10-14:00", "UTC")
+
+
+def test_swinging_door_requires_max_interval(client):
+    response = _put_configs(client, compression_mode="swinging_door", compression_tolerance=0.1)
+    assert response.status_code == 400
+    assert "compression_max_interval" in response.get_json()["error"]
+    assert _put_configs(client, compression_mode="swinging_door", compression_tolerance=0.1,
+                        compression_max_interval=600).status_code == 200
+
+
+def test_stale_held_sample_is_stored(client):
+    from backend.api.routes import store_held_samples
+
+    assert _put_configs(client, compression_mode="swinging_door", compression_tolerance=0.1,
+                        compression_max_interval=600).status_code == 200
+    # 一定の傾きで増えるサンプルは最初の1件だけ保存し、最後のサンプルを保留する
+    start = datetime.combine(DAY, datetime.min.time())
+    _post_samples(client, start, [1.0, 2.0, 3.0, 4.0], step=timedelta(seconds=1), counters=False)
+    assert _count(client, Log) == 1
+
+    compressor = compression_registry._compressors[1]
+    with client.application.app_context():
+        # 受信から held_max_age 経つまでは保存しない
+        assert compression_registry.flush_held(store_held_samples, now=compressor.held_at + 1) == 0
+        assert compression_registry.flush_held(
+            store_held_samples, now=compressor.held_at + compressor.held_max_age) == 1
+        last = db.session.execute(db.select(Log).order_by(Log.timestamp.desc())).scalars().first()
+        assert (last.timestamp, last.current) == (start + timedelta(seconds=3), 4.0)
+        # 保存済みのサンプルは二度保存しない
+        assert compression_registry.flush_held(store_held_samples, now=compressor.held_at + 1000) == 0
+
+
+def test_held_sample_failure_resets_compressor(client):
+    compressor = EquipmentCompressor({"current": ("swinging_door", 0.1, 600)}, interval=1)
+    assert compressor.held_max_age == 10
+    for i in range(3):
+        compressor.offer(datetime(2025, 1, 15, 0, 0, i), {"current": float(i)})
+    assert compressor.take_stale_held(compressor.held_at + 9) is None
+
+    def failing_store(equipment_pk, samples):
+        raise RuntimeError("db down")
+
+    compression_registry._compressors[1] = compressor
+    with client.application.app_context():
+        assert compression_registry.flush_held(failing_store, now=compressor.held_at + 10) == 0
+    assert compression_registry.stats(1) is None
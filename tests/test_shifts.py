@@ -0,0 +1,76 @@
+"""
+シフトカレンダー: 日をまたぐシフトと夏時間のあるタイムゾーンでの UTC 境界
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from backend.shifts import ShiftCalendar, ShiftWindow
+
+SPEC = "A=06:00-14:00,B=14:00-22:00,C=22:00-06:00"
+
+
+def test_windows_on_overnight_shift():
+    calendar = ShiftCalendar.parse(SPEC, "Asia/Tokyo")
+    day = date(2025, 1, 15)
+
+    assert calendar.windows_on(day) == [
+        ShiftWindow(day, "A", datetime(2025, 1, 14, 21), datetime(2025, 1, 15, 5)),
+        ShiftWindow(day, "B", datetime(2025, 1, 15, 5), datetime(2025, 1, 15, 13)),
+        # C 22:00-06:00 は開始日の扱いで、翌日の 06:00 に終わる
+        ShiftWindow(day, "C", datetime(2025, 1, 15, 13), datetime(2025, 1, 15, 21)),
+    ]
+    assert calendar.locate(datetime(2025, 1, 15, 20, 59)).name == "C"
+    assert calendar.locate(datetime(2025, 1, 15, 21, 0)) == ShiftWindow(
+        date(2025, 1, 16), "A", datetime(2025, 1, 15, 21), datetime(2025, 1, 16, 5))
+
+
+@pytest.mark.parametrize("day, hours", [
+    (date(2025, 3, 8), 7),     # 夏時間の開始（02:00 → 03:00）をまたぐ夜勤は7時間
+    (date(2025, 11, 1), 9),    # 夏時間の終了（02:00 → 01:00）をまたぐ夜勤は9時間
+    (date(2025, 6, 1), 8),
+])
+def test_windows_on_across_dst(day, hours):
+    calendar = ShiftCalendar.parse(SPEC, "America/New_York")
+    windows = {window.name: window for window in calendar.windows_on(day)}
+
+    night = windows["C"]
+    assert (night.end_at - night.start_at).total_seconds() == hours * 3600
+    # 境界は現地時刻のまま（22:00 開始、翌 06:00 終了）
+    assert calendar.local_date(night.start_at) == day
+    assert night.end_at == calendar.windows_on(date.fromordinal(day.toordinal() + 1))[0].start_at
+    assert windows["A"].end_at == windows["B"].start_at
+    assert windows["B"].end_at == night.start_at
+
+
+def test_windows_ending_returns_each_shift_once_in_end_order():
+    calendar = ShiftCalendar.parse(SPEC, "America/New_York")
+    # 2025-03-09 00:00Z〜2025-03-10 12:00Z（夏時間の開始を含む）
+    windows = calendar.windows_ending(datetime(2025, 3, 9, 0), datetime(2025, 3, 10, 12))
+
+    assert [(w.shift_date, w.name) for w in windows] == [
+        (date(2025, 3, 8), "B"), (date(2025, 3, 8), "C"),
+        (date(2025, 3, 9), "A"), (date(2025, 3, 9), "B"), (date(2025, 3, 9), "C"),
+    ]
+    assert [w.end_at for w in windows] == [
+        datetime(2025, 3, 9, 3), datetime(2025, 3, 9, 10),
+        datetime(2025, 3, 9, 18), datetime(2025, 3, 10, 2), datetime(2025, 3, 10, 10),
+    ]
+    # 区間は after を含まず until を含む（続けて呼んでも重複・漏れがない）
+    first = calendar.windows_ending(datetime(2025, 3, 9, 0), datetime(2025, 3, 9, 18))
+    rest = calendar.windows_ending(datetime(2025, 3, 9, 18), datetime(2025, 3, 10, 12))
+    assert first + rest == windows
+
+
+@pytest.mark.parametrize("spec", [
+    "",
+    "A=06:00-14:00,A=14:00-22:00",
+    "A=06:00-14:00,B=13:00-22:00",
+    "A=22:00-06:00,B=05:00-07:00",
+    "A=06:00-06:00",
+    "A=06:00",
+])
+def test_invalid_calendars(spec):
+    with pytest.raises(ValueError):
+        ShiftCalendar.parse(spec, "UTC")
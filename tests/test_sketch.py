@@ -0,0 +1,141 @@
+"""
+分位点スケッチ（DDSketch）: 相対誤差・結合・保存形式と、月次集計の重み付き平均
+"""
+
+import math
+import random
+from datetime import date
+
+import pytest
+
+from backend.db import db
+from backend.db.models import DailyLogSummary, MonthlyLogSummary
+from backend.sketch import SKETCH_RELATIVE_ACCURACY, DDSketch, merge_sketches
+
+QUANTILES = (0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
+
+def _assert_within_relative_error(sketch, values, alpha=SKETCH_RELATIVE_ACCURACY):
+    ordered = sorted(values)
+    for q in QUANTILES:
+        exact = ordered[math.floor(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= alpha * abs(exact) + 1e-12, q
+
+
+@pytest.mark.parametrize("values", [
+    [random.Random(1).lognormvariate(2.0, 1.5) for _ in range(20000)],
+    [random.Random(2).uniform(-50.0, 50.0) for _ in range(20000)],
+    [-random.Random(3).expovariate(0.1) for _ in range(5000)] + [0.0] * 100,
+    [15.0] * 1000,
+])
+def test_quantiles_within_relative_error(values):
+    sketch = DDSketch()
+    for value in values:
+        sketch.add(value)
+
+    _assert_within_relative_error(sketch, values)
+    assert sketch.count == len(values)
+    assert (sketch.min, sketch.max) == (min(values), max(values))
+    assert sketch.avg == pytest.approx(sum(values) / len(values))
+
+
+def test_empty_sketch():
+    sketch = DDSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.avg is None
+    restored = DDSketch.from_bytes(sketch.to_bytes())
+    assert restored.count == 0
+    assert restored.quantile(0.99) is None
+
+
+def test_merge_equals_single_sketch():
+    rng = random.Random(4)
+    days = [[rng.gauss(12.5, 2.0) for _ in range(rng.randint(100, 3000))] for _ in range(7)]
+    whole = DDSketch()
+    parts = []
+    for values in days:
+        part = DDSketch()
+        for value in values:
+            whole.add(value)
+            part.add(value)
+        parts.append(part)
+
+    merged = DDSketch()
+    for part in parts:
+        merged.merge(part)
+    assert merged.positive == whole.positive
+    assert merged.count == whole.count
+    assert merged.sum == pytest.approx(whole.sum)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    _assert_within_relative_error(merged, [value for values in days for value in values])
+
+    with pytest.raises(ValueError):
+        DDSketch(alpha=0.02).merge(parts[0])
+
+
+def test_serialize_round_trip_and_merge_blobs():
+    rng = random.Random(5)
+    sketch = DDSketch()
+    for _ in range(5000):
+        sketch.add(rng.choice([-1, 1]) * rng.lognormvariate(0.0, 3.0))
+    sketch.add(0.0, weight=3)
+
+    restored = DDSketch.from_bytes(sketch.to_bytes())
+    for field in ("alpha", "positive", "negative", "zero_count", "count", "sum", "min", "max"):
+        assert getattr(restored, field) == getattr(sketch, field), field
+    assert restored.to_bytes() == sketch.to_bytes()
+
+    # 保存済みスケッチの結合（None・空の列は無視）
+    half = DDSketch()
+    half.add(2.0)
+    merged = merge_sketches([sketch.to_bytes(), None, b"", half.to_bytes()])
+    assert merged.count == sketch.count + 1
+    assert merged.max == max(sketch.max, 2.0)
+
+    with pytest.raises(ValueError):
+        DDSketch.from_bytes(b"\x02" + sketch.to_bytes()[1:])
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    app.test_client().post("/api/register", json={"equipment_id": "S1", "mac_address": "S1",
+                                                  "cpu_serial_number": "S1"})
+    return app
+
+
+def test_monthly_average_is_weighted_by_sample_count(app):
+    from backend.summaries import range_sketches, write_monthly_summary
+
+    # 件数の異なる日: 単純平均なら (10 + 20) / 2 = 15、重み付きなら (10×100 + 20×300) / 400 = 17.5
+    days = [(date(2025, 1, 10), 10.0, 100), (date(2025, 1, 11), 20.0, 300)]
+    with app.app_context():
+        for day, value, count in days:
+            sketch = DDSketch()
+            sketch.add(value, weight=count)
+            db.session.add(DailyLogSummary(
+                equipment_id=1, date=day, current_avg=value, current_max=value, current_min=value,
+                temperature_avg=value + 5, error_count=1, data_count=count, current_sketch=sketch.to_bytes(),
+            ))
+        db.session.commit()
+
+        assert write_monthly_summary(2025, 1) == 1
+        monthly = db.session.execute(db.select(MonthlyLogSummary)).scalar_one()
+        assert monthly.current_avg == pytest.approx(17.5)
+        assert monthly.temperature_avg == pytest.approx(22.5)
+        assert (monthly.data_count, monthly.error_count_total, monthly.operational_days) == (400, 2, 2)
+        assert DDSketch.from_bytes(monthly.current_sketch).count == 400
+
+        # 月が丸ごと含まれる期間は月次、それ以外の日は日次のスケッチを結合
+        sketches, sources = range_sketches(1, date(2025, 1, 1), date(2025, 1, 31))
+        assert sources == {"monthly": 1, "daily": 0}
+        assert sketches["current"].quantile(0.5) == pytest.approx(20.0, rel=SKETCH_RELATIVE_ACCURACY)
+        sketches, sources = range_sketches(1, date(2025, 1, 11), date(2025, 2, 5))
+        assert sources == {"monthly": 0, "daily": 1}
+        assert sketches["current"].count == 300
+        assert sketches["cycle_time"].count == 0
@@ -0,0 +1,153 @@
+"""
+SLMP 3Eフレーム: 一括読出し計画・フレーム作成・デコードと模擬PLCとの往復
+"""
+
+import asyncio
+import struct
+
+import pytest
+
+from backend.edge.plc_simulator import SLMPSimulatedPLC
+from backend.edge.slmp import (
+    MAX_POINTS_PER_READ, PLC_TYPE_LAYOUTS, SLMPClient, SLMPError,
+    decode_block, encode_batch_read, plan_batch_reads,
+)
+
+
+def _config(data_type, address, plc_data_type="word", scale_factor=1, enabled=True):
+    return {"data_type": data_type, "enabled": enabled, "address": address,
+            "scale_factor": scale_factor, "plc_data_type": plc_data_type}
+
+
+def test_plan_merges_addresses_within_gap():
+    configs = [
+        _config("error_code", "D300"),
+        _config("current", "D100"),
+        _config("temperature", "D104", "float32"),
+        _config("disabled", "D500", enabled=False),
+    ]
+
+    blocks = plan_batch_reads(configs, max_gap=128)
+    assert [(b.device, b.start, b.count) for b in blocks] == [("D", 100, 6), ("D", 300, 1)]
+    assert [(item.data_type, item.offset) for item in blocks[0].items] == [("current", 0), ("temperature", 8)]
+
+    # 空きが max_gap 以内なら1ブロックにまとめる
+    blocks = plan_batch_reads(configs, max_gap=200)
+    assert [(b.device, b.start, b.count) for b in blocks] == [("D", 100, 201)]
+    assert blocks[0].items[-1].offset == 400
+
+
+def test_plan_splits_at_max_points_and_device():
+    def counts(*configs):
+        return [(b.start, b.count) for b in plan_batch_reads(configs, max_gap=2000)]
+
+    assert counts(_config("a", "D0"), _config("b", "D959")) == [(0, 960)]
+    assert counts(_config("a", "D0"), _config("b", "D960")) == [(0, 1), (960, 1)]
+    # dword の後半ワードが960点を超える場合も分割
+    assert counts(_config("a", "D0"), _config("b", "D959", "dword")) == [(0, 1), (959, 2)]
+
+    blocks = plan_batch_reads([_config("a", "D10"), _config("b", "W10")])
+    assert [(b.device, b.start) for b in blocks] == [("D", 10), ("W", 16)]
+
+
+def test_plan_rejects_unknown_type_and_address():
+    with pytest.raises(ValueError):
+        plan_batch_reads([_config("a", "D0", "int64")])
+    with pytest.raises(ValueError):
+        plan_batch_reads([_config("a", "X0")])
+
+
+def test_encode_batch_read_frame():
+    frame = encode_batch_read("D", 100, 6)
+    assert frame == bytes.fromhex("5000 00 ff ff03 00 0c00 1000 0104 0000 640000 a8 0600".replace(" ", ""))
+
+    # 先頭デバイス番号は3バイト（ZR は 65536 以上を指定できる）
+    frame = encode_batch_read("ZR", 0x12345, 1)
+    assert frame[15:18] == bytes([0x45, 0x23, 0x01])
+    assert frame[18] == 0xB0
+
+    with pytest.raises(ValueError):
+        encode_batch_read("D", 0, 0)
+    with pytest.raises(ValueError):
+        encode_batch_read("D", 0, MAX_POINTS_PER_READ + 1)
+
+
+def test_decode_block_types_bits_and_scale():
+    configs = [
+        _config("current", "D100", "word", scale_factor=10),
+        _config("run", "D101.3", "bit"),
+        _config("stop", "D101.4", "bit"),
+        _config("temperature", "D102", "int16", scale_factor=10),
+        _config("offset", "D103", "int32"),
+        _config("cycle_time", "D105", "dword"),
+        _config("pressure", "D107", "float32"),
+    ]
+    (block,) = plan_batch_reads(configs)
+    data = bytearray(block.count * 2)
+    struct.pack_into("<H", data, 0, 125)
+    struct.pack_into("<H", data, 2, 0b1000)
+    struct.pack_into("<h", data, 4, -55)
+    struct.pack_into("<i", data, 6, -70000)
+    struct.pack_into("<I", data, 10, 4_000_000_000)
+    struct.pack_into("<f", data, 14, 0.75)
+
+    values = decode_block(block, memoryview(data), {})
+    assert values == {
+        "current": 12.5, "run": 1, "stop": 0, "temperature": -5.5,
+        "offset": -70000, "cycle_time": 4_000_000_000, "pressure": 0.75,
+    }
+
+
+def test_client_round_trip_with_simulator():
+    configs = [
+        _config("current", "D100", "word", scale_factor=10),
+        _config("temperature", "D102", "int16", scale_factor=10),
+        _config("offset", "D103", "int32"),
+        _config("pressure", "D110", "float32"),
+        _config("run", "D120.2", "bit"),
+        _config("counter", "D2000", "dword"),
+    ]
+    expected = {"current": 12.5, "temperature": -12.3, "offset": -123456, "pressure": 0.5, "run": 1,
+                "counter": 70000}
+
+    async def run():
+        plc = SLMPSimulatedPLC("T", configs=[], latency=0.0, jitter=0.0)
+        for config in configs:
+            plc.write_value(config["address"], config["plc_data_type"], expected[config["data_type"]],
+                            config["scale_factor"])
+        port = await plc.start()
+        client = SLMPClient("127.0.0.1", port)
+        try:
+            await client.connect()
+            blocks = plan_batch_reads(configs)
+            assert len(blocks) == 2
+            first = await client.read_blocks(blocks)
+            second = await client.read_blocks(blocks)
+
+            await client.write_words("D", 900, struct.pack("<H", 0xBEEF))
+            words = await client.read_words("D", 0, MAX_POINTS_PER_READ)
+            assert len(words) == MAX_POINTS_PER_READ * 2
+            assert struct.unpack_from("<H", words, 1800)[0] == 0xBEEF
+
+            with pytest.raises(SLMPError) as error:
+                await client.read_words("D", 65535, 2)
+            assert error.value.end_code == 0xC056
+
+            # 切断後の要求は再接続して送る
+            await client.close()
+            assert await client.read_blocks(blocks) == first
+            return first, second
+        finally:
+            await client.close()
+            await plc.stop()
+
+    first, second = asyncio.run(run())
+    assert first == pytest.approx(expected)
+    assert second == first
+
+
+def test_signed_layouts():
+    assert PLC_TYPE_LAYOUTS["int16"][1].format == "<h"
+    assert PLC_TYPE_LAYOUTS["int32"][1].format == "<i"
+    assert PLC_TYPE_LAYOUTS["word"][1].format == "<H"
+    assert PLC_TYPE_LAYOUTS["dword"][1].format == "<I"
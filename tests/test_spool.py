@@ -0,0 +1,106 @@
+"""
+ストア＆フォワード・スプール: 応答が届かず再送されたバッチの重複取込み防止
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db import db
+from backend.db.models import Log, SpoolCheckpoint
+from backend.edge.spool import SampleSpool, SpoolDrainer
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from backend.app import create_app
+
+    app, _ = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.application = app
+    client.post("/api/register", json={"equipment_id": "S1", "mac_address": "S1", "cpu_serial_number": "S1"})
+    return client
+
+
+class _TestClientSession:
+    """SpoolDrainer.session の代わりに Flask のテストクライアントへ送信"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def post(self, url, json, timeout):
+        return _Response(self.client.post("/api/logs/batch", json=json))
+
+
+class _Response:
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.text = response.get_data(as_text=True)
+        self._body = response.get_json()
+
+    def json(self):
+        return self._body
+
+
+def _log_count(client):
+    with client.application.app_context():
+        return db.session.scalar(db.select(db.func.count()).select_from(Log))
+
+
+def _append_samples(spool, start, count):
+    for i in range(count):
+        spool.append({"equipment_id": "S1", "timestamp": (start + timedelta(seconds=i)).isoformat() + "Z",
+                      "current": float(i)})
+
+
+def test_lost_ack_does_not_duplicate_samples(client, tmp_path, monkeypatch):
+    spool = SampleSpool(str(tmp_path / "spool.db"))
+    drainer = SpoolDrainer(spool, "http://server", batch_size=3)
+    drainer.session = _TestClientSession(client)
+    start = datetime.utcnow() - timedelta(minutes=5)
+    _append_samples(spool, start, 5)
+
+    # 1回目は送信に成功したが ack を記録する前に落ちた
+    original_ack = spool.ack
+    monkeypatch.setattr(spool, "ack", lambda seq: (_ for _ in ()).throw(OSError("crash before ack")))
+    with pytest.raises(OSError):
+        drainer.drain_once()
+    monkeypatch.setattr(spool, "ack", original_ack)
+    assert _log_count(client) == 3
+
+    # 再起動後は同じ3件と新しい2件を再送する
+    spool.close()
+    spool = SampleSpool(str(tmp_path / "spool.db"))
+    drainer.spool = spool
+    drainer.batch_size = 10
+    assert drainer.drain_once() == 5
+    assert spool.pending_count() == 0
+    assert _log_count(client) == 5
+
+    with client.application.app_context():
+        checkpoint = db.session.get(SpoolCheckpoint, spool.spool_id)
+        assert checkpoint.acked_seq == 5
+    spool.close()
+
+
+def test_batch_reports_duplicates_and_validates_seqs(client):
+    timestamp = (datetime.utcnow() - timedelta(minutes=1)).isoformat() + "Z"
+    samples = [{"equipment_id": "S1", "timestamp": timestamp, "current": 1.0}]
+    body = {"spool_id": "abc", "seqs": [7], "samples": samples}
+
+    first = client.post("/api/logs/batch", json=body).get_json()
+    second = client.post("/api/logs/batch", json=body).get_json()
+    assert (first["accepted_count"], first["duplicate_count"]) == (1, 0)
+    assert (second["accepted_count"], second["duplicate_count"]) == (0, 1)
+    # 別のスプールの同じ番号は別物として取り込む
+    other = client.post("/api/logs/batch", json={**body, "spool_id": "other"}).get_json()
+    assert other["accepted_count"] == 1
+    # spool_id なしは従来どおり（重複判定なし）
+    assert client.post("/api/logs/batch", json={"samples": samples}).get_json()["duplicate_count"] == 0
+
+    assert client.post("/api/logs/batch", json={**body, "seqs": []}).status_code == 400
+    assert client.post("/api/logs/batch", json={**body, "seqs": ["7"]}).status_code == 400
+    assert client.post("/api/logs/batch", json={**body, "spool_id": ""}).status_code == 400